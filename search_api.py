@@ -1,9 +1,22 @@
 
-import psycopg2
-from fastapi import FastAPI, HTTPException
+import os
+import sys
+import asyncpg
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
+
+# Search modules are shared with the dockerized API in vibecoding/fastapi/app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "vibecoding", "fastapi", "app"))
+
+from db import DatabasePool
+from search_index import build_tsquery
+from search_query import (
+    COUNT_ESTIMATE_QUERY, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE,
+    build_page, build_search_query, decode_cursor, parse_fields, snippet_term,
+)
 
 # PostgreSQL connection details
 DB_CONFIG = {
@@ -14,7 +27,18 @@ DB_CONFIG = {
     'database': 'tc_search_v15'  # Changed to tc_search_v15
 }
 
-app = FastAPI()
+db = DatabasePool(DB_CONFIG)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pool for the whole process instead of a connection per request
+    await db.open()
+    try:
+        yield
+    finally:
+        await db.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware to allow requests from the frontend
 app.add_middleware(
@@ -35,52 +59,77 @@ class SearchResult(BaseModel):
     StoryContents: str | None = None
     WebTitle: str | None = None
 
-@app.get("/search", response_model=List[Dict[str, Any]])
-def search(keyword: str):
-    conn = None
+SEARCH_FIELDS = [
+    "asset_id", "TitleType", "FilmDescription", "WebUrl", "created_at",
+    "PackageName", "EventName", "StoryTitle", "StorySummary", "StoryContents",
+    "WebTitle"
+]
+# StoryContents bodies are large; the snippet stands in for them unless requested
+DEFAULT_FIELDS = [field for field in SEARCH_FIELDS if field != "StoryContents"]
+SNIPPET_SOURCE = 'coalesce(a."StoryContents", a."StorySummary", a."FilmDescription")'
+
+# Served by the bigram full-text index (see vibecoding/fastapi/app/search_index.py)
+# and paged by keyset (see vibecoding/fastapi/app/search_query.py).
+# Build the index for this database once with: python search_api.py build-index
+@app.get("/search", response_model=Dict[str, Any])
+async def search(
+    keyword: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    snippet: bool = True,
+):
+    sort = "relevance"
+    tsquery = build_tsquery(keyword)
+    if tsquery is None:
+        return build_page([], sort, limit, 0, first_page=True)
+
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-
-        # Expanded search to include more text-based columns
-        query = """
-            SELECT
-                "asset_id", "TitleType", "FilmDescription", "WebUrl", "created_at",
-                "PackageName", "EventName", "StoryTitle", "StorySummary", "StoryContents",
-                "WebTitle"
-            FROM asset
-            WHERE
-                "TitleType" ILIKE %s OR "FilmDescription" ILIKE %s OR
-                "PackageName" ILIKE %s OR "EventName" ILIKE %s OR
-                "StoryTitle" ILIKE %s OR "StorySummary" ILIKE %s OR
-                "StoryContents" ILIKE %s OR "WebTitle" ILIKE %s;
-        """
-        search_keyword = f"%{keyword}%"
-        # 8 parameters for the 8 columns in the WHERE clause
-        params = [search_keyword] * 8
-
-        cur.execute(query, params)
-        
-        rows = cur.fetchall()
-        
-        # Get column names from cursor description
-        column_names = [desc[0] for desc in cur.description]
-        
-        results = [dict(zip(column_names, row)) for row in rows]
-        
-        return results
-
-    except psycopg2.Error as err:
+        cursor_values = decode_cursor(cursor, sort) if cursor else None
+        columns = [f'"{field}"' for field in parse_fields(fields, SEARCH_FIELDS, DEFAULT_FIELDS)]
+        query, args = build_search_query(
+            tsquery,
+            columns,
+            sort,
+            limit,
+            cursor_values=cursor_values,
+            snippet_source=SNIPPET_SOURCE if snippet else None,
+            term=snippet_term(keyword),
+        )
+
+        rows = await db.fetch(query, *args)
+        total_estimate = None
+        if cursor_values is None and len(rows) > limit:
+            total_estimate = await db.fetchval(COUNT_ESTIMATE_QUERY, tsquery)
+        return build_page(rows, sort, limit, total_estimate, first_page=cursor_values is None)
+
+    except asyncpg.PostgresError as err:
         # Return a JSON response with the error message
-        return [{"error": f"Database query failed: {err}"}]
+        return {"items": [], "error": f"Database query failed: {err}"}
     except Exception as e:
         # Return a JSON response for other errors
-        return [{"error": f"An unexpected error occurred: {e}"}]
+        return {"items": [], "error": f"An unexpected error occurred: {e}"}
+
+@app.get("/metrics/db")
+async def db_metrics():
+    """Connection pool size and saturation."""
+    return db.metrics()
+
+def build_index():
+    """Creates search_vector and search_count_estimate() in this API's database."""
+    import psycopg2
+    from search_index import build_search_index
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        # Columns here keep their quoted MariaDB names ("StoryTitle")
+        build_search_index(conn, quoted_columns=True)
     finally:
-        if conn:
-            cur.close()
-            conn.close()
+        conn.close()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if sys.argv[1:] == ["build-index"]:
+        build_index()
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,113 @@
+# db.py
+"""
+Shared asyncpg connection pool for the search APIs.
+
+The pool is created once at application startup, so a request only borrows
+an already-authenticated connection instead of paying TCP, auth and backend
+fork cost on every search. asyncpg prepares every statement on first use and
+keeps it in a per-connection statement cache, so the fixed search queries are
+parsed and planned once per pooled connection rather than once per request.
+
+Pool saturation is tracked around `acquire()`: how many requests are waiting
+for a connection, how long they waited and how many gave up, exposed through
+`metrics()`.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+# Seconds a request may wait for a free connection before failing
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+# Seconds a single statement may run
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "10"))
+STATEMENT_CACHE_SIZE = 100
+
+
+class DatabasePool:
+    """asyncpg pool with acquire-time metrics."""
+
+    def __init__(self, config: Dict[str, Any], min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE):
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self._pool: Optional[asyncpg.Pool] = None
+        self._waiting = 0
+        self._acquired_total = 0
+        self._acquire_timeouts = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    async def open(self):
+        self._pool = await asyncpg.create_pool(
+            **self.config,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            command_timeout=DB_COMMAND_TIMEOUT,
+            statement_cache_size=STATEMENT_CACHE_SIZE,
+        )
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrows a pooled connection, recording how long the request waited for it."""
+        if self._pool is None:
+            raise RuntimeError("Database pool is not open")
+
+        self._waiting += 1
+        started = time.perf_counter()
+        try:
+            conn = await self._pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._acquire_timeouts += 1
+            raise
+        finally:
+            self._waiting -= 1
+
+        waited = time.perf_counter() - started
+        self._acquired_total += 1
+        self._wait_seconds_total += waited
+        self._wait_seconds_max = max(self._wait_seconds_max, waited)
+        try:
+            yield conn
+        finally:
+            await self._pool.release(conn)
+
+    async def fetch(self, query: str, *args) -> List[Dict[str, Any]]:
+        """Runs a query on a pooled connection and returns the rows as dicts."""
+        async with self.acquire() as conn:
+            rows = await conn.fetch(query, *args)
+        return [dict(row) for row in rows]
+
+    async def fetchval(self, query: str, *args) -> Any:
+        """Runs a query on a pooled connection and returns the first column of the first row."""
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pool size and saturation counters."""
+        size = self._pool.get_size() if self._pool is not None else 0
+        idle = self._pool.get_idle_size() if self._pool is not None else 0
+        in_use = size - idle
+        return {
+            "size": size,
+            "idle": idle,
+            "in_use": in_use,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "saturation": in_use / self.max_size if self.max_size else 0.0,
+            "waiting": self._waiting,
+            "acquired_total": self._acquired_total,
+            "acquire_timeouts": self._acquire_timeouts,
+            "wait_seconds_avg": self._wait_seconds_total / self._acquired_total if self._acquired_total else 0.0,
+            "wait_seconds_max": self._wait_seconds_max,
+        }
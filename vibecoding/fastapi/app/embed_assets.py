@@ -0,0 +1,212 @@
+# embed_assets.py
+"""
+Resumable batch job that fills asset.embedding for semantic search.
+
+- Rows are read in asset_id order in chunks of CURSOR_ITERSIZE, each chunk
+  its own short autocommit query continuing after the last asset_id read, so
+  the ~2M rows are never materialized in memory at once and no transaction
+  stays open for the whole run.
+- Texts are embedded in batches across a process pool; the embedder is loaded
+  once per worker process.
+- Vectors are written back with execute_values (one UPDATE ... FROM (VALUES)
+  statement per batch) on a separate connection.
+- After every batch the last asset_id is stored in embedding_job_checkpoint
+  in the same transaction as the vectors, so a crashed or interrupted run
+  continues where it stopped. A completed run clears the checkpoint. Every
+  UPDATE rewrites the row (including the generated search_vector column), so
+  batches are committed one by one rather than held in a single transaction.
+- Assets without any text get a NULL embedding rather than a zero vector,
+  which would otherwise rank as a near neighbour of every query.
+- Only rows that are new or changed are embedded: embedding_updated_at keeps
+  the updated_at (or created_at) value the embedding was computed from, and a
+  row is picked up again only when its timestamp moves past it.
+
+Usage:
+    python embed_assets.py [--batch-size 256] [--workers N] [--rebuild-index]
+
+--rebuild-index drops the HNSW index for the run and rebuilds it afterwards,
+which is much faster than maintaining the graph for a first full load.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import psycopg2
+import psycopg2.extras
+
+from embeddings import embedding_text, get_embedder, to_vector_literal
+from search_index import POSTGRES_CONFIG
+from semantic_search import EMBEDDING_COLUMN, migration_sql
+
+JOB_NAME = "asset_embedding"
+DEFAULT_BATCH_SIZE = 256
+# Rows read per query
+CURSOR_ITERSIZE = 2000
+# Characters of StoryContents sent to the embedder
+MAX_CONTENT_CHARS = 2000
+
+SETUP_SQL = [
+    "ALTER TABLE asset ADD COLUMN IF NOT EXISTS embedding_updated_at TIMESTAMP NULL DEFAULT NULL;",
+    """CREATE TABLE IF NOT EXISTS embedding_job_checkpoint (
+        job VARCHAR(100) PRIMARY KEY, last_asset_id INTEGER NOT NULL, updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );""",
+]
+
+SELECT_SQL = f"""
+    SELECT asset_id, storytitle, storysummary, left(storycontents, {MAX_CONTENT_CHARS}),
+           coalesce(updated_at, created_at) AS source_updated_at
+    FROM asset
+    WHERE asset_id > %s
+      AND (embedding_updated_at IS NULL
+           OR coalesce(updated_at, created_at) > embedding_updated_at)
+    ORDER BY asset_id
+    LIMIT %s
+"""
+
+UPDATE_SQL = f"""
+    UPDATE asset
+    SET {EMBEDDING_COLUMN} = v.embedding::vector, embedding_updated_at = v.source_updated_at
+    FROM (VALUES %s) AS v(asset_id, embedding, source_updated_at)
+    WHERE asset.asset_id = v.asset_id
+"""
+
+CHECKPOINT_SQL = """
+    INSERT INTO embedding_job_checkpoint (job, last_asset_id, updated_at)
+    VALUES (%s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (job) DO UPDATE SET last_asset_id = EXCLUDED.last_asset_id, updated_at = EXCLUDED.updated_at
+"""
+
+_worker_embedder = None
+
+
+def _init_worker():
+    """Loads the embedder once per worker process."""
+    global _worker_embedder
+    _worker_embedder = get_embedder()
+
+
+def _embed_batch(rows):
+    """Worker: embeds one batch and returns (asset_id, vector literal, source_updated_at) tuples.
+
+    Rows without text get None (stored as NULL) instead of a vector.
+    """
+    texts = [embedding_text(title, summary, contents, MAX_CONTENT_CHARS) for _, title, summary, contents, _ in rows]
+    embedded = [i for i, text in enumerate(texts) if text.strip()]
+    literals = [None] * len(rows)
+    if embedded:
+        vectors = _worker_embedder.embed([texts[i] for i in embedded])
+        for i, vector in zip(embedded, vectors):
+            literals[i] = to_vector_literal(vector)
+    return [(row[0], literal, row[4]) for row, literal in zip(rows, literals)]
+
+
+def read_checkpoint(conn) -> int:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT last_asset_id FROM embedding_job_checkpoint WHERE job = %s", (JOB_NAME,))
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def stream_batches(conn, start_after: int, batch_size: int):
+    """Yields lists of rows, reading them in keyset-paged autocommit chunks."""
+    conn.autocommit = True
+    batch = []
+    with conn.cursor() as cursor:
+        while True:
+            cursor.execute(SELECT_SQL, (start_after, CURSOR_ITERSIZE))
+            rows = cursor.fetchall()
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if len(rows) < CURSOR_ITERSIZE:
+                break
+            start_after = rows[-1][0]
+    if batch:
+        yield batch
+
+
+def write_batch(conn, results):
+    """Writes one batch of vectors and advances the checkpoint atomically."""
+    with conn.cursor() as cursor:
+        psycopg2.extras.execute_values(cursor, UPDATE_SQL, results, page_size=len(results))
+        cursor.execute(CHECKPOINT_SQL, (JOB_NAME, results[-1][0]))
+    conn.commit()
+
+
+def run_sql(conn, statements):
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        for sql in statements:
+            print(f"Executing: {sql.strip().splitlines()[0]} ...")
+            cursor.execute(sql)
+    conn.autocommit = False
+
+
+def embed_assets(batch_size: int, workers: int, rebuild_index: bool):
+    read_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    write_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    try:
+        dimension = get_embedder().dimension
+        # Column and HNSW index as in semantic_search.py (the index is created last)
+        schema_sql = migration_sql(dimension)
+        index_sql = [sql for sql in schema_sql if "idx_asset_embedding_hnsw" in sql]
+        run_sql(write_conn, [sql for sql in schema_sql if sql not in index_sql] + SETUP_SQL)
+        if rebuild_index:
+            run_sql(write_conn, ["DROP INDEX CONCURRENTLY IF EXISTS idx_asset_embedding_hnsw;"])
+
+        start_after = read_checkpoint(write_conn)
+        if start_after:
+            print(f"Resuming after asset_id {start_after}")
+
+        started = time.time()
+        total = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            # Keep a bounded number of batches in flight and write them in order,
+            # so the checkpoint only ever moves past fully written rows
+            pending = deque()
+
+            def write_oldest():
+                nonlocal total
+                results = pending.popleft().result()
+                write_batch(write_conn, results)
+                total += len(results)
+                print(f"Embedded {total} rows (last asset_id {results[-1][0]}, {total / (time.time() - started):.0f} rows/s)")
+
+            for batch in stream_batches(read_conn, start_after, batch_size):
+                pending.append(executor.submit(_embed_batch, batch))
+                if len(pending) >= workers * 2:
+                    write_oldest()
+            while pending:
+                write_oldest()
+
+        # Completed: the next run starts from the beginning and only picks up changed rows
+        with write_conn.cursor() as cursor:
+            cursor.execute("DELETE FROM embedding_job_checkpoint WHERE job = %s", (JOB_NAME,))
+        write_conn.commit()
+
+        if rebuild_index:
+            run_sql(write_conn, index_sql)
+
+        print(f"--- Embedding finished: {total} rows in {time.time() - started:.1f}s ---")
+    finally:
+        read_conn.close()
+        write_conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed asset texts into asset.embedding")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rebuild-index", action="store_true", help="drop the HNSW index during the run and rebuild it after")
+    options = parser.parse_args()
+
+    try:
+        embed_assets(options.batch_size, options.workers, options.rebuild_index)
+    except psycopg2.Error as err:
+        print(f"PostgreSQL error during embedding: {err}", file=sys.stderr)
+        sys.exit(1)
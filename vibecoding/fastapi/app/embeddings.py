@@ -0,0 +1,116 @@
+# embeddings.py
+"""
+Pluggable text embedders for semantic search.
+
+The backend is chosen with EMBEDDING_BACKEND:
+- "hashing" (default): deterministic feature-hashing model that needs no
+  downloads or GPU. Text is split into the same tokens as the full-text index
+  (CJK bigrams and ASCII words), each token is hashed into one of
+  EMBEDDING_DIMENSION buckets with a hash-derived sign, and the vector is
+  L2-normalized. Identical text always gives an identical vector, on any
+  machine, which makes it suitable for offline runs and tests. It captures
+  lexical overlap rather than meaning.
+- "sentence-transformers": a local SentenceTransformer model named by
+  EMBEDDING_MODEL (requires: pip install sentence-transformers).
+
+The vector column is created with the embedder's dimension, so switching
+backend or dimension requires re-running the embedding job.
+"""
+import hashlib
+import math
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+from search_index import TOKEN_PATTERN
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing").strip().lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "384"))
+
+
+class Embedder(ABC):
+    """Turns texts into fixed-size vectors."""
+
+    name: str = "embedder"
+    dimension: int
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embeds a batch of texts, one vector per text."""
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic, dependency-free feature-hashing embedder."""
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for run in TOKEN_PATTERN.findall((text or "").lower()):
+            if run.isascii() or len(run) == 1:
+                features.append(run)
+            else:
+                features.extend(run[i:i + 2] for i in range(len(run) - 1))
+        return features
+
+    def embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            index = value % self.dimension
+            # Top bit picks the sign so colliding features tend to cancel out
+            vector[index] += 1.0 if value >> 63 else -1.0
+
+        norm = math.sqrt(sum(x * x for x in vector))
+        if norm == 0:
+            return vector
+        return [x / norm for x in vector]
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return [self.embed_one(text) for text in texts]
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Local SentenceTransformer model (multilingual models handle Traditional Chinese)."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name)
+        self.dimension = self._model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers:{model_name}"
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = self._model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.tolist()
+
+
+_embedder: Optional[Embedder] = None
+
+
+def get_embedder() -> Embedder:
+    """Returns the process-wide embedder configured by EMBEDDING_BACKEND."""
+    global _embedder
+    if _embedder is None:
+        if EMBEDDING_BACKEND == "sentence-transformers":
+            _embedder = SentenceTransformerEmbedder()
+        else:
+            if EMBEDDING_BACKEND != "hashing":
+                print(f"Unknown EMBEDDING_BACKEND '{EMBEDDING_BACKEND}', using 'hashing'")
+            _embedder = HashingEmbedder()
+    return _embedder
+
+
+def to_vector_literal(vector: Sequence[float]) -> str:
+    """Formats a vector as pgvector text input, e.g. '[0.1,0.2]'."""
+    return "[" + ",".join(f"{x:.7g}" for x in vector) + "]"
+
+
+def embedding_text(title: Optional[str], summary: Optional[str], contents: Optional[str], max_chars: int = 2000) -> str:
+    """Text embedded for an asset: title, summary and the start of the story contents."""
+    parts = [part for part in (title, summary, (contents or "")[:max_chars]) if part]
+    return "\n".join(parts)
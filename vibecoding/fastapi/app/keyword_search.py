@@ -0,0 +1,177 @@
+# keyword_search.py
+"""
+Search by curated keyword tags (asset_keywords.Keyword_Formal).
+
+asset_keywords links ~4.4M (ItemCode, Keyword_Formal) pairs to assets. A tag
+search is answered entirely from two B-tree indexes instead of scanning free
+text:
+- idx_asset_keywords_keyword_formal on (keyword_formal text_pattern_ops, itemcode)
+  finds the matching tags, for an exact tag or a tag prefix, and already holds
+  the ItemCode, so the lookup is an index-only scan;
+- idx_asset_itemcode joins the matched ItemCodes to asset.
+
+Prefixes are matched with a range on the pattern operators
+(keyword_formal ~>=~ '台北' AND keyword_formal ~<~ '台匘') rather than
+LIKE $1 || '%', so the index stays usable in the generic plan of a prepared
+statement.
+
+Facet counts (assets per matched keyword, per category and in total) come
+from one GROUP BY GROUPING SETS query over the same join.
+
+Run this file once against the database to build the indexes:
+    python keyword_search.py
+"""
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from search_index import POSTGRES_CONFIG
+from search_query import SORT_KEY_TYPES, SORT_KEYS
+
+# Values returned per facet
+FACET_LIMIT = 20
+
+MIGRATION_SQL = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_keywords_keyword_formal ON asset_keywords (keyword_formal text_pattern_ops, itemcode);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_itemcode ON asset (itemcode);",
+    "ANALYZE asset_keywords;",
+]
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def build_keyword_filter(args: list, keyword: str, match: str) -> str:
+    """
+    Builds the predicate on asset_keywords (alias k), appending its values to args.
+
+    Args:
+        args: Positional arguments of the statement being built
+        keyword: Tag to look up (must not be empty)
+        match: "exact" or "prefix"
+    """
+    if match == "exact":
+        args.append(keyword)
+        return f"k.keyword_formal = ${len(args)}"
+    args.extend([keyword, prefix_upper_bound(keyword)])
+    return f"k.keyword_formal ~>=~ ${len(args) - 1} AND k.keyword_formal ~<~ ${len(args)}"
+
+
+def build_keyword_query(
+    keyword: str,
+    match: str,
+    select_columns: Sequence[str],
+    limit: int,
+    cursor_values: Optional[list] = None,
+) -> Tuple[str, list]:
+    """
+    Builds one page of assets tagged with a keyword, newest first.
+
+    Pages use the same keyset cursor as sort=recent in search_query.py.
+
+    Returns:
+        Tuple of SQL text and its positional arguments
+    """
+    args: list = [limit + 1]
+    where = build_keyword_filter(args, keyword, match)
+
+    seek = ""
+    if cursor_values is not None:
+        placeholders = []
+        for key, value in zip(SORT_KEYS["recent"], cursor_values):
+            args.append(value)
+            placeholders.append(f"${len(args)}::{SORT_KEY_TYPES[key]}")
+        seek = f"WHERE (asset.created_at, asset.asset_id) < ({', '.join(placeholders)})"
+
+    # DISTINCT first: a prefix can match several tags of the same asset
+    query = f"""
+        WITH tagged AS (
+            SELECT DISTINCT k.itemcode
+            FROM asset_keywords AS k
+            WHERE {where}
+        )
+        SELECT {", ".join(f"asset.{column}" for column in select_columns)}
+        FROM asset
+        JOIN tagged ON tagged.itemcode = asset.itemcode
+        {seek}
+        ORDER BY asset.created_at DESC, asset.asset_id DESC
+        LIMIT $1
+    """
+    return query, args
+
+
+def build_facet_query(keyword: str, match: str, facet_limit: int = FACET_LIMIT) -> Tuple[str, list]:
+    """
+    Builds the facet query: assets per matched keyword, per category and in total.
+
+    Each result row has (facet, value, count); facet is "keyword", "category"
+    or "total". Only the facet_limit largest values of each facet are returned.
+    """
+    args: list = [facet_limit]
+    where = build_keyword_filter(args, keyword, match)
+    query = f"""
+        SELECT facet, value, count
+        FROM (
+            SELECT CASE
+                       WHEN GROUPING(k.keyword_formal) = 0 THEN 'keyword'
+                       WHEN GROUPING(a.category) = 0 THEN 'category'
+                       ELSE 'total'
+                   END AS facet,
+                   coalesce(k.keyword_formal, a.category) AS value,
+                   count(DISTINCT a.asset_id) AS count,
+                   row_number() OVER (
+                       PARTITION BY GROUPING(k.keyword_formal), GROUPING(a.category)
+                       ORDER BY count(DISTINCT a.asset_id) DESC
+                   ) AS position
+            FROM asset_keywords AS k
+            JOIN asset AS a ON a.itemcode = k.itemcode
+            WHERE {where}
+            GROUP BY GROUPING SETS ((k.keyword_formal), (a.category), ())
+        ) AS facets
+        WHERE position <= $1
+        ORDER BY facet, count DESC, value
+    """
+    return query, args
+
+
+def build_facets(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shapes facet rows into {"total": n, "keywords": [...], "categories": [...]}."""
+    facets: Dict[str, Any] = {"total": 0, "keywords": [], "categories": []}
+    for row in rows:
+        if row["facet"] == "total":
+            facets["total"] = row["count"]
+        else:
+            name = "keywords" if row["facet"] == "keyword" else "categories"
+            facets[name].append({"value": row["value"], "count": row["count"]})
+    return facets
+
+
+def build_keyword_index(conn):
+    """Creates the Keyword_Formal and ItemCode indexes."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        for sql in MIGRATION_SQL:
+            print(f"Executing: {sql.strip().splitlines()[0]} ...")
+            cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    import psycopg2
+
+    print("--- Building keyword tag indexes on asset_keywords and asset ---")
+    conn = None
+    try:
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        build_keyword_index(conn)
+        print("--- Keyword indexes ready. ---")
+    except psycopg2.Error as err:
+        print(f"PostgreSQL error while building keyword indexes: {err}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
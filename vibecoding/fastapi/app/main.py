@@ -1,18 +1,23 @@
-from fastapi import FastAPI, HTTPException
-from typing import List, Dict, Any
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query
+from typing import Dict, Any, Literal, Optional
 from fastapi.middleware.cors import CORSMiddleware
-import psycopg2
-import psycopg2.extras
+import asyncio
+import asyncpg
 
-app = FastAPI(title="Vector Search API")
-
-# Add CORS middleware to allow frontend access
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from db import DatabasePool
+from embeddings import get_embedder, to_vector_literal
+from search_cache import (
+    HOT_KEYWORDS_QUERY, SEARCH_CACHE_PRECOMPUTE_DAYS, SEARCH_CACHE_PRECOMPUTE_TOP,
+    SearchCache, cache_key, normalize_keyword, precompute_loop,
+)
+from keyword_search import build_facet_query, build_facets, build_keyword_query
+from search_index import build_tsquery
+from semantic_search import DEFAULT_K, MAX_K, build_semantic_query, scan_settings, supports_iterative_scan
+from search_query import (
+    COUNT_ESTIMATE_QUERY, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError,
+    build_page, build_search_query, decode_cursor, parse_fields, snippet_term,
 )
 
 # PostgreSQL connection details
@@ -24,45 +29,264 @@ POSTGRES_CONFIG = {
     'database': 'tc_search_v15'
 }
 
+db = DatabasePool(POSTGRES_CONFIG)
+search_cache = SearchCache()
+# Installed pgvector version, read on the first semantic search
+pgvector_version: Optional[str] = None
+
+async def fetch_hot_keywords():
+    rows = await db.fetch(HOT_KEYWORDS_QUERY, SEARCH_CACHE_PRECOMPUTE_TOP, SEARCH_CACHE_PRECOMPUTE_DAYS)
+    return [row["keyword"] for row in rows]
+
+async def warm_search(keyword: str):
+    """Stores the default first /search page of a keyword in the cache."""
+    await search_cache.put(search_key(keyword), await perform_search(keyword))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pool for the whole process instead of a connection per request
+    await db.open()
+    await search_cache.open()
+    precompute = asyncio.create_task(precompute_loop(fetch_hot_keywords, warm_search))
+    try:
+        yield
+    finally:
+        precompute.cancel()
+        await asyncio.gather(precompute, return_exceptions=True)
+        await search_cache.close()
+        await db.close()
+
+app = FastAPI(title="Vector Search API", lifespan=lifespan)
+
+# Add CORS middleware to allow frontend access
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Use lowercase column names without quotes for the query
+SEARCH_FIELDS = [
+    "asset_id", "created_at", "eventname", "storytitle",
+    "storycontents", "category", "filmdescription"
+]
+# StoryContents bodies are large; the snippet stands in for them unless requested
+DEFAULT_FIELDS = [field for field in SEARCH_FIELDS if field != "storycontents"]
+SNIPPET_SOURCE = "coalesce(a.storycontents, a.storysummary, a.filmdescription)"
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the Vector Search API"}
 
-def perform_search(keyword: str) -> List[Dict[str, Any]]:
-    """Core search logic, reusable by multiple endpoints."""
-    conn = None
+async def perform_search(
+    keyword: str,
+    sort: str = "relevance",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    snippet: bool = True,
+) -> Dict[str, Any]:
+    """Core search logic, reusable by multiple endpoints.
+
+    Uses the bigram full-text index built by search_index.py instead of
+    ILIKE scans, so matching rows come from the GIN index on search_vector.
+    Returns one keyset-paginated page (see search_query.py).
+    """
+    tsquery = build_tsquery(keyword)
+    if tsquery is None:
+        return build_page([], sort, limit, 0, first_page=True)
+
     try:
-        conn = psycopg2.connect(**POSTGRES_CONFIG)
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        select_columns = [
-            "asset_id", "eventname", "storytitle", 
-            "storycontents", "category", "filmdescription"
-        ]
-        search_columns = [
-            "eventname", "storytitle", "storycontents", 
-            "category", "filmdescription"
-        ]
-
-        # Use lowercase column names without quotes for the query
-        where_clause = " OR ".join([f'{col} ILIKE %s' for col in search_columns])
-        query = f'SELECT {", ".join(select_columns)} FROM asset WHERE {where_clause} ORDER BY created_at DESC LIMIT 100;'
-        params = (f'%{keyword}%',) * len(search_columns)
-
-        cursor.execute(query, params)
-        results = [dict(row) for row in cursor.fetchall()]
-        return results
-
-    except psycopg2.Error as e:
+        cursor_values = decode_cursor(cursor, sort) if cursor else None
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query, args = build_search_query(
+        tsquery,
+        parse_fields(fields, SEARCH_FIELDS, DEFAULT_FIELDS),
+        sort,
+        limit,
+        cursor_values=cursor_values,
+        snippet_source=SNIPPET_SOURCE if snippet else None,
+        term=snippet_term(keyword),
+    )
+
+    try:
+        rows = await db.fetch(query, *args)
+        total_estimate = None
+        if cursor_values is None and len(rows) > limit:
+            total_estimate = await db.fetchval(COUNT_ESTIMATE_QUERY, tsquery)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Database is busy, please retry")
+    except asyncpg.PostgresError as e:
         print(f"Database error: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
 
-@app.get("/search", response_model=List[Dict[str, Any]])
-def search_items(keyword: str):
-    """Endpoint for general search, called by the frontend."""
+    return build_page(rows, sort, limit, total_estimate, first_page=cursor_values is None)
+
+def search_key(
+    keyword: str,
+    sort: str = "relevance",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    snippet: bool = True,
+) -> str:
+    return cache_key(keyword, sort=sort, cursor=cursor, limit=limit, fields=fields, snippet=snippet)
+
+@app.get("/search", response_model=Dict[str, Any])
+async def search_items(
+    keyword: str,
+    sort: Literal["relevance", "recent"] = "relevance",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    snippet: bool = True,
+):
+    """Endpoint for general search, called by the frontend.
+
+    Pass the returned `next_cursor` back as `cursor` to get the next page.
+    `fields` is a comma separated list of columns (StoryContents is omitted by default).
+    """
+    keyword = normalize_keyword(keyword)
     if not keyword:
-        return []
-    return perform_search(keyword)
\ No newline at end of file
+        return build_page([], sort, limit, 0, first_page=True)
+    # Repeated searches (and the precomputed hot keywords) are answered from search_cache
+    return await search_cache.get_or_compute(
+        search_key(keyword, sort, cursor, limit, fields, snippet),
+        lambda: perform_search(keyword, sort, cursor, limit, fields, snippet),
+    )
+
+async def perform_keyword_search(
+    keyword: str,
+    match: str = "exact",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    facets: bool = True,
+) -> Dict[str, Any]:
+    """Assets tagged with a curated keyword (asset_keywords.Keyword_Formal).
+
+    Matching tags and their assets are found through the B-tree indexes built
+    by keyword_search.py, newest assets first. Facets are only computed for
+    the first page and carry the exact total; with facets=false the total is
+    only known when everything fits on the first page.
+    """
+    try:
+        cursor_values = decode_cursor(cursor, "recent") if cursor else None
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query, args = build_keyword_query(
+        keyword, match, parse_fields(fields, SEARCH_FIELDS, DEFAULT_FIELDS), limit, cursor_values=cursor_values
+    )
+
+    try:
+        rows = await db.fetch(query, *args)
+        facet_rows = None
+        if facets and cursor_values is None:
+            facet_rows = await db.fetch(*build_facet_query(keyword, match))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Database is busy, please retry")
+    except asyncpg.PostgresError as e:
+        print(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if facet_rows is None:
+        page = build_page(rows, "recent", limit, None, first_page=cursor_values is None)
+        if not page["total_is_exact"]:
+            # Nothing was counted without facets; report the total as unknown, not the page size
+            page["total_estimate"] = None
+        return page
+
+    facet_counts = build_facets(facet_rows)
+    page = build_page(rows, "recent", limit, facet_counts["total"], first_page=True)
+    page["total_is_exact"] = True
+    page["facets"] = facet_counts
+    return page
+
+@app.get("/search/keywords", response_model=Dict[str, Any])
+async def search_keywords(
+    keyword: str,
+    match: Literal["exact", "prefix"] = "exact",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    facets: bool = True,
+):
+    """Endpoint for keyword tag search, exact tag or tag prefix (match=prefix).
+
+    Paged like /search with sort=recent; the first page also returns facet
+    counts per matched keyword and per category.
+    """
+    keyword = keyword.strip()
+    if not keyword:
+        return build_page([], "recent", limit, 0, first_page=True)
+    return await perform_keyword_search(keyword, match, cursor, limit, fields, facets)
+
+@app.get("/search/semantic", response_model=Dict[str, Any])
+async def semantic_search(
+    query: str,
+    k: int = Query(DEFAULT_K, ge=1, le=MAX_K),
+    category: Optional[str] = None,
+    title_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    hybrid: bool = False,
+    fields: Optional[str] = None,
+):
+    """k-NN search on asset embeddings, filtered by metadata.
+
+    Filters: category, title_type (TitleType) and an EventDateStart range
+    [date_from, date_to). With hybrid=true the vector ranking is fused with
+    the keyword full-text ranking (see semantic_search.py).
+    """
+    if not query:
+        return {"items": []}
+
+    embedder = get_embedder()
+    # Model inference can be CPU heavy; keep it off the event loop
+    vector = (await asyncio.to_thread(embedder.embed, [query]))[0]
+    tsquery = build_tsquery(query) if hybrid else None
+
+    sql, args = build_semantic_query(
+        to_vector_literal(vector),
+        parse_fields(fields, SEARCH_FIELDS, DEFAULT_FIELDS),
+        k,
+        tsquery=tsquery,
+        category=category,
+        title_type=title_type,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+    global pgvector_version
+    filtered = any(value is not None for value in (category, title_type, date_from, date_to))
+    try:
+        async with db.acquire() as conn:
+            if pgvector_version is None:
+                pgvector_version = await conn.fetchval("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            async with conn.transaction():
+                # Filtered k-NN must not stop at the first ef_search candidates
+                for setting in scan_settings(k, filtered, supports_iterative_scan(pgvector_version)):
+                    await conn.execute(setting)
+                rows = await conn.fetch(sql, *args)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Database is busy, please retry")
+    except asyncpg.PostgresError as e:
+        print(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return {"items": [dict(row) for row in rows], "embedder": embedder.name, "hybrid": tsquery is not None}
+
+@app.get("/metrics/db")
+async def db_metrics():
+    """Connection pool size and saturation."""
+    return db.metrics()
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Search result cache size and hit ratio."""
+    return search_cache.metrics()
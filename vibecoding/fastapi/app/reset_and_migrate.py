@@ -1,7 +1,12 @@
 # reset_and_migrate.py
+import argparse
+import datetime
+import io
 import mysql.connector
 import psycopg2
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 # --- CONFIGS and HELPERS (Copied from main.py) ---
 
@@ -30,6 +35,13 @@ def quote_identifier(name: str) -> str:
         return f'"{name}"'
     return name
 
+INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+
+# Per-table progress, so a failed run can be resumed with --resume instead of restarting
+MIGRATION_CHECKPOINT_SQL = """CREATE TABLE IF NOT EXISTS migration_checkpoint (
+    table_name VARCHAR(200) PRIMARY KEY, last_pk BIGINT NULL DEFAULT NULL, rows_copied BIGINT NOT NULL DEFAULT 0, completed BOOLEAN NOT NULL DEFAULT FALSE, updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);"""
+
 # --- MAIN SCRIPT LOGIC ---
 
 def truncate_postgres_tables():
@@ -73,11 +85,12 @@ def truncate_postgres_tables():
         pg_conn = psycopg2.connect(**POSTGRES_CONFIG)
         pg_cursor = pg_conn.cursor()
 
-        # Get all tables in the public schema
+        # Get all tables in the public schema (deferred_index survives, so indexes
+        # dropped by an interrupted run are still rebuilt after this one)
         pg_cursor.execute("""
             SELECT tablename
             FROM pg_tables
-            WHERE schemaname = 'public'
+            WHERE schemaname = 'public' AND tablename <> 'deferred_index'
         """)
         tables = [row[0] for row in pg_cursor.fetchall()]
 
@@ -106,7 +119,7 @@ def truncate_postgres_tables():
         if pg_conn:
             pg_conn.close()
 
-def migrate_all_data():
+def migrate_all_data(workers: int = 4, chunk_size: int = 50000):
     """Migrates all data from MariaDB to PostgreSQL."""
     print("--- Step 2: Starting full data migration ---")
     mariadb_conn = None
@@ -209,21 +222,12 @@ def migrate_all_data():
         print("All table schemas are ready.")
         # --- END FIX ---
 
-        mariadb_cursor = mariadb_conn.cursor()
-        
-        mariadb_cursor.execute("SHOW TABLES")
-        tables = [table[0] for table in mariadb_cursor.fetchall()]
-        
-        for table_name in tables:
-            if '@' in table_name or '.' in table_name:
-                print(f"Skipping problematic table for data migration: {table_name}")
-                continue
-
-            print(f"--- Starting data migration for table: {table_name} ---")
-            migrate_table_data(table_name, mariadb_conn, postgres_conn)
-        
-        print("\n--- Step 2: Full data migration process finished. ---")
+        pg_cursor_fix = postgres_conn.cursor()
+        pg_cursor_fix.execute(MIGRATION_CHECKPOINT_SQL)
+        postgres_conn.commit()
+        pg_cursor_fix.close()
 
+        tables = list_mariadb_tables(mariadb_conn)
     except Exception as e:
         print(f"An error occurred during the migration process: {e}", file=sys.stderr)
         sys.exit(1)
@@ -233,9 +237,141 @@ def migrate_all_data():
         if postgres_conn:
             postgres_conn.close()
 
-def migrate_table_data(table_name: str, mariadb_conn, postgres_conn, chunk_size: int = 10000):
-    """Migrates data for a single table."""
-    mariadb_cursor = mariadb_conn.cursor(dictionary=True)
+    # Each table is copied by its own worker process with its own connections
+    print(f"Migrating {len(tables)} tables with {workers} parallel workers...")
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(migrate_table_worker, table_name, chunk_size): table_name for table_name in tables}
+        for future in as_completed(futures):
+            table_name = futures[future]
+            try:
+                rows, seconds = future.result()
+                print(f"--- Finished data migration for table: {table_name}. Rows copied: {rows} in {seconds:.1f}s ---")
+            except Exception as e:
+                print(f"Failed to migrate data for table {table_name}. Reason: {e}", file=sys.stderr)
+                failed.append(table_name)
+
+    if failed:
+        print(f"Migration failed for: {', '.join(failed)}. Re-run with --resume to continue from the checkpoints.", file=sys.stderr)
+        sys.exit(1)
+
+    print("\n--- Step 2: Full data migration process finished. ---")
+
+def list_mariadb_tables(mariadb_conn) -> list:
+    """Returns the MariaDB tables to migrate, largest first.
+
+    Largest first, so the long ones are not left running alone at the end of a parallel run.
+    """
+    mariadb_cursor = mariadb_conn.cursor()
+    mariadb_cursor.execute("""
+        SELECT TABLE_NAME FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+        ORDER BY TABLE_ROWS DESC
+    """)
+    tables = []
+    for (table_name,) in mariadb_cursor.fetchall():
+        if '@' in table_name or '.' in table_name:
+            print(f"Skipping problematic table for data migration: {table_name}")
+            continue
+        tables.append(table_name)
+    mariadb_cursor.close()
+    return tables
+
+def get_keyset_column(table_name: str, mariadb_cursor):
+    """Returns the single-column integer primary key of a table, or None."""
+    mariadb_cursor.execute("""
+        SELECT k.COLUMN_NAME, c.DATA_TYPE
+        FROM information_schema.KEY_COLUMN_USAGE k
+        JOIN information_schema.COLUMNS c
+          ON c.TABLE_SCHEMA = k.TABLE_SCHEMA AND c.TABLE_NAME = k.TABLE_NAME AND c.COLUMN_NAME = k.COLUMN_NAME
+        WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s AND k.CONSTRAINT_NAME = 'PRIMARY'
+    """, (table_name,))
+    rows = mariadb_cursor.fetchall()
+    if len(rows) == 1 and rows[0][1].lower() in INTEGER_TYPES:
+        return rows[0][0]
+    return None
+
+def get_bytea_columns(table_name: str, columns: list, postgres_cursor) -> set:
+    """Positions of the given columns that are bytea in the PostgreSQL table."""
+    postgres_cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND data_type = 'bytea'
+    """, (table_name,))
+    bytea_names = {name for (name,) in postgres_cursor.fetchall()}
+    return {index for index, col in enumerate(columns) if col in bytea_names}
+
+def copy_value(value, bytea: bool = False) -> str:
+    """Encodes one value for PostgreSQL's COPY text format.
+
+    Bytes go into bytea columns as \\x hex. For any other column they must be
+    valid UTF-8; anything else raises instead of silently corrupting the data.
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime.datetime):
+        text = value.isoformat(sep=' ')
+    elif isinstance(value, (bytes, bytearray)):
+        if bytea:
+            text = '\\x' + bytes(value).hex()
+        else:
+            try:
+                text = bytes(value).decode('utf-8')
+            except UnicodeDecodeError as e:
+                raise ValueError(f"Binary value is not valid UTF-8 and its target column is not bytea: {e}") from e
+    elif isinstance(value, set):
+        text = ','.join(sorted(value))  # MariaDB SET columns
+    else:
+        text = str(value)
+    # PostgreSQL text cannot contain NUL; backslash and control characters must be escaped
+    return text.replace('\x00', '').replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def copy_rows(postgres_cursor, copy_sql: str, rows, bytea_columns=frozenset()):
+    """Streams a chunk of rows into PostgreSQL with COPY FROM STDIN."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value, index in bytea_columns) for index, value in enumerate(row)))
+        buffer.write('\n')
+    buffer.seek(0)
+    postgres_cursor.copy_expert(copy_sql, buffer)
+
+def read_checkpoint(table_name: str, postgres_cursor):
+    postgres_cursor.execute(
+        "SELECT last_pk, rows_copied, completed FROM migration_checkpoint WHERE table_name = %s", (table_name,)
+    )
+    return postgres_cursor.fetchone()
+
+def save_checkpoint(table_name: str, postgres_cursor, last_pk, rows_copied: int, completed: bool):
+    postgres_cursor.execute("""
+        INSERT INTO migration_checkpoint (table_name, last_pk, rows_copied, completed, updated_at)
+        VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (table_name) DO UPDATE SET
+            last_pk = EXCLUDED.last_pk, rows_copied = EXCLUDED.rows_copied,
+            completed = EXCLUDED.completed, updated_at = EXCLUDED.updated_at
+    """, (table_name, last_pk, rows_copied, completed))
+
+def migrate_table_worker(table_name: str, chunk_size: int):
+    """Worker process entry point: migrates one table on its own connections."""
+    started = time.time()
+    mariadb_conn = mysql.connector.connect(**MARIADB_CONFIG)
+    postgres_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    try:
+        rows = migrate_table_data(table_name, mariadb_conn, postgres_conn, chunk_size)
+        return rows, time.time() - started
+    finally:
+        mariadb_conn.close()
+        postgres_conn.close()
+
+def migrate_table_data(table_name: str, mariadb_conn, postgres_conn, chunk_size: int = 50000) -> int:
+    """Migrates data for a single table, resuming from its checkpoint.
+
+    Tables with an integer primary key are read in keyset order
+    (WHERE pk > last ORDER BY pk LIMIT n) and every chunk is committed together
+    with its checkpoint. Other tables are streamed in a single transaction, so
+    a failure rolls the whole table back and --resume copies it again.
+    """
+    mariadb_cursor = mariadb_conn.cursor()
     postgres_cursor = postgres_conn.cursor()
 
     try:
@@ -243,47 +379,536 @@ def migrate_table_data(table_name: str, mariadb_conn, postgres_conn, chunk_size:
         mariadb_cursor.execute(f"SELECT * FROM `{table_name}` LIMIT 0")
         mariadb_cursor.fetchall()
         mariadb_columns = [col[0] for col in mariadb_cursor.description]
+        keyset_column = get_keyset_column(table_name, mariadb_cursor)
 
-        # Prepare insert statement for PostgreSQL
         columns_str = ", ".join([quote_identifier(col) for col in mariadb_columns])
-        placeholders = ", ".join(["%s"] * len(mariadb_columns))
-        insert_sql = f"INSERT INTO {quote_identifier(table_name)} ({columns_str}) VALUES ({placeholders})"
+        copy_sql = f"COPY {quote_identifier(table_name)} ({columns_str}) FROM STDIN"
+        select_columns = ", ".join(f"`{col}`" for col in mariadb_columns)
+        bytea_columns = get_bytea_columns(table_name, mariadb_columns, postgres_cursor)
 
-        offset = 0
-        total_rows_migrated = 0
+        checkpoint = read_checkpoint(table_name, postgres_cursor)
+        if checkpoint and checkpoint[2]:
+            print(f"Table {table_name} already migrated ({checkpoint[1]} rows). Skipping.")
+            return 0
+
+        if keyset_column is None:
+            # Unbuffered cursor streams the table instead of paging it with OFFSET
+            stream_cursor = mariadb_conn.cursor(buffered=False)
+            stream_cursor.execute(f"SELECT {select_columns} FROM `{table_name}`")
+            total_rows_migrated = 0
+            while True:
+                rows = stream_cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                copy_rows(postgres_cursor, copy_sql, rows, bytea_columns)
+                total_rows_migrated += len(rows)
+                print(f"Copied {len(rows)} rows to {table_name}. Total: {total_rows_migrated}")
+            stream_cursor.close()
+            save_checkpoint(table_name, postgres_cursor, None, total_rows_migrated, True)
+            postgres_conn.commit()
+            return total_rows_migrated
+
+        last_pk = checkpoint[0] if checkpoint and checkpoint[0] is not None else None
+        total_rows_migrated = checkpoint[1] if checkpoint else 0
+        if last_pk is not None:
+            print(f"Resuming {table_name} after {keyset_column} = {last_pk} ({total_rows_migrated} rows already copied)")
+
+        key_index = mariadb_columns.index(keyset_column)
+        first_chunk_sql = f"SELECT {select_columns} FROM `{table_name}` ORDER BY `{keyset_column}` LIMIT %s"
+        next_chunk_sql = f"SELECT {select_columns} FROM `{table_name}` WHERE `{keyset_column}` > %s ORDER BY `{keyset_column}` LIMIT %s"
+        copied = 0
         while True:
-            mariadb_cursor.execute(f"SELECT * FROM `{table_name}` LIMIT {chunk_size} OFFSET {offset}")
+            if last_pk is None:
+                mariadb_cursor.execute(first_chunk_sql, (chunk_size,))
+            else:
+                mariadb_cursor.execute(next_chunk_sql, (last_pk, chunk_size))
             rows = mariadb_cursor.fetchall()
-            if not rows:
-                break
+            completed = len(rows) < chunk_size
 
-            data_to_insert = [tuple(row[col] for col in mariadb_columns) for row in rows]
-            
             try:
-                postgres_cursor.executemany(insert_sql, data_to_insert)
+                if rows:
+                    copy_rows(postgres_cursor, copy_sql, rows, bytea_columns)
+                    last_pk = rows[-1][key_index]
+                    total_rows_migrated += len(rows)
+                    copied += len(rows)
+                # The chunk and its checkpoint commit together, so a resumed run never duplicates rows
+                save_checkpoint(table_name, postgres_cursor, last_pk, total_rows_migrated, completed)
                 postgres_conn.commit()
-                total_rows_migrated += len(rows)
-                print(f"Migrated {len(rows)} rows to {table_name}. Total: {total_rows_migrated}")
             except Exception as e:
                 postgres_conn.rollback()
-                print(f"Error migrating data chunk for table {table_name} at offset {offset}: {e}", file=sys.stderr)
-                # Decide whether to stop or continue
-                # For now, we stop on first error to ensure data integrity
+                print(f"Error migrating data chunk for table {table_name} after {keyset_column} = {last_pk}: {e}", file=sys.stderr)
                 raise e
 
-            offset += chunk_size
-        
-        print(f"--- Finished data migration for table: {table_name}. Total rows: {total_rows_migrated} ---")
+            if rows:
+                print(f"Copied {len(rows)} rows to {table_name}. Total: {total_rows_migrated}")
+            if completed:
+                return copied
 
     except Exception as e:
+        postgres_conn.rollback()
         print(f"Failed to migrate data for table {table_name}. Reason: {e}", file=sys.stderr)
-        # Re-raise the exception to be caught by the main loop
+        # Re-raise the exception to be reported by the main process
         raise e
     finally:
         mariadb_cursor.close()
         postgres_cursor.close()
 
+# --- POST-LOAD INDEX PHASE ---
+#
+# Secondary indexes make every loaded row pay for index maintenance, so a full
+# load runs with only the primary keys. Before the load, the definitions of all
+# other indexes are saved in deferred_index and the indexes are dropped. After
+# the load, those definitions plus POST_LOAD_INDEXES (once per index name) are
+# built with CREATE INDEX CONCURRENTLY (the API keeps serving reads meanwhile),
+# each on its own connection with a raised maintenance_work_mem. Tables are
+# built in parallel, the indexes of one table one after another. Finally the
+# tables are ANALYZEd and every SERIAL sequence is moved past the migrated max
+# id, so the next INSERT does not collide with a copied row.
+#
+# The generated search_vector column is still computed during the load; only
+# its GIN index is deferred.
+
+POST_LOAD_INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_itemcode ON asset (itemcode);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_keywords_itemcode ON asset_keywords (itemcode);",
+    # Keyword tag lookups (see keyword_search.py)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_keywords_keyword_formal ON asset_keywords (keyword_formal text_pattern_ops, itemcode);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_file_itemcode ON asset_file (itemcode);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rcd_asset_browse_itemcode ON rcd_asset_browse (itemcode);",
+]
+
+DEFERRED_INDEX_SQL = """CREATE TABLE IF NOT EXISTS deferred_index (
+    index_name VARCHAR(200) PRIMARY KEY, table_name VARCHAR(200) NOT NULL, definition TEXT NOT NULL
+);"""
+
+def drop_secondary_indexes():
+    """Saves and drops every index that does not back a constraint (primary keys stay)."""
+    print("--- Dropping secondary indexes for the load ---")
+    pg_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    try:
+        pg_cursor = pg_conn.cursor()
+        pg_cursor.execute(DEFERRED_INDEX_SQL)
+        pg_cursor.execute("""
+            SELECT ix.indexname, ix.tablename, ix.indexdef
+            FROM pg_indexes ix
+            JOIN pg_class c ON c.relname = ix.indexname
+            JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = ix.schemaname
+            WHERE ix.schemaname = 'public'
+              AND ix.tablename NOT IN ('deferred_index', 'migration_checkpoint', 'sync_state')
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = c.oid)
+        """)
+        indexes = pg_cursor.fetchall()
+        for index_name, table_name, definition in indexes:
+            pg_cursor.execute("""
+                INSERT INTO deferred_index (index_name, table_name, definition) VALUES (%s, %s, %s)
+                ON CONFLICT (index_name) DO UPDATE SET table_name = EXCLUDED.table_name, definition = EXCLUDED.definition
+            """, (index_name, table_name, definition))
+            pg_cursor.execute(f"DROP INDEX IF EXISTS {quote_identifier(index_name)}")
+            print(f"Deferred index {index_name} on {table_name}")
+        pg_conn.commit()
+        pg_cursor.close()
+    finally:
+        pg_conn.close()
+
+def to_concurrent_definition(definition: str) -> str:
+    """Turns a pg_indexes definition into an idempotent CREATE INDEX CONCURRENTLY."""
+    for prefix in ("CREATE UNIQUE INDEX ", "CREATE INDEX "):
+        if definition.startswith(prefix):
+            return f"{prefix}CONCURRENTLY IF NOT EXISTS " + definition[len(prefix):]
+    return definition
+
+def parse_index_definition(definition: str):
+    """Returns (index name, table name) of a CREATE INDEX statement, without quotes or schema."""
+    head, _, tail = definition.partition(" ON ")
+    index_name = head.split()[-1].strip('"')
+    table = tail.split()[0]
+    if table == "ONLY":
+        table = tail.split()[1]
+    return index_name, table.split(".")[-1].strip('"')
+
+def build_index(definition: str, maintenance_work_mem: str):
+    """Builds one index on its own autocommit connection (CONCURRENTLY cannot run in a transaction)."""
+    started = time.time()
+    pg_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    pg_conn.autocommit = True
+    try:
+        pg_cursor = pg_conn.cursor()
+        pg_cursor.execute("SET maintenance_work_mem = %s", (maintenance_work_mem,))
+        pg_cursor.execute("SET max_parallel_maintenance_workers = 2")
+        index_name = definition.split(" IF NOT EXISTS ", 1)[1].split()[0]
+        # A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would keep
+        pg_cursor.execute("""
+            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND NOT i.indisvalid
+        """, (index_name.strip('"'),))
+        if pg_cursor.fetchone():
+            pg_cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+        pg_cursor.execute(definition)
+        pg_cursor.close()
+        return index_name, time.time() - started
+    finally:
+        pg_conn.close()
+
+def build_table_indexes(definitions: list, maintenance_work_mem: str):
+    """Builds one table's indexes one after another; returns (definition, index name, seconds, error) for each."""
+    results = []
+    for definition in definitions:
+        try:
+            index_name, seconds = build_index(definition, maintenance_work_mem)
+            results.append((definition, index_name, seconds, None))
+        except Exception as e:
+            results.append((definition, None, 0.0, e))
+    return results
+
+def build_post_load_indexes(workers: int = 4, maintenance_work_mem: str = "1GB"):
+    """Rebuilds the deferred indexes and POST_LOAD_INDEXES, tables in parallel.
+
+    Concurrent builds on the same table wait for each other, so each table's
+    indexes are built one after another while different tables run in parallel.
+    An index is built once per name: the deferred definition (as saved from
+    pg_indexes) wins over a POST_LOAD_INDEXES entry of the same name.
+    """
+    print(f"--- Step 3: Building indexes ({workers} tables in parallel, maintenance_work_mem={maintenance_work_mem}) ---")
+    pg_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    try:
+        pg_cursor = pg_conn.cursor()
+        pg_cursor.execute(DEFERRED_INDEX_SQL)
+        pg_cursor.execute("SELECT index_name, table_name, definition FROM deferred_index")
+        deferred = pg_cursor.fetchall()
+        pg_conn.commit()
+        pg_cursor.close()
+    finally:
+        pg_conn.close()
+
+    # index name -> (table, definition)
+    indexes = {index_name: (table_name, to_concurrent_definition(definition)) for index_name, table_name, definition in deferred}
+    for sql in POST_LOAD_INDEXES:
+        index_name, table_name = parse_index_definition(sql)
+        indexes.setdefault(index_name, (table_name, sql))
+
+    by_table = {}
+    for table_name, definition in indexes.values():
+        by_table.setdefault(table_name, []).append(definition)
+
+    failed = []
+    # Index builds run inside PostgreSQL, so threads are enough to keep several going
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(build_table_indexes, definitions, maintenance_work_mem) for definitions in by_table.values()]
+        for future in as_completed(futures):
+            for definition, index_name, seconds, error in future.result():
+                if error is None:
+                    print(f"Built index {index_name} in {seconds:.1f}s")
+                else:
+                    print(f"Failed to build index: {definition}. Reason: {error}", file=sys.stderr)
+                    failed.append(definition)
+
+    if failed:
+        print("Some indexes failed; re-run with --resume to retry them.", file=sys.stderr)
+        sys.exit(1)
+
+    pg_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    try:
+        pg_cursor = pg_conn.cursor()
+        pg_cursor.execute("DELETE FROM deferred_index")
+        pg_conn.commit()
+        pg_cursor.close()
+    finally:
+        pg_conn.close()
+
+def reset_sequences(pg_cursor, tables=None):
+    """Moves the SERIAL sequences of the given tables (default: all) past their max id."""
+    pg_cursor.execute("""
+        SELECT table_name, column_name, pg_get_serial_sequence(quote_ident(table_name), column_name)
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND column_default LIKE 'nextval(%%'
+    """)
+    for table_name, column_name, sequence in pg_cursor.fetchall():
+        if not sequence or (tables is not None and table_name not in tables):
+            continue
+        pg_cursor.execute(
+            f"SELECT setval(%s, coalesce(max({quote_identifier(column_name)}), 0) + 1, false) FROM {quote_identifier(table_name)}",
+            (sequence,),
+        )
+        print(f"Sequence {sequence} now starts at {pg_cursor.fetchone()[0]}")
+
+def finalize_database():
+    """Moves SERIAL sequences past the migrated ids and refreshes planner statistics."""
+    print("--- Step 4: Resetting sequences and analyzing ---")
+    pg_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    pg_conn.autocommit = True
+    try:
+        pg_cursor = pg_conn.cursor()
+        reset_sequences(pg_cursor)
+        pg_cursor.execute("ANALYZE")
+        print("ANALYZE complete.")
+        pg_cursor.close()
+    finally:
+        pg_conn.close()
+
+# --- INCREMENTAL SYNC (non-destructive) ---
+#
+# Instead of TRUNCATE + full copy, only rows changed since the last sync are
+# pulled from MariaDB. A row is changed if its updated/created timestamp is at
+# or after the table's high-water mark, or its primary key is above the highest
+# key seen. Changed rows are COPYed into UNLOGGED staging tables first; live
+# tables are untouched until every table has been staged. Then all staged rows
+# are upserted (INSERT ... ON CONFLICT DO UPDATE) in ONE transaction, together
+# with the new high-water marks, so readers see either the old or the new data
+# and a failed sync leaves nothing half-applied. --dry-run stops after staging
+# and prints how many rows would be inserted/updated per table.
+#
+# Rows arrive with their MariaDB ids, so after the upsert the SERIAL sequences of
+# the synced tables are moved past the new max id, as finalize_database does
+# after a full load.
+#
+# Deletions in MariaDB are not propagated (there are no tombstones to detect them).
+
+UPDATED_COLUMNS = ("updated_at", "update_date")
+CREATED_COLUMNS = ("created_at", "create_date", "logged_at")
+
+SYNC_STATE_SQL = """CREATE TABLE IF NOT EXISTS sync_state (
+    table_name VARCHAR(200) PRIMARY KEY, hw_timestamp TIMESTAMP NULL DEFAULT NULL, hw_pk BIGINT NULL DEFAULT NULL, synced_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);"""
+
+def staging_table_name(table_name: str) -> str:
+    return quote_identifier(f"sync_stage_{table_name}")
+
+def get_timestamp_columns(columns: list):
+    """Returns the (updated, created) timestamp columns present in a table, or None for each."""
+    lowered = {col.lower(): col for col in columns}
+    updated = next((lowered[name] for name in UPDATED_COLUMNS if name in lowered), None)
+    created = next((lowered[name] for name in CREATED_COLUMNS if name in lowered), None)
+    return updated, created
+
+def read_high_water(table_name: str, postgres_cursor, keyset_column: str, updated, created):
+    """High-water marks from sync_state, or derived from the live table on the first sync."""
+    postgres_cursor.execute("SELECT hw_timestamp, hw_pk FROM sync_state WHERE table_name = %s", (table_name,))
+    row = postgres_cursor.fetchone()
+    if row:
+        return row
+
+    timestamp_sql = "NULL"
+    present = [quote_identifier(col) for col in (updated, created) if col]
+    if present:
+        timestamp_sql = f"max(coalesce({', '.join(present)}))"
+    postgres_cursor.execute(
+        f"SELECT {timestamp_sql}, max({quote_identifier(keyset_column)}) FROM {quote_identifier(table_name)}"
+    )
+    return postgres_cursor.fetchone()
+
+def stage_table_changes(table_name: str, chunk_size: int):
+    """Worker process entry point: copies one table's changed rows into its staging table.
+
+    Returns (staged rows, new high-water timestamp, new high-water pk), or None if the
+    table cannot be synced incrementally.
+    """
+    mariadb_conn = mysql.connector.connect(**MARIADB_CONFIG)
+    postgres_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    mariadb_cursor = mariadb_conn.cursor()
+    postgres_cursor = postgres_conn.cursor()
+    try:
+        mariadb_cursor.execute(f"SELECT * FROM `{table_name}` LIMIT 0")
+        mariadb_cursor.fetchall()
+        columns = [col[0] for col in mariadb_cursor.description]
+        keyset_column = get_keyset_column(table_name, mariadb_cursor)
+        if keyset_column is None:
+            print(f"Skipping {table_name}: incremental sync needs a single-column integer primary key")
+            return None
+
+        updated, created = get_timestamp_columns(columns)
+        hw_timestamp, hw_pk = read_high_water(table_name, postgres_cursor, keyset_column, updated, created)
+
+        stage = staging_table_name(table_name)
+        postgres_cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+        # Only the MariaDB columns: PostgreSQL-only columns (search_vector, embeddings) are left alone
+        postgres_cursor.execute(
+            f"CREATE UNLOGGED TABLE {stage} AS "
+            f"SELECT {', '.join(quote_identifier(col) for col in columns)} FROM {quote_identifier(table_name)} WITH NO DATA"
+        )
+        postgres_conn.commit()
+
+        conditions = [f"`{keyset_column}` > %s"]
+        params = [hw_pk if hw_pk is not None else -1]
+        timestamp_expr = None
+        if updated or created:
+            timestamp_expr = f"COALESCE({', '.join(f'`{col}`' for col in (updated, created) if col)})"
+            if hw_timestamp is not None:
+                # >= re-reads rows sharing the boundary timestamp; the upsert makes that harmless
+                conditions.append(f"{timestamp_expr} >= %s")
+                params.append(hw_timestamp)
+            else:
+                # No timestamps in the live table yet: everything counts as changed
+                conditions.append("TRUE")
+        changed_filter = " OR ".join(conditions)
+
+        select_columns = ", ".join(f"`{col}`" for col in columns)
+        timestamp_select = f", {timestamp_expr}" if timestamp_expr else ""
+        chunk_sql = (
+            f"SELECT {select_columns}{timestamp_select} FROM `{table_name}` "
+            f"WHERE ({changed_filter}) AND `{keyset_column}` > %s ORDER BY `{keyset_column}` LIMIT %s"
+        )
+        copy_sql = f"COPY {stage} ({', '.join(quote_identifier(col) for col in columns)}) FROM STDIN"
+        bytea_columns = get_bytea_columns(table_name, columns, postgres_cursor)
+        key_index = columns.index(keyset_column)
+
+        staged = 0
+        last_pk = -1
+        new_hw_timestamp, new_hw_pk = hw_timestamp, hw_pk
+        while True:
+            mariadb_cursor.execute(chunk_sql, (*params, last_pk, chunk_size))
+            rows = mariadb_cursor.fetchall()
+            if not rows:
+                break
+            if timestamp_expr:
+                row_timestamps = [row[-1] for row in rows if row[-1] is not None]
+                if row_timestamps and (new_hw_timestamp is None or max(row_timestamps) > new_hw_timestamp):
+                    new_hw_timestamp = max(row_timestamps)
+                rows = [row[:-1] for row in rows]
+            copy_rows(postgres_cursor, copy_sql, rows, bytea_columns)
+            postgres_conn.commit()
+            last_pk = rows[-1][key_index]
+            new_hw_pk = max(new_hw_pk, last_pk) if new_hw_pk is not None else last_pk
+            staged += len(rows)
+            if len(rows) < chunk_size:
+                break
+
+        print(f"Staged {staged} changed rows for {table_name}")
+        return staged, new_hw_timestamp, new_hw_pk
+    finally:
+        mariadb_cursor.close()
+        postgres_cursor.close()
+        mariadb_conn.close()
+        postgres_conn.close()
+
+def get_table_columns(table_name: str, postgres_cursor):
+    """Columns of a table's staging table, i.e. the columns that come from MariaDB."""
+    postgres_cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s ORDER BY ordinal_position
+    """, (f"sync_stage_{table_name}",))
+    return [row[0] for row in postgres_cursor.fetchall()]
+
+def get_primary_key(table_name: str, postgres_cursor) -> str:
+    postgres_cursor.execute("""
+        SELECT a.attname FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = %s::regclass AND i.indisprimary
+    """, (quote_identifier(table_name),))
+    return postgres_cursor.fetchone()[0]
+
+def diff_staged_table(table_name: str, postgres_cursor):
+    """Counts staged rows that would be inserted or would change an existing row."""
+    stage = staging_table_name(table_name)
+    target = quote_identifier(table_name)
+    pk = quote_identifier(get_primary_key(table_name, postgres_cursor))
+    columns = [quote_identifier(col) for col in get_table_columns(table_name, postgres_cursor)]
+    postgres_cursor.execute(f"""
+        SELECT
+            count(*) FILTER (WHERE t.{pk} IS NULL),
+            count(*) FILTER (WHERE t.{pk} IS NOT NULL
+                AND ({', '.join(f's.{c}' for c in columns)}) IS DISTINCT FROM ({', '.join(f't.{c}' for c in columns)})),
+            count(*)
+        FROM {stage} AS s
+        LEFT JOIN {target} AS t ON t.{pk} = s.{pk}
+    """)
+    inserts, updates, staged = postgres_cursor.fetchone()
+    return inserts, updates, staged - inserts - updates
+
+def apply_staged_table(table_name: str, postgres_cursor):
+    """Upserts one staging table into its live table (caller owns the transaction)."""
+    stage = staging_table_name(table_name)
+    target = quote_identifier(table_name)
+    pk_name = get_primary_key(table_name, postgres_cursor)
+    all_columns = get_table_columns(table_name, postgres_cursor)
+    columns = [quote_identifier(col) for col in all_columns]
+    update_columns = [quote_identifier(col) for col in all_columns if col != pk_name]
+    postgres_cursor.execute(f"""
+        INSERT INTO {target} AS t ({', '.join(columns)})
+        SELECT {', '.join(columns)} FROM {stage}
+        ON CONFLICT ({quote_identifier(pk_name)}) DO UPDATE SET
+            {', '.join(f'{c} = EXCLUDED.{c}' for c in update_columns)}
+        WHERE ({', '.join(f't.{c}' for c in update_columns)}) IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in update_columns)})
+    """)
+    return postgres_cursor.rowcount
+
+def sync_all_data(workers: int = 4, chunk_size: int = 50000, dry_run: bool = False):
+    """Incrementally syncs changed MariaDB rows into PostgreSQL without truncating anything."""
+    print(f"--- Incremental sync{' (dry run)' if dry_run else ''} ---")
+    mariadb_conn = mysql.connector.connect(**MARIADB_CONFIG)
+    postgres_conn = psycopg2.connect(**POSTGRES_CONFIG)
+    try:
+        with postgres_conn.cursor() as cursor:
+            cursor.execute(SYNC_STATE_SQL)
+        postgres_conn.commit()
+        tables = list_mariadb_tables(mariadb_conn)
+    finally:
+        mariadb_conn.close()
+
+    try:
+        # Phase 1: stage changed rows in parallel; live tables are not touched
+        staged = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(stage_table_changes, table_name, chunk_size): table_name for table_name in tables}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is not None:
+                    staged[futures[future]] = result
+
+        cursor = postgres_conn.cursor()
+        print("\n--- Sync diff (table: insert / update / unchanged) ---")
+        for table_name in sorted(staged):
+            inserts, updates, unchanged = diff_staged_table(table_name, cursor)
+            print(f"{table_name}: {inserts} / {updates} / {unchanged}")
+
+        if dry_run:
+            print("Dry run: no changes applied.")
+        else:
+            # Phase 2: apply every table and advance the high-water marks in one transaction
+            for table_name, (_, hw_timestamp, hw_pk) in staged.items():
+                changed = apply_staged_table(table_name, cursor)
+                cursor.execute("""
+                    INSERT INTO sync_state (table_name, hw_timestamp, hw_pk, synced_at)
+                    VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (table_name) DO UPDATE SET
+                        hw_timestamp = EXCLUDED.hw_timestamp, hw_pk = EXCLUDED.hw_pk, synced_at = EXCLUDED.synced_at
+                """, (table_name, hw_timestamp, hw_pk))
+                print(f"Applied {changed} rows to {table_name}")
+            postgres_conn.commit()
+            print("--- Incremental sync committed. ---")
+
+            # Copied ids bypass the sequences; move them past the synced rows
+            reset_sequences(cursor, set(staged))
+            postgres_conn.commit()
+
+        for table_name in staged:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging_table_name(table_name)}")
+        postgres_conn.commit()
+        cursor.close()
+    except Exception as e:
+        postgres_conn.rollback()
+        print(f"Incremental sync failed, nothing was applied: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        postgres_conn.close()
+
 
 if __name__ == "__main__":
-    truncate_postgres_tables()
-    migrate_all_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Copy the MariaDB database into PostgreSQL")
+    parser.add_argument("--workers", type=int, default=4, help="tables migrated in parallel")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per COPY / checkpoint")
+    parser.add_argument("--resume", action="store_true", help="keep existing data and continue from the checkpoints")
+    parser.add_argument("--maintenance-work-mem", default="1GB", help="per index build; total is this times --workers")
+    parser.add_argument("--sync", action="store_true", help="incremental, non-destructive sync of changed rows")
+    parser.add_argument("--dry-run", action="store_true", help="with --sync: report the diff without applying it")
+    options = parser.parse_args()
+
+    if options.sync:
+        sync_all_data(workers=options.workers, chunk_size=options.chunk_size, dry_run=options.dry_run)
+        sys.exit(0)
+
+    if not options.resume:
+        truncate_postgres_tables()
+        drop_secondary_indexes()
+    migrate_all_data(workers=options.workers, chunk_size=options.chunk_size)
+    build_post_load_indexes(workers=options.workers, maintenance_work_mem=options.maintenance_work_mem)
+    finalize_database()
@@ -0,0 +1,250 @@
+# search_cache.py
+"""
+Result cache for /search pages.
+
+Popular keywords are searched over and over, so finished pages are kept in an
+in-process LRU cache with a TTL (SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL).
+Keys are built from the normalized keyword (NFKC, lowercase, collapsed
+whitespace) and every parameter that changes the page: sort, cursor, limit,
+fields and snippet.
+
+Concurrent misses for the same key share one database query instead of all
+running it.
+
+With SEARCH_CACHE_REDIS_URL set, pages are also stored in Redis, so several
+API processes share their results (requires: pip install redis). Redis
+errors are logged and the local cache keeps working on its own.
+
+A background task (precompute_loop) keeps the first page of the hottest
+keywords warm: the curated hot_keyword list plus the SEARCH_CACHE_PRECOMPUTE_TOP
+most searched keywords of the last SEARCH_CACHE_PRECOMPUTE_DAYS days in
+rcd_keyword, refreshed every SEARCH_CACHE_PRECOMPUTE_INTERVAL seconds.
+"""
+import asyncio
+import json
+import os
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_REDIS_URL = os.getenv("SEARCH_CACHE_REDIS_URL", "")
+SEARCH_CACHE_PRECOMPUTE_TOP = int(os.getenv("SEARCH_CACHE_PRECOMPUTE_TOP", "50"))
+SEARCH_CACHE_PRECOMPUTE_DAYS = int(os.getenv("SEARCH_CACHE_PRECOMPUTE_DAYS", "7"))
+# Shorter than the TTL so warm entries are replaced before they expire
+SEARCH_CACHE_PRECOMPUTE_INTERVAL = float(os.getenv("SEARCH_CACHE_PRECOMPUTE_INTERVAL", "240"))
+
+REDIS_KEY_PREFIX = "search:"
+
+# The whole curated list, then the $1 most searched keywords of the last $2 days
+HOT_KEYWORDS_QUERY = """
+    SELECT keyword FROM (
+        SELECT keyword, 0 AS source, pos AS position FROM hot_keyword WHERE keyword <> ''
+        UNION ALL
+        (
+            SELECT keyword, 1, -count(*) FROM rcd_keyword
+            WHERE keyword <> '' AND create_date > now() - make_interval(days => $2)
+            GROUP BY keyword
+            ORDER BY count(*) DESC
+            LIMIT $1
+        )
+    ) AS hot
+    ORDER BY source, position
+"""
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Folds width, case and whitespace so equivalent keywords share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", keyword or "").lower().split())
+
+
+def cache_key(keyword: str, **params) -> str:
+    """Builds the cache key of one page from the keyword and its request parameters."""
+    parts = [normalize_keyword(keyword)] + [f"{name}={params[name]}" for name in sorted(params)]
+    return "\x1f".join(parts)
+
+
+class SearchCache:
+    """LRU + TTL cache of search pages with an optional shared Redis tier."""
+
+    def __init__(
+        self,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        ttl: float = SEARCH_CACHE_TTL,
+        redis_url: str = SEARCH_CACHE_REDIS_URL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._redis = None
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._shared_errors = 0
+
+    async def open(self):
+        if not self.redis_url:
+            return
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            print("SEARCH_CACHE_REDIS_URL is set but the redis package is not installed; using the local cache only")
+            return
+        self._redis = redis.from_url(self.redis_url)
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def get_local(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put_local(self, key: str, value: Any):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    async def get_shared(self, key: str) -> Optional[Any]:
+        if self._redis is None:
+            return None
+        try:
+            data = await self._redis.get(REDIS_KEY_PREFIX + key)
+        except Exception as e:
+            self._shared_errors += 1
+            print(f"Search cache Redis error: {e}")
+            return None
+        return json.loads(data) if data is not None else None
+
+    async def put_shared(self, key: str, value: Any):
+        if self._redis is None:
+            return
+        try:
+            # default=str turns datetimes into text, as the JSON response would
+            await self._redis.set(REDIS_KEY_PREFIX + key, json.dumps(value, default=str), ex=max(1, int(self.ttl)))
+        except Exception as e:
+            self._shared_errors += 1
+            print(f"Search cache Redis error: {e}")
+
+    async def put(self, key: str, value: Any):
+        self.put_local(key, value)
+        await self.put_shared(key, value)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the cached page for key, computing and storing it on a miss.
+
+        Exceptions from compute are not cached and are raised to every waiter.
+        If the request computing the page is cancelled (its client went away),
+        the requests waiting on it compute the page themselves instead.
+        """
+        while True:
+            value = self.get_local(key)
+            if value is not None:
+                self._hits += 1
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self._coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    # This waiter itself was cancelled
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self.get_shared(key)
+            if value is not None:
+                self._shared_hits += 1
+                self.put_local(key, value)
+            else:
+                self._misses += 1
+                value = await compute()
+                await self.put(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve it so an exception nobody else awaited is not reported as lost
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self._hits + self._shared_hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "shared": self._redis is not None,
+            "hits": self._hits,
+            "shared_hits": self._shared_hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "hit_ratio": (self._hits + self._shared_hits) / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "shared_errors": self._shared_errors,
+        }
+
+
+async def precompute_loop(
+    fetch_keywords: Callable[[], Awaitable[List[str]]],
+    warm: Callable[[str], Awaitable[Any]],
+    interval: float = SEARCH_CACHE_PRECOMPUTE_INTERVAL,
+):
+    """Background task: refreshes the cached first page of every hot keyword, forever.
+
+    Args:
+        fetch_keywords: Returns the keywords to warm, hottest first
+        warm: Searches one keyword and stores its page in the cache
+        interval: Seconds between refreshes
+    """
+    while True:
+        started = time.monotonic()
+        warmed = 0
+        try:
+            keywords = await fetch_keywords()
+            seen = set()
+            for keyword in keywords:
+                normalized = normalize_keyword(keyword)
+                if not normalized or normalized in seen:
+                    continue
+                seen.add(normalized)
+                try:
+                    await warm(normalized)
+                    warmed += 1
+                except Exception as e:
+                    print(f"Search cache precompute failed for '{normalized}': {e}")
+            print(f"Search cache precomputed {warmed} hot keywords in {time.monotonic() - started:.1f}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Search cache precompute failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,199 @@
+# search_index.py
+"""
+Full-text search index for the asset table.
+
+Traditional Chinese has no spaces between words, so PostgreSQL's built-in text
+search parsers cannot split it and `ILIKE '%kw%'` cannot use any index. Instead
+every text run is tokenized into overlapping character bigrams ("台北市" ->
+"台北", "北市") plus the final single character, and ASCII runs into lowercase
+words. The tokens are stored with their positions in a generated tsvector
+column (`search_vector`) backed by a GIN index, so it is maintained by
+PostgreSQL on every INSERT/UPDATE.
+
+A keyword is turned into a tsquery of the same tokens: a CJK run becomes a
+phrase of adjacent bigrams ('台北' <-> '北市'), which matches exactly the rows
+containing that substring, a single character becomes a prefix match ('台':*)
+and ASCII words become prefix matches. Rows are ranked with ts_rank_cd using
+column weights (titles > names/categories > summaries > story contents).
+
+Run this file once against the database to build the column and index:
+    python search_index.py
+
+The dockerized API's database folds column names to lowercase. The database
+behind the root search_api.py keeps the MariaDB mixed-case names as quoted
+identifiers ("StoryTitle"), so build it with --quoted-columns and its own
+connection settings:
+    python search_index.py --port 5432 --user postgres --password ... --quoted-columns
+"""
+import argparse
+import re
+import sys
+from typing import List, Optional
+
+import psycopg2
+
+POSTGRES_CONFIG = {
+    'host': 'localhost',
+    'port': 5433,
+    'user': 'user',
+    'password': 'password',
+    'database': 'tc_search_v15'
+}
+
+# Hiragana/Katakana, CJK Extension A, CJK Unified Ideographs, CJK Compatibility Ideographs.
+# Written as \uXXXX escapes, which both Python `re` and PostgreSQL regular expressions understand.
+CJK_RANGES = r'\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+TOKEN_REGEX = rf'[{CJK_RANGES}]+|[a-z0-9]+'
+TOKEN_PATTERN = re.compile(TOKEN_REGEX)
+
+# Longer ASCII runs (hashes, base64 blobs) are not indexed
+MAX_WORD_LENGTH = 100
+
+# tsvector positions stop at 16383, so only the first 16383 tokens of a field are indexed
+MAX_TOKENS_PER_FIELD = 16383
+
+SEARCH_VECTOR_COLUMN = 'search_vector'
+
+# Indexed text columns as spelled in the MariaDB source schema
+SEARCH_COLUMNS = (
+    'StoryTitle', 'EventName', 'WebTitle', 'PackageName', 'category', 'TitleType',
+    'StorySummary', 'FilmDescription', 'StoryContents',
+)
+
+
+def migration_sql(quoted_columns: bool = False) -> List[str]:
+    """
+    Returns the statements creating the search column, its indexes and helpers.
+
+    Args:
+        quoted_columns: Reference the text columns as quoted mixed-case identifiers
+            instead of the lowercase names PostgreSQL folds unquoted ones to
+    """
+    col = {name.lower(): f'"{name}"' if quoted_columns else name.lower() for name in SEARCH_COLUMNS}
+    return [
+        # Tokenizer used by the generated column. IMMUTABLE so it can be used in a
+        # generated column; the tsvector is built from a literal so no text search
+        # parser (and no locale dependency) is involved.
+        """CREATE OR REPLACE FUNCTION cjk_bigram_tsvector(input text) RETURNS tsvector
+        LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+        DECLARE
+            run text;
+            n integer;
+            tokens text[] := '{{}}';
+        BEGIN
+            IF input IS NULL OR input = '' THEN
+                RETURN ''::tsvector;
+            END IF;
+            FOR run IN SELECT (regexp_matches(lower(input), '{token_regex}', 'g'))[1] LOOP
+                n := char_length(run);
+                IF run ~ '^[a-z0-9]' THEN
+                    IF n <= {max_word_length} THEN
+                        tokens := tokens || run;
+                    END IF;
+                ELSE
+                    FOR i IN 1..n - 1 LOOP
+                        tokens := tokens || substr(run, i, 2);
+                    END LOOP;
+                    tokens := tokens || substr(run, n, 1);
+                END IF;
+                EXIT WHEN cardinality(tokens) >= {max_tokens};
+            END LOOP;
+            RETURN coalesce(
+                (SELECT string_agg(format('''%s'':%s', tok, pos), ' ')
+                 FROM unnest(tokens[1:{max_tokens}]) WITH ORDINALITY AS t(tok, pos))::tsvector,
+                ''::tsvector
+            );
+        END
+        $$;""".format(token_regex=TOKEN_REGEX, max_word_length=MAX_WORD_LENGTH, max_tokens=MAX_TOKENS_PER_FIELD),
+        # Separate fields with ' ' so bigrams never span two columns
+        f"""ALTER TABLE asset ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector GENERATED ALWAYS AS (
+            setweight(cjk_bigram_tsvector(coalesce({col['storytitle']}, '') || ' ' || coalesce({col['eventname']}, '') || ' ' || coalesce({col['webtitle']}, '')), 'A') ||
+            setweight(cjk_bigram_tsvector(coalesce({col['packagename']}, '') || ' ' || coalesce({col['category']}, '') || ' ' || coalesce({col['titletype']}, '')), 'B') ||
+            setweight(cjk_bigram_tsvector(coalesce({col['storysummary']}, '') || ' ' || coalesce({col['filmdescription']}, '')), 'C') ||
+            setweight(cjk_bigram_tsvector({col['storycontents']}), 'D')
+        ) STORED;""",
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_search_vector ON asset USING GIN ({SEARCH_VECTOR_COLUMN});",
+        # Keyset pagination order for sort=recent (see search_query.py)
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_created_at_asset_id ON asset (created_at, asset_id);",
+        # Planner row estimate for a search, used as the result total instead of COUNT(*)
+        f"""CREATE OR REPLACE FUNCTION search_count_estimate(q tsquery) RETURNS bigint
+        LANGUAGE plpgsql STABLE AS $$
+        DECLARE
+            plan json;
+        BEGIN
+            EXECUTE format('EXPLAIN (FORMAT JSON) SELECT 1 FROM asset WHERE {SEARCH_VECTOR_COLUMN} @@ %L::tsquery', q::text)
+                INTO plan;
+            RETURN (plan->0->'Plan'->>'Plan Rows')::bigint;
+        END
+        $$;""",
+        "ANALYZE asset;",
+    ]
+
+
+MIGRATION_SQL = migration_sql()
+
+
+def build_tsquery(keyword: str) -> Optional[str]:
+    """
+    Converts a search keyword into a tsquery string matching the indexed tokens.
+
+    Every run in the keyword must be present (AND). Returns None if the keyword
+    contains nothing searchable (e.g. only punctuation).
+    """
+    parts = []
+    for run in TOKEN_PATTERN.findall((keyword or '').lower()):
+        if run.isascii():
+            if len(run) <= MAX_WORD_LENGTH:
+                parts.append(f"'{run}':*")
+        elif len(run) == 1:
+            parts.append(f"'{run}':*")
+        else:
+            bigrams = [f"'{run[i:i + 2]}'" for i in range(len(run) - 1)]
+            parts.append(f"({' <-> '.join(bigrams)})")
+    if not parts:
+        return None
+    return ' & '.join(parts)
+
+
+def build_search_index(conn, quoted_columns: bool = False):
+    """Creates the tokenizer function, the generated search column and its GIN index."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        for sql in migration_sql(quoted_columns):
+            print(f"Executing: {sql.strip().splitlines()[0]} ...")
+            cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Connection settings default to POSTGRES_CONFIG."""
+    parser = argparse.ArgumentParser(description="Build the full-text search index on the asset table.")
+    for key, value in POSTGRES_CONFIG.items():
+        parser.add_argument(f"--{key}", type=type(value), default=value)
+    parser.add_argument(
+        "--quoted-columns",
+        action="store_true",
+        help='text columns are quoted mixed-case identifiers ("StoryTitle"), as in the search_api.py database',
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = {key: getattr(args, key) for key in POSTGRES_CONFIG}
+    print(f"--- Building full-text search index on asset in {config['database']} at {config['host']}:{config['port']} "
+          "(this rewrites the table once) ---")
+    conn = None
+    try:
+        conn = psycopg2.connect(**config)
+        build_search_index(conn, quoted_columns=args.quoted_columns)
+        print("--- Search index ready. ---")
+    except psycopg2.Error as err:
+        print(f"PostgreSQL error while building search index: {err}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
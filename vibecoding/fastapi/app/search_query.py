@@ -0,0 +1,187 @@
+# search_query.py
+"""
+Paged search queries over the asset full-text index.
+
+Pages are fetched with keyset ("seek") pagination instead of OFFSET: the
+cursor carries the sort key of the last row returned, and the next page
+continues strictly after it, so deep pages cost the same as the first one.
+- sort=recent:    ORDER BY created_at DESC, asset_id DESC
+- sort=relevance: ORDER BY rank DESC, created_at DESC, asset_id DESC
+
+Only the requested columns are selected (large text columns such as
+StoryContents are left out unless asked for). Instead, a short snippet around
+the first occurrence of the keyword is cut out by PostgreSQL, and only for
+the rows of the returned page.
+
+Result totals come from the planner's row estimate (search_count_estimate()
+in search_index.py) rather than COUNT(*), which would have to visit every
+matching row of a common keyword. A first page that is not full is an exact
+total.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from search_index import SEARCH_VECTOR_COLUMN, TOKEN_PATTERN
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Characters of context kept before the match and total snippet length
+SNIPPET_CONTEXT = 40
+SNIPPET_LENGTH = 120
+
+SORT_KEYS = {
+    "recent": ("created_at", "asset_id"),
+    "relevance": ("rank", "created_at", "asset_id"),
+}
+
+SORT_KEY_TYPES = {"rank": "real", "created_at": "timestamp", "asset_id": "integer"}
+
+COUNT_ESTIMATE_QUERY = "SELECT search_count_estimate($1::tsquery)"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str], default: Sequence[str]) -> List[str]:
+    """
+    Resolves a comma separated `fields=` parameter into the columns to select.
+
+    Unknown names are ignored. asset_id and created_at are always included
+    because the pagination cursor is built from them. Columns are returned in
+    the order of `allowed` so equal projections produce the same query text.
+    """
+    requested = set(default)
+    if fields:
+        requested = {name.strip() for name in fields.split(",")} & set(allowed)
+    requested.update(("asset_id", "created_at"))
+    return [name for name in allowed if name in requested]
+
+
+def snippet_term(keyword: str) -> str:
+    """Picks the longest searchable run of the keyword to locate the snippet."""
+    runs = TOKEN_PATTERN.findall((keyword or "").lower())
+    return max(runs, key=len) if runs else ""
+
+
+def encode_cursor(row: Dict[str, Any], sort: str) -> str:
+    """Encodes the sort key of the last row of a page as an opaque cursor."""
+    values = []
+    for key in SORT_KEYS[sort]:
+        value = row[key]
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    """Decodes a cursor produced by encode_cursor() for the same sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        keys = SORT_KEYS[sort]
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("cursor does not match sort order")
+        decoded = []
+        for key, value in zip(keys, values):
+            if key == "created_at":
+                decoded.append(datetime.fromisoformat(value))
+            elif key == "asset_id":
+                decoded.append(int(value))
+            else:
+                decoded.append(float(value))
+        return decoded
+    except (ValueError, TypeError, UnicodeDecodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}") from e
+
+
+def build_search_query(
+    tsquery: str,
+    select_columns: Sequence[str],
+    sort: str,
+    limit: int,
+    cursor_values: Optional[list] = None,
+    snippet_source: Optional[str] = None,
+    term: str = "",
+) -> Tuple[str, list]:
+    """
+    Builds one page of a full-text search.
+
+    Args:
+        tsquery: Query produced by search_index.build_tsquery()
+        select_columns: Column expressions to return (must include asset_id and created_at)
+        sort: "recent" or "relevance"
+        limit: Page size; one extra row is fetched to detect a following page
+        cursor_values: Decoded cursor of the previous page, or None for the first page
+        snippet_source: Expression over alias `a` to cut the snippet from, or None
+        term: Text located in snippet_source to center the snippet on
+
+    Returns:
+        Tuple of SQL text and its positional arguments. The text only depends on
+        the shape of the request, so asyncpg reuses one prepared statement per shape.
+    """
+    args: list = [tsquery, limit + 1]
+    sort_keys = SORT_KEYS[sort]
+    order_by = ", ".join(f"{key} DESC" for key in sort_keys)
+
+    seek = ""
+    if cursor_values is not None:
+        placeholders = []
+        for key, value in zip(sort_keys, cursor_values):
+            args.append(value)
+            placeholders.append(f"${len(args)}::{SORT_KEY_TYPES[key]}")
+        seek = f"WHERE ({', '.join(sort_keys)}) < ({', '.join(placeholders)})"
+
+    page = f"""
+        SELECT * FROM (
+            SELECT {", ".join(select_columns)}, ts_rank_cd({SEARCH_VECTOR_COLUMN}, $1::tsquery) AS rank
+            FROM asset
+            WHERE {SEARCH_VECTOR_COLUMN} @@ $1::tsquery
+        ) AS matches
+        {seek}
+        ORDER BY {order_by}
+        LIMIT $2
+    """
+
+    if not snippet_source:
+        return page, args
+
+    # Cut snippets after LIMIT so long text is only read for the rows on this page
+    args.append(term)
+    term_param = f"${len(args)}"
+    query = f"""
+        WITH page AS ({page})
+        SELECT page.*,
+               substr({snippet_source}, greatest(strpos(lower({snippet_source}), {term_param}) - {SNIPPET_CONTEXT}, 1), {SNIPPET_LENGTH}) AS snippet
+        FROM page
+        JOIN asset AS a ON a.asset_id = page.asset_id
+        ORDER BY {", ".join(f"page.{key} DESC" for key in sort_keys)}
+    """
+    return query, args
+
+
+def build_page(
+    rows: List[Dict[str, Any]], sort: str, limit: int, total_estimate: Optional[int], first_page: bool
+) -> Dict[str, Any]:
+    """Shapes fetched rows (limit + 1 at most) into the paged response."""
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1], sort) if has_more and items else None
+
+    # Totals are only computed for the first page; later pages keep the first one
+    total_is_exact = first_page and not has_more
+    if total_is_exact:
+        total = len(items)
+    elif first_page:
+        total = max(total_estimate or 0, len(items))
+    else:
+        total = None
+
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "total_estimate": total,
+        "total_is_exact": total_is_exact,
+    }
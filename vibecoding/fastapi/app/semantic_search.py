@@ -0,0 +1,219 @@
+# semantic_search.py
+"""
+pgvector semantic search over the asset table.
+
+Each asset gets an `embedding vector(N)` column (filled by embed_assets.py)
+with an HNSW index for cosine distance. Metadata filters (category, TitleType,
+event date range) are plain SQL predicates in the same statement as the k-NN
+ordering. An HNSW index scan applies them only to the ef_search candidates it
+returns, so a selective filter can leave fewer than k rows. Filtered queries
+therefore run with hnsw.iterative_scan (pgvector 0.8+), which keeps walking the
+graph until k rows pass the filters. On older pgvector they fall back to an
+exact scan: the filters pick rows through their own indexes and only those rows
+are sorted by distance (see scan_settings).
+
+Hybrid mode fuses the vector ranking with the full-text ranking from
+search_index.py using Reciprocal Rank Fusion:
+    score = 1 / (RRF_K + semantic_rank) + 1 / (RRF_K + keyword_rank)
+RRF only uses positions, so the two incomparable scores (cosine distance and
+ts_rank_cd) never have to be normalized against each other.
+
+Run this file once against the database to add the column and index:
+    python semantic_search.py
+"""
+import sys
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from embeddings import get_embedder
+from search_index import POSTGRES_CONFIG, SEARCH_VECTOR_COLUMN
+
+EMBEDDING_COLUMN = "embedding"
+
+# HNSW build parameters (pgvector defaults) and query-time candidate list size
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 100
+
+# First pgvector release with hnsw.iterative_scan
+ITERATIVE_SCAN_MIN_VERSION = (0, 8)
+
+# Rank constant of Reciprocal Rank Fusion and candidates taken from each ranking
+RRF_K = 60
+HYBRID_CANDIDATES = 100
+
+DEFAULT_K = 20
+MAX_K = 100
+
+
+def migration_sql(dimension: int) -> list:
+    """DDL for the embedding column, its HNSW index and the filter indexes."""
+    return [
+        "CREATE EXTENSION IF NOT EXISTS vector;",
+        f"ALTER TABLE asset ADD COLUMN IF NOT EXISTS {EMBEDDING_COLUMN} vector({dimension});",
+        f"""CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_embedding_hnsw ON asset
+            USING hnsw ({EMBEDDING_COLUMN} vector_cosine_ops) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION});""",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_category ON asset (category);",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_asset_titletype ON asset (titletype);",
+    ]
+
+
+def build_filters(
+    args: list,
+    category: Optional[str] = None,
+    title_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> str:
+    """
+    Builds the metadata filter predicates, appending their values to args.
+
+    Returns:
+        SQL fragment starting with " AND " (empty if no filter is set)
+    """
+    predicates = []
+    for column, op, value in (
+        ("category", "=", category),
+        ("titletype", "=", title_type),
+        ("eventdatestart", ">=", date_from),
+        ("eventdatestart", "<", date_to),
+    ):
+        if value is not None:
+            args.append(value)
+            predicates.append(f"{column} {op} ${len(args)}")
+    return "".join(f" AND {predicate}" for predicate in predicates)
+
+
+def supports_iterative_scan(pgvector_version: Optional[str]) -> bool:
+    """Whether an installed pgvector version (pg_extension.extversion) has hnsw.iterative_scan."""
+    if not pgvector_version:
+        return False
+    try:
+        version = tuple(int(part) for part in pgvector_version.split(".")[:2])
+    except ValueError:
+        return False
+    return version >= ITERATIVE_SCAN_MIN_VERSION
+
+
+def scan_settings(k: int, filtered: bool, iterative_scan: bool) -> list:
+    """
+    SET LOCAL statements to run before a semantic query, in its transaction.
+
+    Args:
+        k: Number of results
+        filtered: Whether metadata filters are set
+        iterative_scan: Whether pgvector supports hnsw.iterative_scan
+
+    Returns:
+        List of SQL statements
+    """
+    settings = [f"SET LOCAL hnsw.ef_search = {max(HNSW_EF_SEARCH, k)}"]
+    if filtered:
+        if iterative_scan:
+            # Keep scanning the graph until LIMIT rows pass the filters, in exact distance order
+            settings.append("SET LOCAL hnsw.iterative_scan = strict_order")
+        else:
+            # No HNSW index scan: filter through the btree indexes (bitmap scans), then sort by distance
+            settings.append("SET LOCAL enable_indexscan = off")
+    return settings
+
+
+def build_semantic_query(
+    vector: str,
+    select_columns: Sequence[str],
+    k: int,
+    tsquery: Optional[str] = None,
+    **filters,
+) -> Tuple[str, list]:
+    """
+    Builds a filtered k-NN query, or a hybrid RRF query when a tsquery is given.
+
+    Args:
+        vector: Query embedding as pgvector text input
+        select_columns: Columns of asset to return
+        k: Number of results
+        tsquery: Full-text query to fuse with, or None for vector-only ranking
+        **filters: category, title_type, date_from, date_to (see build_filters)
+
+    Returns:
+        Tuple of SQL text and its positional arguments
+    """
+    args: list = [vector, k]
+    where = build_filters(args, **filters)
+    columns = ", ".join(f"asset.{column}" for column in select_columns)
+
+    if tsquery is None:
+        query = f"""
+            SELECT {columns}, asset.{EMBEDDING_COLUMN} <=> $1::text::vector AS distance
+            FROM asset
+            WHERE asset.{EMBEDDING_COLUMN} IS NOT NULL{where}
+            ORDER BY asset.{EMBEDDING_COLUMN} <=> $1::text::vector
+            LIMIT $2
+        """
+        return query, args
+
+    args.extend([tsquery, HYBRID_CANDIDATES])
+    tsquery_param, candidates_param = f"${len(args) - 1}", f"${len(args)}"
+    query = f"""
+        WITH semantic AS (
+            SELECT asset_id, row_number() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT asset_id, {EMBEDDING_COLUMN} <=> $1::text::vector AS distance
+                FROM asset
+                WHERE {EMBEDDING_COLUMN} IS NOT NULL{where}
+                ORDER BY {EMBEDDING_COLUMN} <=> $1::text::vector
+                LIMIT {candidates_param}
+            ) AS nearest
+        ),
+        keyword AS (
+            SELECT asset_id, row_number() OVER (ORDER BY text_rank DESC) AS rank
+            FROM (
+                SELECT asset_id, ts_rank_cd({SEARCH_VECTOR_COLUMN}, {tsquery_param}::tsquery) AS text_rank
+                FROM asset
+                WHERE {SEARCH_VECTOR_COLUMN} @@ {tsquery_param}::tsquery{where}
+                ORDER BY text_rank DESC
+                LIMIT {candidates_param}
+            ) AS matches
+        )
+        SELECT {columns},
+               coalesce(1.0 / ({RRF_K} + semantic.rank), 0) + coalesce(1.0 / ({RRF_K} + keyword.rank), 0) AS score,
+               semantic.rank AS semantic_rank,
+               keyword.rank AS keyword_rank
+        FROM semantic
+        FULL JOIN keyword USING (asset_id)
+        JOIN asset USING (asset_id)
+        ORDER BY score DESC, asset.asset_id DESC
+        LIMIT $2
+    """
+    return query, args
+
+
+def build_semantic_index(conn, dimension: int):
+    """Adds the embedding column and builds its HNSW index."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        for sql in migration_sql(dimension):
+            print(f"Executing: {sql.strip().splitlines()[0]} ...")
+            cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    import psycopg2
+
+    embedder = get_embedder()
+    print(f"--- Adding vector({embedder.dimension}) embedding column for {embedder.name} ---")
+    conn = None
+    try:
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        build_semantic_index(conn, embedder.dimension)
+        print("--- Semantic index ready. Run embed_assets.py to fill it. ---")
+    except psycopg2.Error as err:
+        print(f"PostgreSQL error while building semantic index: {err}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
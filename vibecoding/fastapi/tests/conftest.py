@@ -0,0 +1,12 @@
+# conftest.py
+"""
+Tests for the search modules in ../app.
+
+The app modules import each other as top-level modules (as in the Docker image,
+where app/ is the working directory), so app/ is put on sys.path here. Run with:
+    python -m pytest vibecoding/fastapi/tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import embed_assets
+
+
+def test_empty_texts_get_no_vector():
+    embed_assets._init_worker()
+    updated_at = datetime(2024, 1, 1)
+    rows = [
+        (1, "台北車站", None, None, updated_at),
+        (2, None, "", None, updated_at),
+        (3, "  ", None, "\n", updated_at),
+        (4, None, None, "MRT", updated_at),
+    ]
+    results = embed_assets._embed_batch(rows)
+    assert [(asset_id, source) for asset_id, _, source in results] == [(row[0], updated_at) for row in rows]
+    assert results[1][1] is None and results[2][1] is None
+    assert results[0][1].startswith("[") and results[3][1].startswith("[")
+    assert results[0][1] != results[3][1]
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from keyword_search import build_facet_query, build_facets, build_keyword_query, prefix_upper_bound
+
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound("台北") == "台匘"
+    assert "台北" <= "台北市" < prefix_upper_bound("台北")
+
+
+def test_exact_keyword_query():
+    query, args = build_keyword_query("台北", "exact", ["asset_id", "created_at"], 20)
+    assert args == [21, "台北"]
+    assert "k.keyword_formal = $2" in query
+    assert "SELECT asset.asset_id, asset.created_at" in query
+
+
+def test_prefix_keyword_query_with_cursor():
+    created_at = datetime(2024, 1, 1)
+    query, args = build_keyword_query("台北", "prefix", ["asset_id"], 10, cursor_values=[created_at, 7])
+    assert args == [11, "台北", "台匘", created_at, 7]
+    assert "k.keyword_formal ~>=~ $2 AND k.keyword_formal ~<~ $3" in query
+    assert "(asset.created_at, asset.asset_id) < ($4::timestamp, $5::integer)" in query
+
+
+def test_facet_query_arguments():
+    _, args = build_facet_query("台北", "prefix", facet_limit=5)
+    assert args == [5, "台北", "台匘"]
+
+
+def test_build_facets():
+    rows = [
+        {"facet": "category", "value": "photo", "count": 3},
+        {"facet": "keyword", "value": "台北", "count": 4},
+        {"facet": "keyword", "value": "台北市", "count": 1},
+        {"facet": "total", "value": None, "count": 5},
+    ]
+    assert build_facets(rows) == {
+        "total": 5,
+        "keywords": [{"value": "台北", "count": 4}, {"value": "台北市", "count": 1}],
+        "categories": [{"value": "photo", "count": 3}],
+    }
+
+
+def test_build_facets_without_matches():
+    assert build_facets([]) == {"total": 0, "keywords": [], "categories": []}
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from search_cache import SearchCache, cache_key, normalize_keyword
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_normalize_keyword():
+    assert normalize_keyword("  ＴＡＩＰＥＩ   101 ") == "taipei 101"
+    assert normalize_keyword(None) == ""
+
+
+def test_cache_key_covers_parameters():
+    assert cache_key("Taipei", limit=20, sort="recent") == cache_key(" taipei ", sort="recent", limit=20)
+    assert cache_key("taipei", sort="recent", limit=20) != cache_key("taipei", sort="recent", limit=10)
+
+
+def test_lru_eviction():
+    cache = SearchCache(max_entries=2, redis_url="")
+    cache.put_local("a", 1)
+    cache.put_local("b", 2)
+    assert cache.get_local("a") == 1
+    cache.put_local("c", 3)
+    assert cache.get_local("b") is None
+    assert cache.get_local("a") == 1
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = SearchCache(ttl=0, redis_url="")
+    cache.put_local("a", 1)
+    assert cache.get_local("a") is None
+
+
+def test_concurrent_misses_share_one_computation():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"items": []}
+
+    async def main():
+        cache = SearchCache(redis_url="")
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+        assert await cache.get_or_compute("k", compute) is results[0]
+        return cache, results
+
+    cache, results = run(main())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.metrics()["coalesced"] == 4
+    assert cache.metrics()["hits"] == 1
+
+
+def test_errors_reach_waiters_and_are_not_cached():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database down")
+
+    async def main():
+        cache = SearchCache(redis_url="")
+        results = await asyncio.gather(*(cache.get_or_compute("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("k", failing)
+
+    run(main())
+    assert len(calls) == 2
+
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        cache = SearchCache(redis_url="")
+        owner = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        assert await waiter == 2
+        assert owner.cancelled()
+
+    run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_owner():
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "page"
+
+    async def main():
+        cache = SearchCache(redis_url="")
+        owner = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        assert await owner == "page"
+        assert waiter.cancelled()
+
+    run(main())
@@ -0,0 +1,38 @@
+from search_index import MAX_WORD_LENGTH, MIGRATION_SQL, build_tsquery, migration_sql
+
+
+def test_cjk_run_becomes_phrase_of_bigrams():
+    assert build_tsquery("台北市") == "('台北' <-> '北市')"
+
+
+def test_single_character_and_ascii_words_are_prefixes():
+    assert build_tsquery("台") == "'台':*"
+    assert build_tsquery("Taipei 101") == "'taipei':* & '101':*"
+
+
+def test_runs_are_and_combined():
+    assert build_tsquery("台北 MRT") == "('台北') & 'mrt':*"
+
+
+def test_tsquery_syntax_is_not_passed_through():
+    # Quotes, operators and parentheses are separators, never tsquery syntax
+    assert build_tsquery("a'b") == "'a':* & 'b':*"
+    assert build_tsquery("x & !y | (z)") == "'x':* & 'y':* & 'z':*"
+    assert build_tsquery("台北'):* | '市") == "('台北') & '市':*"
+
+
+def test_nothing_searchable():
+    assert build_tsquery("") is None
+    assert build_tsquery(None) is None
+    assert build_tsquery("!?'&|") is None
+    assert build_tsquery("a" * (MAX_WORD_LENGTH + 1)) is None
+
+
+def test_migration_column_quoting():
+    assert MIGRATION_SQL == migration_sql()
+    unquoted = migration_sql()[1]
+    quoted = migration_sql(quoted_columns=True)[1]
+    assert "coalesce(storytitle, '')" in unquoted
+    assert '"StoryTitle"' not in unquoted
+    assert "coalesce(\"StoryTitle\", '')" in quoted
+    assert 'cjk_bigram_tsvector("StoryContents")' in quoted
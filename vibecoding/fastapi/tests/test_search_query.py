@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from search_query import (
+    InvalidCursorError,
+    build_page,
+    build_search_query,
+    decode_cursor,
+    encode_cursor,
+    parse_fields,
+    snippet_term,
+)
+
+ROW = {"asset_id": 42, "created_at": datetime(2024, 5, 1, 12, 30, 15, 123456), "rank": 0.25}
+
+
+def make_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def rows(count):
+    return [{"asset_id": count - i, "created_at": datetime(2024, 1, 1 + i), "rank": 1.0 / (i + 1)} for i in range(count)]
+
+
+@pytest.mark.parametrize("sort, expected", [("recent", [ROW["created_at"], 42]), ("relevance", [0.25, ROW["created_at"], 42])])
+def test_cursor_round_trip(sort, expected):
+    cursor = encode_cursor(ROW, sort)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, sort) == expected
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not base64!",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        make_cursor({"asset_id": 1}),
+        make_cursor(["2024-05-01T12:30:15"]),
+        make_cursor(["yesterday", 42]),
+        make_cursor(["2024-05-01T12:30:15", "x"]),
+        make_cursor(["2024-05-01T12:30:15", None]),
+    ],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "recent")
+
+
+def test_cursor_of_other_sort_order_is_rejected():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor(ROW, "recent"), "relevance")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor(ROW, "relevance"), "recent")
+
+
+def test_parse_fields():
+    allowed = ["asset_id", "created_at", "StoryTitle", "StoryContents", "WebUrl"]
+    default = ["asset_id", "StoryTitle"]
+    assert parse_fields(None, allowed, default) == ["asset_id", "created_at", "StoryTitle"]
+    # Unknown names are dropped, order follows allowed, cursor columns are always kept
+    assert parse_fields("WebUrl, nope,StoryContents", allowed, default) == [
+        "asset_id",
+        "created_at",
+        "StoryContents",
+        "WebUrl",
+    ]
+    assert parse_fields("password", allowed, default) == ["asset_id", "created_at"]
+
+
+def test_snippet_term_picks_longest_run():
+    assert snippet_term("MRT 台北車站") == "台北車站"
+    assert snippet_term("!!") == ""
+
+
+def test_build_page_first_page_not_full_is_exact():
+    page = build_page(rows(3), "recent", 5, None, first_page=True)
+    assert page["next_cursor"] is None
+    assert page["total_estimate"] == 3
+    assert page["total_is_exact"] is True
+
+
+def test_build_page_has_more():
+    fetched = rows(6)
+    page = build_page(fetched, "recent", 5, 1000, first_page=True)
+    assert page["items"] == fetched[:5]
+    assert decode_cursor(page["next_cursor"], "recent") == [fetched[4]["created_at"], fetched[4]["asset_id"]]
+    assert page["total_estimate"] == 1000
+    assert page["total_is_exact"] is False
+
+
+def test_build_page_estimate_never_below_page():
+    page = build_page(rows(6), "recent", 5, 2, first_page=True)
+    assert page["total_estimate"] == 5
+
+
+def test_build_page_later_pages_have_no_total():
+    page = build_page(rows(2), "relevance", 5, None, first_page=False)
+    assert page["next_cursor"] is None
+    assert page["total_estimate"] is None
+    assert page["total_is_exact"] is False
+
+
+def test_build_search_query_first_page():
+    query, args = build_search_query("'a':*", ["asset_id", "created_at"], "recent", 20)
+    assert args == ["'a':*", 21]
+    assert "ORDER BY created_at DESC, asset_id DESC" in query
+    assert "WHERE (" not in query
+
+
+def test_build_search_query_seeks_after_cursor_and_cuts_snippet():
+    values = decode_cursor(encode_cursor(ROW, "relevance"), "relevance")
+    query, args = build_search_query(
+        "'a':*", ["asset_id", "created_at"], "relevance", 10, cursor_values=values, snippet_source="a.x", term="a"
+    )
+    assert args == ["'a':*", 11, 0.25, ROW["created_at"], 42, "a"]
+    assert "WHERE (rank, created_at, asset_id) < ($3::real, $4::timestamp, $5::integer)" in query
+    assert "strpos(lower(a.x), $6)" in query
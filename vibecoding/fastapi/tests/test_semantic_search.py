@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from semantic_search import (
+    HNSW_EF_SEARCH,
+    HYBRID_CANDIDATES,
+    build_semantic_query,
+    scan_settings,
+    supports_iterative_scan,
+)
+
+
+def test_supports_iterative_scan():
+    assert supports_iterative_scan("0.8.0")
+    assert supports_iterative_scan("1.0")
+    assert not supports_iterative_scan("0.7.4")
+    assert not supports_iterative_scan(None)
+    assert not supports_iterative_scan("dev")
+
+
+def test_scan_settings():
+    assert scan_settings(10, filtered=False, iterative_scan=True) == [f"SET LOCAL hnsw.ef_search = {HNSW_EF_SEARCH}"]
+    assert scan_settings(500, filtered=True, iterative_scan=True) == [
+        "SET LOCAL hnsw.ef_search = 500",
+        "SET LOCAL hnsw.iterative_scan = strict_order",
+    ]
+    assert scan_settings(10, filtered=True, iterative_scan=False)[1] == "SET LOCAL enable_indexscan = off"
+
+
+def test_vector_query_with_filters():
+    date_from = datetime(2020, 1, 1)
+    query, args = build_semantic_query("[0.1,0.2]", ["asset_id"], 5, category="photo", date_from=date_from)
+    assert args == ["[0.1,0.2]", 5, "photo", date_from]
+    assert "embedding IS NOT NULL AND category = $3 AND eventdatestart >= $4" in query
+    assert "LIMIT $2" in query
+
+
+def test_hybrid_query_filters_both_rankings():
+    query, args = build_semantic_query("[0.1]", ["asset_id"], 5, tsquery="'a':*", title_type="video")
+    assert args == ["[0.1]", 5, "video", "'a':*", HYBRID_CANDIDATES]
+    assert query.count("AND titletype = $3") == 2
+    assert "@@ $4::tsquery" in query
+    assert "FULL JOIN keyword USING (asset_id)" in query
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Offline load and latency benchmark for the Zen MCP Server.
+
+Starts a local stand-in model server (benchmarks/stub_model_server.py), launches
+server.py over stdio with CustomProvider pointed at it, and runs concurrent
+scripted sessions against it. Every session works on a generated multi-file
+project and performs:
+
+    chat        three turns, each attaching files, chained by continuation_id
+    codereview  one final step with relevant_files, which runs expert analysis
+
+No API keys or network access are needed, so the numbers reflect the server's
+own overhead (thread reconstruction, file reading, prompt assembly, JSON-RPC)
+on top of a model whose latency, output rate and error rate are fixed.
+
+Reported: tool call throughput, p50/p99 latency per tool, mean server overhead
+per call (call latency minus time spent in the stub), failed calls and the peak
+resident memory of the server process.
+
+Usage:
+    python benchmarks/load.py [--sessions 20] [--concurrency 4] [--latency 0.05]
+                              [--tokens-per-second 0] [--error-rate 0] [--stream] [--json]
+
+With --max-p99-ms, --max-overhead-ms or --max-error-rate the script exits with
+status 1 when a limit is exceeded, so CI can catch regressions.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from startup import PROJECT_ROOT, PROVIDER_KEYS  # noqa: E402
+from stub_model_server import StubModelServer, StubSettings  # noqa: E402
+
+MODEL = "local-llama"
+
+
+def _environment(base_url: str) -> dict[str, str]:
+    env = dict(os.environ)
+    for key in PROVIDER_KEYS:
+        env.pop(key, None)
+    env.update(
+        {
+            "CUSTOM_API_URL": base_url,
+            "CUSTOM_API_KEY": "",
+            "DEFAULT_MODEL": MODEL,
+            "LOG_LEVEL": "WARNING",
+            # Keep injected failures from dominating the run with back-off sleeps
+            "RETRY_BASE_DELAY": "0.05",
+            "RETRY_MAX_DELAY": "0.5",
+        }
+    )
+    return env
+
+
+def create_project(directory: Path, files: int = 6, functions: int = 40) -> list[str]:
+    """Writes a small Python project to review and returns the absolute file paths."""
+    paths = []
+    for index in range(files):
+        path = directory / f"module_{index}.py"
+        body = [f'"""Module {index} of the load benchmark project."""\n']
+        for function in range(functions):
+            body.append(
+                f"\ndef handler_{index}_{function}(payload, retries=3):\n"
+                f"    for attempt in range(retries):\n"
+                f"        if payload.get('key_{function}') is not None:\n"
+                f"            return payload['key_{function}'] * {function + 1}\n"
+                f"    return None\n"
+            )
+        path.write_text("".join(body))
+        paths.append(str(path.resolve()))
+    return paths
+
+
+class StdioClient:
+    """Minimal JSON-RPC client for server.py that allows concurrent requests."""
+
+    def __init__(self, env: dict[str, str]):
+        self.process = subprocess.Popen(
+            [sys.executable, str(PROJECT_ROOT / "server.py")],
+            cwd=PROJECT_ROOT,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        self._ids = itertools.count(1)
+        self._pending: dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self.notifications = 0
+        self._reader = threading.Thread(target=self._read, name="load-client-reader", daemon=True)
+        self._reader.start()
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            message = json.loads(line)
+            if "id" not in message:
+                self.notifications += 1
+                continue
+            with self._lock:
+                future = self._pending.pop(message["id"], None)
+            if future is not None:
+                future.set_result(message)
+        with self._lock:
+            for future in self._pending.values():
+                future.set_exception(RuntimeError("Server exited before responding"))
+            self._pending.clear()
+
+    def _send(self, message: dict) -> None:
+        with self._lock:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+
+    def request(self, method: str, params: Optional[dict] = None, timeout: float = 300) -> dict:
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._lock:
+            self._pending[request_id] = future
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}})
+        response = future.result(timeout=timeout)
+        if "error" in response:
+            raise RuntimeError(f"{method} failed: {response['error']}")
+        return response["result"]
+
+    def initialize(self) -> None:
+        self.request(
+            "initialize",
+            {
+                "protocolVersion": "2025-06-18",
+                "capabilities": {},
+                "clientInfo": {"name": "load-benchmark", "version": "1.0"},
+            },
+        )
+        self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def peak_rss_mb(self) -> Optional[float]:
+        """Peak resident memory of the server process (Linux only)."""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return None
+
+    def close(self) -> None:
+        self.process.kill()
+        self.process.wait()
+
+
+def call_tool(client: StdioClient, name: str, arguments: dict, stream: bool) -> tuple[float, dict]:
+    params = {"name": name, "arguments": arguments}
+    if stream:
+        params["_meta"] = {"progressToken": f"{name}-{time.monotonic_ns()}"}
+    start = time.perf_counter()
+    result = client.request("tools/call", params)
+    elapsed = time.perf_counter() - start
+    output = json.loads(result["content"][0]["text"])
+    if output.get("status") not in ("success", "continuation_available", "calling_expert_analysis"):
+        raise RuntimeError(f"{name} returned {output.get('status')}: {str(output.get('content'))[:200]}")
+    return elapsed, output
+
+
+def run_session(client: StdioClient, files: list[str], session: int, stream: bool) -> list[tuple[str, float, bool]]:
+    """One scripted user session; returns (tool, seconds, ok) per tool call."""
+    calls = []
+
+    def timed(tool: str, arguments: dict) -> Optional[dict]:
+        try:
+            elapsed, output = call_tool(client, tool, arguments, stream)
+        except Exception:
+            calls.append((tool, 0.0, False))
+            return None
+        calls.append((tool, elapsed, True))
+        return output
+
+    continuation_id = None
+    prompts = (
+        "Explain what these handlers do and where they could fail.",
+        "Which of them would you refactor first, and why?",
+        "Suggest tests for the retry handling.",
+    )
+    for turn, prompt in enumerate(prompts):
+        arguments = {
+            "prompt": f"[session {session}] {prompt}",
+            "model": MODEL,
+            "files": files[turn : turn + 3],
+        }
+        if continuation_id:
+            arguments["continuation_id"] = continuation_id
+        output = timed("chat", arguments)
+        offer = (output or {}).get("continuation_offer") or {}
+        continuation_id = offer.get("continuation_id", continuation_id)
+
+    timed(
+        "codereview",
+        {
+            "step": f"[session {session}] Reviewed the handler modules for error handling and duplication.",
+            "step_number": 1,
+            "total_steps": 1,
+            "next_step_required": False,
+            "findings": "Handlers share a retry loop that never changes between attempts.",
+            "relevant_files": files,
+            "confidence": "medium",
+            "model": MODEL,
+        },
+    )
+    return calls
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_benchmark(
+    settings: StubSettings,
+    sessions: int = 20,
+    concurrency: int = 4,
+    stream: bool = False,
+) -> dict:
+    with StubModelServer(settings) as stub, tempfile.TemporaryDirectory(prefix="zen-load-") as directory:
+        files = create_project(Path(directory))
+        client = StdioClient(_environment(stub.base_url))
+        try:
+            client.initialize()
+            client.request("tools/list")
+            # Warm-up: first-use imports and provider set-up are the start-up benchmark's concern
+            run_session(client, files, -1, stream)
+            stub.service_times.clear()
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(lambda s: run_session(client, files, s, stream), range(sessions)))
+            wall = time.perf_counter() - start
+            peak_rss = client.peak_rss_mb()
+        finally:
+            client.close()
+        model_seconds = sum(stub.service_times)
+        model_requests = len(stub.service_times)
+
+    calls = [call for session_calls in results for call in session_calls]
+    succeeded = [seconds for _, seconds, ok in calls if ok]
+    by_tool = {}
+    for tool in sorted({tool for tool, _, _ in calls}):
+        latencies = [seconds for name, seconds, ok in calls if name == tool and ok]
+        by_tool[tool] = {
+            "calls": sum(1 for name, _, _ in calls if name == tool),
+            "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 1) if latencies else None,
+        }
+
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "stream": stream,
+        "stub": settings.__dict__,
+        "wall_seconds": round(wall, 3),
+        "calls": len(calls),
+        "failed_calls": len(calls) - len(succeeded),
+        "error_rate": round((len(calls) - len(succeeded)) / len(calls), 4) if calls else 0.0,
+        "throughput_calls_per_second": round(len(calls) / wall, 2) if wall else 0.0,
+        "p50_ms": round(statistics.median(succeeded) * 1000, 1) if succeeded else None,
+        "p99_ms": round(_percentile(succeeded, 99) * 1000, 1) if succeeded else None,
+        # Counts failed attempts too; time spent backing off before a retry shows up as overhead
+        "model_requests": model_requests,
+        "mean_overhead_ms": round((sum(succeeded) - model_seconds) / len(succeeded) * 1000, 1) if succeeded else None,
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+        "progress_notifications": client.notifications,
+        "tools": by_tool,
+    }
+
+
+def check_limits(results: dict, args: argparse.Namespace) -> list[str]:
+    failures = []
+    limits = (
+        ("p99_ms", args.max_p99_ms),
+        ("mean_overhead_ms", args.max_overhead_ms),
+        ("error_rate", args.max_error_rate),
+    )
+    for key, limit in limits:
+        value = results[key]
+        if limit is not None and (value is None or value > limit):
+            failures.append(f"{key} {value} exceeds limit {limit}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=20, help="scripted sessions to run (default: 20)")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions running at once (default: 4)")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="stub output rate (0 = instant)")
+    parser.add_argument("--output-tokens", type=int, default=200, help="stub answer length in tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of failing stub requests")
+    parser.add_argument("--seed", type=int, default=1, help="seed for error injection")
+    parser.add_argument("--stream", action="store_true", help="request progress, which streams model calls")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--max-p99-ms", type=float, help="fail if p99 tool call latency exceeds this")
+    parser.add_argument("--max-overhead-ms", type=float, help="fail if mean server overhead per call exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="fail if the failed call fraction exceeds this")
+    args = parser.parse_args()
+
+    settings = StubSettings(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    results = run_benchmark(settings, sessions=args.sessions, concurrency=args.concurrency, stream=args.stream)
+    failures = check_limits(results, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(
+            f"Zen MCP Server load ({results['sessions']} sessions, concurrency {results['concurrency']}, "
+            f"stub latency {settings.latency * 1000:.0f}ms)"
+        )
+        print(f"  throughput   {results['throughput_calls_per_second']} calls/s ({results['calls']} calls)")
+        print(f"  latency      p50 {results['p50_ms']}ms  p99 {results['p99_ms']}ms")
+        print(f"  overhead     {results['mean_overhead_ms']}ms per call on top of the model")
+        print(f"  failed       {results['failed_calls']} ({results['error_rate']:.1%})")
+        print(f"  peak RSS     {results['peak_rss_mb']} MB")
+        for tool, stats in results["tools"].items():
+            print(f"  {tool:<12} {stats['calls']} calls  p50 {stats['p50_ms']}ms  p99 {stats['p99_ms']}ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
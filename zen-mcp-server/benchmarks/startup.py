@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Session start-up benchmark for the Zen MCP Server.
+
+MCP clients launch the server as a stdio subprocess for every session, so the
+time until the server answers `initialize` and the first `tools/list` is paid
+on every connection. This script starts server.py the way a client does,
+performs the handshake and a tools/list request, and reports for each:
+
+    import      time for `import server` in a fresh interpreter
+    initialize  process start until the initialize response arrives
+    tools/list  process start until the first tools/list response arrives
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--json]
+
+No API calls are made; a placeholder GEMINI_API_KEY is set when no provider is
+configured so that provider set-up runs as it would in a real session.
+
+Reference numbers (median of 5 runs, Linux container, Python 3.11):
+
+    eager imports   import 1.58s  initialize 1.67s  tools/list 1.67s
+    lazy loading    import 0.66s  initialize 0.70s  tools/list 0.83s
+
+Most of what remains is the `mcp` package itself (~0.5s).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+PROVIDER_KEYS = (
+    "GEMINI_API_KEY",
+    "OPENAI_API_KEY",
+    "XAI_API_KEY",
+    "DIAL_API_KEY",
+    "OPENROUTER_API_KEY",
+    "CUSTOM_API_URL",
+)
+
+
+def _environment() -> dict[str, str]:
+    env = dict(os.environ)
+    if not any(env.get(key) for key in PROVIDER_KEYS):
+        env["GEMINI_API_KEY"] = "benchmark-placeholder-key"
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def _send(process: subprocess.Popen, message: dict) -> None:
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def _receive(process: subprocess.Popen, request_id: int) -> dict:
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("Server exited before responding")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def measure_import(env: dict[str, str]) -> float:
+    code = "import time; start = time.perf_counter(); import server; print(time.perf_counter() - start)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_session(env: dict[str, str]) -> tuple[float, float]:
+    """Seconds from process start to the initialize and the first tools/list responses."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(PROJECT_ROOT / "server.py")],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        _send(
+            process,
+            {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "initialize",
+                "params": {
+                    "protocolVersion": "2025-06-18",
+                    "capabilities": {},
+                    "clientInfo": {"name": "startup-benchmark", "version": "1.0"},
+                },
+            },
+        )
+        _receive(process, 1)
+        initialized = time.perf_counter() - start
+
+        _send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        response = _receive(process, 2)
+        listed = time.perf_counter() - start
+        if "result" not in response:
+            raise RuntimeError(f"tools/list failed: {response}")
+        return initialized, listed
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="number of measured runs (default: 10)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    env = _environment()
+    # Warm the filesystem and bytecode caches so runs are comparable
+    measure_import(env)
+
+    samples = {"import": [], "initialize": [], "tools/list": []}
+    for _ in range(args.runs):
+        samples["import"].append(measure_import(env))
+        initialized, listed = measure_session(env)
+        samples["initialize"].append(initialized)
+        samples["tools/list"].append(listed)
+
+    results = {
+        name: {"median": statistics.median(values), "min": min(values), "max": max(values)}
+        for name, values in samples.items()
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Zen MCP Server start-up ({args.runs} runs)")
+    for name, stats in results.items():
+        print(f"  {name:<11} median {stats['median']:.3f}s  min {stats['min']:.3f}s  max {stats['max']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an OpenAI-compatible model API.
+
+Serves POST /v1/chat/completions (plain and streamed) and GET /v1/models with
+synthetic answers, so the server can be benchmarked through CustomProvider
+without network access or API costs. The simulated model has:
+
+    latency            seconds before the first token
+    tokens_per_second  output generation rate (0 answers instantly)
+    output_tokens      length of every answer
+    error_rate         fraction of requests failing with error_status
+
+Every request's service time is recorded, so a load run can separate the
+model's share of the latency from the server's own overhead.
+
+Usage (standalone):
+    python benchmarks/stub_model_server.py --port 8089 --latency 0.2 --tokens-per-second 100
+
+Point the server at it with CUSTOM_API_URL=http://127.0.0.1:8089/v1 and use a
+custom model such as "local-llama".
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Roughly one token per word of the synthetic answer
+_WORDS = ("the", "function", "returns", "a", "value", "from", "cache", "when", "input", "is", "valid")
+
+
+@dataclass
+class StubSettings:
+    latency: float = 0.05
+    tokens_per_second: float = 0.0
+    output_tokens: int = 200
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: Optional[int] = None
+
+
+class StubModelServer:
+    """Threaded HTTP server simulating an OpenAI-compatible chat completions endpoint."""
+
+    def __init__(self, settings: Optional[StubSettings] = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or StubSettings()
+        self._random = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.service_times: list[float] = []
+        self.prompt_characters = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubModelServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-model-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubModelServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.settings.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+    def _record(self, started: float, prompt_characters: int) -> None:
+        with self._lock:
+            self.service_times.append(time.perf_counter() - started)
+            self.prompt_characters += prompt_characters
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; without this, delayed ACKs add ~40ms per request
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "llama3.2", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                started = time.perf_counter()
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                settings = stub.settings
+                prompt_characters = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+                time.sleep(settings.latency)
+                if stub._should_fail():
+                    stub._record(started, prompt_characters)
+                    self._send_json(
+                        settings.error_status,
+                        {"error": {"message": "Injected failure", "type": "server_error"}},
+                        headers={"retry-after-ms": "10"},
+                    )
+                    return
+
+                words = [_WORDS[i % len(_WORDS)] for i in range(settings.output_tokens)]
+                usage = {
+                    "prompt_tokens": prompt_characters // 4,
+                    "completion_tokens": len(words),
+                    "total_tokens": prompt_characters // 4 + len(words),
+                }
+                if request.get("stream"):
+                    self._stream(request, words, usage)
+                else:
+                    if settings.tokens_per_second:
+                        time.sleep(len(words) / settings.tokens_per_second)
+                    self._send_json(200, self._completion(request, " ".join(words), usage))
+                stub._record(started, prompt_characters)
+
+            def _completion(self, request: dict, content: str, usage: dict) -> dict:
+                return {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "llama3.2"),
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                    ],
+                    "usage": usage,
+                }
+
+            def _stream(self, request: dict, words: list[str], usage: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                delay = 1 / stub.settings.tokens_per_second if stub.settings.tokens_per_second else 0
+
+                def event(choices, **extra):
+                    chunk = {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "llama3.2"),
+                        "choices": choices,
+                        **extra,
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+
+                for i, word in enumerate(words):
+                    if delay:
+                        time.sleep(delay)
+                    text = word if i == 0 else f" {word}"
+                    event([{"index": 0, "delta": {"content": text}, "finish_reason": None}])
+                event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                event([], usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub model server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="output rate (0 = instant)")
+    parser.add_argument("--output-tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of failed requests")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = StubSettings(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    stub = StubModelServer(settings, host=args.host, port=args.port)
+    print(f"Stub model server listening on {stub.base_url}")
+    try:
+        stub._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
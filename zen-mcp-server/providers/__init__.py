@@ -1,12 +1,21 @@
-"""Model provider abstractions for supporting multiple AI providers."""
+"""Model provider abstractions for supporting multiple AI providers.
+
+Concrete providers are imported on first access so that importing this package
+does not pull in the provider SDKs.
+"""
+
+import importlib
 
 from .base import ModelCapabilities, ModelProvider, ModelResponse
-from .gemini import GeminiModelProvider
-from .openai_compatible import OpenAICompatibleProvider
-from .openai_provider import OpenAIModelProvider
-from .openrouter import OpenRouterProvider
 from .registry import ModelProviderRegistry
 
+_LAZY_EXPORTS = {
+    "GeminiModelProvider": ".gemini",
+    "OpenAIModelProvider": ".openai_provider",
+    "OpenAICompatibleProvider": ".openai_compatible",
+    "OpenRouterProvider": ".openrouter",
+}
+
 __all__ = [
     "ModelProvider",
     "ModelResponse",
@@ -17,3 +26,11 @@ __all__ = [
     "OpenAICompatibleProvider",
     "OpenRouterProvider",
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
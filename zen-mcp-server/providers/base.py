@@ -4,16 +4,20 @@ import base64
 import binascii
 import logging
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 if TYPE_CHECKING:
     from tools.models import ToolModelCategory
 
 from utils.file_types import IMAGES, get_image_mime_type
 
+from .rate_limiter import ProviderLimiter, get_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -185,6 +189,71 @@ class ModelResponse:
         return self.usage.get("total_tokens", 0)
 
 
+class GenerationCancelledError(RuntimeError):
+    """Raised when a streaming generation is stopped through its cancel event."""
+
+
+class StreamAccumulator:
+    """Collects streamed text chunks, forwards them and measures time to first token.
+
+    Providers feed every chunk through add(); it checks the cancel event first, so a
+    cancelled generation stops at the next chunk and the HTTP stream gets closed.
+    """
+
+    def __init__(
+        self,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        self.on_chunk = on_chunk
+        self.cancel_event = cancel_event
+        self.parts: list[str] = []
+        self.chunks = 0
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise GenerationCancelledError(f"Generation cancelled after {self.chunks} chunks")
+
+    def add(self, text: Optional[str]) -> None:
+        self.check_cancelled()
+        if not text:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.parts.append(text)
+        self.chunks += 1
+        if self.on_chunk is not None:
+            self.on_chunk(text)
+
+    @property
+    def content(self) -> str:
+        return "".join(self.parts)
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    def metadata(self) -> dict[str, Any]:
+        """Streaming statistics merged into ModelResponse.metadata."""
+        return {
+            "streamed": True,
+            "stream_chunks": self.chunks,
+            "time_to_first_token": self.time_to_first_token,
+            "generation_time": time.monotonic() - self.started,
+        }
+
+    def deliver_whole(self, response: "ModelResponse") -> "ModelResponse":
+        """Delivers a response that was not streamed as a single chunk."""
+        self.add(response.content)
+        response.metadata.update(self.metadata())
+        response.metadata["streamed"] = False
+        return response
+
+
 class ModelProvider(ABC):
     """Abstract base class for model providers."""
 
@@ -229,6 +298,50 @@ class ModelProvider(ABC):
         """
         pass
 
+    def generate_content_stream(
+        self,
+        prompt: str,
+        model_name: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        max_output_tokens: Optional[int] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        **kwargs,
+    ) -> ModelResponse:
+        """Generate content, delivering the text incrementally as it is produced.
+
+        Providers with a streaming API override this. The default makes one
+        blocking generate_content() call and delivers the result as a single chunk.
+
+        Args:
+            prompt: User prompt to send to the model
+            model_name: Name of the model to use
+            system_prompt: Optional system prompt for model behavior
+            temperature: Sampling temperature (0-2)
+            max_output_tokens: Maximum tokens to generate
+            on_chunk: Called with each text chunk as it arrives
+            cancel_event: When set, generation stops with GenerationCancelledError
+            **kwargs: Provider-specific parameters, as for generate_content()
+
+        Returns:
+            ModelResponse with the complete content; metadata includes time_to_first_token
+        """
+        accumulator = StreamAccumulator(on_chunk, cancel_event)
+        response = self.generate_content(
+            prompt=prompt,
+            model_name=model_name,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            **kwargs,
+        )
+        return accumulator.deliver_whole(response)
+
+    def get_rate_limiter(self, model_name: str) -> ProviderLimiter:
+        """Shared rate limiter and circuit breaker for calls to a resolved model name."""
+        return get_limiter(self.get_provider_type().value, model_name)
+
     @abstractmethod
     def count_tokens(self, text: str, model_name: str) -> int:
         """Count tokens for the given text using the specified model's tokenizer."""
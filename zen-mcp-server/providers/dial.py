@@ -8,11 +8,13 @@ from typing import Optional
 
 from .base import (
     ModelCapabilities,
+    ModelProvider,
     ModelResponse,
     ProviderType,
     create_temperature_constraint,
 )
 from .openai_compatible import OpenAICompatibleProvider
+from .rate_limiter import RETRY_MAX_ATTEMPTS, estimate_request_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +28,8 @@ class DIALModelProvider(OpenAICompatibleProvider):
 
     FRIENDLY_NAME = "DIAL"
 
-    # Retry configuration for API calls
-    MAX_RETRIES = 4
-    RETRY_DELAYS = [1, 3, 5, 8]  # seconds
+    # Retry configuration for API calls (delays come from the shared rate limiter)
+    MAX_RETRIES = RETRY_MAX_ATTEMPTS
 
     # Model configurations using ModelCapabilities objects
     SUPPORTED_MODELS = {
@@ -370,6 +371,10 @@ class DIALModelProvider(OpenAICompatibleProvider):
 
         return self._deployment_clients[deployment]
 
+    def generate_content_stream(self, *args, **kwargs) -> ModelResponse:
+        """DIAL deployment calls are not streamed; the answer is delivered as a single chunk."""
+        return ModelProvider.generate_content_stream(self, *args, **kwargs)
+
     def generate_content(
         self,
         prompt: str,
@@ -461,10 +466,13 @@ class DIALModelProvider(OpenAICompatibleProvider):
         # DIAL-specific: Get cached client for deployment endpoint
         deployment_client = self._get_deployment_client(resolved_model)
 
-        # Retry logic with progressive delays
+        # Retry logic with shared rate limits, jittered backoff and a circuit breaker
+        limiter = self.get_rate_limiter(resolved_model)
+        reserved_tokens = estimate_request_tokens(prompt, system_prompt, max_output_tokens=max_output_tokens)
         last_exception = None
 
         for attempt in range(self.MAX_RETRIES):
+            limiter.acquire(reserved_tokens)
             try:
                 # Generate completion using deployment-specific client
                 response = deployment_client.chat.completions.create(**completion_params)
@@ -472,6 +480,7 @@ class DIALModelProvider(OpenAICompatibleProvider):
                 # Extract content and usage
                 content = response.choices[0].message.content
                 usage = self._extract_usage(response)
+                limiter.record_success(reserved_tokens, usage.get("total_tokens"))
 
                 return ModelResponse(
                     content=content,
@@ -492,6 +501,7 @@ class DIALModelProvider(OpenAICompatibleProvider):
 
                 # Check if this is a retryable error
                 is_retryable = self._is_error_retryable(e)
+                limiter.record_failure(is_retryable, reserved_tokens)
 
                 if not is_retryable:
                     # Non-retryable error, raise immediately
@@ -499,9 +509,10 @@ class DIALModelProvider(OpenAICompatibleProvider):
 
                 # If this isn't the last attempt and error is retryable, wait and retry
                 if attempt < self.MAX_RETRIES - 1:
-                    delay = self.RETRY_DELAYS[attempt]
+                    delay = limiter.backoff_delay(attempt, e)
                     logger.info(
-                        f"DIAL API error (attempt {attempt + 1}/{self.MAX_RETRIES}), " f"retrying in {delay}s: {str(e)}"
+                        f"DIAL API error (attempt {attempt + 1}/{self.MAX_RETRIES}), "
+                        f"retrying in {delay:.1f}s: {str(e)}"
                     )
                     time.sleep(delay)
                     continue
@@ -8,10 +8,16 @@ from typing import TYPE_CHECKING, Optional
 if TYPE_CHECKING:
     from tools.models import ToolModelCategory
 
-from google import genai
-from google.genai import types
-
-from .base import ModelCapabilities, ModelProvider, ModelResponse, ProviderType, create_temperature_constraint
+from .base import (
+    GenerationCancelledError,
+    ModelCapabilities,
+    ModelProvider,
+    ModelResponse,
+    ProviderType,
+    StreamAccumulator,
+    create_temperature_constraint,
+)
+from .rate_limiter import RETRY_MAX_ATTEMPTS, estimate_request_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -126,6 +132,8 @@ class GeminiModelProvider(ModelProvider):
     def client(self):
         """Lazy initialization of Gemini client."""
         if self._client is None:
+            from google import genai
+
             self._client = genai.Client(api_key=self.api_key)
         return self._client
 
@@ -161,6 +169,11 @@ class GeminiModelProvider(ModelProvider):
         **kwargs,
     ) -> ModelResponse:
         """Generate content using Gemini model."""
+        # Streaming options (see generate_content_stream)
+        accumulator = None
+        if kwargs.pop("stream", False):
+            accumulator = StreamAccumulator(kwargs.pop("on_chunk", None), kwargs.pop("cancel_event", None))
+
         # Validate parameters
         resolved_name = self._resolve_model_name(model_name)
         self.validate_parameters(model_name, temperature)
@@ -194,6 +207,8 @@ class GeminiModelProvider(ModelProvider):
         contents = [{"parts": parts}]
 
         # Prepare generation config
+        from google.genai import types
+
         generation_config = types.GenerateContentConfig(
             temperature=temperature,
             candidate_count=1,
@@ -213,23 +228,31 @@ class GeminiModelProvider(ModelProvider):
                 actual_thinking_budget = int(max_thinking_tokens * self.THINKING_BUDGETS[thinking_mode])
                 generation_config.thinking_config = types.ThinkingConfig(thinking_budget=actual_thinking_budget)
 
-        # Retry logic with progressive delays
-        max_retries = 4  # Total of 4 attempts
-        retry_delays = [1, 3, 5, 8]  # Progressive delays: 1s, 3s, 5s, 8s
+        # Retry logic with shared rate limits, jittered backoff and a circuit breaker
+        limiter = self.get_rate_limiter(resolved_name)
+        max_retries = RETRY_MAX_ATTEMPTS
+        reserved_tokens = estimate_request_tokens(full_prompt, max_output_tokens=max_output_tokens)
 
         last_exception = None
 
         for attempt in range(max_retries):
+            limiter.acquire(reserved_tokens)
             try:
-                # Generate content
-                response = self.client.models.generate_content(
-                    model=resolved_name,
-                    contents=contents,
-                    config=generation_config,
-                )
+                if accumulator is not None:
+                    response = self._generate_streamed_content(resolved_name, contents, generation_config, accumulator)
+                    text = accumulator.content
+                else:
+                    # Generate content
+                    response = self.client.models.generate_content(
+                        model=resolved_name,
+                        contents=contents,
+                        config=generation_config,
+                    )
+                    text = response.text
 
                 # Extract usage information if available
                 usage = self._extract_usage(response)
+                limiter.record_success(reserved_tokens, usage.get("total_tokens"))
 
                 # Intelligently determine finish reason and safety blocks
                 finish_reason_str = "UNKNOWN"
@@ -254,7 +277,7 @@ class GeminiModelProvider(ModelProvider):
                         finish_reason_str = "STOP"
 
                     # If content is empty, check safety ratings for the definitive cause
-                    if not response.text:
+                    if not text:
                         try:
                             safety_ratings = candidate.safety_ratings
                             if safety_ratings:  # Check it's not None or empty
@@ -306,36 +329,46 @@ class GeminiModelProvider(ModelProvider):
                         # prompt_feedback doesn't exist or has unexpected attributes; stick with the default message
                         pass
 
+                metadata = {
+                    "thinking_mode": thinking_mode if capabilities.supports_extended_thinking else None,
+                    "finish_reason": finish_reason_str,
+                    "is_blocked_by_safety": is_blocked_by_safety,
+                    "safety_feedback": safety_feedback_details,
+                }
+                if accumulator is not None:
+                    metadata.update(accumulator.metadata())
+
                 return ModelResponse(
-                    content=response.text,
+                    content=text,
                     usage=usage,
                     model_name=resolved_name,
                     friendly_name="Gemini",
                     provider=ProviderType.GOOGLE,
-                    metadata={
-                        "thinking_mode": thinking_mode if capabilities.supports_extended_thinking else None,
-                        "finish_reason": finish_reason_str,
-                        "is_blocked_by_safety": is_blocked_by_safety,
-                        "safety_feedback": safety_feedback_details,
-                    },
+                    metadata=metadata,
                 )
 
+            except GenerationCancelledError:
+                limiter.release(reserved_tokens)
+                raise
+
             except Exception as e:
                 last_exception = e
 
                 # Check if this is a retryable error using structured error codes
                 is_retryable = self._is_error_retryable(e)
+                limiter.record_failure(is_retryable, reserved_tokens)
 
-                # If this is the last attempt or not retryable, give up
-                if attempt == max_retries - 1 or not is_retryable:
+                # If this is the last attempt or not retryable, give up.
+                # A stream that already delivered chunks is not retried, it would repeat them.
+                if attempt == max_retries - 1 or not is_retryable or (accumulator is not None and accumulator.chunks):
                     break
 
-                # Get progressive delay
-                delay = retry_delays[attempt]
+                # Jittered exponential delay, or the server's retryDelay hint
+                delay = limiter.backoff_delay(attempt, e)
 
                 # Log retry attempt
                 logger.warning(
-                    f"Gemini API error for model {resolved_name}, attempt {attempt + 1}/{max_retries}: {str(e)}. Retrying in {delay}s..."
+                    f"Gemini API error for model {resolved_name}, attempt {attempt + 1}/{max_retries}: {str(e)}. Retrying in {delay:.1f}s..."
                 )
                 time.sleep(delay)
 
@@ -344,6 +377,59 @@ class GeminiModelProvider(ModelProvider):
         error_msg = f"Gemini API error for model {resolved_name} after {actual_attempts} attempt{'s' if actual_attempts > 1 else ''}: {str(last_exception)}"
         raise RuntimeError(error_msg) from last_exception
 
+    def generate_content_stream(
+        self,
+        prompt: str,
+        model_name: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        max_output_tokens: Optional[int] = None,
+        on_chunk=None,
+        cancel_event=None,
+        **kwargs,
+    ) -> ModelResponse:
+        """Generate content with Gemini's streaming API (see ModelProvider.generate_content_stream)."""
+        return self.generate_content(
+            prompt=prompt,
+            model_name=model_name,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            stream=True,
+            on_chunk=on_chunk,
+            cancel_event=cancel_event,
+            **kwargs,
+        )
+
+    def _generate_streamed_content(self, resolved_name: str, contents, generation_config, accumulator):
+        """Streams one generation into the accumulator and returns the last chunk.
+
+        The last chunk carries the finish reason, safety ratings and usage metadata.
+        """
+        last_chunk = None
+        stream = self.client.models.generate_content_stream(
+            model=resolved_name,
+            contents=contents,
+            config=generation_config,
+        )
+        try:
+            for chunk in stream:
+                accumulator.add(chunk.text)
+                last_chunk = chunk
+        finally:
+            # Stop the underlying HTTP stream when the loop ends early (e.g. cancellation)
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+        if last_chunk is None:
+            raise RuntimeError(f"Gemini stream for model {resolved_name} returned no chunks")
+        logger.debug(
+            f"Gemini stream for {resolved_name}: {accumulator.chunks} chunks, "
+            f"time to first token {accumulator.time_to_first_token}"
+        )
+        return last_chunk
+
     def count_tokens(self, text: str, model_name: str) -> int:
         """Count tokens for the given text using Gemini's tokenizer."""
         self._resolve_model_name(model_name)
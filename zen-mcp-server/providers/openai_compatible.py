@@ -9,14 +9,30 @@ from abc import abstractmethod
 from typing import Optional
 from urllib.parse import urlparse
 
-from openai import OpenAI
-
 from .base import (
+    GenerationCancelledError,
     ModelCapabilities,
     ModelProvider,
     ModelResponse,
     ProviderType,
+    StreamAccumulator,
 )
+from .rate_limiter import RETRY_MAX_ATTEMPTS, estimate_request_tokens
+
+
+def __getattr__(name):
+    # The OpenAI SDK takes a few hundred milliseconds to import, so it is loaded
+    # when the first client is created rather than at server start-up
+    if name == "OpenAI":
+        from openai import OpenAI
+
+        return OpenAI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _openai_client_class():
+    """The OpenAI client class, imported on first use (and patchable as ``OpenAI``)."""
+    return globals().get("OpenAI") or __getattr__("OpenAI")
 
 
 class OpenAICompatibleProvider(ModelProvider):
@@ -254,7 +270,7 @@ class OpenAICompatibleProvider(ModelProvider):
                 logging.debug(f"OpenAI client initialized with custom httpx client and timeout: {timeout_config}")
 
                 # Create OpenAI client with custom httpx client
-                self._client = OpenAI(**client_kwargs)
+                self._client = _openai_client_class()(**client_kwargs)
 
             except Exception as e:
                 # If all else fails, try absolute minimal client without custom httpx
@@ -263,7 +279,7 @@ class OpenAICompatibleProvider(ModelProvider):
                     minimal_kwargs = {"api_key": self.api_key}
                     if self.base_url:
                         minimal_kwargs["base_url"] = self.base_url
-                    self._client = OpenAI(**minimal_kwargs)
+                    self._client = _openai_client_class()(**minimal_kwargs)
                 except Exception as fallback_error:
                     logging.error(f"Even minimal OpenAI client creation failed: {fallback_error}")
                     raise
@@ -372,13 +388,18 @@ class OpenAICompatibleProvider(ModelProvider):
         # For responses endpoint, we only add parameters that are explicitly supported
         # Remove unsupported chat completion parameters that may cause API errors
 
-        # Retry logic with progressive delays
-        max_retries = 4
-        retry_delays = [1, 3, 5, 8]
+        # Retry logic with shared rate limits, jittered backoff and a circuit breaker
+        limiter = self.get_rate_limiter(model_name)
+        max_retries = RETRY_MAX_ATTEMPTS
+        reserved_tokens = estimate_request_tokens(
+            *(str(message.get("content", "")) for message in messages), max_output_tokens=max_output_tokens
+        )
         last_exception = None
         actual_attempts = 0
 
         for attempt in range(max_retries):
+            actual_attempts = attempt + 1
+            limiter.acquire(reserved_tokens)
             try:  # Log sanitized payload for debugging
                 import json
 
@@ -407,6 +428,7 @@ class OpenAICompatibleProvider(ModelProvider):
                         "output_tokens": output_tokens,
                         "total_tokens": input_tokens + output_tokens,
                     }
+                limiter.record_success(reserved_tokens, (usage or {}).get("total_tokens"))
 
                 return ModelResponse(
                     content=content,
@@ -427,11 +449,12 @@ class OpenAICompatibleProvider(ModelProvider):
 
                 # Check if this is a retryable error using structured error codes
                 is_retryable = self._is_error_retryable(e)
+                limiter.record_failure(is_retryable, reserved_tokens)
 
                 if is_retryable and attempt < max_retries - 1:
-                    delay = retry_delays[attempt]
+                    delay = limiter.backoff_delay(attempt, e)
                     logging.warning(
-                        f"Retryable error for o3-pro responses endpoint, attempt {actual_attempts}/{max_retries}: {str(e)}. Retrying in {delay}s..."
+                        f"Retryable error for o3-pro responses endpoint, attempt {actual_attempts}/{max_retries}: {str(e)}. Retrying in {delay:.1f}s..."
                     )
                     time.sleep(delay)
                 else:
@@ -465,6 +488,11 @@ class OpenAICompatibleProvider(ModelProvider):
         Returns:
             ModelResponse with generated content and metadata
         """
+        # Streaming options (see generate_content_stream)
+        stream = bool(kwargs.pop("stream", False))
+        on_chunk = kwargs.pop("on_chunk", None)
+        cancel_event = kwargs.pop("cancel_event", None)
+
         # Validate model name against allow-list
         if not self.validate_model_name(model_name):
             raise ValueError(f"Model '{model_name}' not in allowed models list. Allowed models: {self.allowed_models}")
@@ -533,7 +561,7 @@ class OpenAICompatibleProvider(ModelProvider):
         # Add any additional OpenAI-specific parameters
         # Use capabilities to filter parameters for reasoning models
         for key, value in kwargs.items():
-            if key in ["top_p", "frequency_penalty", "presence_penalty", "seed", "stop", "stream"]:
+            if key in ["top_p", "frequency_penalty", "presence_penalty", "seed", "stop"]:
                 # Reasoning models (those that don't support temperature) also don't support these parameters
                 if not supports_temperature and key in ["top_p", "frequency_penalty", "presence_penalty"]:
                     continue  # Skip unsupported parameters for reasoning models
@@ -543,30 +571,49 @@ class OpenAICompatibleProvider(ModelProvider):
         if resolved_model == "o3-pro":
             # This model requires the /v1/responses endpoint
             # If it fails, we should not fall back to chat/completions
-            return self._generate_with_responses_endpoint(
+            response = self._generate_with_responses_endpoint(
                 model_name=resolved_model,
                 messages=messages,
                 temperature=temperature,
                 max_output_tokens=max_output_tokens,
                 **kwargs,
             )
-
-        # Retry logic with progressive delays
-        max_retries = 4  # Total of 4 attempts
-        retry_delays = [1, 3, 5, 8]  # Progressive delays: 1s, 3s, 5s, 8s
+            if stream:
+                # The responses endpoint is not streamed; deliver the answer as one chunk
+                return StreamAccumulator(on_chunk, cancel_event).deliver_whole(response)
+            return response
+
+        accumulator = None
+        if stream:
+            accumulator = StreamAccumulator(on_chunk, cancel_event)
+            completion_params["stream"] = True
+            # Final chunk carries token usage
+            completion_params["stream_options"] = {"include_usage": True}
+
+        # Retry logic with shared rate limits, jittered backoff and a circuit breaker
+        limiter = self.get_rate_limiter(resolved_model)
+        max_retries = RETRY_MAX_ATTEMPTS
+        reserved_tokens = estimate_request_tokens(prompt, system_prompt, max_output_tokens=max_output_tokens)
 
         last_exception = None
         actual_attempts = 0
 
         for attempt in range(max_retries):
             actual_attempts = attempt + 1  # Convert from 0-based index to human-readable count
+            limiter.acquire(reserved_tokens)
             try:
+                if accumulator is not None:
+                    response = self._generate_streamed_completion(completion_params, model_name, accumulator)
+                    limiter.record_success(reserved_tokens, response.usage.get("total_tokens"))
+                    return response
+
                 # Generate completion
                 response = self.client.chat.completions.create(**completion_params)
 
                 # Extract content and usage
                 content = response.choices[0].message.content
                 usage = self._extract_usage(response)
+                limiter.record_success(reserved_tokens, usage.get("total_tokens"))
 
                 return ModelResponse(
                     content=content,
@@ -582,22 +629,28 @@ class OpenAICompatibleProvider(ModelProvider):
                     },
                 )
 
+            except GenerationCancelledError:
+                limiter.release(reserved_tokens)
+                raise
+
             except Exception as e:
                 last_exception = e
 
                 # Check if this is a retryable error using structured error codes
                 is_retryable = self._is_error_retryable(e)
+                limiter.record_failure(is_retryable, reserved_tokens)
 
-                # If this is the last attempt or not retryable, give up
-                if attempt == max_retries - 1 or not is_retryable:
+                # If this is the last attempt or not retryable, give up.
+                # A stream that already delivered chunks is not retried, it would repeat them.
+                if attempt == max_retries - 1 or not is_retryable or (accumulator is not None and accumulator.chunks):
                     break
 
-                # Get progressive delay
-                delay = retry_delays[attempt]
+                # Jittered exponential delay, or the server's Retry-After
+                delay = limiter.backoff_delay(attempt, e)
 
                 # Log retry attempt
                 logging.warning(
-                    f"{self.FRIENDLY_NAME} error for model {model_name}, attempt {actual_attempts}/{max_retries}: {str(e)}. Retrying in {delay}s..."
+                    f"{self.FRIENDLY_NAME} error for model {model_name}, attempt {actual_attempts}/{max_retries}: {str(e)}. Retrying in {delay:.1f}s..."
                 )
                 time.sleep(delay)
 
@@ -606,6 +659,78 @@ class OpenAICompatibleProvider(ModelProvider):
         logging.error(error_msg)
         raise RuntimeError(error_msg) from last_exception
 
+    def generate_content_stream(
+        self,
+        prompt: str,
+        model_name: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        max_output_tokens: Optional[int] = None,
+        on_chunk=None,
+        cancel_event=None,
+        **kwargs,
+    ) -> ModelResponse:
+        """Generate content with a streamed chat completion (see ModelProvider.generate_content_stream)."""
+        return self.generate_content(
+            prompt=prompt,
+            model_name=model_name,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            stream=True,
+            on_chunk=on_chunk,
+            cancel_event=cancel_event,
+            **kwargs,
+        )
+
+    def _generate_streamed_completion(
+        self, completion_params: dict, model_name: str, accumulator: StreamAccumulator
+    ) -> ModelResponse:
+        """Runs one streamed chat completion, feeding every text delta to the accumulator."""
+        stream = self.client.chat.completions.create(**completion_params)
+        finish_reason = None
+        usage = {}
+        response_model = None
+        response_id = None
+        created = None
+
+        try:
+            for chunk in stream:
+                accumulator.check_cancelled()
+                response_model = chunk.model or response_model
+                response_id = chunk.id or response_id
+                created = chunk.created or created
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    if choice.delta is not None:
+                        accumulator.add(choice.delta.content)
+                    if choice.finish_reason:
+                        finish_reason = choice.finish_reason
+                if getattr(chunk, "usage", None):
+                    usage = self._extract_usage(chunk)
+        finally:
+            # Closing the stream drops the connection, which stops generation server-side
+            stream.close()
+
+        logging.debug(
+            f"{self.FRIENDLY_NAME} stream for {model_name}: {accumulator.chunks} chunks, "
+            f"time to first token {accumulator.time_to_first_token}"
+        )
+        return ModelResponse(
+            content=accumulator.content,
+            usage=usage,
+            model_name=model_name,
+            friendly_name=self.FRIENDLY_NAME,
+            provider=self.get_provider_type(),
+            metadata={
+                "finish_reason": finish_reason,
+                "model": response_model,
+                "id": response_id,
+                "created": created,
+                **accumulator.metadata(),
+            },
+        )
+
     def count_tokens(self, text: str, model_name: str) -> int:
         """Count tokens for the given text.
 
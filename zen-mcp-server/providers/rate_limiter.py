@@ -0,0 +1,353 @@
+"""
+Shared rate limiting, retry backoff and circuit breaking for provider calls.
+
+Every provider/model pair gets one ProviderLimiter, shared by all concurrent
+calls in the process:
+
+- Token buckets for requests per minute and tokens per minute (RATE_LIMIT_RPM,
+  RATE_LIMIT_TPM) make a call wait for capacity instead of being rejected by
+  the provider. Token usage is reserved from an estimate before the call and
+  corrected with the reported usage afterwards.
+- Retries back off exponentially with full jitter, so concurrent calls do not
+  retry in lockstep. A Retry-After header (or Gemini's retryDelay) wins over
+  the computed delay and pauses every call to that model, not just the one
+  that was told to wait.
+- A circuit breaker opens after CIRCUIT_BREAKER_FAILURE_THRESHOLD consecutive
+  retryable failures. While open, calls fail fast with CircuitOpenError and
+  ModelProviderRegistry.get_provider_for_model() routes the model to the next
+  provider in PROVIDER_PRIORITY_ORDER that serves it. After
+  CIRCUIT_BREAKER_RESET_SECONDS one probe call is let through (half-open);
+  its result closes or re-opens the circuit.
+
+Limits are configured per provider or per provider/model, the more specific
+entry winning:
+    RATE_LIMIT_RPM=openai=500,google=60,openai/o3=20
+    RATE_LIMIT_TPM=openai=200000
+
+get_limiter_states() reports the state of every limiter for monitoring.
+"""
+
+import email.utils
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1.0"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "60"))
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_RETRY_DELAY_PATTERN = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider/model whose circuit breaker is open."""
+
+    def __init__(self, key: str, retry_in: float):
+        super().__init__(f"Circuit breaker open for {key} after repeated failures; next attempt in {retry_in:.0f}s")
+        self.key = key
+        self.retry_in = retry_in
+
+
+def _parse_limits(value: str) -> dict[str, float]:
+    """Parses "openai=500,openai/o3=20" into {"openai": 500.0, "openai/o3": 20.0}."""
+    limits = {}
+    for entry in value.split(","):
+        name, _, limit = entry.partition("=")
+        if not name.strip() or not limit.strip():
+            continue
+        try:
+            limits[name.strip().lower()] = float(limit)
+        except ValueError:
+            logger.warning(f"Ignoring invalid rate limit entry '{entry}'")
+    return limits
+
+
+def _configured_limit(env_var: str, provider: str, model: str) -> float:
+    limits = _parse_limits(os.getenv(env_var, ""))
+    return limits.get(f"{provider}/{model}".lower(), limits.get(provider.lower(), 0.0))
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute; 0 means unlimited."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Takes amount from the bucket, returning how long the caller must wait for it.
+
+        The bucket may go negative: later callers then queue behind this one.
+        Requests larger than the whole bucket are capped so they can still run.
+        """
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens * 60.0 / self.capacity
+
+    def adjust(self, amount: float) -> None:
+        """Returns (amount > 0) or charges (amount < 0) tokens after the real usage is known."""
+        if self.capacity > 0:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    @property
+    def available(self) -> Optional[float]:
+        if self.capacity <= 0:
+            return None
+        self._refill(time.monotonic())
+        return self.tokens
+
+
+class ProviderLimiter:
+    """Rate limits, backoff hints and circuit breaker state of one provider/model."""
+
+    def __init__(
+        self,
+        key: str,
+        requests_per_minute: float = 0.0,
+        tokens_per_minute: float = 0.0,
+        failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_BREAKER_RESET_SECONDS,
+    ):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._paused_until = 0.0
+        self._stats = {"requests": 0, "successes": 0, "failures": 0, "retries": 0, "rejected": 0, "throttled": 0}
+        self._throttled_seconds = 0.0
+
+    # Circuit breaker -----------------------------------------------------
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.reset_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected (open, or half-open with its probe running)."""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return state == OPEN or (state == HALF_OPEN and self._probe_in_flight)
+
+    def _check_circuit(self, now: float) -> None:
+        state = self._current_state(now)
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and not self._probe_in_flight:
+            # Let one probe through; its outcome decides the next state
+            self._probe_in_flight = True
+            return
+        self._stats["rejected"] += 1
+        raise CircuitOpenError(self.key, max(0.0, self._opened_at + self.reset_seconds - now))
+
+    def record_success(self, reserved_tokens: int = 0, used_tokens: Optional[int] = None) -> None:
+        with self._lock:
+            self._stats["successes"] += 1
+            self._consecutive_failures = 0
+            if self._state != CLOSED:
+                logger.info(f"Circuit breaker for {self.key} closed")
+            self._state = CLOSED
+            self._probe_in_flight = False
+            if used_tokens is not None:
+                self._tokens.adjust(reserved_tokens - used_tokens)
+
+    def record_failure(self, retryable: bool = True, reserved_tokens: int = 0) -> None:
+        """Records a failed attempt and returns its token reservation.
+
+        Only retryable (availability) errors count towards opening the circuit.
+        """
+        with self._lock:
+            self._stats["failures"] += 1
+            self._tokens.adjust(reserved_tokens)
+            now = time.monotonic()
+            state = self._current_state(now)
+            if not retryable:
+                if state == HALF_OPEN:
+                    # The provider answered, so it is reachable again
+                    self._state = CLOSED
+                    self._consecutive_failures = 0
+                    self._probe_in_flight = False
+                return
+            self._consecutive_failures += 1
+            if state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if state != OPEN:
+                    logger.warning(
+                        f"Circuit breaker for {self.key} opened after {self._consecutive_failures} consecutive failures"
+                    )
+                self._state = OPEN
+                self._opened_at = now
+                self._probe_in_flight = False
+
+    def release(self, reserved_tokens: int = 0) -> None:
+        """Ends an attempt without an outcome (e.g. cancelled), so a half-open circuit can probe again."""
+        with self._lock:
+            self._probe_in_flight = False
+            self._tokens.adjust(reserved_tokens)
+
+    # Rate limiting ---------------------------------------------------------
+
+    def acquire(self, estimated_tokens: int = 0) -> float:
+        """Waits until the call may be sent, raising CircuitOpenError if the circuit is open.
+
+        Returns:
+            Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._check_circuit(now)
+            self._stats["requests"] += 1
+            wait = max(
+                self._requests.reserve(1, now),
+                self._tokens.reserve(estimated_tokens, now),
+                self._paused_until - now,
+            )
+            if wait > 0:
+                self._stats["throttled"] += 1
+                self._throttled_seconds += wait
+        if wait > 0:
+            logger.debug(f"Rate limiter for {self.key}: waiting {wait:.2f}s for capacity")
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def backoff_delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """Delay before retry number attempt + 1 (attempt is 0-based).
+
+        Honors a server hint from the error; otherwise exponential backoff with full jitter.
+        A server hint also pauses every other call to this provider/model.
+        """
+        hint = retry_after_seconds(error) if error is not None else None
+        with self._lock:
+            self._stats["retries"] += 1
+            if hint is not None:
+                delay = min(hint, RETRY_MAX_DELAY)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                return delay
+        return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2**attempt)))
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_in": max(0.0, self._opened_at + self.reset_seconds - now) if state == OPEN else 0.0,
+                "paused_for": max(0.0, self._paused_until - now),
+                "requests_per_minute": self._requests.capacity or None,
+                "tokens_per_minute": self._tokens.capacity or None,
+                "available_requests": self._requests.available,
+                "available_tokens": self._tokens.available,
+                "throttled_seconds": round(self._throttled_seconds, 3),
+                **self._stats,
+            }
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-suggested wait from an API error: Retry-After(-Ms) header or Gemini retryDelay."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            retry_after_ms = headers.get("retry-after-ms")
+            if retry_after_ms is not None:
+                return max(0.0, float(retry_after_ms) / 1000.0)
+            retry_after = headers.get("retry-after")
+            if retry_after is not None:
+                try:
+                    return max(0.0, float(retry_after))
+                except ValueError:
+                    retry_at = email.utils.parsedate_to_datetime(retry_after)
+                    return max(0.0, retry_at.timestamp() - time.time())
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+    match = _RETRY_DELAY_PATTERN.search(str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def estimate_request_tokens(*texts: Optional[str], max_output_tokens: Optional[int] = None) -> int:
+    """Rough token count reserved before a call (~4 characters per token plus the output budget).
+
+    Only used for TPM accounting; the reservation is corrected with the reported usage.
+    """
+    return sum(len(text) for text in texts if text) // 4 + (max_output_tokens or 0)
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_key(provider: str, model_name: str) -> str:
+    return f"{provider}/{model_name}"
+
+
+def get_limiter(provider: str, model_name: str) -> ProviderLimiter:
+    """Returns the shared limiter of a provider type value (e.g. "openai") and resolved model name."""
+    key = limiter_key(provider, model_name)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = ProviderLimiter(
+                    key,
+                    requests_per_minute=_configured_limit("RATE_LIMIT_RPM", provider, model_name),
+                    tokens_per_minute=_configured_limit("RATE_LIMIT_TPM", provider, model_name),
+                )
+                _limiters[key] = limiter
+    return limiter
+
+
+def is_circuit_open(provider: str, model_name: str) -> bool:
+    """True if calls to this provider/model are currently being rejected. Never creates a limiter."""
+    limiter = _limiters.get(limiter_key(provider, model_name))
+    return limiter is not None and limiter.is_open
+
+
+def get_limiter_states() -> dict[str, dict[str, Any]]:
+    """State of every limiter, keyed by "provider/model"."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.key: limiter.snapshot() for limiter in limiters}
+
+
+def reset_limiters() -> None:
+    """Forgets all limiter state (used by tests and when the provider configuration changes)."""
+    with _limiters_lock:
+        _limiters.clear()
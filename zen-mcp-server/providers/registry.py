@@ -2,13 +2,45 @@
 
 import logging
 import os
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
 from typing import TYPE_CHECKING, Optional
 
 from .base import ModelProvider, ProviderType
+from .rate_limiter import is_circuit_open
 
 if TYPE_CHECKING:
     from tools.models import ToolModelCategory
 
+# Environment variables that decide which providers can be instantiated
+_PROVIDER_ENV_VARS = (
+    "GEMINI_API_KEY",
+    "OPENAI_API_KEY",
+    "XAI_API_KEY",
+    "OPENROUTER_API_KEY",
+    "CUSTOM_API_KEY",
+    "CUSTOM_API_URL",
+    "DIAL_API_KEY",
+)
+
+
+@dataclass(frozen=True)
+class RoutingTable:
+    """Immutable snapshot of which providers serve which model names.
+
+    Built from every name and alias the configured providers know, filtered by
+    the model restrictions, so resolving a model is a dict lookup instead of
+    asking each provider in turn.
+    """
+
+    # Registry, restriction and API key state the table was built from
+    fingerprint: tuple
+    # Lower-cased model name or alias -> providers that accept it, in priority order
+    routes: Mapping[str, tuple[ProviderType, ...]]
+    # Restriction-filtered result of get_available_models()
+    available_models: Mapping[str, ProviderType]
+
 
 class ModelProviderRegistry:
     """Registry for managing model providers."""
@@ -34,6 +66,7 @@ class ModelProviderRegistry:
             # Initialize instance dictionaries on first creation
             cls._instance._providers = {}
             cls._instance._initialized_providers = {}
+            cls._instance._routing_table = None
             logging.debug(f"REGISTRY: Created instance {cls._instance}")
         return cls._instance
 
@@ -113,34 +146,121 @@ class ModelProviderRegistry:
         2. CUSTOM - For local/private models with specific endpoints
         3. OPENROUTER - Catch-all for cloud models via unified API
 
+        A provider whose circuit breaker is open for the model is skipped in favor of
+        the next one that serves it (see providers/rate_limiter.py). If every candidate
+        is open, the first one is returned and fails fast.
+
         Args:
             model_name: Name of the model (e.g., "gemini-2.5-flash", "gpt5")
 
         Returns:
             ModelProvider instance that supports this model
         """
-        logging.debug(f"get_provider_for_model called with model_name='{model_name}'")
+        candidates = cls.get_routing_table().routes.get(model_name.lower())
+        if candidates is None:
+            # Not a name any provider lists (e.g. an arbitrary OpenRouter or local model): ask each provider
+            candidates = cls._find_providers_for_model(model_name)
+
+        open_circuit_provider = None
+        for provider_type in candidates:
+            provider = cls.get_provider(provider_type)
+            if not provider:
+                continue
+            if cls._is_circuit_open(provider, model_name):
+                logging.warning(f"{provider_type.value} circuit open for {model_name}, trying next provider")
+                open_circuit_provider = open_circuit_provider or provider
+                continue
+            return provider
+
+        if open_circuit_provider:
+            return open_circuit_provider
+
+        logging.debug(f"No provider found for model {model_name}")
+        return None
+
+    @classmethod
+    def _find_providers_for_model(cls, model_name: str) -> tuple[ProviderType, ...]:
+        """Providers that accept model_name, in priority order, by asking each of them."""
+        instance = cls()
+        found = []
+        for provider_type in cls.PROVIDER_PRIORITY_ORDER:
+            if provider_type not in instance._providers:
+                continue
+            provider = cls.get_provider(provider_type)
+            if provider and provider.validate_model_name(model_name):
+                found.append(provider_type)
+        return tuple(found)
+
+    @classmethod
+    def get_routing_table(cls) -> RoutingTable:
+        """Current routing table, rebuilt if providers, restrictions or API keys changed since it was built."""
+        instance = cls()
+        table = instance._routing_table
+        if table is None or table.fingerprint != cls._routing_fingerprint():
+            routes, available_models = cls._build_routes()
+            # Fingerprint taken after building, which instantiates the providers
+            table = RoutingTable(
+                fingerprint=cls._routing_fingerprint(),
+                routes=MappingProxyType(routes),
+                available_models=MappingProxyType(available_models),
+            )
+            instance._routing_table = table
+        return table
+
+    @classmethod
+    def _routing_fingerprint(cls) -> tuple:
+        from utils.model_restrictions import get_restriction_service
 
-        # Check providers in priority order
         instance = cls()
-        logging.debug(f"Registry instance: {instance}")
-        logging.debug(f"Available providers in registry: {list(instance._providers.keys())}")
+        return (
+            tuple(instance._providers.items()),
+            tuple(instance._initialized_providers.items()),
+            id(get_restriction_service()),
+            tuple(os.getenv(name) for name in _PROVIDER_ENV_VARS),
+        )
 
+    @classmethod
+    def _build_routes(cls) -> tuple[dict[str, tuple[ProviderType, ...]], dict[str, ProviderType]]:
+        """Asks every configured provider once which names it accepts and which models it offers."""
+        instance = cls()
+        providers = {}
         for provider_type in cls.PROVIDER_PRIORITY_ORDER:
             if provider_type in instance._providers:
-                logging.debug(f"Found {provider_type} in registry")
-                # Get or create provider instance
                 provider = cls.get_provider(provider_type)
-                if provider and provider.validate_model_name(model_name):
-                    logging.debug(f"{provider_type} validates model {model_name}")
-                    return provider
-                else:
-                    logging.debug(f"{provider_type} does not validate model {model_name}")
-            else:
-                logging.debug(f"{provider_type} not found in registry")
+                if provider:
+                    providers[provider_type] = provider
 
-        logging.debug(f"No provider found for model {model_name}")
-        return None
+        known_names = set()
+        for provider in providers.values():
+            try:
+                known_names.update(name.lower() for name in provider.list_all_known_models())
+            except (AttributeError, NotImplementedError, TypeError):
+                continue
+
+        routes = {}
+        for name in known_names:
+            serving = tuple(
+                provider_type for provider_type, provider in providers.items() if provider.validate_model_name(name)
+            )
+            if serving:
+                routes[name] = serving
+
+        logging.debug(f"Built model routing table: {len(routes)} names across {len(providers)} providers")
+        return routes, cls._collect_available_models(respect_restrictions=True)
+
+    @classmethod
+    def invalidate_routing_table(cls) -> None:
+        """Drops the routing table; the next lookup rebuilds it (e.g. after a configuration reload)."""
+        cls()._routing_table = None
+
+    @staticmethod
+    def _is_circuit_open(provider: ModelProvider, model_name: str) -> bool:
+        """Whether calls from this provider to model_name are currently being rejected."""
+        try:
+            resolved_name = provider._resolve_model_name(model_name)
+        except Exception:
+            resolved_name = model_name
+        return is_circuit_open(provider.get_provider_type().value, resolved_name)
 
     @classmethod
     def get_available_providers(cls) -> list[ProviderType]:
@@ -158,6 +278,13 @@ class ModelProviderRegistry:
         Returns:
             Dict mapping model names to provider types
         """
+        if respect_restrictions:
+            return dict(cls.get_routing_table().available_models)
+        return cls._collect_available_models(respect_restrictions=False)
+
+    @classmethod
+    def _collect_available_models(cls, respect_restrictions: bool) -> dict[str, ProviderType]:
+        """Asks every provider for its models (see get_available_models)."""
         # Import here to avoid circular imports
         from utils.model_restrictions import get_restriction_service
 
@@ -350,6 +477,7 @@ class ModelProviderRegistry:
         """Clear cached provider instances."""
         instance = cls()
         instance._initialized_providers.clear()
+        instance._routing_table = None
 
     @classmethod
     def reset_for_testing(cls) -> None:
@@ -0,0 +1,258 @@
+"""
+Opt-in cache of model responses for identical, deterministic requests.
+
+Agents often repeat a call verbatim (a client-side retry, a sub-agent asking
+the same question), and each repeat pays the full latency and cost again.
+With RESPONSE_CACHE=true, responses are stored under a SHA-256 of everything
+that determines the answer: provider, resolved model, system prompt, prompt
+(which already contains the embedded file contents), image content hashes,
+temperature, thinking mode, output limit and other sampling parameters.
+
+Only deterministic requests are cached: the model must accept a temperature
+and the request's temperature must be at most RESPONSE_CACHE_MAX_TEMPERATURE
+(0 by default). Empty answers, truncated answers and safety blocks are never
+stored.
+
+Entries live in an in-memory LRU (RESPONSE_CACHE_MAX_ENTRIES, expiring after
+RESPONSE_CACHE_TTL seconds) backed by an SQLite file at RESPONSE_CACHE_PATH,
+so they survive restarts and are shared between server processes. Set
+RESPONSE_CACHE_PATH=memory to keep the cache in memory only.
+
+Hit, miss and skip counts are reported by get_stats() and the version tool.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Optional
+
+from .base import ModelProvider, ModelResponse, ProviderType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESPONSE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".zen-mcp-server", "responses.db")
+
+# Finish reasons of answers that were cut short or blocked
+_INCOMPLETE_FINISH_REASONS = {"length", "max_tokens", "content_filter", "safety", "recitation"}
+
+# Request parameters that do not change the answer
+_IGNORED_PARAMETERS = {"on_chunk", "cancel_event", "stream"}
+
+
+def _file_digest(path: str) -> str:
+    if path.startswith("data:"):
+        return hashlib.sha256(path.encode("utf-8")).hexdigest()
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    except OSError:
+        # Unreadable image: the provider will skip it too, key on the path
+        return f"missing:{path}"
+
+
+def make_cache_key(
+    provider: ModelProvider,
+    model_name: str,
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    images: Optional[list[str]] = None,
+    **kwargs,
+) -> str:
+    """SHA-256 over everything that determines the model's answer to a request."""
+    parameters = {name: value for name, value in sorted(kwargs.items()) if name not in _IGNORED_PARAMETERS}
+    material = {
+        "provider": provider.get_provider_type().value,
+        "model": provider._resolve_model_name(model_name),
+        "system_prompt": system_prompt or "",
+        "prompt": prompt,
+        "temperature": temperature,
+        "max_output_tokens": max_output_tokens,
+        "images": [_file_digest(image) for image in images or []],
+        "parameters": parameters,
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _serialize(response: ModelResponse) -> str:
+    data = asdict(response)
+    data["provider"] = response.provider.value
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _deserialize(value: str) -> ModelResponse:
+    data = json.loads(value)
+    data["provider"] = ProviderType(data["provider"])
+    return ModelResponse(**data)
+
+
+class ResponseCache:
+    """In-memory LRU of model responses with TTL, optionally persisted to SQLite."""
+
+    def __init__(
+        self,
+        max_entries: int = 500,
+        ttl_seconds: float = 86400,
+        max_temperature: float = 0.0,
+        path: Optional[str] = DEFAULT_RESPONSE_CACHE_PATH,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "skipped": 0, "stores": 0, "evictions": 0}
+
+        self._conn = None
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache (expires_at)")
+
+    def is_cacheable(self, provider: ModelProvider, model_name: str, temperature: Optional[float]) -> bool:
+        """Whether a request has deterministic settings: a temperature the model honors, low enough."""
+        if temperature is None or temperature > self.max_temperature:
+            return False
+        try:
+            return provider.get_capabilities(model_name).supports_temperature
+        except Exception:
+            return False
+
+    def get(self, key: str) -> Optional[ModelResponse]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM response_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._store_locked(key, entry)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+
+        response = _deserialize(entry[0])
+        response.metadata["cache_hit"] = True
+        return response
+
+    def put(self, key: str, response: ModelResponse) -> bool:
+        """Stores a complete response; returns False if it was not worth caching."""
+        finish_reason = str(response.metadata.get("finish_reason") or "").lower()
+        if not response.content or response.metadata.get("is_blocked_by_safety"):
+            return False
+        if finish_reason in _INCOMPLETE_FINISH_REASONS:
+            return False
+
+        entry = (_serialize(response), time.time() + self.ttl_seconds)
+        with self._lock:
+            self._store_locked(key, entry)
+            self._stats["stores"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO response_cache (key, value, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                    (key, entry[0], entry[1]),
+                )
+                # Keep the file within the size cap: drop expired rows, then the oldest ones
+                self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE key IN ("
+                    "SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        return True
+
+    def _store_locked(self, key: str, entry: tuple[str, float]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def record_skip(self) -> None:
+        with self._lock:
+            self._stats["skipped"] += 1
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self._conn is not None,
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+                **self._stats,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM response_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide response cache, or None unless RESPONSE_CACHE is enabled."""
+    global _response_cache
+    if os.getenv("RESPONSE_CACHE", "false").lower() not in ("true", "1", "yes"):
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                path = os.path.expanduser(os.getenv("RESPONSE_CACHE_PATH") or DEFAULT_RESPONSE_CACHE_PATH)
+                settings = {
+                    "max_entries": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500")),
+                    "ttl_seconds": float(os.getenv("RESPONSE_CACHE_TTL", "86400")),
+                    "max_temperature": float(os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", "0")),
+                }
+                try:
+                    _response_cache = ResponseCache(path=None if path.lower() == "memory" else path, **settings)
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"Response cache at {path} unavailable ({e}); caching in memory only")
+                    _response_cache = ResponseCache(path=None, **settings)
+    return _response_cache
+
+
+def reset_response_cache() -> None:
+    """Closes and forgets the process-wide cache (tests, configuration reloads)."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is not None:
+            _response_cache.close()
+        _response_cache = None
@@ -20,9 +20,11 @@ as defined by the MCP protocol.
 
 import asyncio
 import atexit
+import json
 import logging
 import os
 import sys
+import threading
 import time
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
@@ -54,7 +56,6 @@ from mcp.types import (  # noqa: E402
     ServerCapabilities,
     TextContent,
     Tool,
-    ToolAnnotations,
     ToolsCapability,
 )
 
@@ -62,25 +63,12 @@ from config import (  # noqa: E402
     DEFAULT_MODEL,
     __version__,
 )
-from tools import (  # noqa: E402
-    AnalyzeTool,
-    ChallengeTool,
-    ChatTool,
-    CodeReviewTool,
-    ConsensusTool,
-    DebugIssueTool,
-    DocgenTool,
-    ListModelsTool,
-    PlannerTool,
-    PrecommitTool,
-    RefactorTool,
-    SecauditTool,
-    TestGenTool,
-    ThinkDeepTool,
-    TracerTool,
-    VersionTool,
-)
 from tools.models import ToolOutput  # noqa: E402
+from tools.shared.request_context import tool_request_scope  # noqa: E402
+from tools.shared.schema_cache import get_tool_schema_cache  # noqa: E402
+from tools.shared.tool_registry import ToolRegistry  # noqa: E402
+from utils import telemetry  # noqa: E402
+from utils.progress import progress_reporting  # noqa: E402
 
 # Configure logging for server operations
 # Can be controlled via LOG_LEVEL environment variable (DEBUG, INFO, WARNING, ERROR)
@@ -261,26 +249,38 @@ def filter_disabled_tools(all_tools: dict[str, Any]) -> dict[str, Any]:
 
 # Initialize the tool registry with all available AI-powered tools
 # Each tool provides specialized functionality for different development tasks
-# Tools are instantiated once and reused across requests (stateless design)
-TOOLS = {
-    "chat": ChatTool(),  # Interactive development chat and brainstorming
-    "thinkdeep": ThinkDeepTool(),  # Step-by-step deep thinking workflow with expert analysis
-    "planner": PlannerTool(),  # Interactive sequential planner using workflow architecture
-    "consensus": ConsensusTool(),  # Step-by-step consensus workflow with multi-model analysis
-    "codereview": CodeReviewTool(),  # Comprehensive step-by-step code review workflow with expert analysis
-    "precommit": PrecommitTool(),  # Step-by-step pre-commit validation workflow
-    "debug": DebugIssueTool(),  # Root cause analysis and debugging assistance
-    "secaudit": SecauditTool(),  # Comprehensive security audit with OWASP Top 10 and compliance coverage
-    "docgen": DocgenTool(),  # Step-by-step documentation generation with complexity analysis
-    "analyze": AnalyzeTool(),  # General-purpose file and code analysis
-    "refactor": RefactorTool(),  # Step-by-step refactoring analysis workflow with expert validation
-    "tracer": TracerTool(),  # Static call path prediction and control flow analysis
-    "testgen": TestGenTool(),  # Step-by-step test generation workflow with expert validation
-    "challenge": ChallengeTool(),  # Critical challenge prompt wrapper to avoid automatic agreement
-    "listmodels": ListModelsTool(),  # List all available AI models by provider
-    "version": VersionTool(),  # Display server version and system information
+# Tools are instantiated once and reused across requests (stateless design).
+# Each tool's module is imported on first use so the MCP handshake is not kept
+# waiting on every tool module (see tools/shared/tool_registry.py)
+TOOL_SPECS = {
+    "chat": ("tools.chat", "ChatTool"),  # Interactive development chat and brainstorming
+    "thinkdeep": ("tools.thinkdeep", "ThinkDeepTool"),  # Step-by-step deep thinking workflow with expert analysis
+    "planner": ("tools.planner", "PlannerTool"),  # Interactive sequential planner using workflow architecture
+    "consensus": ("tools.consensus", "ConsensusTool"),  # Step-by-step consensus workflow with multi-model analysis
+    "codereview": ("tools.codereview", "CodeReviewTool"),  # Step-by-step code review workflow with expert analysis
+    "precommit": ("tools.precommit", "PrecommitTool"),  # Step-by-step pre-commit validation workflow
+    "debug": ("tools.debug", "DebugIssueTool"),  # Root cause analysis and debugging assistance
+    "secaudit": ("tools.secaudit", "SecauditTool"),  # Security audit with OWASP Top 10 and compliance coverage
+    "docgen": ("tools.docgen", "DocgenTool"),  # Step-by-step documentation generation with complexity analysis
+    "analyze": ("tools.analyze", "AnalyzeTool"),  # General-purpose file and code analysis
+    "refactor": ("tools.refactor", "RefactorTool"),  # Step-by-step refactoring analysis workflow with expert validation
+    "tracer": ("tools.tracer", "TracerTool"),  # Static call path prediction and control flow analysis
+    "testgen": ("tools.testgen", "TestGenTool"),  # Step-by-step test generation workflow with expert validation
+    "challenge": ("tools.challenge", "ChallengeTool"),  # Critical challenge prompt wrapper to avoid automatic agreement
+    "listmodels": ("tools.listmodels", "ListModelsTool"),  # List all available AI models by provider
+    "version": ("tools.version", "VersionTool"),  # Display server version and system information
 }
-TOOLS = filter_disabled_tools(TOOLS)
+TOOLS = ToolRegistry(filter_disabled_tools(TOOL_SPECS))
+
+
+def preload_tools() -> None:
+    """Imports every tool and builds the list_tools schemas ahead of the first request."""
+    TOOLS.load_all()
+    try:
+        get_tool_schema_cache().get(TOOLS)
+    except Exception as e:
+        logger.debug(f"Could not prebuild tool schemas: {e}")
+
 
 # Rich prompt templates for all tools
 PROMPT_TEMPLATES = {
@@ -558,6 +558,12 @@ def configure_providers():
     else:
         logger.info("No model restrictions configured - all models allowed")
 
+    # Precompute model routing (alias -> model -> provider) now that providers and
+    # restrictions are final; tool calls then resolve models with a dict lookup
+    ModelProviderRegistry.invalidate_routing_table()
+    routing_table = ModelProviderRegistry.get_routing_table()
+    logger.debug(f"Model routing table built with {len(routing_table.routes)} model names and aliases")
+
     # Check if auto mode has any models available after restrictions
     from config import IS_AUTO_MODE
 
@@ -586,7 +592,7 @@ async def handle_list_tools() -> list[Tool]:
     - inputSchema: JSON Schema defining the expected parameters
 
     Returns:
-        List of Tool objects representing all available tools
+        List of Tool objects, one for each available tool
     """
     logger.debug("MCP client requested tool list")
 
@@ -610,29 +616,14 @@ async def handle_list_tools() -> list[Tool]:
                 pass
     except Exception as e:
         logger.debug(f"Could not log client info during list_tools: {e}")
-    tools = []
-
-    # Add all registered AI-powered tools from the TOOLS registry
-    for tool in TOOLS.values():
-        # Get optional annotations from the tool
-        annotations = tool.get_annotations()
-        tool_annotations = ToolAnnotations(**annotations) if annotations else None
-
-        tools.append(
-            Tool(
-                name=tool.name,
-                description=tool.description,
-                inputSchema=tool.get_input_schema(),
-                annotations=tool_annotations,
-            )
-        )
 
-    # Log cache efficiency info
-    if os.getenv("OPENROUTER_API_KEY") and os.getenv("OPENROUTER_API_KEY") != "your_openrouter_api_key_here":
-        logger.debug("OpenRouter registry cache used efficiently across all tool schemas")
+    # Schemas of all registered AI-powered tools from the TOOLS registry, built once
+    # per provider configuration (see tools/shared/schema_cache.py). A plain list keeps
+    # the handler compatible with every mcp>=1.0 release, which wraps it in ListToolsResult.
+    result = get_tool_schema_cache().get(TOOLS)
 
-    logger.debug(f"Returning {len(tools)} tools to MCP client")
-    return tools
+    logger.debug(f"Returning {len(result.tools)} tools to MCP client")
+    return list(result.tools)
 
 
 @server.call_tool()
@@ -692,6 +683,28 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         3. Claude continues with codereview tool + continuation_id → full context preserved
         4. Multiple tools can collaborate using same thread ID
     """
+    # Per-stage latency telemetry, off unless TELEMETRY=true (see utils/telemetry.py)
+    with telemetry.tool_call_trace(name) as trace:
+        result = await _execute_tool_call(name, arguments)
+        if trace is not None:
+            trace.status = _result_status(result)
+        return result
+
+
+def _result_status(result: list[TextContent]) -> str:
+    """Outcome of a tool call for telemetry: error if the tool reported one in its output, else success."""
+    text = getattr(result[0], "text", "") if result else ""
+    if text.startswith("Unknown tool:"):
+        return "error"
+    try:
+        status = json.loads(text).get("status")
+    except (ValueError, AttributeError):
+        return "success"
+    return "error" if status == "error" else "success"
+
+
+async def _execute_tool_call(name: str, arguments: dict[str, Any]) -> list[TextContent]:
+    """Routes one tool call to its tool; see handle_call_tool."""
     logger.info(f"MCP tool call: {name}")
     logger.debug(f"MCP tool arguments: {list(arguments.keys())}")
 
@@ -718,7 +731,8 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         except Exception:
             pass
 
-        arguments = await reconstruct_thread_context(arguments)
+        with telemetry.span("reconstruct_thread_context"):
+            arguments = await reconstruct_thread_context(arguments)
         logger.debug(f"[CONVERSATION_DEBUG] After thread reconstruction, arguments keys: {list(arguments.keys())}")
         if "_remaining_tokens" in arguments:
             logger.debug(f"[CONVERSATION_DEBUG] Remaining token budget: {arguments['_remaining_tokens']:,}")
@@ -753,7 +767,8 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         if not tool.requires_model():
             logger.debug(f"Tool {name} doesn't require model resolution - skipping model validation")
             # Execute tool directly without model context
-            return await tool.execute(arguments)
+            with tool_request_scope(), progress_reporting(*_get_progress_target()):
+                return await tool.execute(arguments)
 
         # Handle auto mode at MCP boundary - resolve to specific model
         if model_name.lower() == "auto":
@@ -806,8 +821,11 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
                 logger.warning(f"File size check failed for {name} with model {model_name}")
                 return [TextContent(type="text", text=ToolOutput(**file_size_check).model_dump_json())]
 
-        # Execute tool with pre-resolved model context
-        result = await tool.execute(arguments)
+        # Execute tool with pre-resolved model context, in its own request state so
+        # concurrent calls to the same tool instance do not share per-call attributes.
+        # Model calls are streamed with progress notifications if the client asked for progress.
+        with tool_request_scope(), progress_reporting(*_get_progress_target()):
+            result = await tool.execute(arguments)
         logger.info(f"Tool '{name}' execution completed")
 
         # Log completion to activity file
@@ -823,6 +841,16 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
 
+def _get_progress_target() -> tuple[Any, Any]:
+    """Session and progress token of the current MCP request, (None, None) if there is none."""
+    try:
+        ctx = server.request_context
+    except LookupError:
+        return None, None
+    progress_token = ctx.meta.progressToken if ctx.meta else None
+    return ctx.session, progress_token
+
+
 def parse_model_option(model_string: str) -> tuple[str, Optional[str]]:
     """
     Parse model:option format into model name and option.
@@ -989,13 +1017,13 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
         4. Debug tool can reference specific findings from analyze tool
         5. Natural cross-tool collaboration without context loss
     """
-    from utils.conversation_memory import add_turn, build_conversation_history, get_thread
+    from utils.conversation_memory import HISTORY_MAX_TURNS, add_turn, build_conversation_history, get_thread
 
     continuation_id = arguments["continuation_id"]
 
-    # Get thread context from storage
+    # Get thread context from storage (only the turns history assembly can use are parsed)
     logger.debug(f"[CONVERSATION_DEBUG] Looking up thread {continuation_id} in storage")
-    context = get_thread(continuation_id)
+    context = get_thread(continuation_id, max_turns=HISTORY_MAX_TURNS)
     if not context:
         logger.warning(f"Thread not found: {continuation_id}")
         logger.debug(f"[CONVERSATION_DEBUG] Thread {continuation_id} not found in storage or expired")
@@ -1056,7 +1084,11 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
     logger.debug(f"[CONVERSATION_DEBUG] Building conversation history for thread {continuation_id}")
     logger.debug(f"[CONVERSATION_DEBUG] Thread has {len(context.turns)} turns, tool: {context.tool_name}")
     logger.debug(f"[CONVERSATION_DEBUG] Using model: {model_context.model_name}")
-    conversation_history, conversation_tokens = build_conversation_history(context, model_context)
+    # Files the new request refers to again are served from the history, so keep them when space is short
+    request_files = [*(arguments.get("relevant_files") or []), *(arguments.get("files") or [])]
+    conversation_history, conversation_tokens = build_conversation_history(
+        context, model_context, relevant_files=request_files
+    )
     logger.debug(f"[CONVERSATION_DEBUG] Conversation history built: {conversation_tokens:,} tokens")
     logger.debug(
         f"[CONVERSATION_DEBUG] Conversation history length: {len(conversation_history)} chars (~{conversation_tokens:,} tokens)"
@@ -1069,7 +1101,7 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
     # All tools now use standardized 'prompt' field
     original_prompt = arguments.get("prompt", "")
     logger.debug("[CONVERSATION_DEBUG] Extracting user input from 'prompt' field")
-    original_prompt_tokens = estimate_tokens(original_prompt) if original_prompt else 0
+    original_prompt_tokens = model_context.estimate_tokens(original_prompt) if original_prompt else 0
     logger.debug(
         f"[CONVERSATION_DEBUG] User input length: {len(original_prompt)} chars (~{original_prompt_tokens:,} tokens)"
     )
@@ -1332,6 +1364,10 @@ async def main():
     logger.info(f"Available tools: {list(TOOLS.keys())}")
     logger.info("Server ready - waiting for tool requests...")
 
+    # Import the tool modules and build their schemas while the client completes
+    # the handshake, so the first list_tools request is served from the cache
+    threading.Thread(target=preload_tools, name="zen-tool-preload", daemon=True).start()
+
     # Run the server using stdio transport (standard input/output)
     # This allows the server to be launched by MCP clients as a subprocess
     async with stdio_server() as (read_stream, write_stream):
@@ -93,6 +93,16 @@ def pytest_collection_modifyitems(session, config, items):
     _set_dummy_keys_if_missing()
 
 
+@pytest.fixture(autouse=True)
+def reset_provider_limiters():
+    """Start every test with closed circuit breakers and empty rate limit buckets."""
+    from providers.rate_limiter import reset_limiters
+
+    reset_limiters()
+    yield
+    reset_limiters()
+
+
 @pytest.fixture(autouse=True)
 def mock_provider_availability(request, monkeypatch):
     """
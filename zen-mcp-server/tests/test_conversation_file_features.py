@@ -112,11 +112,11 @@ class TestFileInclusionPlanning:
         all_files = [small_file1, small_file2]
         max_tokens = 1000  # Generous budget
 
-        included, skipped, total_tokens = _plan_file_inclusion_by_size(all_files, max_tokens)
+        plan = _plan_file_inclusion_by_size(all_files, max_tokens)
 
-        assert included == all_files
-        assert skipped == []
-        assert total_tokens > 0  # Should have estimated some tokens
+        assert plan.included == all_files
+        assert plan.skipped == []
+        assert plan.estimated_tokens > 0  # Should have estimated some tokens
 
     def test_plan_file_inclusion_exceeds_budget(self, project_path):
         """Test file inclusion when files exceed token budget"""
@@ -132,29 +132,30 @@ class TestFileInclusionPlanning:
         all_files = [small_file, large_file]
         max_tokens = 50  # Very tight budget
 
-        included, skipped, total_tokens = _plan_file_inclusion_by_size(all_files, max_tokens)
+        plan = _plan_file_inclusion_by_size(all_files, max_tokens)
 
         # Should include some files, skip others when budget is tight
-        assert len(included) + len(skipped) == 2
-        assert total_tokens <= max_tokens
+        assert plan.included == [small_file]
+        assert plan.skipped == [large_file]
+        assert plan.estimated_tokens <= max_tokens
 
     def test_plan_file_inclusion_empty_list(self):
         """Test file inclusion planning with empty file list"""
-        included, skipped, total_tokens = _plan_file_inclusion_by_size([], 1000)
+        plan = _plan_file_inclusion_by_size([], 1000)
 
-        assert included == []
-        assert skipped == []
-        assert total_tokens == 0
+        assert plan.included == []
+        assert plan.skipped == []
+        assert plan.estimated_tokens == 0
 
     def test_plan_file_inclusion_nonexistent_files(self):
         """Test file inclusion planning with non-existent files"""
         nonexistent_files = ["/does/not/exist1.py", "/does/not/exist2.py"]
 
-        included, skipped, total_tokens = _plan_file_inclusion_by_size(nonexistent_files, 1000)
+        plan = _plan_file_inclusion_by_size(nonexistent_files, 1000)
 
-        assert included == []
-        assert skipped == nonexistent_files
-        assert total_tokens == 0
+        assert plan.included == []
+        assert plan.skipped == nonexistent_files
+        assert plan.estimated_tokens == 0
 
 
 class TestConversationHistoryBuilding:
@@ -16,11 +16,16 @@ from utils.conversation_memory import (
     MAX_CONVERSATION_TURNS,
     ConversationTurn,
     ThreadContext,
+    _LRUCache,
     add_turn,
     build_conversation_history,
+    clear_history_cache,
     create_thread,
+    get_history_cache_stats,
     get_thread,
+    get_thread_chain,
 )
+from utils.storage_backend import InMemoryStorage
 
 
 class TestConversationMemory:
@@ -756,5 +761,205 @@ class TestConversationFlow:
                 assert large_file in history
 
 
+class TestIncrementalHistoryAssembly:
+    """Test memoization of formatted turns and embedded files in build_conversation_history"""
+
+    def setup_method(self):
+        clear_history_cache()
+
+    def teardown_method(self):
+        clear_history_cache()
+
+    def _make_context(self, turns):
+        return ThreadContext(
+            thread_id="12345678-1234-1234-1234-123456789012",
+            created_at="2023-01-01T00:00:00Z",
+            last_updated_at="2023-01-01T00:00:00Z",
+            tool_name="chat",
+            turns=turns,
+            initial_context={},
+        )
+
+    def test_continuation_only_formats_new_turn(self):
+        """Previously formatted turns are reused when a turn is appended"""
+        turns = [
+            ConversationTurn(role="user", content=f"Question {i}", timestamp=f"2023-01-01T00:0{i}:00Z")
+            for i in range(3)
+        ]
+        first_history, _ = build_conversation_history(self._make_context(turns))
+        assert get_history_cache_stats()["turns"]["entries"] == 3
+
+        turns.append(ConversationTurn(role="assistant", content="Answer", timestamp="2023-01-01T00:05:00Z"))
+        with patch(
+            "utils.conversation_memory._get_tool_formatted_content", side_effect=lambda turn: [turn.content]
+        ) as mock_format:
+            second_history, _ = build_conversation_history(self._make_context(turns))
+
+        # Only the appended turn needed formatting
+        assert mock_format.call_count == 1
+        assert get_history_cache_stats()["turns"]["entries"] == 4
+        assert "Question 0" in second_history
+        assert "--- Turn 4 (Gemini) ---" in second_history
+
+    def test_continuation_does_not_retokenize_history(self):
+        """Token totals reuse the cached per-turn counts instead of tokenizing the whole history"""
+        turns = [
+            ConversationTurn(role="user", content=f"Question {i}", timestamp=f"2023-01-01T00:0{i}:00Z")
+            for i in range(3)
+        ]
+        build_conversation_history(self._make_context(turns))
+
+        from utils.model_context import ModelContext
+
+        with patch.object(ModelContext, "estimate_tokens", autospec=True, return_value=1) as mock_estimate:
+            history, tokens = build_conversation_history(self._make_context(turns))
+
+        assert "Question 0" in history
+        assert tokens > 0
+        for call in mock_estimate.call_args_list:
+            assert "Question 0" not in call.args[1]
+
+    def test_turn_cache_is_bounded_by_size(self):
+        """Entries are evicted oldest first once their total size exceeds the limit"""
+        cache = _LRUCache(max_entries=10, max_size=100)
+        cache.put("a", "A", size=60)
+        cache.put("b", "B", size=30)
+        cache.put("c", "C", size=30)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == "B"
+        assert cache.get("c") == "C"
+
+    def test_unchanged_files_are_not_reread(self, project_path):
+        """Embedded file section is reused until a referenced file changes on disk"""
+        source = project_path / "module.py"
+        source.write_text("VALUE = 1\n", encoding="utf-8")
+        turns = [
+            ConversationTurn(
+                role="user", content="Review", timestamp="2023-01-01T00:00:00Z", files=[str(source)], tool_name="chat"
+            )
+        ]
+
+        history, _ = build_conversation_history(self._make_context(turns))
+        assert "VALUE = 1" in history
+
+        with patch("utils.file_utils.read_file_content") as mock_read:
+            history, _ = build_conversation_history(self._make_context(turns))
+            mock_read.assert_not_called()
+        assert "VALUE = 1" in history
+
+        # Modifying the file invalidates the cached section
+        source.write_text("VALUE = 22\n", encoding="utf-8")
+        os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 1_000_000))
+        history, _ = build_conversation_history(self._make_context(turns))
+        assert "VALUE = 22" in history
+
+
+class TestThreadRecordFormat:
+    """Test the append-only turn log encoding of stored threads"""
+
+    @pytest.fixture
+    def storage(self):
+        storage = InMemoryStorage()
+        try:
+            with patch("utils.conversation_memory.get_storage", return_value=storage):
+                yield storage
+        finally:
+            storage.shutdown()
+
+    def test_turn_log_roundtrip(self, storage):
+        """Turns appended to the log are read back in order with full metadata"""
+        thread_id = create_thread("chat", {"prompt": "Hello"})
+        assert add_turn(thread_id, "user", "First", files=["/a.py"])
+        assert add_turn(thread_id, "assistant", "Second\nwith newline", tool_name="chat", model_name="flash")
+
+        record = storage.get(f"thread:{thread_id}")
+        lines = record.split("\n")
+        # Marker, header and one line per turn
+        assert len(lines) == 4
+
+        context = get_thread(thread_id)
+        assert [turn.content for turn in context.turns] == ["First", "Second\nwith newline"]
+        assert context.last_updated_at == context.turns[-1].timestamp
+        assert get_thread(thread_id, max_turns=0).last_updated_at == context.last_updated_at
+        assert context.turns[0].files == ["/a.py"]
+        assert context.turns[1].model_name == "flash"
+        assert context.initial_context == {"prompt": "Hello"}
+
+    def test_get_thread_newest_turns_only(self, storage):
+        """max_turns returns only the newest turns in chronological order"""
+        thread_id = create_thread("chat", {})
+        for i in range(5):
+            add_turn(thread_id, "user", f"Turn {i}")
+
+        context = get_thread(thread_id, max_turns=2)
+        assert [turn.content for turn in context.turns] == ["Turn 3", "Turn 4"]
+        assert get_thread(thread_id, max_turns=0).turns == []
+        assert len(get_thread(thread_id).turns) == 5
+
+    def test_append_does_not_reparse_existing_turns(self, storage):
+        """Appending a turn only parses the header, never the stored turns"""
+        thread_id = create_thread("chat", {})
+        add_turn(thread_id, "user", "Existing")
+
+        with (
+            patch.object(ConversationTurn, "model_validate_json") as mock_parse,
+            patch.object(storage, "setex") as mock_setex,
+        ):
+            assert add_turn(thread_id, "assistant", "New")
+            mock_parse.assert_not_called()
+            # The turn is appended, the stored record is not rewritten
+            mock_setex.assert_not_called()
+
+        assert len(get_thread(thread_id).turns) == 2
+
+    def test_turn_limit_counts_stored_turns(self, storage):
+        """The turn limit is enforced from the number of stored turn lines"""
+        thread_id = create_thread("chat", {})
+        with patch("utils.conversation_memory.MAX_CONVERSATION_TURNS", 2):
+            assert add_turn(thread_id, "user", "One")
+            assert add_turn(thread_id, "assistant", "Two")
+            assert not add_turn(thread_id, "user", "Three")
+
+        assert len(get_thread(thread_id).turns) == 2
+
+    def test_chain_loads_only_newest_turns(self, storage):
+        """get_thread_chain stops reading older threads once max_turns turns are loaded"""
+        parent_id = create_thread("chat", {})
+        for i in range(3):
+            add_turn(parent_id, "user", f"Parent {i}")
+        child_id = create_thread("chat", {}, parent_thread_id=parent_id)
+        for i in range(3):
+            add_turn(child_id, "user", f"Child {i}")
+
+        chain = get_thread_chain(child_id, max_turns=4)
+        assert [turn.content for thread in chain for turn in thread.turns] == [
+            "Parent 2",
+            "Child 0",
+            "Child 1",
+            "Child 2",
+        ]
+
+        chain = get_thread_chain(child_id, max_turns=3)
+        assert [thread.thread_id for thread in chain] == [child_id]
+
+    def test_legacy_record_is_upgraded(self, storage):
+        """Threads stored as full ThreadContext JSON remain readable and appendable"""
+        thread_id = "12345678-1234-1234-1234-123456789012"
+        legacy = ThreadContext(
+            thread_id=thread_id,
+            created_at="2023-01-01T00:00:00Z",
+            last_updated_at="2023-01-01T00:00:00Z",
+            tool_name="chat",
+            turns=[ConversationTurn(role="user", content="Old", timestamp="2023-01-01T00:00:00Z")],
+            initial_context={},
+        )
+        storage.setex(f"thread:{thread_id}", 60, legacy.model_dump_json())
+
+        assert get_thread(thread_id).turns[0].content == "Old"
+        assert add_turn(thread_id, "assistant", "New")
+        assert [turn.content for turn in get_thread(thread_id).turns] == ["Old", "New"]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -153,7 +153,8 @@ class TestDIALProvider:
         assert provider._supports_vision("unknown-model") is False
 
     @patch("openai.OpenAI")  # Mock the OpenAI class directly from openai module
-    def test_generate_content_with_alias(self, mock_openai_class):
+    @patch("providers.openai_compatible.OpenAI")  # Shared client, created before the deployment client
+    def test_generate_content_with_alias(self, mock_shared_client_class, mock_openai_class):
         """Test that generate_content properly resolves aliases and uses deployment routing."""
         # Create mock client
         mock_client = MagicMock()
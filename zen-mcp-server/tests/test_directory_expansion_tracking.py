@@ -138,8 +138,15 @@ def helper_function():
             redis_storage[key] = value
             return True
 
+        def mock_append(key, ttl, value):
+            if key not in redis_storage:
+                return False
+            redis_storage[key] += value
+            return True
+
         mock_client.get.side_effect = mock_get
         mock_client.setex.side_effect = mock_setex
+        mock_client.append.side_effect = mock_append
         mock_storage.return_value = mock_client
 
         # Setup mock provider
@@ -210,8 +217,15 @@ def helper_function():
             redis_storage[key] = value
             return True
 
+        def mock_append(key, ttl, value):
+            if key not in redis_storage:
+                return False
+            redis_storage[key] += value
+            return True
+
         mock_client.get.side_effect = mock_get
         mock_client.setex.side_effect = mock_setex
+        mock_client.append.side_effect = mock_append
         mock_storage.return_value = mock_client
 
         directory = temp_directory_with_files["directory"]
@@ -251,8 +265,15 @@ def helper_function():
             redis_storage[key] = value
             return True
 
+        def mock_append(key, ttl, value):
+            if key not in redis_storage:
+                return False
+            redis_storage[key] += value
+            return True
+
         mock_client.get.side_effect = mock_get
         mock_client.setex.side_effect = mock_setex
+        mock_client.append.side_effect = mock_append
         mock_storage.return_value = mock_client
 
         directory = temp_directory_with_files["directory"]
@@ -0,0 +1,128 @@
+"""
+Tests for token budget packing of embedded files (utils/file_packing.py) and
+its use by read_files() and conversation history.
+"""
+
+import random
+from unittest.mock import patch
+
+from utils import file_packing
+from utils.conversation_memory import _plan_file_inclusion_by_size
+from utils.file_packing import plan_file_packing
+from utils.file_utils import estimate_file_tokens, read_file_outline, read_files
+
+
+def _source(functions: int) -> str:
+    return "".join(f"def handler_{i}(payload):\n    return payload.get('key_{i}')\n\n" for i in range(functions))
+
+
+class TestPlanFilePacking:
+    def test_everything_fits(self):
+        plan = plan_file_packing([("/a.py", 100), ("/b.py", 200)], 1_000)
+
+        assert plan.files == ["/a.py", "/b.py"]
+        assert plan.degraded == {}
+        assert plan.estimated_tokens == 300
+
+    def test_large_early_file_does_not_evict_small_files(self):
+        files = [("/big.py", 1_000)] + [(f"/small_{i}.py", 100) for i in range(5)]
+
+        plan = plan_file_packing(files, 600, allow_degraded=False)
+
+        assert plan.included == [f"/small_{i}.py" for i in range(5)]
+        assert plan.skipped == ["/big.py"]
+
+    def test_recency_and_relevance(self):
+        files = [("/newer.py", 400), ("/older.py", 400)]
+
+        assert plan_file_packing(files, 500).included == ["/newer.py"]
+        assert plan_file_packing(files, 500, relevant_files=["/older.py"]).included == ["/older.py"]
+
+    def test_oversized_files_are_degraded(self):
+        files = [("/huge.py", 100_000), ("/a.py", 2_000), ("/b.py", 3_000)]
+
+        plan = plan_file_packing(files, 10_000)
+
+        assert plan.files == ["/huge.py", "/a.py", "/b.py"]
+        assert plan.included == ["/a.py", "/b.py"]
+        assert plan.degraded == {"/huge.py": file_packing.outline_allowance(10_000)}
+        assert plan.estimated_tokens <= 10_000
+
+    def test_plans_stay_within_budget(self):
+        rng = random.Random(7)
+        for solver_cells in (file_packing.MAX_PACKING_CELLS, 0):  # knapsack, then the greedy fallback
+            with patch.object(file_packing, "MAX_PACKING_CELLS", solver_cells):
+                for _ in range(50):
+                    files = [(f"/f{i}.py", rng.randint(0, 20_000)) for i in range(rng.randint(1, 40))]
+                    budget = rng.randint(500, 100_000)
+                    plan = plan_file_packing(files, budget)
+                    sizes = dict(files)
+                    used = sum(plan.degraded.get(path, sizes[path]) for path in plan.files)
+                    assert used == plan.estimated_tokens <= budget
+                    assert sorted(plan.files + plan.skipped) == sorted(path for path, _ in files)
+
+
+class TestDegradedFiles:
+    def test_outline_keeps_definitions(self, project_path):
+        source = project_path / "service.py"
+        source.write_text("import os\n\n" + _source(200), encoding="utf-8")
+
+        content, tokens = read_file_outline(str(source), 500)
+
+        assert f"--- BEGIN FILE OUTLINE: {source} ---" in content
+        assert "   1│ import os" in content
+        assert "   3│ def handler_0(payload):" in content
+        assert "return payload" not in content
+        assert 0 < tokens <= 500
+
+    def test_excerpt_of_text_file(self, project_path):
+        notes = project_path / "notes.txt"
+        notes.write_text("".join(f"line {i}\n" for i in range(5_000)), encoding="utf-8")
+
+        content, tokens = read_file_outline(str(notes), 300)
+
+        assert f"--- BEGIN FILE EXCERPT: {notes} ---" in content
+        assert "line 0" in content
+        assert "line 4999" not in content
+        assert tokens <= 300
+
+    def test_read_files_degrades_instead_of_dropping(self, project_path):
+        large = project_path / "large.py"
+        large.write_text(_source(3_000), encoding="utf-8")
+        small = [project_path / f"small_{i}.py" for i in range(3)]
+        for path in small:
+            path.write_text(_source(3), encoding="utf-8")
+
+        content = read_files([str(large)] + [str(path) for path in small], max_tokens=20_000, reserve_tokens=0)
+
+        assert f"--- BEGIN FILE OUTLINE: {large} ---" in content
+        for path in small:
+            assert f"--- BEGIN FILE: {path} ---" in content
+        assert "SKIPPED FILES" not in content
+
+    def test_conversation_plan_degrades_and_skips_missing(self, project_path):
+        large = project_path / "large.py"
+        large.write_text(_source(3_000), encoding="utf-8")
+        small = project_path / "small.py"
+        small.write_text(_source(3), encoding="utf-8")
+        missing = str(project_path / "missing.py")
+
+        plan = _plan_file_inclusion_by_size([str(large), missing, str(small)], 10_000)
+
+        assert plan.files == [str(large), str(small)]
+        assert list(plan.degraded) == [str(large)]
+        assert plan.skipped == [missing]
+
+    def test_conversation_plan_expands_relevant_directories(self, project_path):
+        newer = project_path / "newer.py"
+        newer.write_text(_source(200), encoding="utf-8")
+        package = project_path / "pkg"
+        package.mkdir()
+        older = package / "older.py"
+        older.write_text(_source(200), encoding="utf-8")
+        files = [str(newer), str(older)]
+        budget = estimate_file_tokens(str(newer)) + 100
+
+        assert _plan_file_inclusion_by_size(files, budget).included == [str(newer)]
+        plan = _plan_file_inclusion_by_size(files, budget, relevant_files=[str(package)])
+        assert plan.included == [str(older)]
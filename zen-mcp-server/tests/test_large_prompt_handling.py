@@ -18,6 +18,7 @@ from mcp.types import TextContent
 from config import MCP_PROMPT_SIZE_LIMIT
 from tools.chat import ChatTool
 from tools.codereview import CodeReviewTool
+from utils.token_utils import estimate_tokens
 
 # from tools.debug import DebugIssueTool  # Commented out - debug tool refactored
 
@@ -361,6 +362,7 @@ class TestLargePromptHandling:
                 file_tokens=335_544,
                 history_tokens=335_544,
             )
+            mock_model_context.estimate_tokens.side_effect = estimate_tokens
             mock_model_context_class.return_value = mock_model_context
 
             # Should continue with empty prompt when file can't be read
@@ -408,6 +410,7 @@ class TestLargePromptHandling:
                 file_tokens=335_544,
                 history_tokens=335_544,
             )
+            mock_model_context.estimate_tokens.side_effect = estimate_tokens
             mock_model_context_class.return_value = mock_model_context
 
             # Mock the prepare_prompt to simulate huge internal context
@@ -526,6 +529,7 @@ class TestLargePromptHandling:
                 file_tokens=335_544,
                 history_tokens=335_544,
             )
+            mock_model_context.estimate_tokens.side_effect = estimate_tokens
             mock_model_context_class.return_value = mock_model_context
 
             # Simulate continuation by having the request contain embedded conversation history
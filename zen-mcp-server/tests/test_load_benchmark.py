@@ -0,0 +1,60 @@
+"""
+Tests for the offline load benchmark's stand-in model server (benchmarks/stub_model_server.py),
+driven through CustomProvider exactly as the benchmark drives it.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from providers.custom import CustomProvider
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from stub_model_server import StubModelServer, StubSettings  # noqa: E402
+
+
+def _generate(stub, stream=False):
+    provider = CustomProvider(api_key="", base_url=stub.base_url)
+    if stream:
+        chunks = []
+        response = provider.generate_content_stream(
+            prompt="Review this", model_name="local-llama", on_chunk=chunks.append
+        )
+        return response, chunks
+    return provider.generate_content(prompt="Review this", model_name="local-llama"), None
+
+
+class TestStubModelServer:
+    def test_completion(self):
+        with StubModelServer(StubSettings(latency=0, output_tokens=5)) as stub:
+            response, _ = _generate(stub)
+
+        assert response.content == "the function returns a value"
+        assert response.usage["output_tokens"] == 5
+        assert stub.requests == 1
+        assert len(stub.service_times) == 1
+
+    def test_streamed_completion(self):
+        with StubModelServer(StubSettings(latency=0, output_tokens=5)) as stub:
+            response, chunks = _generate(stub, stream=True)
+
+        assert response.content == "the function returns a value"
+        assert len(chunks) == 5
+        assert response.metadata["streamed"] is True
+
+    def test_injected_errors_are_retried(self):
+        # With seed 1 the first request fails and the second succeeds
+        with StubModelServer(StubSettings(latency=0, output_tokens=3, error_rate=0.5, seed=1)) as stub:
+            response, _ = _generate(stub)
+
+        assert response.content == "the function returns"
+        assert (stub.requests, stub.errors) == (2, 1)
+
+    def test_injected_client_errors_fail(self):
+        with StubModelServer(StubSettings(latency=0, error_rate=1.0, error_status=400)) as stub:
+            with pytest.raises(RuntimeError, match="Injected failure"):
+                _generate(stub)
+
+        assert stub.requests == 1
@@ -80,6 +80,42 @@ class TestModelProviderRegistry:
         assert ProviderType.GOOGLE in providers
         assert ProviderType.OPENAI in providers
 
+    @patch.dict(os.environ, {"GEMINI_API_KEY": "test-key", "OPENAI_API_KEY": "test-key"})
+    @pytest.mark.no_mock_provider
+    def test_routing_table_resolves_aliases_without_asking_providers(self):
+        """Model lookups use the precomputed routing table"""
+        ModelProviderRegistry.register_provider(ProviderType.GOOGLE, GeminiModelProvider)
+        ModelProviderRegistry.register_provider(ProviderType.OPENAI, OpenAIModelProvider)
+
+        table = ModelProviderRegistry.get_routing_table()
+        assert table.routes["flash"] == (ProviderType.GOOGLE,)
+        assert table.routes["o4-mini"] == (ProviderType.OPENAI,)
+        with pytest.raises(TypeError):
+            table.routes["flash"] = (ProviderType.OPENAI,)
+
+        with patch.object(GeminiModelProvider, "validate_model_name") as validate:
+            provider = ModelProviderRegistry.get_provider_for_model("Flash")
+        assert isinstance(provider, GeminiModelProvider)
+        validate.assert_not_called()
+        assert ModelProviderRegistry.get_routing_table() is table
+
+    @pytest.mark.no_mock_provider
+    def test_routing_table_rebuilt_when_restrictions_change(self):
+        """A new restriction service (configuration reload) invalidates the table"""
+        import utils.model_restrictions
+
+        ModelProviderRegistry.register_provider(ProviderType.OPENAI, OpenAIModelProvider)
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+            utils.model_restrictions._restriction_service = None
+            assert ModelProviderRegistry.get_provider_for_model("o3") is not None
+
+            with patch.dict(os.environ, {"OPENAI_ALLOWED_MODELS": "o4-mini"}):
+                utils.model_restrictions._restriction_service = None
+                assert ModelProviderRegistry.get_provider_for_model("o3") is None
+                assert "o3" not in ModelProviderRegistry.get_available_models()
+
+        utils.model_restrictions._restriction_service = None
+
 
 class TestGeminiProvider:
     """Test Gemini model provider"""
@@ -0,0 +1,200 @@
+"""
+Tests for the shared provider rate limiter and circuit breaker (providers/rate_limiter.py).
+"""
+
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from providers.base import ProviderType
+from providers.openai_provider import OpenAIModelProvider
+from providers.rate_limiter import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitOpenError,
+    ProviderLimiter,
+    TokenBucket,
+    get_limiter,
+    get_limiter_states,
+    retry_after_seconds,
+)
+from providers.registry import ModelProviderRegistry
+from utils.progress import generate_with_progress
+
+
+class TestTokenBucket:
+    def test_unlimited_bucket_never_waits(self):
+        bucket = TokenBucket(0)
+        assert bucket.reserve(10_000, now=0.0) == 0.0
+        assert bucket.available is None
+
+    def test_waits_for_refill_once_empty(self):
+        bucket = TokenBucket(60)  # one per second
+        bucket.updated = 0.0
+        for _ in range(60):
+            assert bucket.reserve(1, now=0.0) == 0.0
+
+        assert bucket.reserve(1, now=0.0) == pytest.approx(1.0)
+        # The next caller queues behind the previous one
+        assert bucket.reserve(1, now=0.0) == pytest.approx(2.0)
+
+    def test_adjust_returns_unused_reservation(self):
+        bucket = TokenBucket(1000)
+        bucket.updated = 0.0
+        bucket.reserve(800, now=0.0)
+        bucket.adjust(800 - 100)
+        assert bucket.tokens == pytest.approx(900)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_retryable_failures(self):
+        limiter = ProviderLimiter("openai/gpt-4.1", failure_threshold=3, reset_seconds=30)
+
+        limiter.record_failure(retryable=False)
+        for _ in range(2):
+            limiter.record_failure()
+        assert limiter.state == CLOSED
+
+        limiter.record_failure()
+        assert limiter.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            limiter.acquire()
+
+    def test_success_resets_failure_count(self):
+        limiter = ProviderLimiter("openai/gpt-4.1", failure_threshold=2)
+        limiter.record_failure()
+        limiter.record_success()
+        limiter.record_failure()
+        assert limiter.state == CLOSED
+
+    def test_half_open_lets_one_probe_through(self):
+        limiter = ProviderLimiter("openai/gpt-4.1", failure_threshold=1, reset_seconds=30)
+        limiter.record_failure()
+
+        with patch("providers.rate_limiter.time.monotonic", return_value=limiter._opened_at + 31):
+            assert limiter.state == HALF_OPEN
+            limiter.acquire()  # the probe
+            with pytest.raises(CircuitOpenError):
+                limiter.acquire()
+            limiter.record_success()
+            assert limiter.state == CLOSED
+
+    def test_failed_probe_reopens(self):
+        limiter = ProviderLimiter("openai/gpt-4.1", failure_threshold=1, reset_seconds=30)
+        limiter.record_failure()
+
+        with patch("providers.rate_limiter.time.monotonic", return_value=limiter._opened_at + 31):
+            limiter.acquire()
+            limiter.record_failure()
+            assert limiter.state == OPEN
+
+
+class TestBackoff:
+    def test_retry_after_header(self):
+        error = Exception("429")
+        error.response = SimpleNamespace(headers={"retry-after": "7"})
+        assert retry_after_seconds(error) == 7.0
+
+        error.response = SimpleNamespace(headers={"retry-after-ms": "1500"})
+        assert retry_after_seconds(error) == 1.5
+
+    def test_gemini_retry_delay(self):
+        error = Exception("429 RESOURCE_EXHAUSTED {'@type': 'RetryInfo', 'retryDelay': '12s'}")
+        assert retry_after_seconds(error) == 12.0
+
+    def test_server_hint_pauses_other_calls(self):
+        limiter = ProviderLimiter("openai/gpt-4.1")
+        error = Exception("429")
+        error.response = SimpleNamespace(headers={"retry-after": "5"})
+
+        assert limiter.backoff_delay(0, error) == 5.0
+        assert limiter.snapshot()["paused_for"] > 4
+
+    def test_jittered_exponential_delay(self):
+        limiter = ProviderLimiter("openai/gpt-4.1")
+        with patch("providers.rate_limiter.random.uniform", side_effect=lambda low, high: high):
+            assert limiter.backoff_delay(0) == 1.0
+            assert limiter.backoff_delay(2) == 4.0
+
+
+class TestProviderIntegration:
+    @patch("providers.openai_compatible.time.sleep")
+    @patch("providers.openai_compatible.OpenAI")
+    def test_retries_use_shared_limiter(self, mock_openai_class, mock_sleep):
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = Exception("500 Internal server error")
+
+        provider = OpenAIModelProvider("test-key")
+        with pytest.raises(RuntimeError, match="after 4 attempts"):
+            provider.generate_content(prompt="Hello", model_name="gpt-4.1")
+
+        assert mock_sleep.call_count == 3
+        state = get_limiter_states()["openai/gpt-4.1"]
+        assert state["failures"] == 4
+        assert state["retries"] == 3
+        assert state["consecutive_failures"] == 4
+
+    @patch("providers.openai_compatible.OpenAI")
+    def test_backoff_does_not_block_the_event_loop(self, mock_openai_class):
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = Exception("500 Internal server error")
+        provider = OpenAIModelProvider("test-key")
+        loop_ran = threading.Event()
+        waits = []
+
+        def backoff_sleep(seconds):
+            # Set by a coroutine, so the wait times out if the backoff sleeps on the event loop
+            waits.append(loop_ran.wait(timeout=2))
+            loop_ran.clear()
+
+        async def keep_loop_busy(call):
+            while not call.done():
+                loop_ran.set()
+                await asyncio.sleep(0.01)
+
+        async def run():
+            call = asyncio.ensure_future(generate_with_progress(provider, prompt="Hello", model_name="gpt-4.1"))
+            await asyncio.gather(call, keep_loop_busy(call), return_exceptions=True)
+            return call.exception()
+
+        with patch("providers.openai_compatible.time.sleep", side_effect=backoff_sleep):
+            error = asyncio.run(run())
+
+        assert isinstance(error, RuntimeError)
+        assert waits == [True, True, True]
+
+    @patch.dict(os.environ, {"RATE_LIMIT_RPM": "openai=100,openai/o3=20", "RATE_LIMIT_TPM": "openai=50000"})
+    def test_limits_from_environment(self):
+        assert get_limiter("openai", "o3").snapshot()["requests_per_minute"] == 20
+        state = get_limiter("openai", "gpt-4.1").snapshot()
+        assert state["requests_per_minute"] == 100
+        assert state["tokens_per_minute"] == 50000
+
+    def test_registry_fails_over_when_circuit_is_open(self):
+        primary = MagicMock()
+        primary.get_provider_type.return_value = ProviderType.OPENAI
+        primary._resolve_model_name.return_value = "gpt-4.1"
+        secondary = MagicMock()
+        secondary.get_provider_type.return_value = ProviderType.OPENROUTER
+        secondary._resolve_model_name.return_value = "openai/gpt-4.1"
+
+        registry = ModelProviderRegistry()
+        providers = {ProviderType.OPENAI: primary, ProviderType.OPENROUTER: secondary}
+        with (
+            patch.dict(registry._providers, {ProviderType.OPENAI: object, ProviderType.OPENROUTER: object}),
+            patch.object(ModelProviderRegistry, "get_provider", side_effect=lambda ptype: providers.get(ptype)),
+        ):
+            assert ModelProviderRegistry.get_provider_for_model("gpt-4.1") is primary
+
+            limiter = get_limiter("openai", "gpt-4.1")
+            for _ in range(limiter.failure_threshold):
+                limiter.record_failure()
+
+            assert ModelProviderRegistry.get_provider_for_model("gpt-4.1") is secondary
@@ -0,0 +1,146 @@
+"""
+Tests for per-request tool state (tools/shared/request_context.py).
+
+Tool instances are shared singletons, so per-call attributes must be isolated
+between concurrent calls while keeping plain attribute behaviour outside a
+request scope.
+"""
+
+import asyncio
+import json
+from unittest.mock import Mock, patch
+
+from tools.codereview import CodeReviewTool
+from tools.consensus import ConsensusTool
+from tools.shared.request_context import RequestLocal, tool_request_scope
+
+
+class _Tool:
+    history = RequestLocal(list)
+    config = RequestLocal()
+
+
+class TestRequestLocal:
+    def test_outside_scope_behaves_like_instance_attribute(self):
+        tool = _Tool()
+        assert tool.config is None
+
+        tool.history.append("step 1")
+        tool.config = {"mode": "a"}
+
+        assert tool.history == ["step 1"]
+        assert tool.__dict__["config"] == {"mode": "a"}
+        assert _Tool().history == []
+
+    def test_scope_starts_empty_and_does_not_leak(self):
+        tool = _Tool()
+        tool.config = "instance value"
+
+        with tool_request_scope():
+            assert tool.config is None
+            tool.config = "request value"
+            tool.history.append("step")
+            assert tool.config == "request value"
+
+        assert tool.config == "instance value"
+        assert tool.history == []
+
+    def test_delete_resets_to_default(self):
+        tool = _Tool()
+        with tool_request_scope():
+            tool.config = "value"
+            del tool.config
+            assert tool.config is None
+
+    def test_concurrent_calls_on_same_instance_are_isolated(self):
+        tool = _Tool()
+
+        async def call(name: str, steps: int):
+            with tool_request_scope():
+                tool.config = name
+                for step in range(steps):
+                    tool.history.append(f"{name}-{step}")
+                    await asyncio.sleep(0)
+                return tool.config, list(tool.history)
+
+        async def run_all():
+            return await asyncio.gather(call("a", 3), call("b", 5))
+
+        (config_a, history_a), (config_b, history_b) = asyncio.run(run_all())
+
+        assert config_a == "a"
+        assert history_a == ["a-0", "a-1", "a-2"]
+        assert config_b == "b"
+        assert history_b == [f"b-{step}" for step in range(5)]
+
+    def test_tool_attributes_are_request_local(self):
+        tool = CodeReviewTool()
+
+        with tool_request_scope():
+            tool.work_history.append({"step_number": 1})
+            tool.review_config = {"review_type": "security"}
+            tool._current_model_name = "flash"
+
+        with tool_request_scope():
+            assert tool.work_history == []
+            assert tool.review_config == {}
+            assert tool._current_model_name is None
+            assert tool._current_arguments == {}
+
+
+class TestWorkflowStateFields:
+    def test_state_fields_are_saved_with_the_turn(self):
+        tool = CodeReviewTool()
+
+        class Request:
+            relevant_files = []
+            images = []
+
+        with tool_request_scope():
+            tool.work_history.append({"step_number": 1})
+            tool.initial_request = "Review auth module"
+            tool.review_config = {"review_type": "security"}
+
+            with patch("tools.workflow.workflow_mixin.add_turn") as add_turn:
+                tool.store_conversation_turn("thread-1", {"status": "ok"}, Request())
+
+        state = add_turn.call_args.kwargs["model_metadata"]
+        assert state["work_history"] == [{"step_number": 1}]
+        assert state["initial_request"] == "Review auth module"
+        assert state["review_config"] == {"review_type": "security"}
+
+    def test_consensus_steps_are_linked_through_the_thread(self):
+        tool = ConsensusTool()
+        models = [{"model": "flash", "stance": "for"}, {"model": "o3", "stance": "against"}]
+
+        async def consult(model_config, request):
+            return {"model": model_config["model"], "stance": model_config["stance"], "status": "success"}
+
+        async def run_step(step_number, continuation_id=None):
+            arguments = {
+                "step": "Should we adopt the proposal?" if step_number == 1 else "Summary so far",
+                "step_number": step_number,
+                "total_steps": 2,
+                "next_step_required": step_number < 2,
+                "findings": "findings",
+                "models": models if step_number == 1 else None,
+                "continuation_id": continuation_id,
+            }
+            with tool_request_scope():
+                result = await tool.execute_workflow(arguments)
+            return json.loads(result[0].text)
+
+        provider = Mock()
+        provider.get_provider_type.return_value.value = "google"
+        with (
+            patch.object(tool, "_consult_model", side_effect=consult),
+            patch.object(tool, "get_model_provider", return_value=provider),
+            patch.object(tool, "get_request_model_name", return_value="flash"),
+        ):
+            first = asyncio.run(run_step(1))
+            second = asyncio.run(run_step(2, first["continuation_id"]))
+
+        assert second["status"] == "consensus_workflow_complete"
+        assert second["complete_consensus"]["initial_prompt"] == "Should we adopt the proposal?"
+        assert second["complete_consensus"]["models_consulted"] == ["flash:for", "o3:against"]
+        assert tool.__dict__.get("models_to_consult") is None
@@ -0,0 +1,137 @@
+"""
+Tests for the opt-in model response cache (providers/response_cache.py).
+"""
+
+import asyncio
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from providers.base import ModelResponse, ProviderType
+from providers.response_cache import ResponseCache, get_response_cache, make_cache_key, reset_response_cache
+from utils.progress import generate_with_progress
+
+
+def _provider(supports_temperature=True):
+    provider = MagicMock()
+    provider.get_provider_type.return_value = ProviderType.OPENAI
+    provider._resolve_model_name.side_effect = lambda name: {"mini": "o4-mini"}.get(name, name)
+    provider.get_capabilities.return_value = MagicMock(supports_temperature=supports_temperature)
+    provider.generate_content.return_value = ModelResponse(
+        content="The answer",
+        usage={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12},
+        model_name="gpt-4.1",
+        friendly_name="OpenAI",
+        provider=ProviderType.OPENAI,
+        metadata={"finish_reason": "stop"},
+    )
+    return provider
+
+
+@pytest.fixture
+def enabled_cache(tmp_path):
+    reset_response_cache()
+    env = {"RESPONSE_CACHE": "true", "RESPONSE_CACHE_PATH": str(tmp_path / "responses.db")}
+    with patch.dict(os.environ, env):
+        yield get_response_cache()
+    reset_response_cache()
+
+
+class TestCacheKey:
+    def test_key_covers_request_and_images(self, tmp_path):
+        provider = _provider()
+        image = tmp_path / "diagram.png"
+        image.write_bytes(b"v1")
+
+        base = make_cache_key(provider, model_name="gpt-4.1", prompt="Explain", temperature=0.0)
+        assert base == make_cache_key(provider, model_name="gpt-4.1", prompt="Explain", temperature=0.0)
+        assert base != make_cache_key(provider, model_name="gpt-4.1", prompt="Explain!", temperature=0.0)
+        assert base != make_cache_key(
+            provider, model_name="gpt-4.1", prompt="Explain", temperature=0.0, thinking_mode="high"
+        )
+
+        with_image = make_cache_key(provider, model_name="gpt-4.1", prompt="Explain", images=[str(image)])
+        image.write_bytes(b"v2")
+        assert with_image != make_cache_key(provider, model_name="gpt-4.1", prompt="Explain", images=[str(image)])
+
+    def test_aliases_share_a_key(self):
+        provider = _provider()
+        assert make_cache_key(provider, model_name="mini", prompt="p") == make_cache_key(
+            provider, model_name="o4-mini", prompt="p"
+        )
+
+
+class TestResponseCache:
+    def test_only_deterministic_settings_are_cacheable(self):
+        cache = ResponseCache(path=None)
+        assert cache.is_cacheable(_provider(), "gpt-4.1", 0.0)
+        assert not cache.is_cacheable(_provider(), "gpt-4.1", 0.5)
+        assert not cache.is_cacheable(_provider(supports_temperature=False), "o3", 0.0)
+
+    def test_incomplete_responses_are_not_stored(self):
+        cache = ResponseCache(path=None)
+        truncated = ModelResponse(content="Half an", metadata={"finish_reason": "length"})
+        assert cache.put("key", truncated) is False
+        assert cache.put("key", ModelResponse(content="")) is False
+        assert cache.get("key") is None
+
+    def test_size_cap_and_ttl(self):
+        cache = ResponseCache(max_entries=2, ttl_seconds=60, path=None)
+        for key in ("a", "b", "c"):
+            cache.put(key, ModelResponse(content=key))
+        assert cache.get("a") is None
+        assert cache.get("c").content == "c"
+
+        with patch("providers.response_cache.time.time", return_value=10**12):
+            assert cache.get("c") is None
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "responses.db")
+        first = ResponseCache(path=path)
+        first.put("key", _provider().generate_content.return_value)
+        first.close()
+
+        cached = ResponseCache(path=path).get("key")
+        assert cached.content == "The answer"
+        assert cached.provider == ProviderType.OPENAI
+        assert cached.metadata["cache_hit"] is True
+
+
+class TestGenerateWithCache:
+    def test_disabled_by_default(self):
+        reset_response_cache()
+        assert get_response_cache() is None
+
+    def test_cache_path_expands_home(self, tmp_path):
+        reset_response_cache()
+        env = {"RESPONSE_CACHE": "true", "RESPONSE_CACHE_PATH": "~/.zen-mcp-server/responses.db", "HOME": str(tmp_path)}
+        try:
+            with patch.dict(os.environ, env):
+                assert get_response_cache() is not None
+            assert (tmp_path / ".zen-mcp-server" / "responses.db").exists()
+        finally:
+            reset_response_cache()
+
+    def test_repeated_deterministic_call_hits_cache(self, enabled_cache):
+        provider = _provider()
+        request = {"prompt": "Review this", "model_name": "gpt-4.1", "temperature": 0.0}
+
+        first = asyncio.run(generate_with_progress(provider, **request))
+        second = asyncio.run(generate_with_progress(provider, **request))
+
+        provider.generate_content.assert_called_once()
+        assert first.content == second.content == "The answer"
+        assert second.metadata["cache_hit"] is True
+        stats = enabled_cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+
+    def test_non_deterministic_call_bypasses_cache(self, enabled_cache):
+        provider = _provider()
+        request = {"prompt": "Brainstorm", "model_name": "gpt-4.1", "temperature": 0.7}
+
+        asyncio.run(generate_with_progress(provider, **request))
+        asyncio.run(generate_with_progress(provider, **request))
+
+        assert provider.generate_content.call_count == 2
+        assert enabled_cache.get_stats()["skipped"] == 2
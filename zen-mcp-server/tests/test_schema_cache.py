@@ -0,0 +1,70 @@
+"""
+Tests for the versioned list_tools schema cache (tools/shared/schema_cache.py).
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+from providers.registry import ModelProviderRegistry
+from tools.shared.schema_cache import ToolSchemaCache, get_tool_schema_cache
+from tools.shared.tool_registry import ToolRegistry
+
+
+def _tools():
+    return ToolRegistry({"chat": ("tools.chat", "ChatTool"), "version": ("tools.version", "VersionTool")})
+
+
+class TestToolSchemaCache:
+    def test_schemas_are_built_once(self):
+        cache = ToolSchemaCache()
+        tools = _tools()
+
+        with patch.object(tools["chat"], "get_input_schema", wraps=tools["chat"].get_input_schema) as schema:
+            first = cache.get(tools)
+            second = cache.get(tools)
+
+        assert first is second
+        assert schema.call_count == 1
+        assert [tool.name for tool in first.tools] == ["chat", "version"]
+        stats = cache.get_stats()
+        assert (stats["builds"], stats["hits"], stats["tools"]) == (1, 1, 2)
+
+    def test_serialized_once_per_version(self):
+        cache = ToolSchemaCache()
+        tools = _tools()
+
+        payload = cache.get_serialized(tools)
+        assert cache.get_serialized(tools) is payload
+        assert [tool["name"] for tool in json.loads(payload)["tools"]] == ["chat", "version"]
+        assert cache.get_stats()["size_bytes"] == len(payload)
+
+    def test_configuration_changes_rebuild(self):
+        cache = ToolSchemaCache()
+        tools = _tools()
+        first = cache.get(tools)
+
+        with patch("config.DEFAULT_MODEL", "some-other-model"):
+            assert cache.get(tools) is not first
+
+        rebuilt = cache.get(tools)
+        ModelProviderRegistry.invalidate_routing_table()
+        assert cache.get(tools) is not rebuilt
+
+        builds = cache.get_stats()["builds"]
+        cache.invalidate()
+        cache.get(tools)
+        assert cache.get_stats()["builds"] == builds + 1
+
+
+def test_list_tools_is_served_from_cache():
+    import server
+
+    get_tool_schema_cache().invalidate()
+    first = asyncio.run(server.handle_list_tools())
+    second = asyncio.run(server.handle_list_tools())
+
+    # The cached Tool objects are reused, not rebuilt
+    assert len(first) == len(second)
+    assert all(a is b for a, b in zip(first, second))
+    assert {tool.name for tool in first} == set(server.TOOLS)
@@ -0,0 +1,48 @@
+"""
+Tests for lazy loading at server start-up (tools/shared/tool_registry.py and the
+lazy provider SDK imports).
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from tools.shared.tool_registry import ToolRegistry
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestToolRegistry:
+    def test_tools_are_instantiated_on_first_lookup(self):
+        registry = ToolRegistry({"chat": ("tools.chat", "ChatTool"), "version": ("tools.version", "VersionTool")})
+
+        assert list(registry) == ["chat", "version"]
+        assert "chat" in registry and "unknown" not in registry
+        assert not registry.is_loaded("chat")
+
+        tool = registry["chat"]
+        assert tool.get_name() == "chat"
+        assert registry["chat"] is tool
+        assert registry.is_loaded("chat") and not registry.is_loaded("version")
+        assert registry.get("unknown") is None
+
+    def test_load_all_skips_broken_tools(self):
+        registry = ToolRegistry(
+            {"broken": ("tools.does_not_exist", "Tool"), "version": ("tools.version", "VersionTool")}
+        )
+        registry.load_all()
+        assert registry.is_loaded("version")
+        assert not registry.is_loaded("broken")
+
+
+def test_importing_server_defers_sdks_and_tool_modules():
+    code = (
+        "import json, sys; import server; "
+        "print(json.dumps(sorted(m for m in sys.modules "
+        "if m in ('openai', 'google.genai', 'tools.chat', 'tools.codereview', 'tools.version'))))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True, timeout=60
+    )
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,229 @@
+"""Tests for the conversation storage backends."""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+from utils.storage_backend import InMemoryStorage, SQLiteStorage, StorageBackend, create_storage_backend
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "conversations.db")
+
+
+@pytest.fixture
+def memory_storage():
+    """InMemoryStorage without its background cleanup thread, shut down after the test."""
+
+    created = []
+
+    def factory(max_bytes=None):
+        with patch("utils.storage_backend.threading.Thread"):
+            storage = InMemoryStorage(max_bytes=max_bytes)
+        created.append(storage)
+        return storage
+
+    yield factory
+    for storage in created:
+        storage.shutdown()
+
+
+class TestInMemoryStorage:
+    """Test the byte-budgeted in-memory backend."""
+
+    def test_set_get_and_size_accounting(self, memory_storage):
+        storage = memory_storage()
+        storage.setex("thread:a", 60, "x" * 100)
+        storage.setex("thread:b", 60, "y" * 100)
+        stats = storage.get_stats()
+        assert stats["entries"] == 2
+        assert stats["bytes"] > 200
+
+        # Overwriting replaces the accounted size instead of adding to it
+        storage.setex("thread:a", 60, "z")
+        assert storage.get("thread:a") == "z"
+        assert storage.get_stats()["bytes"] < stats["bytes"]
+
+    def test_lru_eviction_over_budget(self, memory_storage):
+        entry_size = sys.getsizeof("thread:0") + sys.getsizeof("x" * 1000)
+        storage = memory_storage(max_bytes=entry_size * 3)
+
+        for i in range(3):
+            storage.setex(f"thread:{i}", 60, "x" * 1000)
+        # Touch thread:0 so thread:1 becomes least recently used
+        assert storage.get("thread:0") is not None
+        storage.setex("thread:3", 60, "x" * 1000)
+
+        assert storage.get("thread:1") is None
+        assert storage.get("thread:0") is not None
+        assert storage.get("thread:3") is not None
+        stats = storage.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["entries"] == 3
+        assert stats["bytes"] <= stats["max_bytes"]
+
+    def test_oversized_entry_is_kept(self, memory_storage):
+        storage = memory_storage(max_bytes=100)
+        storage.setex("thread:small", 60, "x")
+        storage.setex("thread:big", 60, "x" * 1000)
+        assert storage.get("thread:big") is not None
+        assert storage.get("thread:small") is None
+
+    def test_heap_expiry_skips_rewritten_keys(self, memory_storage):
+        storage = memory_storage()
+        storage.setex("thread:short", 1, "a")
+        storage.setex("thread:renewed", 1, "b")
+        storage.setex("thread:renewed", 3600, "c")
+
+        with patch("utils.storage_backend.time.time", return_value=time.time() + 10):
+            storage._cleanup_expired()
+
+        assert storage.get("thread:short") is None
+        assert storage.get("thread:renewed") == "c"
+        stats = storage.get_stats()
+        assert stats["expirations"] == 1
+        assert stats["entries"] == 1
+
+    def test_expiry_heap_is_compacted(self, memory_storage):
+        storage = memory_storage()
+        for _ in range(500):
+            storage.setex("thread:hot", 60, "v")
+        assert len(storage._expiry_heap) <= 2 * len(storage._store) + 64
+
+    def test_append_extends_value_and_accounting(self, memory_storage):
+        storage = memory_storage()
+        storage.setex("thread:a", 60, "head")
+        size = storage.get_stats()["bytes"]
+
+        assert storage.append("thread:a", 60, "\nturn" * 100)
+        assert storage.get("thread:a") == "head" + "\nturn" * 100
+        assert storage.get_stats()["bytes"] > size
+        assert not storage.append("thread:missing", 60, "turn")
+        assert storage.get("thread:missing") is None
+
+    def test_append_refreshes_ttl_and_skips_expired(self, memory_storage):
+        storage = memory_storage()
+        storage.setex("thread:a", 1, "head")
+        storage.setex("thread:b", 1, "head")
+        assert storage.append("thread:a", 3600, "\nturn")
+
+        with patch("utils.storage_backend.time.time", return_value=time.time() + 2):
+            assert not storage.append("thread:b", 3600, "\nturn")
+            assert storage.get("thread:b") is None
+            assert storage.get("thread:a") == "head\nturn"
+
+    def test_invalid_budget_env_uses_default(self):
+        with patch.dict(os.environ, {"CONVERSATION_STORAGE_MAX_MB": "lots"}):
+            assert InMemoryStorage._get_max_bytes_from_env() == InMemoryStorage.DEFAULT_MAX_MB * 1024 * 1024
+
+
+class TestSQLiteStorage:
+    """Test the persistent SQLite backend."""
+
+    def test_set_and_get(self, sqlite_path):
+        storage = SQLiteStorage(sqlite_path)
+        try:
+            storage.setex("thread:abc", 60, "value")
+            assert storage.get("thread:abc") == "value"
+            assert storage.get("thread:missing") is None
+
+            storage.setex("thread:abc", 60, "updated")
+            assert storage.get("thread:abc") == "updated"
+        finally:
+            storage.shutdown()
+
+    def test_expired_values_not_returned(self, sqlite_path):
+        storage = SQLiteStorage(sqlite_path)
+        try:
+            storage.setex("thread:old", 60, "value")
+            with patch("utils.storage_backend.time.time", return_value=time.time() + 120):
+                assert storage.get("thread:old") is None
+        finally:
+            storage.shutdown()
+
+    def test_append(self, sqlite_path):
+        storage = SQLiteStorage(sqlite_path)
+        try:
+            storage.setex("thread:abc", 60, "head")
+            assert storage.append("thread:abc", 60, "\nturn")
+            assert storage.get("thread:abc") == "head\nturn"
+            assert not storage.append("thread:missing", 60, "turn")
+            assert storage.get("thread:missing") is None
+
+            storage.setex("thread:old", 60, "head")
+            with patch("utils.storage_backend.time.time", return_value=time.time() + 120):
+                assert not storage.append("thread:old", 60, "\nturn")
+        finally:
+            storage.shutdown()
+
+    def test_survives_restart_and_shared_between_instances(self, sqlite_path):
+        """Threads written by one server process are visible to another and after restart"""
+        first = SQLiteStorage(sqlite_path)
+        second = SQLiteStorage(sqlite_path)
+        try:
+            first.setex("thread:shared", 60, "from first")
+            assert second.get("thread:shared") == "from first"
+        finally:
+            first.shutdown()
+            second.shutdown()
+
+        restarted = SQLiteStorage(sqlite_path)
+        try:
+            assert restarted.get("thread:shared") == "from first"
+        finally:
+            restarted.shutdown()
+
+    def test_batched_cleanup(self, sqlite_path):
+        storage = SQLiteStorage(sqlite_path)
+        storage.CLEANUP_BATCH_SIZE = 3
+        try:
+            for i in range(7):
+                storage.setex(f"thread:expired-{i}", 1, "x")
+            storage.setex("thread:live", 3600, "y")
+
+            with patch("utils.storage_backend.time.time", return_value=time.time() + 10):
+                assert storage._cleanup_expired() == 7
+
+            remaining = storage._conn.execute("SELECT key FROM conversation_store").fetchall()
+            assert remaining == [("thread:live",)]
+        finally:
+            storage.shutdown()
+
+    def test_wal_mode_enabled(self, sqlite_path):
+        storage = SQLiteStorage(sqlite_path)
+        try:
+            assert storage._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        finally:
+            storage.shutdown()
+
+
+class TestBackendSelection:
+    """Test CONVERSATION_STORAGE selection and fallbacks."""
+
+    def test_default_is_memory(self):
+        with patch.dict(os.environ, {"CONVERSATION_STORAGE": ""}):
+            assert isinstance(create_storage_backend(), InMemoryStorage)
+
+    def test_sqlite_selected_from_env(self, sqlite_path):
+        with patch.dict(os.environ, {"CONVERSATION_STORAGE": "sqlite", "CONVERSATION_STORAGE_PATH": sqlite_path}):
+            storage = create_storage_backend()
+        try:
+            assert isinstance(storage, SQLiteStorage)
+            assert isinstance(storage, StorageBackend)
+        finally:
+            storage.shutdown()
+
+    def test_redis_without_package_falls_back_to_memory(self):
+        with (
+            patch.dict(os.environ, {"CONVERSATION_STORAGE": "redis"}),
+            patch.dict(sys.modules, {"redis": None}),
+        ):
+            assert isinstance(create_storage_backend(), InMemoryStorage)
+
+    def test_unknown_backend_falls_back_to_memory(self):
+        with patch.dict(os.environ, {"CONVERSATION_STORAGE": "bogus"}):
+            assert isinstance(create_storage_backend(), InMemoryStorage)
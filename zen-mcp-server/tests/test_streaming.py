@@ -0,0 +1,216 @@
+"""
+Tests for streamed model calls (ModelProvider.generate_content_stream) and the
+progress notifications sent while a tool waits for the model (utils/progress.py).
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from providers.base import (
+    GenerationCancelledError,
+    ModelProvider,
+    ModelResponse,
+    ProviderType,
+    StreamAccumulator,
+)
+from providers.openai_provider import OpenAIModelProvider
+from utils.progress import generate_with_progress, progress_reporting
+
+
+def _chunk(content=None, finish_reason=None, usage=None):
+    choices = []
+    if content is not None or finish_reason is not None:
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)]
+    return SimpleNamespace(model="gpt-4.1-2025-04-14", id="chunk-id", created=1234567890, choices=choices, usage=usage)
+
+
+def _response(content="Whole answer"):
+    return ModelResponse(
+        content=content,
+        usage={},
+        model_name="test-model",
+        friendly_name="Test",
+        provider=ProviderType.OPENAI,
+    )
+
+
+class TestStreamAccumulator:
+    def test_collects_chunks_and_measures_first_token(self):
+        received = []
+        accumulator = StreamAccumulator(received.append)
+
+        accumulator.add(None)
+        assert accumulator.time_to_first_token is None
+
+        accumulator.add("Hello")
+        accumulator.add("")
+        accumulator.add(" world")
+
+        assert accumulator.content == "Hello world"
+        assert received == ["Hello", " world"]
+        metadata = accumulator.metadata()
+        assert metadata["streamed"] is True
+        assert metadata["stream_chunks"] == 2
+        assert metadata["time_to_first_token"] >= 0
+
+    def test_cancel_event_stops_at_next_chunk(self):
+        cancel_event = threading.Event()
+        accumulator = StreamAccumulator(cancel_event=cancel_event)
+        accumulator.add("first")
+
+        cancel_event.set()
+        with pytest.raises(GenerationCancelledError):
+            accumulator.add("second")
+        assert accumulator.content == "first"
+
+    def test_default_stream_delivers_whole_response(self):
+        provider = MagicMock()
+        provider.generate_content.return_value = _response()
+        received = []
+
+        result = ModelProvider.generate_content_stream(provider, "prompt", "test-model", on_chunk=received.append)
+
+        assert received == ["Whole answer"]
+        assert result.metadata["streamed"] is False
+        assert result.metadata["stream_chunks"] == 1
+
+
+class TestOpenAICompatibleStreaming:
+    @patch("providers.openai_compatible.OpenAI")
+    def test_streamed_completion(self, mock_openai_class):
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        stream = MagicMock()
+        stream.__iter__.return_value = iter(
+            [
+                _chunk("Hel"),
+                _chunk("lo"),
+                _chunk(finish_reason="stop"),
+                _chunk(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=2, total_tokens=12)),
+            ]
+        )
+        mock_client.chat.completions.create.return_value = stream
+
+        received = []
+        provider = OpenAIModelProvider("test-key")
+        result = provider.generate_content_stream(
+            prompt="Say hello", model_name="gpt-4.1", temperature=0.5, on_chunk=received.append
+        )
+
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        assert call_kwargs["stream"] is True
+        assert call_kwargs["stream_options"] == {"include_usage": True}
+        assert received == ["Hel", "lo"]
+        assert result.content == "Hello"
+        assert result.usage == {"input_tokens": 10, "output_tokens": 2, "total_tokens": 12}
+        assert result.metadata["finish_reason"] == "stop"
+        assert result.metadata["stream_chunks"] == 2
+        assert result.metadata["time_to_first_token"] is not None
+        stream.close.assert_called_once()
+
+    @patch("providers.openai_compatible.OpenAI")
+    def test_cancelled_stream_is_closed_and_not_retried(self, mock_openai_class):
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        cancel_event = threading.Event()
+        stream = MagicMock()
+        stream.__iter__.return_value = iter([_chunk("one"), _chunk("two"), _chunk("three")])
+        mock_client.chat.completions.create.return_value = stream
+
+        provider = OpenAIModelProvider("test-key")
+        with pytest.raises(GenerationCancelledError):
+            provider.generate_content_stream(
+                prompt="Count",
+                model_name="gpt-4.1",
+                on_chunk=lambda text: cancel_event.set(),
+                cancel_event=cancel_event,
+            )
+
+        mock_client.chat.completions.create.assert_called_once()
+        stream.close.assert_called_once()
+
+
+class TestGenerateWithProgress:
+    def test_without_progress_token_calls_generate_content(self):
+        provider = MagicMock()
+        provider.generate_content.return_value = _response()
+
+        result = asyncio.run(generate_with_progress(provider, prompt="p", model_name="test-model"))
+
+        assert result.content == "Whole answer"
+        provider.generate_content.assert_called_once_with(prompt="p", model_name="test-model")
+        provider.generate_content_stream.assert_not_called()
+
+    def test_concurrent_calls_do_not_block_each_other(self):
+        both_started = threading.Barrier(2, timeout=5)
+
+        def generate_content(**kwargs):
+            # Deadlocks (and times out) if the calls run one after the other on the event loop
+            both_started.wait()
+            return _response()
+
+        provider = MagicMock()
+        provider.generate_content.side_effect = generate_content
+
+        async def run():
+            return await asyncio.gather(
+                generate_with_progress(provider, prompt="a", model_name="test-model"),
+                generate_with_progress(provider, prompt="b", model_name="test-model"),
+            )
+
+        assert [r.content for r in asyncio.run(run())] == ["Whole answer", "Whole answer"]
+
+    def test_streams_and_sends_progress_notifications(self):
+        session = MagicMock()
+        session.send_progress_notification = AsyncMock()
+
+        def generate_content_stream(on_chunk, cancel_event, **kwargs):
+            on_chunk("Hello")
+            return _response("Hello")
+
+        provider = MagicMock()
+        provider.generate_content_stream.side_effect = generate_content_stream
+
+        async def run():
+            with progress_reporting(session, "token-1"):
+                result = await generate_with_progress(provider, prompt="p", model_name="test-model")
+            # Let the notification scheduled from the worker thread run
+            await asyncio.sleep(0.05)
+            return result
+
+        result = asyncio.run(run())
+
+        assert result.content == "Hello"
+        provider.generate_content.assert_not_called()
+        args, kwargs = session.send_progress_notification.call_args
+        assert args == ("token-1", 5)
+        assert "5 characters" in kwargs["message"]
+
+    def test_cancellation_sets_cancel_event(self):
+        started = threading.Event()
+        cancel_events = []
+
+        def generate_content_stream(on_chunk, cancel_event, **kwargs):
+            cancel_events.append(cancel_event)
+            started.set()
+            cancel_event.wait(5)
+            raise GenerationCancelledError("cancelled")
+
+        provider = MagicMock()
+        provider.generate_content_stream.side_effect = generate_content_stream
+        session = MagicMock()
+
+        async def run():
+            with progress_reporting(session, "token-1"):
+                task = asyncio.create_task(generate_with_progress(provider, prompt="p", model_name="test-model"))
+                await asyncio.to_thread(started.wait, 5)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+        asyncio.run(run())
+        assert cancel_events[0].is_set()
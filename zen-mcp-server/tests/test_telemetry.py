@@ -0,0 +1,117 @@
+"""
+Tests for per-stage tool call telemetry (utils/telemetry.py).
+"""
+
+import asyncio
+import json
+import os
+import urllib.request
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from providers.base import ModelResponse, ProviderType
+from utils import telemetry
+from utils.file_utils import read_files
+from utils.progress import generate_with_progress
+
+
+@pytest.fixture
+def telemetry_file(tmp_path):
+    path = tmp_path / "telemetry.jsonl"
+    telemetry.reset_telemetry()
+    with patch.dict(os.environ, {"TELEMETRY": "true", "TELEMETRY_PATH": str(path)}):
+        yield path
+    telemetry.reset_telemetry()
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _provider():
+    provider = MagicMock()
+    provider.generate_content.return_value = ModelResponse(
+        content="Looks fine",
+        usage={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150},
+        model_name="gpt-4.1",
+        friendly_name="OpenAI",
+        provider=ProviderType.OPENAI,
+    )
+    return provider
+
+
+class TestDisabled:
+    def test_disabled_by_default(self, tmp_path):
+        with patch.dict(os.environ, {"TELEMETRY_PATH": str(tmp_path / "t.jsonl")}):
+            os.environ.pop("TELEMETRY", None)
+            with telemetry.tool_call_trace("chat") as trace:
+                assert trace is None
+                assert not telemetry.is_tracing()
+                with telemetry.span("read_files"):
+                    telemetry.record(files_read=1)
+        assert not (tmp_path / "t.jsonl").exists()
+
+
+class TestToolCallTrace:
+    def test_stages_and_counters_are_written_as_jsonl(self, telemetry_file, tmp_path):
+        source = tmp_path / "module.py"
+        source.write_text("def answer():\n    return 42\n")
+
+        async def tool_call():
+            with telemetry.tool_call_trace("codereview"):
+                with telemetry.span("prompt_assembly"):
+                    prompt = read_files([str(tmp_path)])
+                await generate_with_progress(_provider(), prompt=prompt, model_name="gpt-4.1")
+
+        asyncio.run(tool_call())
+
+        (entry,) = _records(telemetry_file)
+        assert entry["tool"] == "codereview"
+        assert entry["status"] == "success"
+        assert entry["model"] == "gpt-4.1"
+        assert entry["provider"] == "openai"
+        assert set(entry["stages"]) == {"prompt_assembly", "read_files", "expand_paths", "provider_call"}
+        assert entry["stages"]["read_files"]["count"] == 1
+        counters = entry["counters"]
+        assert counters["files_read"] == 1
+        assert counters["tokens_estimated"] > 0
+        assert (counters["tokens_input"], counters["tokens_output"]) == (120, 30)
+
+    def test_errors_are_recorded(self, telemetry_file):
+        with pytest.raises(RuntimeError):
+            with telemetry.tool_call_trace("debug"):
+                raise RuntimeError("boom")
+        assert _records(telemetry_file)[0]["status"] == "error"
+
+    def test_handle_call_tool_is_traced(self, telemetry_file):
+        from server import handle_call_tool
+
+        asyncio.run(handle_call_tool("version", {}))
+        asyncio.run(handle_call_tool("no-such-tool", {}))
+
+        entries = _records(telemetry_file)
+        assert [(e["tool"], e["status"]) for e in entries] == [("version", "success"), ("no-such-tool", "error")]
+
+
+class TestMetricsEndpoint:
+    def test_serves_openmetrics(self, tmp_path):
+        exporter = telemetry.Telemetry(path=None, metrics_port=0)
+        try:
+            trace = telemetry.ToolCallTrace("chat")
+            trace.add_stage("provider_call", 0.5)
+            trace.increment(files_read=2)
+            trace.finish()
+            exporter.export(trace)
+
+            url = f"http://127.0.0.1:{exporter.metrics_port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode("utf-8")
+                assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+        finally:
+            exporter.close()
+
+        assert 'zen_tool_calls_total{tool="chat",status="success"} 1' in body
+        assert 'zen_tool_stage_duration_seconds_sum{tool="chat",stage="provider_call"} 0.500000' in body
+        assert 'zen_tool_files_read_total{tool="chat"} 2' in body
+        assert body.endswith("# EOF\n")
@@ -0,0 +1,113 @@
+"""Tests for the pluggable tokenizer layer in utils.token_utils."""
+
+import os
+from unittest.mock import MagicMock, patch
+
+from providers.base import ProviderType
+from utils import token_utils
+from utils.model_context import ModelContext
+from utils.token_utils import (
+    HeuristicTokenizer,
+    TiktokenTokenizer,
+    estimate_tokens,
+    get_calibration_factor,
+    get_tokenizer,
+    get_tokenizer_backend,
+)
+
+
+class TestHeuristicTokenizer:
+    """Test the dependency-free fallback estimator."""
+
+    def test_ascii_matches_four_chars_per_token(self):
+        assert HeuristicTokenizer().count("a" * 400) == 100
+
+    def test_empty_text(self):
+        assert HeuristicTokenizer().count("") == 0
+
+    def test_cjk_counts_about_one_token_per_character(self):
+        """Traditional Chinese must not be under-counted by the 4 chars/token rule."""
+        text = "請幫我檢查這段程式碼的效能問題" * 10  # 150 CJK characters
+        tokens = HeuristicTokenizer().count(text)
+        assert tokens == 150
+        assert tokens > len(text) // 4 * 3
+
+    def test_mixed_text(self):
+        text = "def main():  # 主程式入口"
+        tokens = HeuristicTokenizer().count(text)
+        # 5 CJK characters at ~1 token each plus ASCII at ~4 chars/token
+        assert 5 <= tokens <= 12
+
+
+class TestTokenizerSelection:
+    """Test backend selection, caching and fallback."""
+
+    def test_heuristic_backend(self):
+        with patch.dict(os.environ, {"TOKENIZER_BACKEND": "heuristic"}):
+            assert isinstance(get_tokenizer("gpt-4o"), HeuristicTokenizer)
+
+    def test_unknown_backend_falls_back_to_auto(self):
+        with patch.dict(os.environ, {"TOKENIZER_BACKEND": "bogus"}):
+            assert get_tokenizer_backend() == "auto"
+
+    def test_tiktoken_unavailable_falls_back_to_heuristic(self):
+        with (
+            patch.dict(os.environ, {"TOKENIZER_BACKEND": "tiktoken"}),
+            patch.object(token_utils, "_load_tiktoken_encoding", return_value=None),
+        ):
+            token_utils._resolve_tokenizer.cache_clear()
+            try:
+                assert isinstance(get_tokenizer("gpt-4o"), HeuristicTokenizer)
+            finally:
+                token_utils._resolve_tokenizer.cache_clear()
+
+    def test_tiktoken_encoder_is_cached(self):
+        encoding = MagicMock()
+        encoding.name = "o200k_base"
+        encoding.encode_ordinary.return_value = [1, 2, 3]
+
+        with (
+            patch.dict(os.environ, {"TOKENIZER_BACKEND": "tiktoken"}),
+            patch.object(token_utils, "_load_tiktoken_encoding", return_value=encoding) as mock_load,
+        ):
+            token_utils._resolve_tokenizer.cache_clear()
+            try:
+                first = get_tokenizer("gpt-4o")
+                second = get_tokenizer("gpt-4o")
+                assert isinstance(first, TiktokenTokenizer)
+                assert first is second
+                assert mock_load.call_count == 1
+                assert estimate_tokens("hello world", model_name="gpt-4o") == 3
+            finally:
+                token_utils._resolve_tokenizer.cache_clear()
+
+    def test_sentencepiece_without_model_path_falls_back(self):
+        with patch.dict(os.environ, {"TOKENIZER_BACKEND": "sentencepiece", "SENTENCEPIECE_MODEL_PATH": ""}):
+            assert isinstance(get_tokenizer(), HeuristicTokenizer)
+
+
+class TestCalibration:
+    """Test per-provider calibration factors."""
+
+    def test_default_factor(self):
+        with patch.dict(os.environ, {"TOKENIZER_CALIBRATION": ""}):
+            assert get_calibration_factor("google") == 1.0
+            assert get_calibration_factor(None) == 1.0
+
+    def test_configured_factor_applied(self):
+        with patch.dict(os.environ, {"TOKENIZER_BACKEND": "heuristic", "TOKENIZER_CALIBRATION": "google=1.5, xai=bad"}):
+            assert get_calibration_factor("google") == 1.5
+            assert get_calibration_factor("xai") == 1.0
+            assert estimate_tokens("a" * 400, provider="google") == 150
+            assert estimate_tokens("a" * 400, provider="openai") == 100
+
+    def test_model_context_uses_provider_calibration(self):
+        with patch.dict(os.environ, {"TOKENIZER_BACKEND": "heuristic", "TOKENIZER_CALIBRATION": "google=2.0"}):
+            context = ModelContext("gemini-2.5-flash")
+            context._capabilities = MagicMock(provider=ProviderType.GOOGLE)
+            assert context.estimate_tokens("a" * 400) == 200
+
+    def test_model_context_unknown_model_uncalibrated(self):
+        with patch.dict(os.environ, {"TOKENIZER_BACKEND": "heuristic", "TOKENIZER_CALIBRATION": "google=2.0"}):
+            context = ModelContext("no-such-model-xyz")
+            assert context.estimate_tokens("a" * 400) == 100
@@ -128,6 +128,7 @@ class TestWorkflowFileEmbedding:
         # Set up consolidated findings
         self.mock_tool.consolidated_findings = Mock()
         self.mock_tool.consolidated_findings.relevant_files = set(current_relevant_files)
+        self.mock_tool.work_history = [{"step_number": 1, "relevant_files": current_relevant_files}]
 
         # Set up current arguments with continuation
         self.mock_tool._current_arguments = {"continuation_id": "test-thread-123"}
@@ -137,6 +138,9 @@ class TestWorkflowFileEmbedding:
         self.mock_tool._prepare_files_for_expert_analysis = (
             BaseWorkflowMixin._prepare_files_for_expert_analysis.__get__(self.mock_tool)
         )
+        self.mock_tool._relevant_files_newest_first = BaseWorkflowMixin._relevant_files_newest_first.__get__(
+            self.mock_tool
+        )
         self.mock_tool._force_embed_files_for_expert_analysis = (
             BaseWorkflowMixin._force_embed_files_for_expert_analysis.__get__(self.mock_tool)
         )
@@ -182,6 +186,7 @@ class TestWorkflowFileEmbedding:
         # Set up the tool methods
         self.mock_tool.get_current_model_context.return_value = mock_model_context
         self.mock_tool.wants_line_numbers_by_default.return_value = True
+        self.mock_tool.consolidated_findings.relevant_files = {self.test_files[0]}
 
         # Call the method
         file_content, processed_files = self.mock_tool._force_embed_files_for_expert_analysis(self.test_files)
@@ -192,6 +197,7 @@ class TestWorkflowFileEmbedding:
             max_tokens=100000,
             reserve_tokens=1000,
             include_line_numbers=True,
+            relevant_files=[self.test_files[0]],
         )
 
         # Verify it expanded paths to get individual files
@@ -220,6 +226,20 @@ class TestWorkflowFileEmbedding:
 
             assert should_embed == expected_embed, f"Failed for: {description}"
 
+    def test_relevant_files_ordered_newest_step_first(self):
+        """Expert analysis lists files from the newest step first, not alphabetically"""
+        self.mock_tool.work_history = [
+            {"step_number": 1, "relevant_files": ["/src/a.py", "/src/z.py"]},
+            {"step_number": 2, "relevant_files": ["/src/m.py"]},
+            {"step_number": 3, "relevant_files": ["/src/b.py", "/src/a.py"]},
+        ]
+        self.mock_tool.consolidated_findings = Mock()
+        self.mock_tool.consolidated_findings.relevant_files = {"/src/a.py", "/src/b.py", "/src/m.py", "/src/z.py"}
+
+        ordered = BaseWorkflowMixin._relevant_files_newest_first(self.mock_tool)
+
+        assert ordered == ["/src/b.py", "/src/a.py", "/src/m.py", "/src/z.py"]
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -1,23 +1,30 @@
 """
 Tool implementations for Zen MCP Server
+
+Tool classes are imported on first access, so importing a single tool (or
+tools.models) does not load every tool module.
 """
 
-from .analyze import AnalyzeTool
-from .challenge import ChallengeTool
-from .chat import ChatTool
-from .codereview import CodeReviewTool
-from .consensus import ConsensusTool
-from .debug import DebugIssueTool
-from .docgen import DocgenTool
-from .listmodels import ListModelsTool
-from .planner import PlannerTool
-from .precommit import PrecommitTool
-from .refactor import RefactorTool
-from .secaudit import SecauditTool
-from .testgen import TestGenTool
-from .thinkdeep import ThinkDeepTool
-from .tracer import TracerTool
-from .version import VersionTool
+import importlib
+
+_LAZY_EXPORTS = {
+    "AnalyzeTool": ".analyze",
+    "ChallengeTool": ".challenge",
+    "ChatTool": ".chat",
+    "CodeReviewTool": ".codereview",
+    "ConsensusTool": ".consensus",
+    "DebugIssueTool": ".debug",
+    "DocgenTool": ".docgen",
+    "ListModelsTool": ".listmodels",
+    "PlannerTool": ".planner",
+    "PrecommitTool": ".precommit",
+    "RefactorTool": ".refactor",
+    "SecauditTool": ".secaudit",
+    "TestGenTool": ".testgen",
+    "ThinkDeepTool": ".thinkdeep",
+    "TracerTool": ".tracer",
+    "VersionTool": ".version",
+}
 
 __all__ = [
     "ThinkDeepTool",
@@ -37,3 +44,11 @@ __all__ = [
     "TracerTool",
     "VersionTool",
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -27,6 +27,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import ANALYZE_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
 
 from .workflow.base import WorkflowTool
 
@@ -147,10 +148,9 @@ class AnalyzeTool(WorkflowTool):
     including architectural review, performance analysis, security assessment, and maintainability evaluation.
     """
 
-    def __init__(self):
-        super().__init__()
-        self.initial_request = None
-        self.analysis_config = {}
+    # Per-request state that later steps need; saved with each turn and restored on continuation
+    analysis_config = RequestLocal(dict)
+    workflow_state_fields = ("analysis_config",)
 
     def get_name(self) -> str:
         return "analyze"
@@ -27,6 +27,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import CODEREVIEW_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
 
 from .workflow.base import WorkflowTool
 
@@ -138,10 +139,9 @@ class CodeReviewTool(WorkflowTool):
     including security audits, performance analysis, architectural review, and maintainability assessment.
     """
 
-    def __init__(self):
-        super().__init__()
-        self.initial_request = None
-        self.review_config = {}
+    # Per-request state that later steps need; saved with each turn and restored on continuation
+    review_config = RequestLocal(dict)
+    workflow_state_fields = ("review_config",)
 
     def get_name(self) -> str:
         return "codereview"
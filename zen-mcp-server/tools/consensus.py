@@ -29,7 +29,10 @@ from mcp.types import TextContent
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import CONSENSUS_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
+from utils.conversation_memory import create_thread
 from utils.model_context import ModelContext
+from utils.progress import generate_with_progress
 
 from .workflow.base import WorkflowTool
 
@@ -158,13 +161,15 @@ class ConsensusTool(WorkflowTool):
     and finally synthesizes all perspectives into a unified recommendation.
     """
 
+    initial_prompt = RequestLocal()
+    original_proposal = RequestLocal()  # Store the original proposal separately
+    models_to_consult = RequestLocal(list)
+    accumulated_responses = RequestLocal(list)
+    # Saved with each step's turn and restored on continuation (see BaseWorkflowMixin)
+    workflow_state_fields = ("initial_prompt", "original_proposal", "models_to_consult", "accumulated_responses")
+
     def __init__(self):
         super().__init__()
-        self.initial_prompt: str | None = None
-        self.original_proposal: str | None = None  # Store the original proposal separately
-        self.models_to_consult: list[dict] = []
-        self.accumulated_responses: list[dict] = []
-        self._current_arguments: dict[str, Any] = {}
 
     def get_name(self) -> str:
         return "consensus"
@@ -431,6 +436,7 @@ of the evidence, even when it strongly points in one direction.""",
 
         # Validate request
         request = self.get_workflow_request_model()(**arguments)
+        continuation_id = request.continuation_id
 
         # On first step, store the models to consult
         if request.step_number == 1:
@@ -442,6 +448,14 @@ of the evidence, even when it strongly points in one direction.""",
             # Set total steps: len(models) (each step includes consultation + response)
             request.total_steps = len(self.models_to_consult)
 
+            # The thread carries the models and responses to the following steps
+            if not continuation_id:
+                clean_args = {k: v for k, v in arguments.items() if k not in ["_model_context", "_resolved_model_name"]}
+                continuation_id = create_thread(self.get_name(), clean_args)
+        elif continuation_id:
+            # Restore the proposal, models and responses saved by the previous step
+            self._restore_workflow_state(continuation_id)
+
         # For all steps (1 through total_steps), consult the corresponding model
         if request.step_number <= request.total_steps:
             # Calculate which model to consult for this step
@@ -499,11 +513,13 @@ of the evidence, even when it strongly points in one direction.""",
                         f"Model {model_response['model']} has provided its {model_response.get('stance', 'neutral')} "
                         f"perspective. Please analyze this response and call {self.get_name()} again with:\n"
                         f"- step_number: {request.step_number + 1}\n"
-                        f"- findings: Summarize key points from this model's response"
+                        f"- findings: Summarize key points from this model's response\n"
+                        f"- continuation_id: {continuation_id}"
                     )
 
                 # Add accumulated responses for tracking
                 response_data["accumulated_responses"] = self.accumulated_responses
+                response_data["continuation_id"] = continuation_id
 
                 # Add metadata (since we're bypassing the base class metadata addition)
                 model_name = self.get_request_model_name(request)
@@ -515,6 +531,9 @@ of the evidence, even when it strongly points in one direction.""",
                     "provider_used": provider.get_provider_type().value,
                 }
 
+                # Persist the consensus state for the next step
+                self.store_conversation_turn(continuation_id, response_data, request)
+
                 return [TextContent(type="text", text=json.dumps(response_data, indent=2, ensure_ascii=False))]
 
         # Otherwise, use standard workflow execution
@@ -560,7 +579,8 @@ of the evidence, even when it strongly points in one direction.""",
                 logger.warning(warning)
 
             # Call the model with validated temperature
-            response = provider.generate_content(
+            response = await generate_with_progress(
+                provider,
                 prompt=prompt,
                 model_name=model_name,
                 system_prompt=system_prompt,
@@ -117,9 +117,8 @@ class DebugIssueTool(WorkflowTool):
     including race conditions, memory leaks, performance issues, and integration problems.
     """
 
-    def __init__(self):
-        super().__init__()
-        self.initial_issue = None
+    # Saved with each turn and restored on continuation (see BaseWorkflowMixin)
+    workflow_state_fields = ("initial_issue",)
 
     def get_name(self) -> str:
         return "debug"
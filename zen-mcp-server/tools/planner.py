@@ -31,6 +31,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_BALANCED
 from systemprompts import PLANNER_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
 
 from .workflow.base import WorkflowTool
 
@@ -121,9 +122,10 @@ class PlannerTool(WorkflowTool):
     - Self-contained operation (no expert analysis)
     """
 
-    def __init__(self):
-        super().__init__()
-        self.branches = {}
+    # Per-request state that later steps need; saved with each turn and restored on continuation
+    branches = RequestLocal(dict)
+    initial_planning_description = RequestLocal()
+    workflow_state_fields = ("branches", "initial_planning_description")
 
     def get_name(self) -> str:
         return "planner"
@@ -520,10 +522,7 @@ class PlannerTool(WorkflowTool):
 
     def get_initial_request(self, fallback_step: str) -> str:
         """Get initial planning description."""
-        try:
-            return self.initial_planning_description
-        except AttributeError:
-            return fallback_step
+        return self.initial_planning_description or fallback_step
 
     # Required abstract methods from BaseTool
     def get_request_model(self):
@@ -26,6 +26,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import PRECOMMIT_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
 
 from .workflow.base import WorkflowTool
 
@@ -139,10 +140,9 @@ class PrecommitTool(WorkflowTool):
     multi-repository analysis, security review, performance validation, and integration testing.
     """
 
-    def __init__(self):
-        super().__init__()
-        self.initial_request = None
-        self.git_config = {}
+    # Per-request state that later steps need; saved with each turn and restored on continuation
+    git_config = RequestLocal(dict)
+    workflow_state_fields = ("git_config",)
 
     def get_name(self) -> str:
         return "precommit"
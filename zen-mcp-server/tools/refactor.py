@@ -27,6 +27,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import REFACTOR_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
 
 from .workflow.base import WorkflowTool
 
@@ -154,10 +155,9 @@ class RefactorTool(WorkflowTool):
     opportunities, and organization improvements.
     """
 
-    def __init__(self):
-        super().__init__()
-        self.initial_request = None
-        self.refactor_config = {}
+    # Per-request state that later steps need; saved with each turn and restored on continuation
+    refactor_config = RequestLocal(dict)
+    workflow_state_fields = ("refactor_config",)
 
     def get_name(self) -> str:
         return "refactor"
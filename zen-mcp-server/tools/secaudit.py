@@ -28,6 +28,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import SECAUDIT_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
 
 from .workflow.base import WorkflowTool
 
@@ -161,10 +162,9 @@ class SecauditTool(WorkflowTool):
     security-specific capabilities.
     """
 
-    def __init__(self):
-        super().__init__()
-        self.initial_request = None
-        self.security_config = {}
+    # Per-request state that later steps need; saved with each turn and restored on continuation
+    security_config = RequestLocal(dict)
+    workflow_state_fields = ("security_config",)
 
     def get_name(self) -> str:
         """Return the unique name of the tool."""
@@ -29,6 +29,8 @@ from utils.conversation_memory import (
 )
 from utils.file_utils import read_file_content, read_files
 
+from .request_context import RequestLocal
+
 # Import models from tools.models for compatibility
 try:
     from tools.models import SPECIAL_STATUS_MODELS, ContinuationOffer, ToolOutput
@@ -82,6 +84,13 @@ class BaseTool(ABC):
     # Class-level cache for OpenRouter registry to avoid multiple loads
     _openrouter_registry_cache = None
 
+    # Per-call state. Tool instances are shared by concurrent calls, so these live
+    # in the request context (see tools/shared/request_context.py), not on self.
+    _current_arguments = RequestLocal(dict)
+    _current_model_name = RequestLocal()
+    _model_context = RequestLocal()
+    _actually_processed_files = RequestLocal(list)
+
     @classmethod
     def _get_openrouter_registry(cls):
         """Get cached OpenRouter registry instance, creating if needed."""
@@ -982,6 +991,7 @@ class BaseTool(ABC):
                     max_tokens=effective_max_tokens + reserve_tokens,
                     reserve_tokens=reserve_tokens,
                     include_line_numbers=self.wants_line_numbers_by_default(),
+                    model_context=model_context,
                 )
                 # Note: No need to validate against MCP_PROMPT_SIZE_LIMIT here
                 # read_files already handles token-aware truncation based on model's capabilities
@@ -993,7 +1003,9 @@ class BaseTool(ABC):
                 # Estimate tokens for debug logging
                 from utils.token_utils import estimate_tokens
 
-                content_tokens = estimate_tokens(file_content)
+                content_tokens = (
+                    model_context.estimate_tokens(file_content) if model_context else estimate_tokens(file_content)
+                )
                 logger.debug(
                     f"{self.name} tool successfully embedded {len(files_to_embed)} files ({content_tokens:,} tokens)"
                 )
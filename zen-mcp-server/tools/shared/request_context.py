@@ -0,0 +1,85 @@
+"""
+Per-request state for tool singletons
+
+Tools are created once and shared by every call (see TOOLS in server.py), but
+while a call runs they keep working state on ``self``: the arguments, the
+resolved model context, the workflow history and so on. Attributes declared
+with ``RequestLocal`` store that state in a per-request context instead of on
+the instance, so concurrent calls to the same tool never see each other's
+values.
+
+The context is a ``contextvars.ContextVar``: server.py opens one with
+``tool_request_scope()`` around each tool execution, and asyncio gives every
+task its own copy of the context, so each in-flight call has its own state.
+Outside a request scope (direct calls in tests and scripts) the values fall
+back to the instance, which keeps the previous single-call behaviour.
+
+Example:
+    class MyTool(BaseTool):
+        review_config = RequestLocal(dict)
+
+        async def execute(self, arguments):
+            self.review_config = {...}  # visible to this call only
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+_MISSING = object()
+
+# id(tool) -> {attribute name: value} for the request running in this context
+_request_state: ContextVar[Optional[dict[int, dict[str, Any]]]] = ContextVar("tool_request_state", default=None)
+
+
+class RequestLocal:
+    """
+    Descriptor for tool attributes whose value belongs to a single request.
+
+    Args:
+        default_factory: Called to create the initial value the first time the
+            attribute is read in a request (e.g. ``list``); None gives ``None``
+    """
+
+    def __init__(self, default_factory: Optional[Callable[[], Any]] = None):
+        self.default_factory = default_factory
+        self.name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    @staticmethod
+    def _values(instance: Any) -> dict[str, Any]:
+        state = _request_state.get()
+        if state is None:
+            # No request scope: behave like a plain instance attribute
+            return instance.__dict__
+        return state.setdefault(id(instance), {})
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        values = self._values(instance)
+        value = values.get(self.name, _MISSING)
+        if value is _MISSING:
+            value = self.default_factory() if self.default_factory is not None else None
+            # Keep it, so in-place changes (e.g. list.append) are seen by later reads
+            values[self.name] = value
+        return value
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        self._values(instance)[self.name] = value
+
+    def __delete__(self, instance: Any) -> None:
+        self._values(instance).pop(self.name, None)
+
+
+@contextmanager
+def tool_request_scope() -> Iterator[None]:
+    """Gives the enclosed tool execution its own, initially empty, request state."""
+    token = _request_state.set({})
+    try:
+        yield
+    finally:
+        _request_state.reset(token)
@@ -0,0 +1,113 @@
+"""
+Versioned cache of the tool definitions returned by list_tools.
+
+Every tool's input schema embeds the model enumeration and descriptions built
+by get_model_field_schema(), which walks all providers, model restrictions and
+the OpenRouter registry. Clients list tools on every connection and sometimes
+repeatedly, yet the result only changes when the provider configuration does.
+
+The cache builds the ListToolsResult once and keeps it, together with its JSON
+serialization, under a version made of everything the schemas depend on: the
+provider routing table (rebuilt by the registry when API keys, registered
+providers or model restrictions change), DEFAULT_MODEL, the OpenRouter
+registry instance and the set of enabled tools. A lookup with a different
+version rebuilds; invalidate() forces a rebuild.
+"""
+
+import hashlib
+import logging
+import threading
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from mcp.types import ListToolsResult, Tool, ToolAnnotations
+
+logger = logging.getLogger(__name__)
+
+
+class ToolSchemaCache:
+    """ListToolsResult for a tool registry, computed once per provider configuration."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[tuple] = None
+        self._result: Optional[ListToolsResult] = None
+        self._serialized: bytes = b""
+        self._digest = ""
+        self._stats = {"hits": 0, "builds": 0}
+
+    @staticmethod
+    def _current_version(tools: Mapping[str, Any]) -> tuple:
+        import config
+        from providers.registry import ModelProviderRegistry
+        from tools.shared.base_tool import BaseTool
+
+        # The table object itself: the registry replaces it whenever its inputs change
+        return (
+            ModelProviderRegistry.get_routing_table(),
+            config.DEFAULT_MODEL,
+            id(BaseTool._openrouter_registry_cache),
+            tuple(tools),
+        )
+
+    def get(self, tools: Mapping[str, Any]) -> ListToolsResult:
+        """The list_tools result for these tools, rebuilt only if the configuration changed."""
+        version = self._current_version(tools)
+        with self._lock:
+            if self._result is not None and self._is_current(version):
+                self._stats["hits"] += 1
+                return self._result
+
+            result = ListToolsResult(tools=[self._build_tool(tool) for tool in tools.values()])
+            self._serialized = result.model_dump_json(by_alias=True, exclude_none=True).encode("utf-8")
+            self._digest = hashlib.sha256(self._serialized).hexdigest()[:12]
+            # Building may have created the OpenRouter registry; key on the state after the build
+            self._version = self._current_version(tools)
+            self._result = result
+            self._stats["builds"] += 1
+            logger.debug(
+                f"Built tool schemas {self._digest} for {len(result.tools)} tools ({len(self._serialized)} bytes)"
+            )
+            return result
+
+    def _is_current(self, version: tuple) -> bool:
+        # Routing tables are compared by identity, everything else by value
+        return self._version is not None and self._version[0] is version[0] and self._version[1:] == version[1:]
+
+    def get_serialized(self, tools: Mapping[str, Any]) -> bytes:
+        """The JSON serialization of get(tools), produced once per version."""
+        self.get(tools)
+        with self._lock:
+            return self._serialized
+
+    @staticmethod
+    def _build_tool(tool) -> Tool:
+        annotations = tool.get_annotations()
+        return Tool(
+            name=tool.name,
+            description=tool.description,
+            inputSchema=tool.get_input_schema(),
+            annotations=ToolAnnotations(**annotations) if annotations else None,
+        )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+            self._result = None
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self._digest or None,
+                "tools": len(self._result.tools) if self._result is not None else 0,
+                "size_bytes": len(self._serialized) if self._result is not None else 0,
+                **self._stats,
+            }
+
+
+_tool_schema_cache = ToolSchemaCache()
+
+
+def get_tool_schema_cache() -> ToolSchemaCache:
+    """The process-wide tool schema cache."""
+    return _tool_schema_cache
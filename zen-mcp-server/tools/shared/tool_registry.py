@@ -0,0 +1,63 @@
+"""
+Lazily instantiated registry of the server's tools.
+
+The server is started per client session, and importing every tool module up
+front (each builds its Pydantic request models and pulls in the shared tool
+machinery) delays the MCP handshake. The registry only records where each tool
+lives; a tool's module is imported and the tool instantiated the first time it
+is looked up, and load_all() lets the server warm the rest in the background
+once the handshake is under way.
+"""
+
+import importlib
+import logging
+import threading
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class ToolRegistry(Mapping):
+    """Mapping of tool name to tool instance, instantiating each tool on first access.
+
+    Args:
+        specs: Ordered mapping of tool name to (module path, class name)
+    """
+
+    def __init__(self, specs: Mapping[str, tuple[str, str]]):
+        self._specs = dict(specs)
+        self._tools: dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, name: str) -> Any:
+        tool = self._tools.get(name)
+        if tool is not None:
+            return tool
+        module_path, class_name = self._specs[name]
+        with self._lock:
+            if name not in self._tools:
+                tool_class = getattr(importlib.import_module(module_path), class_name)
+                self._tools[name] = tool_class()
+            return self._tools[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._specs)
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._tools
+
+    def load_all(self) -> None:
+        """Instantiates every tool not loaded yet (run from a background thread at start-up)."""
+        for name in self._specs:
+            try:
+                self[name]
+            except Exception as e:
+                # Surface the error on the request that needs the tool, not here
+                logger.warning(f"Failed to preload tool '{name}': {e}")
@@ -18,6 +18,8 @@ from typing import Any, Optional
 from tools.shared.base_models import ToolRequest
 from tools.shared.base_tool import BaseTool
 from tools.shared.schema_builders import SchemaBuilder
+from utils import telemetry
+from utils.progress import generate_with_progress
 
 
 class SimpleTool(BaseTool):
@@ -332,64 +334,65 @@ class SimpleTool(BaseTool):
             continuation_id = self.get_request_continuation_id(request)
 
             # Handle conversation history and prompt preparation
-            if continuation_id:
-                # Check if conversation history is already embedded
-                field_value = self.get_request_prompt(request)
-                if "=== CONVERSATION HISTORY ===" in field_value:
-                    # Use pre-embedded history
-                    prompt = field_value
-                    logger.debug(f"{self.get_name()}: Using pre-embedded conversation history")
-                else:
-                    # No embedded history - reconstruct it (for in-process calls)
-                    logger.debug(f"{self.get_name()}: No embedded history found, reconstructing conversation")
-
-                    # Get thread context
-                    from utils.conversation_memory import add_turn, build_conversation_history, get_thread
-
-                    thread_context = get_thread(continuation_id)
-
-                    if thread_context:
-                        # Add user's new input to conversation
-                        user_prompt = self.get_request_prompt(request)
-                        user_files = self.get_request_files(request)
-                        if user_prompt:
-                            add_turn(continuation_id, "user", user_prompt, files=user_files)
-
-                            # Get updated thread context after adding the turn
-                            thread_context = get_thread(continuation_id)
-                            logger.debug(
-                                f"{self.get_name()}: Retrieved updated thread with {len(thread_context.turns)} turns"
+            with telemetry.span("prompt_assembly"):
+                if continuation_id:
+                    # Check if conversation history is already embedded
+                    field_value = self.get_request_prompt(request)
+                    if "=== CONVERSATION HISTORY ===" in field_value:
+                        # Use pre-embedded history
+                        prompt = field_value
+                        logger.debug(f"{self.get_name()}: Using pre-embedded conversation history")
+                    else:
+                        # No embedded history - reconstruct it (for in-process calls)
+                        logger.debug(f"{self.get_name()}: No embedded history found, reconstructing conversation")
+
+                        # Get thread context
+                        from utils.conversation_memory import add_turn, build_conversation_history, get_thread
+
+                        thread_context = get_thread(continuation_id)
+
+                        if thread_context:
+                            # Add user's new input to conversation
+                            user_prompt = self.get_request_prompt(request)
+                            user_files = self.get_request_files(request)
+                            if user_prompt:
+                                add_turn(continuation_id, "user", user_prompt, files=user_files)
+
+                                # Get updated thread context after adding the turn
+                                thread_context = get_thread(continuation_id)
+                                logger.debug(
+                                    f"{self.get_name()}: Retrieved updated thread with {len(thread_context.turns)} turns"
+                                )
+
+                            # Build conversation history with updated thread context
+                            conversation_history, conversation_tokens = build_conversation_history(
+                                thread_context, self._model_context
                             )
 
-                        # Build conversation history with updated thread context
-                        conversation_history, conversation_tokens = build_conversation_history(
-                            thread_context, self._model_context
-                        )
-
-                        # Get the base prompt from the tool
-                        base_prompt = await self.prepare_prompt(request)
+                            # Get the base prompt from the tool
+                            base_prompt = await self.prepare_prompt(request)
 
-                        # Combine with conversation history
-                        if conversation_history:
-                            prompt = f"{conversation_history}\n\n=== NEW USER INPUT ===\n{base_prompt}"
+                            # Combine with conversation history
+                            if conversation_history:
+                                prompt = f"{conversation_history}\n\n=== NEW USER INPUT ===\n{base_prompt}"
+                            else:
+                                prompt = base_prompt
                         else:
-                            prompt = base_prompt
-                    else:
-                        # Thread not found, prepare normally
-                        logger.warning(f"Thread {continuation_id} not found, preparing prompt normally")
-                        prompt = await self.prepare_prompt(request)
-            else:
-                # New conversation, prepare prompt normally
-                prompt = await self.prepare_prompt(request)
+                            # Thread not found, prepare normally
+                            logger.warning(f"Thread {continuation_id} not found, preparing prompt normally")
+                            prompt = await self.prepare_prompt(request)
+                else:
+                    # New conversation, prepare prompt normally
+                    prompt = await self.prepare_prompt(request)
 
-                # Add follow-up instructions for new conversations
-                from server import get_follow_up_instructions
+                    # Add follow-up instructions for new conversations
+                    from server import get_follow_up_instructions
 
-                follow_up_instructions = get_follow_up_instructions(0)
-                prompt = f"{prompt}\n\n{follow_up_instructions}"
-                logger.debug(
-                    f"Added follow-up instructions for new {self.get_name()} conversation"
-                )  # Validate images if any were provided
+                    follow_up_instructions = get_follow_up_instructions(0)
+                    prompt = f"{prompt}\n\n{follow_up_instructions}"
+                    logger.debug(
+                        f"Added follow-up instructions for new {self.get_name()} conversation"
+                    )  # Validate images if any were provided
             if images:
                 image_validation_error = self._validate_image_limits(
                     images, model_context=self._model_context, continuation_id=continuation_id
@@ -423,13 +426,12 @@ class SimpleTool(BaseTool):
             )
 
             # Estimate tokens for logging
-            from utils.token_utils import estimate_tokens
-
-            estimated_tokens = estimate_tokens(prompt)
+            estimated_tokens = self._model_context.estimate_tokens(prompt)
             logger.debug(f"Prompt length: {len(prompt)} characters (~{estimated_tokens:,} tokens)")
 
             # Generate content with provider abstraction
-            model_response = provider.generate_content(
+            model_response = await generate_with_progress(
+                provider,
                 prompt=prompt,
                 model_name=self._current_model_name,
                 system_prompt=system_prompt,
@@ -486,7 +488,8 @@ class SimpleTool(BaseTool):
                         retry_prompt = f"{original_prompt}\n\nIMPORTANT: Please provide a substantive response. If you cannot respond to the above request, please explain why and suggest alternatives."
 
                         try:
-                            retry_response = provider.generate_content(
+                            retry_response = await generate_with_progress(
+                                provider,
                                 prompt=retry_prompt,
                                 model_name=self._current_model_name,
                                 system_prompt=system_prompt,
@@ -137,10 +137,6 @@ class TestGenTool(WorkflowTool):
 
     __test__ = False  # Prevent pytest from collecting this class as a test
 
-    def __init__(self):
-        super().__init__()
-        self.initial_request = None
-
     def get_name(self) -> str:
         return "testgen"
 
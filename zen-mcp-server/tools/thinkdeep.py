@@ -24,6 +24,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_CREATIVE
 from systemprompts import THINKDEEP_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
 
 from .workflow.base import WorkflowTool
 
@@ -121,11 +122,9 @@ class ThinkDeepTool(WorkflowTool):
         "Provides systematic hypothesis testing, evidence-based investigation, and expert validation."
     )
 
-    def __init__(self):
-        """Initialize the ThinkDeep workflow tool"""
-        super().__init__()
-        # Storage for request parameters to use in expert analysis
-        self.stored_request_params = {}
+    # Per-request state that later steps need; saved with each turn and restored on continuation
+    stored_request_params = RequestLocal(dict)
+    workflow_state_fields = ("stored_request_params",)
 
     def get_name(self) -> str:
         """Return the tool name"""
@@ -30,6 +30,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import TRACER_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from tools.shared.request_context import RequestLocal
 
 from .workflow.base import WorkflowTool
 
@@ -150,10 +151,10 @@ class TracerTool(WorkflowTool):
     both precision tracing (execution flow) and dependencies tracing (structural relationships).
     """
 
-    def __init__(self):
-        super().__init__()
-        self.initial_request = None
-        self.trace_config = {}
+    # Per-request state that later steps need; saved with each turn and restored on continuation
+    trace_config = RequestLocal(dict)
+    initial_tracing_description = RequestLocal()
+    workflow_state_fields = ("trace_config", "initial_tracing_description")
 
     def get_name(self) -> str:
         return "tracer"
@@ -739,10 +740,7 @@ DTOClass ──uses──→ [TARGET_CLASS] ──uses──→ EntityClass
 
     def get_initial_request(self, fallback_step: str) -> str:
         """Get initial tracing description."""
-        try:
-            return self.initial_tracing_description
-        except AttributeError:
-            return fallback_step
+        return self.initial_tracing_description or fallback_step
 
     def get_request_confidence(self, request) -> str:
         """Get confidence from request for tracer workflow."""
@@ -307,6 +307,54 @@ class VersionTool(BaseTool):
 
         output_lines.append("")
 
+        # Rate limiter and circuit breaker state of every model called so far
+        from providers.rate_limiter import get_limiter_states
+
+        provider_health = get_limiter_states()
+        if provider_health:
+            output_lines.append("## Provider Health")
+            for key, state in sorted(provider_health.items()):
+                line = (
+                    f"- **{key}**: circuit {state['state']}, {state['successes']} ok / {state['failures']} failed, "
+                    f"{state['retries']} retries, {state['rejected']} rejected, "
+                    f"throttled {state['throttled_seconds']:.1f}s"
+                )
+                if state["state"] == "open":
+                    line += f" (next attempt in {state['retry_in']:.0f}s)"
+                output_lines.append(line)
+            output_lines.append("")
+
+        from providers.response_cache import get_response_cache
+
+        response_cache = get_response_cache()
+        response_cache_stats = response_cache.get_stats() if response_cache is not None else None
+        if response_cache_stats is not None:
+            output_lines.append("## Response Cache")
+            output_lines.append(
+                f"**Entries**: {response_cache_stats['entries']}/{response_cache_stats['max_entries']} "
+                f"({'persistent' if response_cache_stats['persistent'] else 'memory only'})"
+            )
+            output_lines.append(
+                f"**Hits**: {response_cache_stats['hits']}, **Misses**: {response_cache_stats['misses']}, "
+                f"**Skipped (non-deterministic)**: {response_cache_stats['skipped']}, "
+                f"**Hit ratio**: {response_cache_stats['hit_ratio']:.0%}"
+            )
+            output_lines.append("")
+
+        from tools.shared.schema_cache import get_tool_schema_cache
+
+        tool_schema_stats = get_tool_schema_cache().get_stats()
+        if tool_schema_stats["version"]:
+            output_lines.append("## Tool Schemas")
+            output_lines.append(
+                f"**Version**: {tool_schema_stats['version']} ({tool_schema_stats['tools']} tools, "
+                f"{tool_schema_stats['size_bytes']:,} bytes)"
+            )
+            output_lines.append(
+                f"**Builds**: {tool_schema_stats['builds']}, **Cache hits**: {tool_schema_stats['hits']}"
+            )
+            output_lines.append("")
+
         # Format output
         content = "\n".join(output_lines)
 
@@ -320,6 +368,9 @@ class VersionTool(BaseTool):
                 "last_updated": __updated__,
                 "python_version": f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
                 "platform": f"{platform.system()} {platform.release()}",
+                "provider_health": provider_health,
+                "response_cache": response_cache_stats,
+                "tool_schemas": tool_schema_stats,
             },
         )
 
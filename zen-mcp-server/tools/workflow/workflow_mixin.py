@@ -30,9 +30,12 @@ from typing import Any, Optional
 from mcp.types import TextContent
 
 from config import MCP_PROMPT_SIZE_LIMIT
+from utils import telemetry
 from utils.conversation_memory import add_turn, create_thread
+from utils.progress import generate_with_progress
 
 from ..shared.base_models import ConsolidatedFindings
+from ..shared.request_context import RequestLocal
 
 logger = logging.getLogger(__name__)
 
@@ -65,11 +68,23 @@ class BaseWorkflowMixin(ABC):
     - _prepare_file_content_for_prompt()
     """
 
+    # Workflow state of the current call, kept per request (see tools/shared/request_context.py).
+    # Later steps arrive as separate calls and get it back from conversation memory.
+    work_history = RequestLocal(list)
+    consolidated_findings = RequestLocal(ConsolidatedFindings)
+    initial_request = RequestLocal()
+    initial_issue = RequestLocal()
+    _embedded_file_content = RequestLocal(str)
+    _file_reference_note = RequestLocal(str)
+    _referenced_files = RequestLocal(list)
+
+    # Further request-local attributes that later steps rely on (e.g. configuration
+    # captured on step 1). They are stored with every conversation turn next to
+    # work_history and restored on continuation.
+    workflow_state_fields: tuple[str, ...] = ()
+
     def __init__(self) -> None:
         super().__init__()
-        self.work_history: list[dict[str, Any]] = []
-        self.consolidated_findings: ConsolidatedFindings = ConsolidatedFindings()
-        self.initial_request: Optional[str] = None
 
     # ================================================================================
     # Abstract Methods - Required Implementation by BaseTool or Subclasses
@@ -331,10 +346,11 @@ class BaseWorkflowMixin(ABC):
 
         This ensures expert analysis has complete context without including irrelevant files.
         """
-        all_relevant_files = set()
+        # Ordered (current step first, then newest conversation files) so packing can favor recent files
+        all_relevant_files = {}
 
-        # 1. Get files from current consolidated relevant_files
-        all_relevant_files.update(self.consolidated_findings.relevant_files)
+        # 1. Get files from current consolidated relevant_files, newest step first
+        all_relevant_files.update(dict.fromkeys(self._relevant_files_newest_first()))
 
         # 2. Get additional relevant_files from conversation history (if continued workflow)
         try:
@@ -349,7 +365,7 @@ class BaseWorkflowMixin(ABC):
                     if thread_context:
                         # Get all files from conversation (these were relevant_files in previous steps)
                         conversation_files = get_conversation_file_list(thread_context)
-                        all_relevant_files.update(conversation_files)
+                        all_relevant_files.update(dict.fromkeys(conversation_files))
                         logger.debug(
                             f"[WORKFLOW_FILES] {self.get_name()}: Added {len(conversation_files)} files from conversation history"
                         )
@@ -417,6 +433,8 @@ class BaseWorkflowMixin(ABC):
             max_tokens=max_tokens,
             reserve_tokens=1000,
             include_line_numbers=self.wants_line_numbers_by_default(),
+            # Files relevant in the current step win over those only carried over from the conversation
+            relevant_files=list(self.consolidated_findings.relevant_files),
         )
 
         # Expand paths to get individual files for tracking
@@ -679,23 +697,7 @@ class BaseWorkflowMixin(ABC):
 
             # Restore workflow state on continuation
             if continuation_id:
-                from utils.conversation_memory import get_thread
-
-                thread = get_thread(continuation_id)
-                if thread and thread.turns:
-                    # Find the most recent assistant turn from this tool with workflow state
-                    for turn in reversed(thread.turns):
-                        if turn.role == "assistant" and turn.tool_name == self.get_name() and turn.model_metadata:
-                            state = turn.model_metadata
-                            if isinstance(state, dict) and "work_history" in state:
-                                self.work_history = state.get("work_history", [])
-                                self.initial_request = state.get("initial_request")
-                                # Rebuild consolidated findings from restored history
-                                self._reprocess_consolidated_findings()
-                                logger.debug(
-                                    f"[{self.get_name()}] Restored workflow state with {len(self.work_history)} history items"
-                                )
-                                break  # State restored, exit loop
+                self._restore_workflow_state(continuation_id)
 
             # Adjust total steps if needed
             if request.step_number > request.total_steps:
@@ -1126,6 +1128,36 @@ class BaseWorkflowMixin(ABC):
 
         return response_data
 
+    def _restore_workflow_state(self, continuation_id: str) -> None:
+        """
+        Restore the workflow state saved with this tool's latest turn in a thread.
+
+        Restores work_history, initial_request and workflow_state_fields (see
+        store_conversation_turn) and rebuilds the consolidated findings.
+        """
+        from utils.conversation_memory import get_thread
+
+        thread = get_thread(continuation_id)
+        if not thread or not thread.turns:
+            return
+
+        # Find the most recent assistant turn from this tool with workflow state
+        for turn in reversed(thread.turns):
+            if turn.role == "assistant" and turn.tool_name == self.get_name() and turn.model_metadata:
+                state = turn.model_metadata
+                if isinstance(state, dict) and "work_history" in state:
+                    self.work_history = state.get("work_history", [])
+                    self.initial_request = state.get("initial_request")
+                    for field in self.workflow_state_fields:
+                        if field in state:
+                            setattr(self, field, state[field])
+                    # Rebuild consolidated findings from restored history
+                    self._reprocess_consolidated_findings()
+                    logger.debug(
+                        f"[{self.get_name()}] Restored workflow state with {len(self.work_history)} history items"
+                    )
+                    return
+
     def store_conversation_turn(self, continuation_id: str, response_data: dict, request):
         """
         Store the conversation turn. Tools can override for custom memory storage.
@@ -1135,6 +1167,7 @@ class BaseWorkflowMixin(ABC):
 
         # Serialize workflow state for persistence across stateless tool calls
         workflow_state = {"work_history": self.work_history, "initial_request": getattr(self, "initial_request", None)}
+        workflow_state.update({field: getattr(self, field) for field in self.workflow_state_fields})
 
         add_turn(
             thread_id=continuation_id,
@@ -1409,6 +1442,15 @@ class BaseWorkflowMixin(ABC):
         if step_data.get("confidence"):
             self.consolidated_findings.confidence = step_data["confidence"]
 
+    def _relevant_files_newest_first(self) -> list[str]:
+        """Consolidated relevant files ordered by the step that last listed them, newest step first"""
+        ordered = {}
+        for step in reversed(self.work_history):
+            ordered.update(dict.fromkeys(step.get("relevant_files") or []))
+        # Files not traceable to a recorded step keep a stable order after the rest
+        ordered.update(dict.fromkeys(sorted(self.consolidated_findings.relevant_files - ordered.keys())))
+        return [f for f in ordered if f in self.consolidated_findings.relevant_files]
+
     def _reprocess_consolidated_findings(self):
         """Reprocess consolidated findings after backtracking"""
         self.consolidated_findings = ConsolidatedFindings()
@@ -1479,26 +1521,27 @@ class BaseWorkflowMixin(ABC):
 
             provider = self._model_context.provider
 
-            # Prepare expert analysis context
-            expert_context = self.prepare_expert_analysis_context(self.consolidated_findings)
-
-            # Check if tool wants to include files in prompt
-            if self.should_include_files_in_expert_prompt():
-                file_content = self._prepare_files_for_expert_analysis()
-                if file_content:
-                    expert_context = self._add_files_to_expert_context(expert_context, file_content)
-
-            # Get system prompt for this tool with localization support
-            base_system_prompt = self.get_system_prompt()
-            language_instruction = self.get_language_instruction()
-            system_prompt = language_instruction + base_system_prompt
-
-            # Check if tool wants system prompt embedded in main prompt
-            if self.should_embed_system_prompt():
-                prompt = f"{system_prompt}\n\n{expert_context}\n\n{self.get_expert_analysis_instruction()}"
-                system_prompt = ""  # Clear it since we embedded it
-            else:
-                prompt = expert_context
+            with telemetry.span("prompt_assembly"):
+                # Prepare expert analysis context
+                expert_context = self.prepare_expert_analysis_context(self.consolidated_findings)
+
+                # Check if tool wants to include files in prompt
+                if self.should_include_files_in_expert_prompt():
+                    file_content = self._prepare_files_for_expert_analysis()
+                    if file_content:
+                        expert_context = self._add_files_to_expert_context(expert_context, file_content)
+
+                # Get system prompt for this tool with localization support
+                base_system_prompt = self.get_system_prompt()
+                language_instruction = self.get_language_instruction()
+                system_prompt = language_instruction + base_system_prompt
+
+                # Check if tool wants system prompt embedded in main prompt
+                if self.should_embed_system_prompt():
+                    prompt = f"{system_prompt}\n\n{expert_context}\n\n{self.get_expert_analysis_instruction()}"
+                    system_prompt = ""  # Clear it since we embedded it
+                else:
+                    prompt = expert_context
 
             # Validate temperature against model constraints
             validated_temperature, temp_warnings = self.get_validated_temperature(request, self._model_context)
@@ -1508,7 +1551,8 @@ class BaseWorkflowMixin(ABC):
                 logger.warning(warning)
 
             # Generate AI response - use request parameters if available
-            model_response = provider.generate_content(
+            model_response = await generate_with_progress(
+                provider,
                 prompt=prompt,
                 model_name=model_name,
                 system_prompt=system_prompt,
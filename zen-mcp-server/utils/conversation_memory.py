@@ -8,7 +8,9 @@ across independent request cycles.
 
 CRITICAL ARCHITECTURAL REQUIREMENT:
 This conversation memory system is designed for PERSISTENT MCP SERVER PROCESSES.
-It uses in-memory storage that persists only within a single Python process.
+By default it uses in-memory storage that persists only within a single Python process.
+Set CONVERSATION_STORAGE=sqlite (or redis) to share threads between processes and
+keep them across server restarts (see utils/storage_backend.py).
 
 ⚠️  IMPORTANT: This system will NOT work correctly if MCP tool calls are made
     as separate subprocess invocations (each subprocess starts with empty memory).
@@ -104,14 +106,20 @@ This enables true AI-to-AI collaboration across the entire tool ecosystem with o
 context preservation and natural conversation understanding.
 """
 
+import hashlib
+import json
 import logging
 import os
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Any, Optional
 
 from pydantic import BaseModel
 
+from utils.file_packing import FilePackingPlan, plan_file_packing
+
 logger = logging.getLogger(__name__)
 
 # Configuration constants
@@ -143,6 +151,30 @@ except ValueError:
 
 CONVERSATION_TIMEOUT_SECONDS = CONVERSATION_TIMEOUT_HOURS * 3600
 
+# History assembly caches (see build_conversation_history)
+# Formatted turn blocks are immutable once a turn is stored, and the embedded-file
+# section only changes when the referenced files change on disk, so a continuation
+# only needs to format the newly appended turn.
+HISTORY_TURN_CACHE_SIZE = 2048
+# Total characters of formatted turn blocks kept; a few huge turns evict older ones early
+HISTORY_TURN_CACHE_MAX_CHARS = 32 * 1024 * 1024
+HISTORY_FILE_CACHE_SIZE = 64
+
+# Newest turns loaded for history assembly across a thread chain. Older turns rarely
+# fit the history token budget, so they are not read from storage or parsed. Always
+# covers MAX_CONVERSATION_TURNS, so a single thread is loaded whole.
+HISTORY_MAX_TURNS = 2 * MAX_CONVERSATION_TURNS
+
+# Thread record format
+# Threads are stored as a turn log: a marker line, one header line (thread metadata,
+# written once) and one JSON line per turn. Adding a turn appends a single line with
+# the storage backend's native append instead of rewriting the whole record; the
+# turn count is the number of turn lines and the last update time is the newest
+# turn's timestamp. Readers can parse just the header or only the newest turns.
+# Records without the marker (complete ThreadContext JSON) are still accepted and
+# upgraded on the next write.
+THREAD_RECORD_MARKER = "#zen-turnlog:1"
+
 
 class ConversationTurn(BaseModel):
     """
@@ -201,12 +233,156 @@ class ThreadContext(BaseModel):
     initial_context: dict[str, Any]  # Original request parameters
 
 
+class _LRUCache:
+    """Small thread-safe LRU cache used for conversation history assembly
+
+    Bounded by entry count and, when max_size is set, by the total size passed to put().
+    """
+
+    def __init__(self, max_entries: int, max_size: Optional[int] = None):
+        self._max_entries = max_entries
+        self._max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._sizes: dict = {}
+        self._total_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size: int = 0) -> None:
+        with self._lock:
+            self._total_size += size - self._sizes.get(key, 0)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries or (
+                self._max_size is not None and self._total_size > self._max_size and len(self._entries) > 1
+            ):
+                evicted, _ = self._entries.popitem(last=False)
+                self._total_size -= self._sizes.pop(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Formatted turn blocks: turn identity (content by digest) + tokenizer -> (turn_content, turn_tokens)
+_turn_block_cache = _LRUCache(HISTORY_TURN_CACHE_SIZE, max_size=HISTORY_TURN_CACHE_MAX_CHARS)
+# File inclusion plans: (file stat key, budget, relevant files) -> FilePackingPlan
+_file_plan_cache = _LRUCache(HISTORY_FILE_CACHE_SIZE)
+# Embedded file sections: (file stat key, budget, relevant files, tokenizer) -> (files_content, files_included, tokens)
+_file_section_cache = _LRUCache(HISTORY_FILE_CACHE_SIZE)
+
+
+def clear_history_cache() -> None:
+    """Drop all memoized conversation history blocks (formatted turns and embedded files)"""
+    _turn_block_cache.clear()
+    _file_plan_cache.clear()
+    _file_section_cache.clear()
+
+
+def get_history_cache_stats() -> dict[str, dict[str, int]]:
+    """Get entry and hit/miss counts for the conversation history caches"""
+    return {
+        name: {"entries": len(cache), "hits": cache.hits, "misses": cache.misses}
+        for name, cache in (
+            ("turns", _turn_block_cache),
+            ("file_plans", _file_plan_cache),
+            ("file_sections", _file_section_cache),
+        )
+    }
+
+
+def _encode_thread_header(header: dict[str, Any]) -> str:
+    """Serialize thread metadata (everything except turns) as a single compact JSON line"""
+    return json.dumps(header, ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode_thread_record(context: ThreadContext) -> str:
+    """Serialize a complete thread into the turn log format"""
+    header = context.model_dump(mode="json", exclude={"turns"})
+    lines = [THREAD_RECORD_MARKER, _encode_thread_header(header)]
+    # model_dump_json escapes newlines, so every turn occupies exactly one line
+    lines.extend(turn.model_dump_json() for turn in context.turns)
+    return "\n".join(lines)
+
+
+def _decode_thread_header(data: str) -> Optional[tuple[dict[str, Any], str]]:
+    """
+    Parse only the header of a turn log record.
+
+    Returns:
+        Tuple of (header_dict, turn_lines_blob) for turn log records, where
+        turn_lines_blob holds the raw (unparsed) turn lines, or None for
+        records in the legacy full-JSON format
+    """
+    if not data.startswith(THREAD_RECORD_MARKER + "\n"):
+        return None
+    _, header_line, *rest = data.split("\n", 2)
+    return json.loads(header_line), rest[0] if rest else ""
+
+
+def _decode_thread_record(data: str, max_turns: Optional[int] = None) -> ThreadContext:
+    """
+    Parse a stored thread record (turn log or legacy full JSON).
+
+    Args:
+        data: Stored record
+        max_turns: If set, only the newest max_turns turns are parsed and returned
+
+    Returns:
+        ThreadContext with the requested turns in chronological order
+    """
+    decoded = _decode_thread_header(data)
+    if decoded is None:
+        context = ThreadContext.model_validate_json(data)
+        if max_turns is not None:
+            context.turns = context.turns[-max_turns:] if max_turns > 0 else []
+        return context
+
+    header, turn_blob = decoded
+    header.pop("turn_count", None)  # Written by older versions of the format
+
+    if not turn_blob or max_turns == 0:
+        turn_lines = []
+    elif max_turns is None:
+        turn_lines = turn_blob.split("\n")
+    else:
+        # Only split off (and parse) the newest turns
+        turn_lines = turn_blob.rsplit("\n", max_turns)[-max_turns:]
+
+    turns = [ConversationTurn.model_validate_json(line) for line in turn_lines]
+    if turns:
+        header["last_updated_at"] = turns[-1].timestamp
+    elif turn_blob:
+        header["last_updated_at"] = json.loads(turn_blob.rsplit("\n", 1)[-1])["timestamp"]
+    return ThreadContext(**header, turns=turns)
+
+
 def get_storage():
     """
-    Get in-memory storage backend for conversation persistence.
+    Get the configured storage backend for conversation persistence.
 
     Returns:
-        InMemoryStorage: Thread-safe in-memory storage backend
+        StorageBackend: In-memory (default), SQLite or Redis backend selected by CONVERSATION_STORAGE
     """
     from .storage_backend import get_storage_backend
 
@@ -258,14 +434,14 @@ def create_thread(tool_name: str, initial_request: dict[str, Any], parent_thread
     # Store in memory with configurable TTL to prevent indefinite accumulation
     storage = get_storage()
     key = f"thread:{thread_id}"
-    storage.setex(key, CONVERSATION_TIMEOUT_SECONDS, context.model_dump_json())
+    storage.setex(key, CONVERSATION_TIMEOUT_SECONDS, _encode_thread_record(context))
 
     logger.debug(f"[THREAD] Created new thread {thread_id} with parent {parent_thread_id}")
 
     return thread_id
 
 
-def get_thread(thread_id: str) -> Optional[ThreadContext]:
+def get_thread(thread_id: str, max_turns: Optional[int] = None) -> Optional[ThreadContext]:
     """
     Retrieve thread context from in-memory storage
 
@@ -275,6 +451,8 @@ def get_thread(thread_id: str) -> Optional[ThreadContext]:
 
     Args:
         thread_id: UUID of the conversation thread
+        max_turns: Optional limit - only the newest max_turns turns are parsed
+                   and returned (e.g. when only recent turns fit the budget)
 
     Returns:
         ThreadContext: Complete conversation context if found
@@ -294,7 +472,7 @@ def get_thread(thread_id: str) -> Optional[ThreadContext]:
         data = storage.get(key)
 
         if data:
-            return ThreadContext.model_validate_json(data)
+            return _decode_thread_record(data, max_turns=max_turns)
         return None
     except Exception:
         # Silently handle errors to avoid exposing storage details
@@ -347,21 +525,42 @@ def add_turn(
     """
     logger.debug(f"[FLOW] Adding {role} turn to {thread_id} ({tool_name})")
 
-    context = get_thread(thread_id)
-    if not context:
+    if not thread_id or not _is_valid_uuid(thread_id):
+        logger.debug(f"[FLOW] Thread {thread_id} not found for turn addition")
+        return False
+
+    key = f"thread:{thread_id}"
+    try:
+        storage = get_storage()
+        data = storage.get(key)
+        # Only the header is parsed - existing turns stay as raw JSON lines
+        decoded = _decode_thread_header(data) if data else None
+        legacy_context = ThreadContext.model_validate_json(data) if data and decoded is None else None
+    except Exception:
+        # Silently handle errors to avoid exposing storage details
+        data = None
+
+    if not data:
         logger.debug(f"[FLOW] Thread {thread_id} not found for turn addition")
         return False
 
+    if decoded:
+        turn_blob = decoded[1]
+        turn_count = turn_blob.count("\n") + 1 if turn_blob else 0
+    else:
+        turn_count = len(legacy_context.turns)
+
     # Check turn limit to prevent runaway conversations
-    if len(context.turns) >= MAX_CONVERSATION_TURNS:
+    if turn_count >= MAX_CONVERSATION_TURNS:
         logger.debug(f"[FLOW] Thread {thread_id} at max turns ({MAX_CONVERSATION_TURNS})")
         return False
 
     # Create new turn with complete metadata
+    now = datetime.now(timezone.utc).isoformat()
     turn = ConversationTurn(
         role=role,
         content=content,
-        timestamp=datetime.now(timezone.utc).isoformat(),
+        timestamp=now,
         files=files,  # Preserved for cross-tool file context
         images=images,  # Preserved for cross-tool visual context
         tool_name=tool_name,  # Track which tool generated this turn
@@ -370,21 +569,25 @@ def add_turn(
         model_metadata=model_metadata,  # Additional model info
     )
 
-    context.turns.append(turn)
-    context.last_updated_at = datetime.now(timezone.utc).isoformat()
-
-    # Save back to storage and refresh TTL
+    # Save to storage and refresh TTL to configured timeout
     try:
-        storage = get_storage()
-        key = f"thread:{thread_id}"
-        storage.setex(key, CONVERSATION_TIMEOUT_SECONDS, context.model_dump_json())  # Refresh TTL to configured timeout
+        if decoded:
+            # Append only the new turn line; the stored turns are not rewritten
+            if not storage.append(key, CONVERSATION_TIMEOUT_SECONDS, "\n" + turn.model_dump_json()):
+                logger.debug(f"[FLOW] Thread {thread_id} expired before turn addition")
+                return False
+        else:
+            # Legacy full-JSON record - upgrade to the turn log format
+            legacy_context.turns.append(turn)
+            legacy_context.last_updated_at = now
+            storage.setex(key, CONVERSATION_TIMEOUT_SECONDS, _encode_thread_record(legacy_context))
         return True
     except Exception as e:
         logger.debug(f"[FLOW] Failed to save turn to storage: {type(e).__name__}")
         return False
 
 
-def get_thread_chain(thread_id: str, max_depth: int = 20) -> list[ThreadContext]:
+def get_thread_chain(thread_id: str, max_depth: int = 20, max_turns: Optional[int] = None) -> list[ThreadContext]:
     """
     Traverse the parent chain to get all threads in conversation sequence.
 
@@ -394,6 +597,9 @@ def get_thread_chain(thread_id: str, max_depth: int = 20) -> list[ThreadContext]
     Args:
         thread_id: Starting thread ID
         max_depth: Maximum chain depth to prevent infinite loops
+        max_turns: Optional limit on turns across the chain - only the newest
+                   max_turns turns are parsed, and older threads are not read
+                   once the limit is reached
 
     Returns:
         list[ThreadContext]: All threads in chain, oldest first
@@ -401,9 +607,14 @@ def get_thread_chain(thread_id: str, max_depth: int = 20) -> list[ThreadContext]
     chain = []
     current_id = thread_id
     seen_ids = set()
+    remaining_turns = max_turns
 
     # Build chain from current to oldest
     while current_id and len(chain) < max_depth:
+        if remaining_turns is not None and remaining_turns <= 0:
+            logger.debug(f"[THREAD] Turn limit ({max_turns}) reached, not loading older threads from {current_id}")
+            break
+
         # Prevent circular references
         if current_id in seen_ids:
             logger.warning(f"[THREAD] Circular reference detected in thread chain at {current_id}")
@@ -411,12 +622,14 @@ def get_thread_chain(thread_id: str, max_depth: int = 20) -> list[ThreadContext]
 
         seen_ids.add(current_id)
 
-        context = get_thread(current_id)
+        context = get_thread(current_id, max_turns=remaining_turns)
         if not context:
             logger.debug(f"[THREAD] Thread {current_id} not found in chain traversal")
             break
 
         chain.append(context)
+        if remaining_turns is not None:
+            remaining_turns -= len(context.turns)
         current_id = context.parent_thread_id
 
     # Reverse to get chronological order (oldest first)
@@ -570,49 +783,42 @@ def get_conversation_image_list(context: ThreadContext) -> list[str]:
     return image_list
 
 
-def _plan_file_inclusion_by_size(all_files: list[str], max_file_tokens: int) -> tuple[list[str], list[str], int]:
+def _plan_file_inclusion_by_size(
+    all_files: list[str], max_file_tokens: int, relevant_files: Optional[list[str]] = None
+) -> FilePackingPlan:
     """
     Plan which files to include based on size constraints.
 
     This is ONLY used for conversation history building, not MCP boundary checks.
+    Files are packed into the budget by utils.file_packing: newer files and
+    relevant_files are worth more, small files are not crowded out by a large
+    one, and files too large to embed are planned as outlines or excerpts.
+    Missing or inaccessible files are skipped.
 
     Args:
-        all_files: List of files to consider for inclusion
+        all_files: List of files to consider for inclusion, newest first
         max_file_tokens: Maximum tokens available for file content
+        relevant_files: Files or directories the current request refers to; preferred when packing
 
     Returns:
-        Tuple of (files_to_include, files_to_skip, estimated_total_tokens)
+        FilePackingPlan with the files to include (whole or degraded) and to skip
     """
     if not all_files:
-        return [], [], 0
+        return FilePackingPlan()
 
-    files_to_include = []
-    files_to_skip = []
-    total_tokens = 0
+    from utils.file_utils import estimate_file_tokens, expand_paths
 
     logger.debug(f"[FILES] Planning inclusion for {len(all_files)} files with budget {max_file_tokens:,} tokens")
 
+    candidates = []
+    unavailable = []
     for file_path in all_files:
         try:
-            from utils.file_utils import estimate_file_tokens
-
             if os.path.exists(file_path) and os.path.isfile(file_path):
                 # Use centralized token estimation for consistency
-                estimated_tokens = estimate_file_tokens(file_path)
-
-                if total_tokens + estimated_tokens <= max_file_tokens:
-                    files_to_include.append(file_path)
-                    total_tokens += estimated_tokens
-                    logger.debug(
-                        f"[FILES] Including {file_path} - {estimated_tokens:,} tokens (total: {total_tokens:,})"
-                    )
-                else:
-                    files_to_skip.append(file_path)
-                    logger.debug(
-                        f"[FILES] Skipping {file_path} - would exceed budget (needs {estimated_tokens:,} tokens)"
-                    )
+                candidates.append((file_path, estimate_file_tokens(file_path)))
             else:
-                files_to_skip.append(file_path)
+                unavailable.append(file_path)
                 # More descriptive message for missing files
                 if not os.path.exists(file_path):
                     logger.debug(
@@ -622,16 +828,185 @@ def _plan_file_inclusion_by_size(all_files: list[str], max_file_tokens: int) ->
                     logger.debug(f"[FILES] Skipping {file_path} - file not accessible (not a regular file)")
 
         except Exception as e:
-            files_to_skip.append(file_path)
+            unavailable.append(file_path)
             logger.debug(f"[FILES] Skipping {file_path} - error during processing: {type(e).__name__}: {e}")
 
+    # Directories in relevant_files mark every file below them, as in read_files()
+    relevant = set(relevant_files) | set(expand_paths(relevant_files)) if relevant_files else None
+    plan = plan_file_packing(candidates, max_file_tokens, relevant_files=relevant)
+    # Keep the skipped list in conversation order
+    skipped = set(plan.skipped) | set(unavailable)
+    plan.skipped = [file_path for file_path in all_files if file_path in skipped]
+
     logger.debug(
-        f"[FILES] Inclusion plan: {len(files_to_include)} include, {len(files_to_skip)} skip, {total_tokens:,} tokens"
+        f"[FILES] Inclusion plan: {len(plan.included)} include, {len(plan.degraded)} degraded, "
+        f"{len(plan.skipped)} skip, {plan.estimated_tokens:,} tokens"
+    )
+    return plan
+
+
+def _get_file_stat_key(all_files: list[str]) -> tuple:
+    """
+    Build a cache key that changes whenever any referenced file changes on disk.
+
+    Uses one os.stat() per file; missing or inaccessible files are keyed as such
+    so that a file reappearing also invalidates cached plans.
+    """
+    key = []
+    for file_path in all_files:
+        try:
+            stat = os.stat(file_path)
+            key.append((file_path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            key.append((file_path, None, None))
+    return tuple(key)
+
+
+def _get_tokenizer_key(model_context) -> Optional[Any]:
+    """
+    Identity of the model context's token counter, used to key cached token counts.
+
+    Returns None when the context has no stable tokenizer identity, in which case
+    results that depend on token counts are not cached.
+    """
+    try:
+        return model_context.tokenizer_key
+    except Exception:
+        return None
+
+
+def _embed_planned_files(plan: FilePackingPlan, model_context) -> tuple[str, int, int]:
+    """
+    Read and format the planned files for the conversation history file section.
+
+    Args:
+        plan: Plan from _plan_file_inclusion_by_size(); degraded files are embedded as outlines or excerpts
+        model_context: ModelContext used for token counting
+
+    Returns:
+        Tuple of (files_content, files_included, total_tokens); files_content is
+        empty if none of the planned files could be read
+    """
+    from utils.file_utils import read_file_content, read_file_outline
+
+    # Process files for embedding
+    file_contents = []
+    total_tokens = 0
+    files_included = 0
+
+    for file_path in plan.files:
+        try:
+            logger.debug(f"[FILES] Processing file {file_path}")
+            if file_path in plan.degraded:
+                formatted_content, content_tokens = read_file_outline(
+                    file_path, plan.degraded[file_path], model_context=model_context
+                )
+            else:
+                formatted_content, content_tokens = read_file_content(file_path, model_context=model_context)
+            if formatted_content:
+                file_contents.append(formatted_content)
+                total_tokens += content_tokens
+                files_included += 1
+                logger.debug(f"File embedded in conversation history: {file_path} ({content_tokens:,} tokens)")
+            else:
+                logger.debug(f"File skipped (empty content): {file_path}")
+        except Exception as e:
+            # More descriptive error handling for missing files
+            try:
+                if not os.path.exists(file_path):
+                    logger.info(
+                        f"File no longer accessible for conversation history: {file_path} - file was moved/deleted since conversation (marking as excluded)"
+                    )
+                else:
+                    logger.warning(
+                        f"Failed to embed file in conversation history: {file_path} - {type(e).__name__}: {e}"
+                    )
+            except Exception:
+                # Fallback if path translation also fails
+                logger.warning(f"Failed to embed file in conversation history: {file_path} - {type(e).__name__}: {e}")
+            continue
+
+    if not file_contents:
+        return "", 0, 0
+
+    files_content = "".join(file_contents)
+    if plan.skipped:
+        skipped_note = (
+            f"\n[NOTE: {len(plan.skipped)} additional file(s) were omitted due to size constraints, missing files, or access issues. "
+            f"These were older files from earlier conversation turns.]\n"
+        )
+        files_content += skipped_note
+        total_tokens += model_context.estimate_tokens(skipped_note)
+    return files_content, files_included, total_tokens
+
+
+def _format_turn_block(turn: ConversationTurn, turn_num: int, model_context) -> tuple[str, int]:
+    """
+    Format a single conversation turn for history, memoized per turn and tokenizer.
+
+    Stored turns never change, so the formatted block and its token count are
+    cached by the turn's identity (position, metadata and a digest of the content).
+
+    Args:
+        turn: The conversation turn to format
+        turn_num: 1-based position of the turn in the (chained) conversation
+        model_context: ModelContext used for token counting
+
+    Returns:
+        Tuple of (turn_content, turn_tokens)
+    """
+    tokenizer_key = _get_tokenizer_key(model_context)
+    cache_key = (
+        turn_num,
+        turn.role,
+        turn.timestamp,
+        turn.tool_name,
+        turn.model_provider,
+        turn.model_name,
+        tuple(turn.files or ()),
+        hashlib.sha256(turn.content.encode("utf-8", "surrogatepass")).digest(),
+        tokenizer_key,
     )
-    return files_to_include, files_to_skip, total_tokens
+    if tokenizer_key is not None:
+        cached = _turn_block_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    role_label = "Claude" if turn.role == "user" else "Gemini"
+
+    # Build the complete turn content
+    turn_parts = []
+
+    # Add turn header with tool attribution for cross-tool tracking
+    turn_header = f"\n--- Turn {turn_num} ({role_label}"
+    if turn.tool_name:
+        turn_header += f" using {turn.tool_name}"
+
+    # Add model info if available
+    if turn.model_provider and turn.model_name:
+        turn_header += f" via {turn.model_provider}/{turn.model_name}"
+
+    turn_header += ") ---"
+    turn_parts.append(turn_header)
+
+    # Get tool-specific formatting if available
+    # This includes file references and the actual content
+    tool_formatted_content = _get_tool_formatted_content(turn)
+    turn_parts.extend(tool_formatted_content)
+
+    # Calculate tokens for this turn
+    turn_content = "\n".join(turn_parts)
+    turn_tokens = model_context.estimate_tokens(turn_content)
 
+    result = (turn_content, turn_tokens)
+    if tokenizer_key is not None:
+        _turn_block_cache.put(cache_key, result, size=len(turn_content))
+    return result
 
-def build_conversation_history(context: ThreadContext, model_context=None, read_files_func=None) -> tuple[str, int]:
+
+def build_conversation_history(
+    context: ThreadContext, model_context=None, read_files_func=None, relevant_files: Optional[list[str]] = None
+) -> tuple[str, int]:
     """
     Build formatted conversation history for tool prompts with embedded file contents.
 
@@ -647,9 +1022,10 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
     token limits require file exclusions.
 
     CONVERSATION CHAIN HANDLING:
-    If the thread has a parent_thread_id, this function traverses the entire chain
-    to include complete conversation history across multiple linked threads. File
-    prioritization works across the entire chain, not just the current thread.
+    If the thread has a parent_thread_id, this function traverses the chain to
+    include conversation history across multiple linked threads, loading at most
+    the newest HISTORY_MAX_TURNS turns. File prioritization works across the
+    loaded chain, not just the current thread.
 
     CONVERSATION TURN ORDERING STRATEGY:
     The function employs a sophisticated two-phase approach for optimal token utilization:
@@ -679,6 +1055,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
         context: ThreadContext containing the conversation to format
         model_context: ModelContext for token allocation (optional, uses DEFAULT_MODEL fallback)
         read_files_func: Optional function to read files (primarily for testing)
+        relevant_files: Files the continuing request refers to; preferred when not all files fit
 
     Returns:
         tuple[str, int]: (formatted_conversation_history, total_tokens_used)
@@ -727,11 +1104,14 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
         - Intelligent token budgeting prevents context window overflow
         - In-memory persistence with automatic TTL management
         - Graceful degradation when files are inaccessible or too large
+        - Formatted turn blocks are memoized per turn, and the file inclusion plan and
+          embedded file section are memoized by file mtimes/sizes, so a continuation
+          only formats and counts the newly appended turn
     """
     # Get the complete thread chain
     if context.parent_thread_id:
         # This thread has a parent, get the full chain
-        chain = get_thread_chain(context.thread_id)
+        chain = get_thread_chain(context.thread_id, max_turns=HISTORY_MAX_TURNS)
 
         # Collect all turns from all threads in chain
         all_turns = []
@@ -799,21 +1179,34 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
         "",
     ]
 
+    # The embedded file section is counted from its (cached) token total instead of re-tokenized
+    files_section_index = None
+    files_section_tokens = 0
+
     # Embed files referenced in this conversation with size-aware selection
     if all_files:
         logger.debug(f"[FILES] Starting embedding for {len(all_files)} files")
 
         # Plan file inclusion based on size constraints
         # CRITICAL: all_files is already ordered by newest-first prioritization from get_conversation_file_list()
-        # So when _plan_file_inclusion_by_size() hits token limits, it naturally excludes OLDER files first
-        # while preserving the most recent file references - exactly what we want!
-        files_to_include, files_to_skip, estimated_tokens = _plan_file_inclusion_by_size(all_files, max_file_tokens)
+        # _plan_file_inclusion_by_size() weighs newer files (and the request's relevant files) higher, so
+        # when token limits bite, OLDER files are degraded to outlines or excluded first
+        # Plans and embedded file contents are memoized by file mtimes/sizes, so unchanged
+        # files are neither re-planned nor re-read on continuation
+        file_stat_key = _get_file_stat_key(all_files)
+        relevant_key = tuple(sorted(set(relevant_files or ())))
+        plan_cache_key = (file_stat_key, max_file_tokens, relevant_key)
+        plan = _file_plan_cache.get(plan_cache_key)
+        if plan is None:
+            plan = _plan_file_inclusion_by_size(all_files, max_file_tokens, relevant_files=relevant_files)
+            _file_plan_cache.put(plan_cache_key, plan)
+        files_to_skip = plan.skipped
 
         if files_to_skip:
             logger.info(f"[FILES] Excluding {len(files_to_skip)} files from conversation history: {files_to_skip}")
             logger.debug("[FILES] Files excluded for various reasons (size constraints, missing files, access issues)")
 
-        if files_to_include:
+        if plan.files:
             history_parts.extend(
                 [
                     "=== FILES REFERENCED IN THIS CONVERSATION ===",
@@ -823,64 +1216,38 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
                         if not files_to_skip
                         else f"[NOTE: {len(files_to_skip)} files omitted (size constraints, missing files, or access issues)]"
                     ),
+                    (
+                        ""
+                        if not plan.degraded
+                        else f"[NOTE: {len(plan.degraded)} files too large for the token budget are shown as outlines or excerpts]"
+                    ),
                     "Refer to these when analyzing the context and requests below:",
                     "",
                 ]
             )
 
             if read_files_func is None:
-                from utils.file_utils import read_file_content
-
-                # Process files for embedding
-                file_contents = []
-                total_tokens = 0
-                files_included = 0
-
-                for file_path in files_to_include:
-                    try:
-                        logger.debug(f"[FILES] Processing file {file_path}")
-                        formatted_content, content_tokens = read_file_content(file_path)
-                        if formatted_content:
-                            file_contents.append(formatted_content)
-                            total_tokens += content_tokens
-                            files_included += 1
-                            logger.debug(
-                                f"File embedded in conversation history: {file_path} ({content_tokens:,} tokens)"
-                            )
-                        else:
-                            logger.debug(f"File skipped (empty content): {file_path}")
-                    except Exception as e:
-                        # More descriptive error handling for missing files
-                        try:
-                            if not os.path.exists(file_path):
-                                logger.info(
-                                    f"File no longer accessible for conversation history: {file_path} - file was moved/deleted since conversation (marking as excluded)"
-                                )
-                            else:
-                                logger.warning(
-                                    f"Failed to embed file in conversation history: {file_path} - {type(e).__name__}: {e}"
-                                )
-                        except Exception:
-                            # Fallback if path translation also fails
-                            logger.warning(
-                                f"Failed to embed file in conversation history: {file_path} - {type(e).__name__}: {e}"
-                            )
-                        continue
-
-                if file_contents:
-                    files_content = "".join(file_contents)
-                    if files_to_skip:
-                        files_content += (
-                            f"\n[NOTE: {len(files_to_skip)} additional file(s) were omitted due to size constraints, missing files, or access issues. "
-                            f"These were older files from earlier conversation turns.]\n"
-                        )
+                tokenizer_key = _get_tokenizer_key(model_context)
+                section_cache_key = (file_stat_key, max_file_tokens, relevant_key, tokenizer_key)
+                cached_section = _file_section_cache.get(section_cache_key) if tokenizer_key is not None else None
+                if cached_section is None:
+                    cached_section = _embed_planned_files(plan, model_context)
+                    if tokenizer_key is not None:
+                        _file_section_cache.put(section_cache_key, cached_section)
+                else:
+                    logger.debug(f"[FILES] Reusing cached file section for {len(plan.files)} files")
+                files_content, files_included, total_tokens = cached_section
+
+                if files_content:
+                    files_section_index = len(history_parts)
+                    files_section_tokens = total_tokens
                     history_parts.append(files_content)
                     logger.debug(
                         f"Conversation history file embedding complete: {files_included} files embedded, {len(files_to_skip)} omitted, {total_tokens:,} total tokens"
                     )
                 else:
                     history_parts.append("(No accessible files found)")
-                    logger.debug(f"[FILES] No accessible files found from {len(files_to_include)} planned files")
+                    logger.debug(f"[FILES] No accessible files found from {len(plan.files)} planned files")
             else:
                 # Fallback to original read_files function
                 files_content = read_files_func(all_files)
@@ -890,6 +1257,8 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
 
                     within_limit, estimated_tokens = check_token_limit(files_content)
                     if within_limit:
+                        files_section_index = len(history_parts)
+                        files_section_tokens = estimated_tokens
                         history_parts.append(files_content)
                     else:
                         # Handle token limit exceeded for conversation files
@@ -914,38 +1283,18 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
     # OLDER turns first when space runs out, preserving the most contextually relevant exchanges
     turn_entries = []  # Will store (index, formatted_turn_content) for chronological ordering later
     total_turn_tokens = 0
-    file_embedding_tokens = sum(model_context.estimate_tokens(part) for part in history_parts)
+    file_embedding_tokens = files_section_tokens + sum(
+        model_context.estimate_tokens(part) for idx, part in enumerate(history_parts) if idx != files_section_index
+    )
 
     # CRITICAL: Process turns in REVERSE chronological order (newest to oldest)
     # This prioritization strategy ensures recent context is preserved when token budget is tight
     for idx in range(len(all_turns) - 1, -1, -1):
         turn = all_turns[idx]
         turn_num = idx + 1
-        role_label = "Claude" if turn.role == "user" else "Gemini"
-
-        # Build the complete turn content
-        turn_parts = []
-
-        # Add turn header with tool attribution for cross-tool tracking
-        turn_header = f"\n--- Turn {turn_num} ({role_label}"
-        if turn.tool_name:
-            turn_header += f" using {turn.tool_name}"
-
-        # Add model info if available
-        if turn.model_provider and turn.model_name:
-            turn_header += f" via {turn.model_provider}/{turn.model_name}"
 
-        turn_header += ") ---"
-        turn_parts.append(turn_header)
-
-        # Get tool-specific formatting if available
-        # This includes file references and the actual content
-        tool_formatted_content = _get_tool_formatted_content(turn)
-        turn_parts.extend(tool_formatted_content)
-
-        # Calculate tokens for this turn
-        turn_content = "\n".join(turn_parts)
-        turn_tokens = model_context.estimate_tokens(turn_content)
+        # Formatted blocks are memoized, so only newly appended turns are formatted and counted
+        turn_content, turn_tokens = _format_turn_block(turn, turn_num, model_context)
 
         # Check if adding this turn would exceed history budget
         if file_embedding_tokens + total_turn_tokens + turn_tokens > max_history_tokens:
@@ -977,6 +1326,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
     # Log what we included
     included_turns = len(turn_entries)
     total_turns = len(all_turns)
+    footer_start = len(history_parts)
     if included_turns < total_turns:
         logger.info(f"[HISTORY] Included {included_turns}/{total_turns} turns due to token limit")
         history_parts.append(f"\n[Note: Showing {included_turns} most recent turns out of {total_turns} total]")
@@ -997,11 +1347,14 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
         ]
     )
 
-    # Calculate total tokens for the complete conversation history
+    # Total tokens from the parts already counted above plus the footer, so a continuation
+    # only tokenizes its new turn instead of the whole history
     complete_history = "\n".join(history_parts)
-    from utils.token_utils import estimate_tokens
-
-    total_conversation_tokens = estimate_tokens(complete_history)
+    total_conversation_tokens = (
+        file_embedding_tokens
+        + total_turn_tokens
+        + model_context.estimate_tokens("\n".join(history_parts[footer_start:]))
+    )
 
     # Summary log of what was built
     user_turns = len([t for t in all_turns if t.role == "user"])
@@ -0,0 +1,232 @@
+"""
+Token budget packing for embedded files
+
+Walking files in order and skipping whatever no longer fits lets one large
+file early in the list crowd out many smaller ones, or leaves most of the
+budget unused. This module instead treats file selection as a knapsack
+problem: every file has a value and a token cost, and the planner picks the
+combination with the highest total value that fits the budget.
+
+A file's value comes from its position in the list (callers pass files most
+recent or most important first, so value decays with position) and doubles
+when the file is one of the request's relevant_files. A file too large to
+embed whole can still be included as an outline or excerpt capped at
+OUTLINE_MAX_TOKENS, worth a fraction of the full file, so it is degraded
+rather than dropped.
+
+Costs are the callers' existing size estimates (estimate_file_tokens), so
+planning reads no file contents. The planner is a multiple-choice knapsack
+solved by dynamic programming over the budget scaled to at most
+PACKING_RESOLUTION buckets; costs are rounded up so a plan never exceeds the
+real budget. Very long file lists fall back to a greedy pick by value per
+token. Either way, budget left over from rounding is filled in priority order.
+"""
+
+import logging
+import math
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Value of a file relative to the one before it in priority order
+RECENCY_DECAY = 0.95
+
+# Older files keep at least this share of the first file's value
+MIN_RECENCY_WEIGHT = 0.1
+
+# Multiplier for files listed in the request's relevant_files
+RELEVANT_FILE_WEIGHT = 2.0
+
+# Value of an outline or excerpt relative to the whole file
+DEGRADED_VALUE = 0.3
+
+# Token allowance for an outline or excerpt of a file too large to embed
+OUTLINE_MAX_TOKENS = 2_000
+OUTLINE_MIN_TOKENS = 200
+
+# Budget buckets for the dynamic programming solver, and the table size above which it is not used
+PACKING_RESOLUTION = 1_000
+MAX_PACKING_CELLS = 200_000
+
+_SKIP, _DEGRADE, _FULL = 0, 1, 2
+
+
+@dataclass
+class FilePackingPlan:
+    """Files selected for a token budget.
+
+    Attributes:
+        files: Files to embed, whole or degraded, in the original priority order
+        degraded: Files to embed as an outline or excerpt, mapped to their token allowance
+        skipped: Files left out
+        estimated_tokens: Estimated tokens of the planned files
+    """
+
+    files: list[str] = field(default_factory=list)
+    degraded: dict[str, int] = field(default_factory=dict)
+    skipped: list[str] = field(default_factory=list)
+    estimated_tokens: int = 0
+
+    @property
+    def included(self) -> list[str]:
+        """Files to embed whole."""
+        return [file_path for file_path in self.files if file_path not in self.degraded]
+
+
+def file_weight(position: int, is_relevant: bool = False) -> float:
+    """Value of embedding a file whole, by its priority position and relevance."""
+    weight = max(MIN_RECENCY_WEIGHT, RECENCY_DECAY**position)
+    return weight * RELEVANT_FILE_WEIGHT if is_relevant else weight
+
+
+def outline_allowance(max_tokens: int) -> int:
+    """Token allowance for one degraded file under the given budget (0 when degrading is not worthwhile)."""
+    allowance = min(OUTLINE_MAX_TOKENS, max_tokens // 8)
+    return allowance if allowance >= OUTLINE_MIN_TOKENS else 0
+
+
+def plan_file_packing(
+    file_tokens: Sequence[tuple[str, int]],
+    max_tokens: int,
+    relevant_files: Optional[Iterable[str]] = None,
+    allow_degraded: bool = True,
+) -> FilePackingPlan:
+    """
+    Choose which files to embed whole, degrade or skip within a token budget.
+
+    Args:
+        file_tokens: (file_path, estimated_tokens) pairs, highest priority (e.g. newest) first
+        max_tokens: Token budget for the files
+        relevant_files: Files the request marked as relevant; they weigh double
+        allow_degraded: Whether files too large to embed may be planned as outlines or excerpts
+
+    Returns:
+        FilePackingPlan for the files
+    """
+    if not file_tokens:
+        return FilePackingPlan()
+
+    max_tokens = max(0, max_tokens)
+    total = sum(tokens for _, tokens in file_tokens)
+    if total <= max_tokens:
+        return FilePackingPlan(files=[path for path, _ in file_tokens], estimated_tokens=total)
+
+    relevant = set(relevant_files or ())
+    allowance = outline_allowance(max_tokens) if allow_degraded else 0
+    values = [file_weight(i, path in relevant) for i, (path, _) in enumerate(file_tokens)]
+    degrade_costs = [allowance if allowance and tokens > allowance else None for _, tokens in file_tokens]
+
+    resolution = min(PACKING_RESOLUTION, max_tokens)
+    if resolution and len(file_tokens) * resolution <= MAX_PACKING_CELLS:
+        choices = _solve_knapsack(file_tokens, values, degrade_costs, max_tokens, resolution)
+    else:
+        choices = _solve_greedy(file_tokens, values, degrade_costs, max_tokens)
+
+    _fill_remaining_budget(file_tokens, degrade_costs, choices, max_tokens)
+
+    plan = FilePackingPlan()
+    for (path, tokens), choice, degrade_cost in zip(file_tokens, choices, degrade_costs):
+        if choice == _FULL:
+            plan.files.append(path)
+            plan.estimated_tokens += tokens
+        elif choice == _DEGRADE:
+            plan.files.append(path)
+            plan.degraded[path] = degrade_cost
+            plan.estimated_tokens += degrade_cost
+        else:
+            plan.skipped.append(path)
+
+    logger.debug(
+        f"[FILES] Packed {len(plan.files) - len(plan.degraded)} whole and {len(plan.degraded)} degraded files, "
+        f"skipped {len(plan.skipped)} ({plan.estimated_tokens:,}/{max_tokens:,} tokens)"
+    )
+    return plan
+
+
+def _solve_knapsack(
+    file_tokens: Sequence[tuple[str, int]],
+    values: list[float],
+    degrade_costs: list[Optional[int]],
+    max_tokens: int,
+    resolution: int,
+) -> list[int]:
+    """Multiple-choice knapsack (skip, degrade or embed whole) over the budget scaled to `resolution` buckets."""
+    scale = max_tokens / resolution
+
+    def cost(tokens: int) -> int:
+        return math.ceil(tokens / scale)
+
+    best = [0.0] * (resolution + 1)  # best[c]: highest value using at most c buckets
+    decisions = []
+    for (_, tokens), value, degrade_cost in zip(file_tokens, values, degrade_costs):
+        decision = bytearray(resolution + 1)
+        updated = best[:]
+        options = [(cost(tokens), value, _FULL)]
+        if degrade_cost is not None:
+            options.append((cost(degrade_cost), value * DEGRADED_VALUE, _DEGRADE))
+        for option_cost, option_value, choice in options:
+            for capacity in range(option_cost, resolution + 1):
+                candidate = best[capacity - option_cost] + option_value
+                if candidate > updated[capacity]:
+                    updated[capacity] = candidate
+                    decision[capacity] = choice
+        best = updated
+        decisions.append(decision)
+
+    choices = [_SKIP] * len(file_tokens)
+    capacity = resolution
+    for index in range(len(file_tokens) - 1, -1, -1):
+        choice = decisions[index][capacity]
+        if choice == _FULL:
+            capacity -= cost(file_tokens[index][1])
+        elif choice == _DEGRADE:
+            capacity -= cost(degrade_costs[index])
+        choices[index] = choice
+    return choices
+
+
+def _solve_greedy(
+    file_tokens: Sequence[tuple[str, int]],
+    values: list[float],
+    degrade_costs: list[Optional[int]],
+    max_tokens: int,
+) -> list[int]:
+    """Value-per-token greedy packing for lists too long for the knapsack table."""
+    options = []
+    for index, ((_, tokens), value, degrade_cost) in enumerate(zip(file_tokens, values, degrade_costs)):
+        options.append((value / max(tokens, 1), index, tokens, _FULL))
+        if degrade_cost is not None:
+            options.append((value * DEGRADED_VALUE / degrade_cost, index, degrade_cost, _DEGRADE))
+    options.sort(key=lambda option: (-option[0], option[1]))
+
+    choices = [_SKIP] * len(file_tokens)
+    remaining = max_tokens
+    for _, index, tokens, choice in options:
+        if choices[index] == _SKIP and tokens <= remaining:
+            choices[index] = choice
+            remaining -= tokens
+    return choices
+
+
+def _fill_remaining_budget(
+    file_tokens: Sequence[tuple[str, int]],
+    degrade_costs: list[Optional[int]],
+    choices: list[int],
+    max_tokens: int,
+) -> None:
+    """Uses budget left over by rounding: upgrades files in priority order while they fit."""
+    used = 0
+    for (_, tokens), choice, degrade_cost in zip(file_tokens, choices, degrade_costs):
+        used += tokens if choice == _FULL else degrade_cost if choice == _DEGRADE else 0
+    remaining = max_tokens - used
+
+    for index, ((_, tokens), degrade_cost) in enumerate(zip(file_tokens, degrade_costs)):
+        current = degrade_cost if choices[index] == _DEGRADE else 0
+        if choices[index] != _FULL and tokens - current <= remaining:
+            choices[index] = _FULL
+            remaining -= tokens - current
+        elif choices[index] == _SKIP and degrade_cost is not None and degrade_cost <= remaining:
+            choices[index] = _DEGRADE
+            remaining -= degrade_cost
@@ -40,11 +40,14 @@ multi-turn file handling:
 import json
 import logging
 import os
+import re
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
-from .file_types import BINARY_EXTENSIONS, CODE_EXTENSIONS, IMAGE_EXTENSIONS, TEXT_EXTENSIONS
+from .file_packing import outline_allowance, plan_file_packing
+from .file_types import BINARY_EXTENSIONS, CODE_EXTENSIONS, IMAGE_EXTENSIONS, PROGRAMMING_EXTENSIONS, TEXT_EXTENSIONS
 from .security_config import EXCLUDED_DIRS, is_dangerous_path
+from .telemetry import record, traced
 from .token_utils import DEFAULT_CONTEXT_WINDOW, estimate_tokens
 
 
@@ -80,6 +83,13 @@ def _is_builtin_custom_models_config(path_str: str) -> bool:
 logger = logging.getLogger(__name__)
 
 
+def _count_tokens(text: str, model_context: Optional[Any] = None) -> int:
+    """Count tokens with the model's tokenizer when a ModelContext is available."""
+    if model_context is not None:
+        return model_context.estimate_tokens(text)
+    return estimate_tokens(text)
+
+
 def is_mcp_directory(path: Path) -> bool:
     """
     Check if a directory is the MCP server's own directory.
@@ -323,6 +333,7 @@ def resolve_and_validate_path(path_str: str) -> Path:
     return resolved_path
 
 
+@traced("expand_paths")
 def expand_paths(paths: list[str], extensions: Optional[set[str]] = None) -> list[str]:
     """
     Expand paths to individual files, handling both files and directories.
@@ -418,7 +429,11 @@ def expand_paths(paths: list[str], extensions: Optional[set[str]] = None) -> lis
 
 
 def read_file_content(
-    file_path: str, max_size: int = 1_000_000, *, include_line_numbers: Optional[bool] = None
+    file_path: str,
+    max_size: int = 1_000_000,
+    *,
+    include_line_numbers: Optional[bool] = None,
+    model_context: Optional[Any] = None,
 ) -> tuple[str, int]:
     """
     Read a single file and format it for inclusion in AI prompts.
@@ -431,6 +446,7 @@ def read_file_content(
         file_path: Path to file (must be absolute)
         max_size: Maximum file size to read (default 1MB to prevent memory issues)
         include_line_numbers: Whether to add line numbers. If None, auto-detects based on file type
+        model_context: Optional ModelContext whose tokenizer is used for token counts
 
     Returns:
         Tuple of (formatted_content, estimated_tokens)
@@ -446,7 +462,7 @@ def read_file_content(
         logger.debug(f"[FILES] Path validation failed for {file_path}: {type(e).__name__}: {e}")
         error_msg = str(e)
         content = f"\n--- ERROR ACCESSING FILE: {file_path} ---\nError: {error_msg}\n--- END FILE ---\n"
-        tokens = estimate_tokens(content)
+        tokens = _count_tokens(content, model_context)
         logger.debug(f"[FILES] Returning error content for {file_path}: {tokens} tokens")
         return content, tokens
 
@@ -455,12 +471,12 @@ def read_file_content(
         if not path.exists():
             logger.debug(f"[FILES] File does not exist: {file_path}")
             content = f"\n--- FILE NOT FOUND: {file_path} ---\nError: File does not exist\n--- END FILE ---\n"
-            return content, estimate_tokens(content)
+            return content, _count_tokens(content, model_context)
 
         if not path.is_file():
             logger.debug(f"[FILES] Path is not a file: {file_path}")
             content = f"\n--- NOT A FILE: {file_path} ---\nError: Path is not a file\n--- END FILE ---\n"
-            return content, estimate_tokens(content)
+            return content, _count_tokens(content, model_context)
 
         # Check file size to prevent memory exhaustion
         file_size = path.stat().st_size
@@ -468,7 +484,7 @@ def read_file_content(
         if file_size > max_size:
             logger.debug(f"[FILES] File too large: {file_path} ({file_size:,} > {max_size:,} bytes)")
             content = f"\n--- FILE TOO LARGE: {file_path} ---\nFile size: {file_size:,} bytes (max: {max_size:,})\n--- END FILE ---\n"
-            return content, estimate_tokens(content)
+            return content, _count_tokens(content, model_context)
 
         # Determine if we should add line numbers
         add_line_numbers = should_add_line_numbers(file_path, include_line_numbers)
@@ -496,18 +512,124 @@ def read_file_content(
         # ("--- BEGIN DIFF: ... ---") to allow AI to distinguish between complete file content
         # vs. partial diff content when files appear in both sections
         formatted = f"\n--- BEGIN FILE: {file_path} ---\n{file_content}\n--- END FILE: {file_path} ---\n"
-        tokens = estimate_tokens(formatted)
+        tokens = _count_tokens(formatted, model_context)
         logger.debug(f"[FILES] Formatted content for {file_path}: {len(formatted)} chars, {tokens} tokens")
+        record(files_read=1, file_tokens=tokens)
         return formatted, tokens
 
     except Exception as e:
         logger.debug(f"[FILES] Exception reading file {file_path}: {type(e).__name__}: {e}")
         content = f"\n--- ERROR READING FILE: {file_path} ---\nError: {str(e)}\n--- END FILE ---\n"
-        tokens = estimate_tokens(content)
+        tokens = _count_tokens(content, model_context)
         logger.debug(f"[FILES] Returning error content for {file_path}: {tokens} tokens")
         return content, tokens
 
 
+# Lines kept in the outline of a source file: definitions, declarations and imports
+_OUTLINE_PATTERN = re.compile(
+    r"^\s*(?:(?:export|default|async|static|abstract|pub(?:\([^)]*\))?)\s+)*"
+    r"(?:def|class|function|interface|struct|enum|trait|impl|fn|func|type|module|namespace|package|import|from|"
+    r"#include|using|public|private|protected|internal)\b"
+)
+_MARKDOWN_HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+# Bytes scanned when outlining a file too large to embed
+OUTLINE_MAX_FILE_SIZE = 10 * 1024 * 1024
+
+
+def read_file_outline(
+    file_path: str,
+    max_tokens: int,
+    *,
+    include_line_numbers: Optional[bool] = None,
+    model_context: Optional[Any] = None,
+) -> tuple[str, int]:
+    """
+    Read a condensed view of a file that is too large to embed whole.
+
+    Source files are reduced to an outline of their definitions, declarations
+    and imports (markdown to its headings), each with its line number so the
+    model can ask for the surrounding code. Other files, and source files
+    without recognizable definitions, are cut to an excerpt of their first
+    lines. Either view is trimmed to fit max_tokens.
+
+    Args:
+        file_path: Path to file (must be absolute)
+        max_tokens: Token allowance for the formatted outline or excerpt
+        include_line_numbers: Whether to number excerpt lines. If None, auto-detects based on file type
+        model_context: Optional ModelContext whose tokenizer is used for token counts
+
+    Returns:
+        Tuple of (formatted_content, estimated_tokens); errors are formatted as in read_file_content
+    """
+    try:
+        path = resolve_and_validate_path(file_path)
+        if not path.is_file():
+            return read_file_content(file_path, model_context=model_context)
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = _normalize_line_endings(f.read(OUTLINE_MAX_FILE_SIZE))
+    except Exception:
+        # read_file_content reports the problem in its usual format
+        return read_file_content(file_path, model_context=model_context)
+
+    lines = text.split("\n")
+    width = max(4, len(str(len(lines))))
+    extension = path.suffix.lower()
+    if extension in PROGRAMMING_EXTENSIONS:
+        pattern = _OUTLINE_PATTERN
+    elif extension in (".md", ".markdown"):
+        pattern = _MARKDOWN_HEADING_PATTERN
+    else:
+        pattern = None
+
+    outline = [f"{i + 1:{width}d}│ {line}" for i, line in enumerate(lines) if pattern and pattern.match(line)]
+    if outline:
+        kind, view = "OUTLINE", outline
+        description = "definitions and imports only"
+    else:
+        kind = "EXCERPT"
+        if should_add_line_numbers(file_path, include_line_numbers):
+            view = [f"{i + 1:{width}d}│ {line}" for i, line in enumerate(lines)]
+        else:
+            view = lines
+        description = "first lines only"
+
+    estimated_total = estimate_file_tokens(file_path)
+
+    def format_view(shown: int) -> str:
+        return (
+            f"\n--- BEGIN FILE {kind}: {file_path} ---\n"
+            f"[{kind.title()} of a file too large for the token budget (~{estimated_total:,} tokens, "
+            f"{len(lines):,} lines): {description}, {shown:,} of {len(view):,} lines shown]\n"
+            + "\n".join(view[:shown])
+            + f"\n--- END FILE {kind}: {file_path} ---\n"
+        )
+
+    # Largest prefix of the view that fits the allowance; no tokenizer packs more than ~10 characters
+    # per token, so longer prefixes are not tokenized at all
+    low, high, characters = 0, 0, 0
+    while high < len(view) and characters <= max_tokens * 10:
+        characters += len(view[high]) + 1
+        high += 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _count_tokens(format_view(middle), model_context) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+
+    if low == 0:
+        # Nothing fits (e.g. one enormous line); the caller gets the whole file or its size notice instead
+        return read_file_content(file_path, model_context=model_context)
+
+    formatted = format_view(low)
+    tokens = _count_tokens(formatted, model_context)
+    logger.debug(f"[FILES] {kind.title()} of {file_path}: {low} of {len(view)} lines, {tokens} tokens")
+    record(files_read=1, files_degraded=1, file_tokens=tokens)
+    return formatted, tokens
+
+
+@traced("read_files")
 def read_files(
     file_paths: list[str],
     code: Optional[str] = None,
@@ -515,21 +637,28 @@ def read_files(
     reserve_tokens: int = 50_000,
     *,
     include_line_numbers: bool = False,
+    model_context: Optional[Any] = None,
+    relevant_files: Optional[list[str]] = None,
 ) -> str:
     """
     Read multiple files and optional direct code with smart token management.
 
     This function implements intelligent token budgeting to maximize the amount
     of relevant content that can be included in an AI prompt while staying
-    within token limits. It prioritizes direct code and reads files until
-    the token budget is exhausted.
+    within token limits. It prioritizes direct code, then packs files into the
+    remaining budget (utils/file_packing.py): when not all files fit, earlier
+    files and relevant_files are preferred, many small files are not crowded
+    out by one large one, and files too large to embed are shown as an outline
+    or excerpt instead of being dropped.
 
     Args:
-        file_paths: List of file or directory paths (absolute paths required)
+        file_paths: List of file or directory paths (absolute paths required), most important first
         code: Optional direct code to include (prioritized over files)
         max_tokens: Maximum tokens to use (defaults to DEFAULT_CONTEXT_WINDOW)
         reserve_tokens: Tokens to reserve for prompt and response (default 50K)
         include_line_numbers: Whether to add line numbers to file content
+        model_context: Optional ModelContext whose tokenizer is used for budgeting
+        relevant_files: Files or directories the request marked as relevant; preferred when packing
 
     Returns:
         str: All file contents formatted for AI consumption
@@ -552,7 +681,7 @@ def read_files(
     # Direct code is prioritized because it's explicitly provided by the user
     if code:
         formatted_code = f"\n--- BEGIN DIRECT CODE ---\n{code}\n--- END DIRECT CODE ---\n"
-        code_tokens = estimate_tokens(formatted_code)
+        code_tokens = _count_tokens(formatted_code, model_context)
 
         if code_tokens <= available_tokens:
             content_parts.append(formatted_code)
@@ -571,28 +700,48 @@ def read_files(
             logger.debug("[FILES] No files found from provided paths")
             content_parts.append(f"\n--- NO FILES FOUND ---\nProvided paths: {', '.join(file_paths)}\n--- END ---\n")
         else:
-            # Read files sequentially until token limit is reached
-            logger.debug(f"[FILES] Reading {len(all_files)} files with token budget {available_tokens:,}")
-            for i, file_path in enumerate(all_files):
-                if total_tokens >= available_tokens:
-                    logger.debug(f"[FILES] Token budget exhausted, skipping remaining {len(all_files) - i} files")
-                    files_skipped.extend(all_files[i:])
-                    break
-
-                file_content, file_tokens = read_file_content(file_path, include_line_numbers=include_line_numbers)
-                logger.debug(f"[FILES] File {file_path}: {file_tokens:,} tokens")
-
-                # Check if adding this file would exceed limit
-                if total_tokens + file_tokens <= available_tokens:
-                    content_parts.append(file_content)
-                    total_tokens += file_tokens
-                    logger.debug(f"[FILES] Added file {file_path}, total tokens: {total_tokens:,}")
-                else:
-                    # File too large for remaining budget
-                    logger.debug(
-                        f"[FILES] File {file_path} too large for remaining budget ({file_tokens:,} tokens, {available_tokens - total_tokens:,} remaining)"
+            # Plan with the size estimates, then read only the planned files
+            logger.debug(f"[FILES] Packing {len(all_files)} files into token budget {available_tokens:,}")
+            relevant = set(expand_paths(relevant_files)) if relevant_files else None
+            plan = plan_file_packing(
+                [(file_path, estimate_file_tokens(file_path)) for file_path in all_files],
+                available_tokens,
+                relevant_files=relevant,
+            )
+            files_skipped.extend(plan.skipped)
+
+            remaining_tokens = available_tokens
+            for file_path in plan.files:
+                allowance = plan.degraded.get(file_path)
+                if allowance is None:
+                    file_content, file_tokens = read_file_content(
+                        file_path, include_line_numbers=include_line_numbers, model_context=model_context
                     )
-                    files_skipped.append(file_path)
+                    logger.debug(f"[FILES] File {file_path}: {file_tokens:,} tokens")
+                    if file_tokens > remaining_tokens:
+                        # The estimate was low (e.g. line numbers); fall back to an outline if one still fits
+                        logger.debug(
+                            f"[FILES] File {file_path} too large for remaining budget ({file_tokens:,} tokens, {remaining_tokens:,} remaining)"
+                        )
+                        allowance = outline_allowance(remaining_tokens)
+                        if not allowance:
+                            files_skipped.append(file_path)
+                            continue
+                if allowance is not None:
+                    file_content, file_tokens = read_file_outline(
+                        file_path,
+                        min(allowance, remaining_tokens),
+                        include_line_numbers=include_line_numbers,
+                        model_context=model_context,
+                    )
+                    if file_tokens > remaining_tokens:
+                        files_skipped.append(file_path)
+                        continue
+
+                content_parts.append(file_content)
+                total_tokens += file_tokens
+                remaining_tokens -= file_tokens
+                logger.debug(f"[FILES] Added file {file_path}, total tokens: {total_tokens:,}")
 
     # Add informative note about skipped files to help users understand
     # what was omitted and why
@@ -32,6 +32,7 @@ from typing import Any, Optional
 
 from config import DEFAULT_MODEL
 from providers import ModelCapabilities, ModelProviderRegistry
+from utils.token_utils import estimate_tokens, get_calibration_factor, get_tokenizer
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +67,7 @@ class ModelContext:
         self._provider = None
         self._capabilities = None
         self._token_allocation = None
+        self._provider_key = None
 
     @property
     def provider(self):
@@ -155,14 +157,33 @@ class ModelContext:
 
     def estimate_tokens(self, text: str) -> int:
         """
-        Estimate token count for text using model-specific tokenizer.
+        Estimate token count for text using the model's tokenizer.
 
-        For now, uses simple estimation. Can be enhanced with model-specific
-        tokenizers (tiktoken for OpenAI, etc.) in the future.
+        Uses the shared tokenizer layer in utils.token_utils (cached encoders,
+        heuristic fallback) with the calibration factor of this model's provider.
         """
-        # TODO: Integrate model-specific tokenizers
-        # For now, use conservative estimation
-        return len(text) // 3  # Conservative estimate
+        return estimate_tokens(text, model_name=self.model_name, provider=self._get_provider_key())
+
+    @property
+    def tokenizer_key(self) -> tuple[str, float]:
+        """
+        Identity of the token counter used by this context.
+
+        Two contexts with the same key produce identical token counts, which lets
+        callers (e.g. conversation history assembly) reuse cached counts.
+        """
+        provider = self._get_provider_key()
+        return get_tokenizer(self.model_name).name, get_calibration_factor(provider)
+
+    def _get_provider_key(self) -> Optional[str]:
+        """Provider type value used for tokenizer calibration, resolved once."""
+        if self._provider_key is None:
+            try:
+                self._provider_key = self.capabilities.provider.value
+            except Exception:
+                # Unknown/unavailable model - count without provider calibration
+                self._provider_key = ""
+        return self._provider_key or None
 
     @classmethod
     def from_arguments(cls, arguments: dict[str, Any]) -> "ModelContext":
@@ -0,0 +1,204 @@
+"""
+Streaming model calls with MCP progress notifications.
+
+Long expert analyses (thinkdeep, codereview, ...) can take minutes. When the MCP
+client asks for progress (it sends a progressToken with tools/call), server.py
+opens a progress_reporting() scope around the tool execution. Model calls made
+through generate_with_progress() then use the provider's streaming API
+(ModelProvider.generate_content_stream) in a worker thread, so the event loop
+stays free to send progress notifications while chunks arrive.
+
+If the client cancels the request or disconnects, the awaiting task is
+cancelled; the cancel event stops the worker at the next chunk and the
+provider closes its HTTP stream instead of generating an answer nobody reads.
+
+Without a progressToken, model calls make a single generate_content() call, also
+in a worker thread: the provider's rate limiter and retry backoff
+(providers/rate_limiter.py) sleep in that thread, so a throttled call does not
+stall every other in-flight tool call.
+
+generate_with_progress() is also where a tool's model call fails over: if the
+call fails while the provider's circuit breaker for the model is open
+(providers/rate_limiter.py), it is retried once on the next provider that
+serves the model, and where the opt-in response cache (providers/response_cache.py)
+answers repeated deterministic requests without calling the provider. With
+telemetry enabled (utils/telemetry.py), the call is timed as the tool call's
+provider_call stage along with its estimated and billed tokens.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from providers.base import GenerationCancelledError
+from providers.response_cache import get_response_cache, make_cache_key
+from utils import telemetry
+from utils.token_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two progress notifications of one request
+PROGRESS_NOTIFICATION_INTERVAL = float(os.getenv("PROGRESS_NOTIFICATION_INTERVAL", "1.0"))
+
+_progress_reporter: ContextVar[Optional["ProgressReporter"]] = ContextVar("progress_reporter", default=None)
+
+
+class ProgressReporter:
+    """Turns streamed chunks into throttled MCP progress notifications for one request."""
+
+    def __init__(
+        self,
+        session: Any,
+        progress_token: Any,
+        loop: asyncio.AbstractEventLoop,
+        interval: float = PROGRESS_NOTIFICATION_INTERVAL,
+    ):
+        self.session = session
+        self.progress_token = progress_token
+        self.loop = loop
+        self.interval = interval
+        self.characters = 0
+        self._last_sent = 0.0
+        self._lock = threading.Lock()
+
+    def on_chunk(self, text: str) -> None:
+        """Chunk callback; runs in the provider's worker thread."""
+        with self._lock:
+            self.characters += len(text)
+            now = time.monotonic()
+            if now - self._last_sent < self.interval:
+                return
+            self._last_sent = now
+            characters = self.characters
+        self._send(characters, f"Received {characters:,} characters from the model")
+
+    def _send(self, progress: float, message: str) -> None:
+        coroutine = self.session.send_progress_notification(self.progress_token, progress, message=message)
+        try:
+            asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        except RuntimeError:
+            # Event loop already closed (server shutting down)
+            coroutine.close()
+
+
+@contextmanager
+def progress_reporting(session: Any, progress_token: Any) -> Iterator[None]:
+    """Streams model calls in the enclosed block and reports progress to the client.
+
+    Does nothing when the client did not send a progress token.
+    """
+    if progress_token is None or session is None:
+        yield
+        return
+    token = _progress_reporter.set(ProgressReporter(session, progress_token, asyncio.get_running_loop()))
+    try:
+        yield
+    finally:
+        _progress_reporter.reset(token)
+
+
+async def generate_with_progress(provider, **kwargs):
+    """Calls provider.generate_content(**kwargs), streamed when progress is being reported.
+
+    Fails over to another provider for the same model when this provider's circuit is open.
+
+    Returns:
+        ModelResponse from the provider
+    """
+    with telemetry.span("provider_call"):
+        if telemetry.is_tracing():
+            prompt_text = (kwargs.get("system_prompt") or "") + (kwargs.get("prompt") or "")
+            telemetry.record(provider_calls=1, tokens_estimated=estimate_tokens(prompt_text))
+        try:
+            response = await _generate(provider, **kwargs)
+        except GenerationCancelledError:
+            raise
+        except Exception as e:
+            fallback = _failover_provider(provider, kwargs.get("model_name"))
+            if fallback is None:
+                raise
+            logger.warning(
+                f"{provider.get_provider_type().value} unavailable for {kwargs.get('model_name')} ({e}); "
+                f"failing over to {fallback.get_provider_type().value}"
+            )
+            response = await _generate(fallback, **kwargs)
+
+    if telemetry.is_tracing():
+        _record_usage(response)
+    return response
+
+
+def _record_usage(response) -> None:
+    """Adds the tokens billed for a model call to the current tool call's telemetry."""
+    usage = getattr(response, "usage", None) or {}
+    if getattr(response, "metadata", {}).get("cache_hit"):
+        telemetry.record(cache_hits=1)
+    else:
+        telemetry.record(tokens_input=usage.get("input_tokens", 0), tokens_output=usage.get("output_tokens", 0))
+    provider_type = getattr(response, "provider", None)
+    telemetry.annotate(
+        model=getattr(response, "model_name", None), provider=getattr(provider_type, "value", provider_type)
+    )
+
+
+def _failover_provider(provider, model_name: Optional[str]):
+    """Next provider serving model_name if provider's circuit breaker for it is open, else None."""
+    from providers.registry import ModelProviderRegistry
+
+    if not model_name or not ModelProviderRegistry._is_circuit_open(provider, model_name):
+        return None
+    fallback = ModelProviderRegistry.get_provider_for_model(model_name)
+    if fallback is None or fallback is provider:
+        return None
+    return fallback
+
+
+async def _generate(provider, **kwargs):
+    """One provider call, answered from the response cache when it is enabled and the request is deterministic."""
+    cache = get_response_cache()
+    if cache is None:
+        return await _call_provider(provider, **kwargs)
+
+    if not cache.is_cacheable(provider, kwargs.get("model_name"), kwargs.get("temperature")):
+        cache.record_skip()
+        return await _call_provider(provider, **kwargs)
+
+    cache_key = make_cache_key(provider, **kwargs)
+    response = cache.get(cache_key)
+    if response is not None:
+        logger.info(f"Response cache hit for {kwargs.get('model_name')}")
+        return response
+
+    response = await _call_provider(provider, **kwargs)
+    cache.put(cache_key, response)
+    return response
+
+
+async def _call_provider(provider, **kwargs):
+    reporter = _progress_reporter.get()
+    if reporter is None:
+        # Off the event loop, so concurrent tool calls are not serialized behind a blocking HTTP request
+        # or the rate limiter's backoff sleeps
+        return await asyncio.to_thread(provider.generate_content, **kwargs)
+
+    cancel_event = threading.Event()
+    try:
+        response = await asyncio.to_thread(
+            provider.generate_content_stream, on_chunk=reporter.on_chunk, cancel_event=cancel_event, **kwargs
+        )
+    except asyncio.CancelledError:
+        # Stop the worker thread at its next chunk
+        cancel_event.set()
+        logger.info(f"Cancelled streaming call to {kwargs.get('model_name')}")
+        raise
+
+    ttft = response.metadata.get("time_to_first_token")
+    if ttft is not None:
+        logger.info(f"Model {kwargs.get('model_name')} time to first token: {ttft:.2f}s")
+    return response
@@ -1,100 +1,464 @@
 """
-In-memory storage backend for conversation threads
+Storage backends for conversation threads
 
-This module provides a thread-safe, in-memory alternative to Redis for storing
-conversation contexts. It's designed for ephemeral MCP server sessions where
-conversations only need to persist during a single Claude session.
+This module provides the key/value storage used for conversation contexts.
+All backends expose the same small Redis-style interface (get/setex with TTL,
+plus append for growing a stored value in place) so conversation_memory does
+not care where threads live.
 
-⚠️  PROCESS-SPECIFIC STORAGE: This storage is confined to a single Python process.
+Backends (selected with the CONVERSATION_STORAGE environment variable):
+- "memory" (default): thread-safe in-memory LRU store with a byte budget,
+  confined to one process
+- "sqlite": embedded SQLite database (WAL mode, TTL index, batched expiry).
+  Threads survive server restarts and are shared by every MCP server process
+  that points at the same CONVERSATION_STORAGE_PATH.
+- "redis": any Redis-protocol server at REDIS_URL (Redis, Valkey, KeyDB or a
+  local stand-in). Requires the optional `redis` package.
+
+⚠️  PROCESS-SPECIFIC STORAGE: The in-memory backend is confined to a single Python process.
     Data stored in one process is NOT accessible from other processes or subprocesses.
     This is why simulator tests that run server.py as separate subprocesses cannot
-    share conversation state between tool calls.
+    share conversation state between tool calls unless a shared backend is configured.
 
 Key Features:
 - Thread-safe operations using locks
-- TTL support with automatic expiration
+- TTL support with automatic expiration (heap-ordered, no full scans)
+- Byte-budgeted in-memory store with LRU eviction and metrics
 - Background cleanup thread for memory management
 - Singleton pattern for consistent state within a single process
-- Drop-in replacement for Redis storage (for single-process scenarios)
+- Graceful fallback to in-memory storage if a configured backend is unavailable
 """
 
+import heapq
 import logging
 import os
+import sqlite3
+import sys
 import threading
 import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SQLITE_PATH = os.path.join(os.path.expanduser("~"), ".zen-mcp-server", "conversations.db")
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+
+
+def _get_cleanup_interval() -> tuple[int, int]:
+    """
+    Get (timeout_hours, cleanup_interval_seconds) for expiry sweeps.
+
+    Matches Redis behavior: cleanup runs at 1/10th of the conversation timeout
+    (e.g., 18 mins for a 3 hour timeout), and at least every 5 minutes.
+    """
+    timeout_hours = int(os.getenv("CONVERSATION_TIMEOUT_HOURS", "3"))
+    cleanup_interval = (timeout_hours * 3600) // 10
+    return timeout_hours, max(300, cleanup_interval)  # Minimum 5 minutes
 
-class InMemoryStorage:
-    """Thread-safe in-memory storage for conversation threads"""
 
-    def __init__(self):
-        self._store: dict[str, tuple[str, float]] = {}
+class StorageBackend(ABC):
+    """Interface for conversation thread storage"""
+
+    @abstractmethod
+    def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> None:
+        """Store value with expiration time"""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Retrieve value if not expired"""
+        pass
+
+    def setex(self, key: str, ttl_seconds: int, value: str) -> None:
+        """Redis-compatible setex method"""
+        self.set_with_ttl(key, ttl_seconds, value)
+
+    def append(self, key: str, ttl_seconds: int, value: str) -> bool:
+        """
+        Append value to an existing, unexpired key and refresh its TTL.
+
+        Backends override this with a native append so the stored value is not
+        read back and rewritten. This fallback is not atomic.
+
+        Returns:
+            bool: True if the key existed and was extended, False otherwise
+        """
+        current = self.get(key)
+        if current is None:
+            return False
+        self.set_with_ttl(key, ttl_seconds, current + value)
+        return True
+
+    def shutdown(self) -> None:  # noqa: B027 - optional hook, backends without resources need not override it
+        """Release resources held by the backend (background threads, connections)"""
+        return None
+
+
+class InMemoryStorage(StorageBackend):
+    """
+    Thread-safe, memory-bounded in-memory storage for conversation threads
+
+    Entries are kept in LRU order and their sizes are accounted in bytes. When a
+    write pushes the store over its byte budget (CONVERSATION_STORAGE_MAX_MB,
+    default 512MB) the least recently used threads are evicted. Expiry times are
+    tracked in a min-heap, so expiring entries costs O(log n) per entry instead
+    of scanning the whole store while holding the lock.
+    """
+
+    DEFAULT_MAX_MB = 512
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self._store: OrderedDict[str, tuple[str, float, int]] = OrderedDict()
+        # (expires_at, key) - may contain stale entries for keys that were rewritten
+        self._expiry_heap: list[tuple[float, str]] = []
         self._lock = threading.Lock()
-        # Match Redis behavior: cleanup interval based on conversation timeout
-        # Run cleanup at 1/10th of timeout interval (e.g., 18 mins for 3 hour timeout)
-        timeout_hours = int(os.getenv("CONVERSATION_TIMEOUT_HOURS", "3"))
-        self._cleanup_interval = (timeout_hours * 3600) // 10
-        self._cleanup_interval = max(300, self._cleanup_interval)  # Minimum 5 minutes
-        self._shutdown = False
+        self._max_bytes = max_bytes if max_bytes is not None else self._get_max_bytes_from_env()
+        self._total_bytes = 0
+        self._evictions = 0
+        self._expirations = 0
+        timeout_hours, self._cleanup_interval = _get_cleanup_interval()
+        self._shutdown = threading.Event()
 
         # Start background cleanup thread
         self._cleanup_thread = threading.Thread(target=self._cleanup_worker, daemon=True)
         self._cleanup_thread.start()
 
         logger.info(
-            f"In-memory storage initialized with {timeout_hours}h timeout, cleanup every {self._cleanup_interval//60}m"
+            f"In-memory storage initialized with {timeout_hours}h timeout, cleanup every {self._cleanup_interval//60}m, "
+            f"budget {self._max_bytes // (1024 * 1024)}MB"
         )
 
+    @classmethod
+    def _get_max_bytes_from_env(cls) -> int:
+        """Read the byte budget from CONVERSATION_STORAGE_MAX_MB"""
+        try:
+            max_mb = float(os.getenv("CONVERSATION_STORAGE_MAX_MB", str(cls.DEFAULT_MAX_MB)))
+            if max_mb <= 0:
+                raise ValueError
+        except ValueError:
+            logger.warning(
+                f"Invalid CONVERSATION_STORAGE_MAX_MB value ('{os.getenv('CONVERSATION_STORAGE_MAX_MB')}'), "
+                f"using default of {cls.DEFAULT_MAX_MB}MB"
+            )
+            max_mb = cls.DEFAULT_MAX_MB
+        return int(max_mb * 1024 * 1024)
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        """Approximate memory held by an entry (O(1), uses the str object sizes)"""
+        return sys.getsizeof(key) + sys.getsizeof(value)
+
     def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> None:
         """Store value with expiration time"""
         with self._lock:
-            expires_at = time.time() + ttl_seconds
-            self._store[key] = (value, expires_at)
+            now = time.time()
+            expires_at = now + ttl_seconds
+            size = self._entry_size(key, value)
+
+            self._remove_locked(key)
+            self._store[key] = (value, expires_at, size)
+            self._total_bytes += size
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+
+            self._expire_locked(now)
+            self._evict_locked(keep=key)
+            self._compact_heap_locked()
             logger.debug(f"Stored key {key} with TTL {ttl_seconds}s")
 
+    def append(self, key: str, ttl_seconds: int, value: str) -> bool:
+        """Append value to an existing, unexpired key and refresh its TTL"""
+        with self._lock:
+            now = time.time()
+            entry = self._store.get(key)
+            if entry is None or entry[1] <= now:
+                return False
+
+            expires_at = now + ttl_seconds
+            new_value = entry[0] + value
+            size = self._entry_size(key, new_value)
+            self._total_bytes += size - entry[2]
+            self._store[key] = (new_value, expires_at, size)
+            self._store.move_to_end(key)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+
+            self._expire_locked(now)
+            self._evict_locked(keep=key)
+            self._compact_heap_locked()
+            logger.debug(f"Appended to key {key} with TTL {ttl_seconds}s")
+            return True
+
     def get(self, key: str) -> Optional[str]:
         """Retrieve value if not expired"""
         with self._lock:
-            if key in self._store:
-                value, expires_at = self._store[key]
+            entry = self._store.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
                 if time.time() < expires_at:
+                    self._store.move_to_end(key)  # Mark as most recently used
                     logger.debug(f"Retrieved key {key}")
                     return value
                 else:
                     # Clean up expired entry
-                    del self._store[key]
+                    self._remove_locked(key)
+                    self._expirations += 1
                     logger.debug(f"Key {key} expired and removed")
         return None
 
-    def setex(self, key: str, ttl_seconds: int, value: str) -> None:
-        """Redis-compatible setex method"""
-        self.set_with_ttl(key, ttl_seconds, value)
+    def get_stats(self) -> dict[str, int]:
+        """Get storage metrics (entry count, bytes used, budget, evictions, expirations)"""
+        with self._lock:
+            return {
+                "entries": len(self._store),
+                "bytes": self._total_bytes,
+                "max_bytes": self._max_bytes,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def _remove_locked(self, key: str) -> None:
+        """Remove an entry and its size accounting (heap entry becomes stale). Caller holds the lock."""
+        entry = self._store.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def _expire_locked(self, now: float) -> int:
+        """Pop expired entries off the expiry heap. Caller holds the lock."""
+        expired = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._store.get(key)
+            # Skip stale heap entries for keys that were rewritten with a new TTL
+            if entry is not None and entry[1] == expires_at:
+                self._remove_locked(key)
+                expired += 1
+        self._expirations += expired
+        return expired
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        """Evict least recently used entries until within the byte budget. Caller holds the lock."""
+        while self._total_bytes > self._max_bytes and len(self._store) > 1:
+            key = next(iter(self._store))
+            if key == keep:
+                # Never evict the entry being written, even if it alone exceeds the budget
+                self._store.move_to_end(key)
+                key = next(iter(self._store))
+            self._remove_locked(key)
+            self._evictions += 1
+            logger.debug(f"Evicted least recently used key {key} (storage over {self._max_bytes:,} bytes)")
+
+    def _compact_heap_locked(self) -> None:
+        """Rebuild the expiry heap when stale entries dominate it. Caller holds the lock."""
+        if len(self._expiry_heap) > 2 * len(self._store) + 64:
+            self._expiry_heap = [(expires_at, key) for key, (_, expires_at, _) in self._store.items()]
+            heapq.heapify(self._expiry_heap)
 
     def _cleanup_worker(self):
         """Background thread that periodically cleans up expired entries"""
-        while not self._shutdown:
-            time.sleep(self._cleanup_interval)
+        while not self._shutdown.wait(self._cleanup_interval):
             self._cleanup_expired()
 
     def _cleanup_expired(self):
         """Remove all expired entries"""
         with self._lock:
-            current_time = time.time()
-            expired_keys = [k for k, (_, exp) in self._store.items() if exp < current_time]
-            for key in expired_keys:
-                del self._store[key]
+            expired = self._expire_locked(time.time())
 
-            if expired_keys:
-                logger.debug(f"Cleaned up {len(expired_keys)} expired conversation threads")
+        if expired:
+            logger.debug(f"Cleaned up {expired} expired conversation threads")
 
     def shutdown(self):
         """Graceful shutdown of background thread"""
-        self._shutdown = True
+        self._shutdown.set()
+        if self._cleanup_thread.is_alive():
+            self._cleanup_thread.join(timeout=1)
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    Persistent conversation storage in an embedded SQLite database.
+
+    Uses WAL journaling so several MCP server processes can read while one
+    writes, an index on the expiry column so expired rows are found without a
+    table scan, and batched deletes so cleanup never holds the write lock for
+    long.
+    """
+
+    CLEANUP_BATCH_SIZE = 500
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self._path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        # One connection shared by the threads of this process (guarded by _lock);
+        # other processes open their own connections to the same file
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_store ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_conversation_store_expires ON conversation_store (expires_at)"
+        )
+
+        timeout_hours, self._cleanup_interval = _get_cleanup_interval()
+        self._shutdown = threading.Event()
+        self._cleanup_thread = threading.Thread(target=self._cleanup_worker, daemon=True)
+        self._cleanup_thread.start()
+
+        logger.info(
+            f"SQLite conversation storage initialized at {path} with {timeout_hours}h timeout, "
+            f"cleanup every {self._cleanup_interval//60}m"
+        )
+
+    def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> None:
+        """Store value with expiration time"""
+        expires_at = time.time() + ttl_seconds
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conversation_store (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, value, expires_at),
+            )
+        logger.debug(f"Stored key {key} with TTL {ttl_seconds}s")
+
+    def append(self, key: str, ttl_seconds: int, value: str) -> bool:
+        """Append value to an existing, unexpired key and refresh its TTL"""
+        now = time.time()
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE conversation_store SET value = value || ?, expires_at = ? WHERE key = ? AND expires_at > ?",
+                (value, now + ttl_seconds, key, now),
+            ).rowcount
+        if updated:
+            logger.debug(f"Appended to key {key} with TTL {ttl_seconds}s")
+        return bool(updated)
+
+    def get(self, key: str) -> Optional[str]:
+        """Retrieve value if not expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM conversation_store WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        logger.debug(f"Retrieved key {key}")
+        return row[0]
+
+    def _cleanup_worker(self):
+        """Background thread that periodically cleans up expired entries"""
+        while not self._shutdown.wait(self._cleanup_interval):
+            try:
+                self._cleanup_expired()
+            except sqlite3.Error as e:
+                logger.warning(f"SQLite conversation cleanup failed: {e}")
+
+    def _cleanup_expired(self) -> int:
+        """Delete expired rows in small batches, releasing the lock between batches"""
+        total_deleted = 0
+        current_time = time.time()
+        while True:
+            with self._lock:
+                deleted = self._conn.execute(
+                    "DELETE FROM conversation_store WHERE rowid IN ("
+                    "SELECT rowid FROM conversation_store WHERE expires_at <= ? LIMIT ?)",
+                    (current_time, self.CLEANUP_BATCH_SIZE),
+                ).rowcount
+            total_deleted += deleted
+            if deleted < self.CLEANUP_BATCH_SIZE:
+                break
+
+        if total_deleted:
+            logger.debug(f"Cleaned up {total_deleted} expired conversation threads")
+        return total_deleted
+
+    def shutdown(self):
+        """Stop the cleanup thread and close the database connection"""
+        self._shutdown.set()
         if self._cleanup_thread.is_alive():
             self._cleanup_thread.join(timeout=1)
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStorage(StorageBackend):
+    """
+    Conversation storage on any Redis-protocol server.
+
+    Expiry is delegated to the server (SETEX), so no cleanup thread is needed.
+    """
+
+    # APPEND would create a missing key, so the existence check and the TTL
+    # refresh run in the same server-side script
+    _APPEND_SCRIPT = (
+        "if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end "
+        "redis.call('APPEND', KEYS[1], ARGV[1]) "
+        "redis.call('EXPIRE', KEYS[1], ARGV[2]) "
+        "return 1"
+    )
+
+    def __init__(self, url: str = DEFAULT_REDIS_URL):
+        import redis  # Optional dependency - only required for this backend
+
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._client.ping()
+        self._append = self._client.register_script(self._APPEND_SCRIPT)
+        logger.info(f"Redis conversation storage initialized at {url}")
+
+    def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> None:
+        """Store value with expiration time"""
+        self._client.setex(key, ttl_seconds, value)
+        logger.debug(f"Stored key {key} with TTL {ttl_seconds}s")
+
+    def append(self, key: str, ttl_seconds: int, value: str) -> bool:
+        """Append value to an existing, unexpired key and refresh its TTL"""
+        return bool(self._append(keys=[key], args=[value, ttl_seconds]))
+
+    def get(self, key: str) -> Optional[str]:
+        """Retrieve value if not expired"""
+        return self._client.get(key)
+
+    def shutdown(self):
+        """Close the connection pool"""
+        self._client.close()
+
+
+def create_storage_backend(backend: Optional[str] = None) -> StorageBackend:
+    """
+    Create a storage backend by name.
+
+    Args:
+        backend: "memory", "sqlite" or "redis"; defaults to CONVERSATION_STORAGE
+
+    Returns:
+        StorageBackend: The requested backend, or InMemoryStorage if it cannot be initialized
+    """
+    backend = (backend or os.getenv("CONVERSATION_STORAGE", "memory")).strip().lower()
+
+    try:
+        if backend == "sqlite":
+            return SQLiteStorage(os.path.expanduser(os.getenv("CONVERSATION_STORAGE_PATH") or DEFAULT_SQLITE_PATH))
+        if backend == "redis":
+            return RedisStorage(os.getenv("REDIS_URL") or DEFAULT_REDIS_URL)
+        if backend not in ("memory", ""):
+            logger.warning(f"Unknown CONVERSATION_STORAGE '{backend}', using in-memory storage")
+    except ImportError:
+        logger.warning(
+            f"CONVERSATION_STORAGE={backend} requires the '{backend}' package, falling back to in-memory storage"
+        )
+    except Exception as e:
+        logger.warning(
+            f"Could not initialize {backend} conversation storage ({type(e).__name__}: {e}), "
+            "falling back to in-memory storage"
+        )
+
+    return InMemoryStorage()
 
 
 # Global singleton instance
@@ -102,12 +466,12 @@ _storage_instance = None
 _storage_lock = threading.Lock()
 
 
-def get_storage_backend() -> InMemoryStorage:
+def get_storage_backend() -> StorageBackend:
     """Get the global storage instance (singleton pattern)"""
     global _storage_instance
     if _storage_instance is None:
         with _storage_lock:
             if _storage_instance is None:
-                _storage_instance = InMemoryStorage()
-                logger.info("Initialized in-memory conversation storage")
+                _storage_instance = create_storage_backend()
+                logger.info(f"Initialized {type(_storage_instance).__name__} conversation storage")
     return _storage_instance
@@ -0,0 +1,350 @@
+"""
+Per-stage latency telemetry for MCP tool calls.
+
+A slow tool call can spend its time rebuilding the conversation thread,
+expanding and reading files, assembling the prompt or waiting for the model,
+and the debug logs do not say which. With TELEMETRY=true, server.py opens a
+trace around every tool call and the stages record spans into it:
+
+    reconstruct_thread_context  conversation thread resumption (server.py)
+    expand_paths, read_files    file discovery and reading (utils/file_utils.py)
+    prompt_assembly             building the prompt sent to the model (tools)
+    provider_call               the model call, including cache lookups (utils/progress.py)
+
+Spans nest (read_files runs inside prompt_assembly and includes its own
+expand_paths) and a stage that runs several times is summed. Alongside the
+spans the trace counts files read, tokens estimated before the call and the
+input/output tokens billed by the provider.
+
+Each finished call is appended as one JSON line to TELEMETRY_PATH (default
+logs/telemetry.jsonl). With TELEMETRY_METRICS_PORT set, aggregated counters are
+also served in OpenMetrics text format at http://127.0.0.1:<port>/metrics for
+Prometheus to scrape.
+
+Telemetry is off by default; span(), record() and annotate() then cost a
+single context variable lookup.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TELEMETRY_PATH = str(Path(__file__).resolve().parent.parent / "logs" / "telemetry.jsonl")
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+_current_trace: ContextVar[Optional["ToolCallTrace"]] = ContextVar("tool_call_trace", default=None)
+
+
+def is_enabled() -> bool:
+    return os.getenv("TELEMETRY", "false").lower() in ("true", "1", "yes")
+
+
+class ToolCallTrace:
+    """Stage timings and counters of one tool call."""
+
+    def __init__(self, tool_name: str):
+        self.tool_name = tool_name
+        self.status = "success"
+        self.started_at = datetime.now(timezone.utc)
+        self.duration = 0.0
+        self.stages: dict[str, list[float]] = {}  # stage -> [seconds, count]
+        self.counters: dict[str, int] = {}
+        self.attributes: dict[str, Any] = {}
+        self._start = time.perf_counter()
+        # Stages also run in worker threads (asyncio.to_thread copies the context)
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def increment(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                self.counters[name] = self.counters.get(name, 0) + int(value or 0)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "timestamp": self.started_at.isoformat(),
+                "tool": self.tool_name,
+                "status": self.status,
+                "duration_ms": round(self.duration * 1000, 3),
+                **self.attributes,
+                "stages": {
+                    stage: {"ms": round(seconds * 1000, 3), "count": count}
+                    for stage, (seconds, count) in self.stages.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+
+class _Span:
+    __slots__ = ("trace", "stage", "start")
+
+    def __init__(self, trace: ToolCallTrace, stage: str):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.add_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def is_tracing() -> bool:
+    """Whether the current code runs inside a traced tool call."""
+    return _current_trace.get() is not None
+
+
+def span(stage: str):
+    """Context manager timing a stage of the current tool call (a no-op outside a trace)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, stage)
+
+
+def traced(stage: str):
+    """Decorator timing every call of a function as a stage of the current tool call."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record(**counts: int) -> None:
+    """Adds to counters of the current tool call, e.g. record(files_read=3)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.increment(**counts)
+
+
+def annotate(**attributes: Any) -> None:
+    """Sets attributes (model, provider, ...) on the current tool call."""
+    trace = _current_trace.get()
+    if trace is not None:
+        with trace._lock:
+            trace.attributes.update(attributes)
+
+
+@contextmanager
+def tool_call_trace(tool_name: str) -> Iterator[Optional[ToolCallTrace]]:
+    """Traces one tool call when telemetry is enabled; yields None otherwise."""
+    if not is_enabled():
+        yield None
+        return
+
+    trace = ToolCallTrace(tool_name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        raise
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
+        get_telemetry().export(trace)
+
+
+class MetricsRegistry:
+    """Aggregated counters over finished tool calls, rendered as OpenMetrics text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[tuple[str, str], int] = {}
+        self._durations: dict[str, list[float]] = {}
+        self._stages: dict[tuple[str, str], list[float]] = {}
+        self._counters: dict[tuple[str, str], int] = {}
+
+    def observe(self, trace: ToolCallTrace) -> None:
+        tool = trace.tool_name
+        with self._lock:
+            key = (tool, trace.status)
+            self._calls[key] = self._calls.get(key, 0) + 1
+            totals = self._durations.setdefault(tool, [0.0, 0])
+            totals[0] += trace.duration
+            totals[1] += 1
+            for stage, (seconds, count) in trace.stages.items():
+                totals = self._stages.setdefault((tool, stage), [0.0, 0])
+                totals[0] += seconds
+                totals[1] += count
+            for name, value in trace.counters.items():
+                self._counters[(tool, name)] = self._counters.get((tool, name), 0) + value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append("# TYPE zen_tool_calls counter")
+            lines.append("# HELP zen_tool_calls Tool calls by tool and outcome.")
+            for (tool, status), count in sorted(self._calls.items()):
+                lines.append(f'zen_tool_calls_total{{tool="{tool}",status="{status}"}} {count}')
+
+            lines.append("# TYPE zen_tool_call_duration_seconds summary")
+            lines.append("# HELP zen_tool_call_duration_seconds Wall time of tool calls.")
+            for tool, (seconds, count) in sorted(self._durations.items()):
+                lines.append(f'zen_tool_call_duration_seconds_sum{{tool="{tool}"}} {seconds:.6f}')
+                lines.append(f'zen_tool_call_duration_seconds_count{{tool="{tool}"}} {count}')
+
+            lines.append("# TYPE zen_tool_stage_duration_seconds summary")
+            lines.append("# HELP zen_tool_stage_duration_seconds Time spent in each stage of tool calls.")
+            for (tool, stage), (seconds, count) in sorted(self._stages.items()):
+                labels = f'tool="{tool}",stage="{stage}"'
+                lines.append(f"zen_tool_stage_duration_seconds_sum{{{labels}}} {seconds:.6f}")
+                lines.append(f"zen_tool_stage_duration_seconds_count{{{labels}}} {count}")
+
+            for name in sorted({name for _, name in self._counters}):
+                lines.append(f"# TYPE zen_tool_{name} counter")
+                for (tool, counter), value in sorted(self._counters.items()):
+                    if counter == name:
+                        lines.append(f'zen_tool_{name}_total{{tool="{tool}"}} {value}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class Telemetry:
+    """Writes finished traces as JSON lines and feeds the metrics endpoint."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_TELEMETRY_PATH, metrics_port: Optional[int] = None):
+        self.path = path
+        self.metrics = MetricsRegistry()
+        self._lock = threading.Lock()
+        self._file = None
+        self._metrics_server = None
+        if metrics_port is not None:
+            self._start_metrics_server(metrics_port)
+
+    def export(self, trace: ToolCallTrace) -> None:
+        self.metrics.observe(trace)
+        if not self.path:
+            return
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        try:
+            with self._lock:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line + "\n")
+                self._file.flush()
+        except OSError as e:
+            logger.warning(f"Could not write telemetry to {self.path}: {e}")
+
+    def _start_metrics_server(self, port: int) -> None:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self.metrics
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # stdout/stderr belong to the MCP stdio transport
+                logger.debug(f"Metrics endpoint: {format % args}")
+
+        try:
+            self._metrics_server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+        except OSError as e:
+            # Another server process (one per client session) may already hold the port
+            logger.warning(f"Telemetry metrics endpoint not started on port {port}: {e}")
+            return
+        self._metrics_server.daemon_threads = True
+        threading.Thread(target=self._metrics_server.serve_forever, name="zen-metrics", daemon=True).start()
+        logger.info(f"Serving telemetry metrics at http://127.0.0.1:{self.metrics_port}/metrics")
+
+    @property
+    def metrics_port(self) -> Optional[int]:
+        return self._metrics_server.server_address[1] if self._metrics_server is not None else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
+            self._metrics_server = None
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """The process-wide telemetry exporter, configured from the environment on first use."""
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                path = os.getenv("TELEMETRY_PATH", DEFAULT_TELEMETRY_PATH)
+                if not os.path.isabs(path) and path.lower() != "none":
+                    # Relative paths are relative to the server directory, like the logs
+                    path = str(Path(__file__).resolve().parent.parent / path)
+                port = os.getenv("TELEMETRY_METRICS_PORT", "")
+                _telemetry = Telemetry(
+                    path=None if path.lower() == "none" else path,
+                    metrics_port=int(port) if port.isdigit() else None,
+                )
+    return _telemetry
+
+
+def reset_telemetry() -> None:
+    """Closes and forgets the process-wide exporter (tests, configuration reloads)."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is not None:
+            _telemetry.close()
+        _telemetry = None
@@ -1,36 +1,269 @@
 """
 Token counting utilities for managing API context limits
 
-This module provides functions for estimating token counts to ensure
-requests stay within the Gemini API's context window limits.
+This module provides token counting for prompts, embedded files and
+conversation history so that requests stay within each model's context window.
 
-Note: The estimation uses a simple character-to-token ratio which is
-approximate. For production systems requiring precise token counts,
-consider using the actual tokenizer for the specific model.
+Tokenizer selection is controlled by the TOKENIZER_BACKEND environment variable:
+- "auto" (default): tiktoken when installed, otherwise the heuristic estimator
+- "tiktoken": OpenAI BPE encodings (picked per model, o200k_base fallback)
+- "sentencepiece": SentencePiece model loaded from SENTENCEPIECE_MODEL_PATH
+- "heuristic": dependency-free approximation aware of multi-byte scripts
+
+Encoder objects are expensive to build (tiktoken loads a BPE rank table,
+SentencePiece loads a protobuf model), so each one is created once per process
+and cached. If an optional tokenizer cannot be loaded (missing package, no
+network to fetch the encoding file, bad model path) the heuristic estimator is
+used instead and the failure is logged once.
+
+Counts can be scaled per provider with TOKENIZER_CALIBRATION, e.g.
+"google=1.1,xai=1.05", to account for providers whose real tokenizer differs
+from the locally available one.
 """
 
+import logging
+import os
+from abc import ABC, abstractmethod
+from functools import cache, lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
 # Default fallback for token limit (conservative estimate)
 DEFAULT_CONTEXT_WINDOW = 200_000  # Conservative fallback for unknown models
 
+# Encoding used by tiktoken when a model name is unknown to it (GPT-4o/o-series/GPT-5 vocabulary)
+DEFAULT_TIKTOKEN_ENCODING = "o200k_base"
+
+SUPPORTED_TOKENIZER_BACKENDS = ("auto", "tiktoken", "sentencepiece", "heuristic")
+
+
+class Tokenizer(ABC):
+    """Abstract token counter."""
+
+    name: str = "tokenizer"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Return the number of tokens in text."""
+        pass
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    Dependency-free token approximation.
+
+    ASCII text averages ~4 characters per token. Multi-byte characters (CJK,
+    most symbols such as the "│" line-number separator) cost roughly one token
+    each on modern tokenizers, so treating them as a quarter token badly
+    under-counts Traditional Chinese prompts. Instead of looping over
+    characters in Python, the number of multi-byte characters is derived from
+    the UTF-8 byte length, which keeps the estimate O(n) in C.
+    """
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+
+        char_count = len(text)
+        if text.isascii():
+            return char_count // 4
+
+        # Every non-ASCII character adds 1-3 extra bytes in UTF-8; CJK adds 2.
+        extra_bytes = len(text.encode("utf-8", errors="replace")) - char_count
+        wide_chars = min(char_count, extra_bytes // 2)
+        narrow_chars = char_count - wide_chars
+        return narrow_chars // 4 + wide_chars
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Exact BPE token counts via tiktoken."""
+
+    def __init__(self, encoding):
+        self._encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        # encode_ordinary treats special-token strings (e.g. "<|endoftext|>") in
+        # user files as plain text instead of raising
+        return len(self._encoding.encode_ordinary(text))
+
+
+class SentencePieceTokenizer(Tokenizer):
+    """Token counts from a local SentencePiece model (Gemini/Gemma-style vocabularies)."""
+
+    def __init__(self, processor, model_path: str):
+        self._processor = processor
+        self.name = f"sentencepiece:{os.path.basename(model_path)}"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._processor.encode(text))
+
+
+_HEURISTIC_TOKENIZER = HeuristicTokenizer()
+
+
+def get_tokenizer_backend() -> str:
+    """Get the configured tokenizer backend name (see SUPPORTED_TOKENIZER_BACKENDS)."""
+    backend = os.getenv("TOKENIZER_BACKEND", "auto").strip().lower() or "auto"
+    if backend not in SUPPORTED_TOKENIZER_BACKENDS:
+        logger.warning(f"Unknown TOKENIZER_BACKEND '{backend}', using 'auto'")
+        return "auto"
+    return backend
+
+
+@cache
+def _load_tiktoken_encoding(encoding_name: str):
+    """Load and cache a tiktoken encoding, or None if tiktoken is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(encoding_name)
+    except ImportError:
+        return None
+    except Exception as e:
+        # tiktoken downloads encoding files on first use; fail soft when offline
+        logger.warning(f"Could not load tiktoken encoding '{encoding_name}': {type(e).__name__}: {e}")
+        return None
 
-def estimate_tokens(text: str) -> int:
+
+@lru_cache(maxsize=128)
+def _tiktoken_encoding_name_for_model(model_name: Optional[str]) -> str:
+    """Resolve the tiktoken encoding name used by a model."""
+    if model_name:
+        try:
+            import tiktoken
+
+            return tiktoken.encoding_name_for_model(model_name)
+        except (ImportError, KeyError):
+            pass
+    return DEFAULT_TIKTOKEN_ENCODING
+
+
+@cache
+def _load_sentencepiece_tokenizer(model_path: str) -> Optional[SentencePieceTokenizer]:
+    """Load and cache a SentencePiece model, or None if it cannot be loaded."""
+    if not model_path:
+        logger.warning("TOKENIZER_BACKEND=sentencepiece requires SENTENCEPIECE_MODEL_PATH to be set")
+        return None
+    try:
+        import sentencepiece
+
+        processor = sentencepiece.SentencePieceProcessor(model_file=model_path)
+        return SentencePieceTokenizer(processor, model_path)
+    except ImportError:
+        logger.warning("TOKENIZER_BACKEND=sentencepiece but the sentencepiece package is not installed")
+        return None
+    except Exception as e:
+        logger.warning(f"Could not load SentencePiece model '{model_path}': {type(e).__name__}: {e}")
+        return None
+
+
+@lru_cache(maxsize=128)
+def _resolve_tokenizer(backend: str, model_name: Optional[str], sentencepiece_path: str) -> Tokenizer:
+    """Build the tokenizer for a backend/model combination (cached per combination)."""
+    if backend == "heuristic":
+        return _HEURISTIC_TOKENIZER
+
+    if backend == "sentencepiece":
+        tokenizer = _load_sentencepiece_tokenizer(sentencepiece_path)
+        if tokenizer is not None:
+            return tokenizer
+        return _HEURISTIC_TOKENIZER
+
+    # "auto" or "tiktoken"
+    encoding = _load_tiktoken_encoding(_tiktoken_encoding_name_for_model(model_name))
+    if encoding is not None:
+        return TiktokenTokenizer(encoding)
+
+    if backend == "tiktoken":
+        logger.warning("TOKENIZER_BACKEND=tiktoken but tiktoken is unavailable, falling back to heuristic estimation")
+    return _HEURISTIC_TOKENIZER
+
+
+def get_tokenizer(model_name: Optional[str] = None) -> Tokenizer:
+    """
+    Get the cached tokenizer for a model.
+
+    Args:
+        model_name: Optional model name used to pick a model-specific encoding
+
+    Returns:
+        Tokenizer: Cached tokenizer instance (heuristic fallback if none is available)
     """
-    Estimate token count using a character-based approximation.
+    return _resolve_tokenizer(get_tokenizer_backend(), model_name, os.getenv("SENTENCEPIECE_MODEL_PATH", ""))
 
-    This uses a rough heuristic where 1 token ≈ 4 characters, which is
-    a reasonable approximation for English text. The actual token count
-    may vary based on:
-    - Language (non-English text may have different ratios)
-    - Code vs prose (code often has more tokens per character)
-    - Special characters and formatting
+
+def _parse_calibration(raw: str) -> dict[str, float]:
+    """Parse "provider=factor,provider=factor" into a dict, skipping invalid entries."""
+    factors = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        provider, _, value = item.partition("=")
+        try:
+            factor = float(value)
+        except ValueError:
+            logger.warning(f"Ignoring invalid TOKENIZER_CALIBRATION entry '{item}'")
+            continue
+        if factor <= 0:
+            logger.warning(f"Ignoring non-positive TOKENIZER_CALIBRATION entry '{item}'")
+            continue
+        factors[provider.strip().lower()] = factor
+    return factors
+
+
+@lru_cache(maxsize=8)
+def _calibration_table(raw: str) -> dict[str, float]:
+    return _parse_calibration(raw)
+
+
+def get_calibration_factor(provider: Optional[str]) -> float:
+    """
+    Get the token count calibration factor for a provider.
+
+    Args:
+        provider: Provider type value (e.g., "google", "openai") or None
+
+    Returns:
+        float: Multiplier applied to raw token counts (1.0 when not configured)
+    """
+    if not provider:
+        return 1.0
+    return _calibration_table(os.getenv("TOKENIZER_CALIBRATION", "")).get(provider.lower(), 1.0)
+
+
+def estimate_tokens(text: str, model_name: Optional[str] = None, provider: Optional[str] = None) -> int:
+    """
+    Count tokens in text using the configured tokenizer.
+
+    Uses a real tokenizer (tiktoken/SentencePiece) when available and falls back
+    to a script-aware approximation: ~4 characters per token for ASCII text and
+    ~1 token per CJK character.
 
     Args:
-        text: The text to estimate tokens for
+        text: The text to count tokens for
+        model_name: Optional model name for model-specific encodings
+        provider: Optional provider type value used for calibration
 
     Returns:
         int: Estimated number of tokens
     """
-    return len(text) // 4
+    if not text:
+        return 0
+
+    tokens = get_tokenizer(model_name).count(text)
+    factor = get_calibration_factor(provider)
+    if factor != 1.0:
+        tokens = int(tokens * factor)
+    return tokens
 
 
 def check_token_limit(text: str, context_window: int = DEFAULT_CONTEXT_WINDOW) -> tuple[bool, int]: